@@ -4,12 +4,18 @@ Reduces multiple API calls to single aggregated endpoints
 """
 
 import os
+import asyncio
 import logging
 from typing import Optional
 from datetime import datetime, timezone, timedelta
 from fastapi import APIRouter, Depends, HTTPException, Query, Header
-from motor.motor_asyncio import AsyncIOMotorClient
 import jwt
+from utils.database import get_database
+from utils.principal_cache import principal_cache
+from cache_service import get_cached_project_stats, load_cached_project_stats
+from models_projects import DrawingState
+from services.drawing_state import drawing_state
+from services.project_stats import flag_expression
 
 logger = logging.getLogger(__name__)
 
@@ -17,10 +23,7 @@ logger = logging.getLogger(__name__)
 aggregated_router = APIRouter(prefix="/api/aggregated", tags=["aggregated"])
 
 # Database connection
-mongo_url = os.environ.get('MONGO_URL')
-db_name = os.environ.get('DB_NAME', 'architecture_firm')
-client = AsyncIOMotorClient(mongo_url)
-db = client[db_name]
+db = get_database()
 
 SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "your-secret-key")
 
@@ -43,6 +46,11 @@ async def get_current_user_from_token(authorization: str = Header(None)):
         if not user_identifier:
             raise HTTPException(status_code=401, detail="Invalid token")
         
+        cache_key = f"token:jwt:{user_identifier}"
+        cached_user = principal_cache.get(cache_key)
+        if cached_user is not None:
+            return dict(cached_user)
+        
         # Get user from database - try by ID first, then by email
         user = await db.users.find_one({"id": user_identifier}, {"_id": 0})
         if not user:
@@ -52,7 +60,8 @@ async def get_current_user_from_token(authorization: str = Header(None)):
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
         
-        return user
+        principal_cache.set(cache_key, user, user_id=user.get("id"), email=user.get("email"))
+        return dict(user)
         
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
@@ -63,6 +72,112 @@ async def get_current_user_from_token(authorization: str = Header(None)):
         raise HTTPException(status_code=401, detail="Authentication failed")
 
 
+EMPTY_DRAWING_STATS = {
+    "total_drawings": 0,
+    "issued": 0,
+    "revisions_needed": 0,
+    "pending_approval": 0,
+    "ready_to_issue": 0
+}
+
+
+def _in_state(state: DrawingState) -> dict:
+    return {"$cond": [{"$eq": ["$state", state.value]}, 1, 0]}
+
+
+async def _aggregate_drawing_stats(project_ids: list) -> dict:
+    """Per-project drawing status counters in a single $group pass"""
+    pipeline = [
+        {"$match": {"project_id": {"$in": project_ids}, "deleted_at": None}},
+        {"$group": {
+            "_id": "$project_id",
+            "total_drawings": {"$sum": 1},
+            "issued": {"$sum": {"$cond": [flag_expression("is_issued"), 1, 0]}},
+            "revisions_needed": {"$sum": _in_state(DrawingState.REVISION_REQUIRED)},
+            "pending_approval": {"$sum": _in_state(DrawingState.UPLOADED_WAITING_APPROVAL)},
+            "ready_to_issue": {"$sum": _in_state(DrawingState.APPROVED_READY_TO_ISSUE)}
+        }}
+    ]
+    rows = await db.project_drawings.aggregate(pipeline).to_list(len(project_ids))
+    return {row.pop("_id"): row for row in rows}
+
+
+async def _aggregate_recent_comments(project_ids: list, user_id: str) -> dict:
+    """Per-project count of other users' comments from the last 24h"""
+    yesterday = datetime.now(timezone.utc) - timedelta(hours=24)
+    pipeline = [
+        {"$match": {
+            "project_id": {"$in": project_ids},
+            "created_at": {"$gte": yesterday.isoformat()},
+            "user_id": {"$ne": user_id}
+        }},
+        {"$group": {"_id": "$project_id", "count": {"$sum": 1}}}
+    ]
+    rows = await db.comments.aggregate(pipeline).to_list(len(project_ids))
+    return {row["_id"]: row["count"] for row in rows}
+
+
+def _shared_batch(fetch):
+    """
+    Loader factory over one lazily started bulk query: each project's
+    loader awaits the same task and picks its own row. Projects another
+    request is already loading coalesce onto that load instead.
+    """
+    task = None
+
+    def loader_for(project_id, pick):
+        async def load():
+            nonlocal task
+            if task is None:
+                task = asyncio.ensure_future(fetch())
+            return pick(await asyncio.shield(task), project_id)
+        return load
+    return loader_for
+
+
+async def _get_team_leader_project_stats(project_ids: list, user_id: str) -> dict:
+    """
+    Drawing and comment stats for each project, served from cache where
+    possible and otherwise computed with one aggregation per collection.
+    Concurrent dashboards missing the same project share one computation.
+    Cached entries are dropped by cache_service.invalidate_project_stats
+    on drawing and comment writes.
+    """
+    comments_part = f"comments:{user_id}"
+    drawing_stats = {}
+    comment_counts = {}
+    for project_id in project_ids:
+        cached = await get_cached_project_stats(project_id, "drawings")
+        if cached is not None:
+            drawing_stats[project_id] = cached
+        cached = await get_cached_project_stats(project_id, comments_part)
+        if cached is not None:
+            comment_counts[project_id] = cached["count"]
+    
+    missing_drawings = [pid for pid in project_ids if pid not in drawing_stats]
+    missing_comments = [pid for pid in project_ids if pid not in comment_counts]
+    
+    drawings_loader = _shared_batch(lambda: _aggregate_drawing_stats(missing_drawings))
+    comments_loader = _shared_batch(lambda: _aggregate_recent_comments(missing_comments, user_id))
+    fresh = await asyncio.gather(
+        *(load_cached_project_stats(
+            pid, "drawings",
+            drawings_loader(pid, lambda rows, p: rows.get(p, dict(EMPTY_DRAWING_STATS)))
+        ) for pid in missing_drawings),
+        *(load_cached_project_stats(
+            pid, comments_part,
+            comments_loader(pid, lambda rows, p: {"count": rows.get(p, 0)})
+        ) for pid in missing_comments)
+    )
+    
+    for project_id, stats in zip(missing_drawings, fresh):
+        drawing_stats[project_id] = stats
+    for project_id, stats in zip(missing_comments, fresh[len(missing_drawings):]):
+        comment_counts[project_id] = stats["count"]
+    
+    return {pid: (drawing_stats[pid], comment_counts[pid]) for pid in project_ids}
+
+
 @aggregated_router.get("/team-leader-dashboard")
 async def get_team_leader_dashboard(user: dict = Depends(get_current_user_from_token)):
     """
@@ -83,7 +198,10 @@ async def get_team_leader_dashboard(user: dict = Depends(get_current_user_from_t
         {"_id": 0}
     ).to_list(100)
     
-    # Aggregate drawing stats for each project
+    stats_by_project = await _get_team_leader_project_stats(
+        [p['id'] for p in projects], user_id
+    )
+    
     projects_with_stats = []
     total_revisions = 0
     total_pending_approval = 0
@@ -91,31 +209,14 @@ async def get_team_leader_dashboard(user: dict = Depends(get_current_user_from_t
     total_new_comments = 0
     
     for project in projects:
-        # Get drawings for this project
-        drawings = await db.project_drawings.find(
-            {"project_id": project['id'], "deleted_at": None},
-            {"_id": 0}
-        ).to_list(500)
-        
-        # Calculate stats
-        total_drawings = len(drawings)
-        issued = len([d for d in drawings if d.get('is_issued')])
-        revisions = len([d for d in drawings if d.get('has_pending_revision')])
-        pending_approval = len([d for d in drawings if d.get('under_review') and not d.get('is_approved') and not d.get('has_pending_revision')])
-        ready_to_issue = len([d for d in drawings if d.get('is_approved') and not d.get('is_issued')])
-        
-        # Get recent comments (last 24h)
-        yesterday = datetime.now(timezone.utc) - timedelta(hours=24)
-        recent_comments = await db.comments.count_documents({
-            "project_id": project['id'],
-            "created_at": {"$gte": yesterday.isoformat()},
-            "user_id": {"$ne": user_id}
-        })
+        drawing_stats, recent_comments = stats_by_project[project['id']]
+        total_drawings = drawing_stats["total_drawings"]
+        issued = drawing_stats["issued"]
         
         # Update totals
-        total_revisions += revisions
-        total_pending_approval += pending_approval
-        total_ready_to_issue += ready_to_issue
+        total_revisions += drawing_stats["revisions_needed"]
+        total_pending_approval += drawing_stats["pending_approval"]
+        total_ready_to_issue += drawing_stats["ready_to_issue"]
         total_new_comments += recent_comments
         
         project_data = {
@@ -123,9 +224,9 @@ async def get_team_leader_dashboard(user: dict = Depends(get_current_user_from_t
             "stats": {
                 "total_drawings": total_drawings,
                 "issued": issued,
-                "revisions_needed": revisions,
-                "pending_approval": pending_approval,
-                "ready_to_issue": ready_to_issue,
+                "revisions_needed": drawing_stats["revisions_needed"],
+                "pending_approval": drawing_stats["pending_approval"],
+                "ready_to_issue": drawing_stats["ready_to_issue"],
                 "new_comments": recent_comments,
                 "percent_complete": round((issued / total_drawings * 100) if total_drawings > 0 else 0)
             }
@@ -186,13 +287,16 @@ async def get_project_full(project_id: str, user: dict = Depends(get_current_use
         {"_id": 0}
     ).to_list(500)
     
-    # Categorize drawings
+    # Categorize drawings by their lifecycle state
+    by_state = {state.value: [] for state in DrawingState}
+    for d in drawings:
+        by_state.setdefault(d.get('state') or drawing_state(d), []).append(d)
     drawings_by_status = {
-        "revisions_needed": [d for d in drawings if d.get('has_pending_revision')],
-        "pending_approval": [d for d in drawings if d.get('under_review') and not d.get('is_approved') and not d.get('has_pending_revision')],
-        "ready_to_issue": [d for d in drawings if d.get('is_approved') and not d.get('is_issued')],
-        "issued": [d for d in drawings if d.get('is_issued') and not d.get('has_pending_revision')],
-        "not_started": [d for d in drawings if not d.get('file_url') and not d.get('is_issued') and not d.get('has_pending_revision') and not d.get('under_review')]
+        "revisions_needed": by_state[DrawingState.REVISION_REQUIRED.value],
+        "pending_approval": by_state[DrawingState.UPLOADED_WAITING_APPROVAL.value],
+        "ready_to_issue": by_state[DrawingState.APPROVED_READY_TO_ISSUE.value],
+        "issued": by_state[DrawingState.ISSUED.value],
+        "not_started": by_state[DrawingState.PENDING_UPLOAD.value]
     }
     
     # Get 3D images grouped by category
@@ -284,16 +388,28 @@ async def get_my_work(user: dict = Depends(get_current_user_from_token)):
     
     action_items = []
     
-    for project in projects:
-        # Get actionable drawings
-        drawings = await db.project_drawings.find(
-            {"project_id": project['id'], "deleted_at": None},
+    # Actionable drawings across all projects in one indexed query on state
+    actionable_states = {
+        DrawingState.REVISION_REQUIRED.value: "revisions_needed",
+        DrawingState.UPLOADED_WAITING_APPROVAL.value: "pending_approval",
+        DrawingState.APPROVED_READY_TO_ISSUE.value: "ready_to_issue",
+    }
+    actionable = {p['id']: {key: [] for key in actionable_states.values()} for p in projects}
+    if projects:
+        async for d in db.project_drawings.find(
+            {
+                "state": {"$in": list(actionable_states)},
+                "project_id": {"$in": list(actionable)},
+                "deleted_at": None
+            },
             {"_id": 0}
-        ).to_list(500)
-        
-        revisions = [d for d in drawings if d.get('has_pending_revision')]
-        pending_approval = [d for d in drawings if d.get('under_review') and not d.get('is_approved') and not d.get('has_pending_revision')]
-        ready_to_issue = [d for d in drawings if d.get('is_approved') and not d.get('is_issued')]
+        ):
+            actionable[d['project_id']][actionable_states[d['state']]].append(d)
+    
+    for project in projects:
+        revisions = actionable[project['id']]["revisions_needed"]
+        pending_approval = actionable[project['id']]["pending_approval"]
+        ready_to_issue = actionable[project['id']]["ready_to_issue"]
         
         # Get recent comments
         yesterday = datetime.now(timezone.utc) - timedelta(hours=24)
@@ -383,6 +499,7 @@ async def get_cache_stats(user: dict = Depends(get_current_user_from_token)):
         from cache_service import cache
         return {
             "cache_stats": cache.stats(),
+            "principal_cache_stats": principal_cache.stats(),
             "async_notifications_enabled": True
         }
     except ImportError:
@@ -8,15 +8,12 @@ from typing import List, Optional
 from datetime import datetime, timezone
 from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
-from motor.motor_asyncio import AsyncIOMotorClient
+from utils.database import get_database
 
 logger = logging.getLogger(__name__)
 
 # Database connection
-mongo_url = os.environ.get('MONGO_URL')
-db_name = os.environ.get('DB_NAME', 'architecture_firm')
-client = AsyncIOMotorClient(mongo_url)
-db = client[db_name]
+db = get_database()
 
 # Create router
 notifications_payments_router = APIRouter()
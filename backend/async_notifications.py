@@ -6,124 +6,137 @@ Non-blocking notification delivery for WhatsApp, Email, and SMS
 import asyncio
 import logging
 import os
-from typing import Dict, Any
+from typing import Dict, Any, List
 from datetime import datetime, timezone
-from motor.motor_asyncio import AsyncIOMotorClient
+from utils.database import get_database
+from integrations.twilio_transport import twilio_transport, TwilioError
+from integrations.sendgrid_transport import sendgrid_transport, SendGridError
+from notification_outbox import notification_outbox, PermanentDeliveryError
 
 logger = logging.getLogger(__name__)
 
 # Database connection
-mongo_url = os.environ.get('MONGO_URL')
-db_name = os.environ.get('DB_NAME', 'architecture_firm')
-client = AsyncIOMotorClient(mongo_url)
-db = client[db_name]
+db = get_database()
 
-# Notification queue for background processing
-notification_queue: asyncio.Queue = asyncio.Queue()
+# Delivery workers per process (each handles one notification at a time)
+NOTIFICATION_WORKERS = int(os.environ.get('NOTIFICATION_WORKERS', '4'))
+# How long an idle worker waits before polling the outbox again
+NOTIFICATION_POLL_INTERVAL = float(os.environ.get('NOTIFICATION_POLL_INTERVAL', '2'))
 
 
 class AsyncNotificationService:
     """
     Async notification service that processes notifications in background.
-    Notifications are queued and processed without blocking the main request.
+    Notifications are persisted to the outbox and delivered by a pool of
+    workers, without blocking the main request.
     """
     
     def __init__(self):
         self.is_running = False
-        self.worker_task = None
-        self.twilio_client = None
+        self.worker_tasks: List[asyncio.Task] = []
+        self.outbox = notification_outbox
+        self._wakeup = asyncio.Event()
         self.sendgrid_client = None
         self._init_clients()
     
     def _init_clients(self):
-        """Initialize Twilio and SendGrid clients"""
-        try:
-            from twilio.rest import Client
-            account_sid = os.environ.get('TWILIO_ACCOUNT_SID')
-            auth_token = os.environ.get('TWILIO_AUTH_TOKEN')
-            if account_sid and auth_token:
-                self.twilio_client = Client(account_sid, auth_token)
-                logger.info("Twilio client initialized for async notifications")
-        except Exception as e:
-            logger.warning(f"Twilio client init failed: {e}")
+        """Check the pooled Twilio and SendGrid transports are configured"""
+        if twilio_transport.is_configured:
+            logger.info("Async Twilio transport enabled for async notifications")
         
-        try:
-            from sendgrid import SendGridAPIClient
-            api_key = os.environ.get('SENDGRID_API_KEY')
-            if api_key:
-                self.sendgrid_client = SendGridAPIClient(api_key)
-                logger.info("SendGrid client initialized for async notifications")
-        except Exception as e:
-            logger.warning(f"SendGrid client init failed: {e}")
+        if sendgrid_transport.is_configured:
+            self.sendgrid_client = sendgrid_transport
+            logger.info("SendGrid client initialized for async notifications")
     
-    async def start_worker(self):
-        """Start the background worker to process notifications"""
+    async def start_worker(self, workers: int = None):
+        """Start the background workers that drain the outbox"""
         if self.is_running:
             return
         
         self.is_running = True
-        self.worker_task = asyncio.create_task(self._process_queue())
-        logger.info("Async notification worker started")
+        count = workers or NOTIFICATION_WORKERS
+        self.worker_tasks = [
+            asyncio.create_task(self._process_queue(i)) for i in range(count)
+        ]
+        logger.info(f"Async notification workers started ({count})")
     
     async def stop_worker(self):
-        """Stop the background worker"""
+        """Stop the background workers"""
         self.is_running = False
-        if self.worker_task:
-            self.worker_task.cancel()
+        self._wakeup.set()
+        for task in self.worker_tasks:
+            task.cancel()
+        for task in self.worker_tasks:
             try:
-                await self.worker_task
+                await task
             except asyncio.CancelledError:
                 pass
-        logger.info("Async notification worker stopped")
+        self.worker_tasks = []
+        logger.info("Async notification workers stopped")
     
-    async def _process_queue(self):
-        """Background worker that processes notifications from the queue"""
+    async def _process_queue(self, worker_id: int = 0):
+        """Worker loop: claim due outbox entries and deliver them"""
         while self.is_running:
             try:
-                # Wait for notification with timeout
-                try:
-                    notification = await asyncio.wait_for(
-                        notification_queue.get(), 
-                        timeout=1.0
-                    )
-                except asyncio.TimeoutError:
+                entry = await self.outbox.claim()
+                if entry is None:
+                    # Nothing due: sleep until the poll interval or a local enqueue
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=NOTIFICATION_POLL_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
                     continue
                 
-                # Process notification
-                await self._send_notification(notification)
-                notification_queue.task_done()
+                await self._dispatch(entry)
                 
+            except asyncio.CancelledError:
+                raise
             except Exception as e:
-                logger.error(f"Error processing notification: {e}")
+                logger.error(f"Notification worker {worker_id} error: {e}")
                 await asyncio.sleep(1)  # Brief pause on error
     
-    async def _send_notification(self, notification: Dict[str, Any]):
-        """Send a notification based on its type"""
-        notif_type = notification.get('type')
+    async def _dispatch(self, entry: Dict[str, Any]):
+        """Deliver a claimed outbox entry and record the outcome"""
+        notification = entry.get('payload', {})
+        notif_type = entry.get('type')
         
         try:
-            if notif_type == 'whatsapp':
-                await self._send_whatsapp(notification)
-            elif notif_type == 'whatsapp_template':
-                await self._send_whatsapp_template(notification)
-            elif notif_type == 'whatsapp_media':
-                await self._send_whatsapp_with_media(notification)
-            elif notif_type == 'email':
-                await self._send_email(notification)
-            elif notif_type == 'sms':
-                await self._send_sms(notification)
-            
-            # Log success
-            await self._log_notification(notification, 'success')
-            
+            await self._send_notification(notification)
         except Exception as e:
-            logger.error(f"Failed to send {notif_type} notification: {e}")
-            await self._log_notification(notification, 'failed', str(e))
+            permanent = _is_permanent_error(e)
+            status = await self.outbox.mark_failed(entry, str(e), permanent=permanent)
+            logger.error(
+                f"Failed to send {notif_type} notification {entry['id']} "
+                f"(attempt {entry.get('attempts')}, now {status}): {e}"
+            )
+            await self._log_notification(notification, 'failed', str(e), entry=entry)
+            return
+        
+        await self.outbox.mark_sent(entry)
+        await self._log_notification(notification, 'success', entry=entry)
+    
+    async def _send_notification(self, notification: Dict[str, Any]):
+        """Send a notification based on its type (raises on failure)"""
+        notif_type = notification.get('type')
+        
+        if notif_type == 'whatsapp':
+            await self._send_whatsapp(notification)
+        elif notif_type == 'whatsapp_template':
+            await self._send_whatsapp_template(notification)
+        elif notif_type == 'whatsapp_media':
+            await self._send_whatsapp_with_media(notification)
+        elif notif_type == 'email':
+            await self._send_email(notification)
+        elif notif_type == 'sms':
+            await self._send_sms(notification)
+        else:
+            raise PermanentDeliveryError(f"Unknown notification type: {notif_type}")
     
     async def _send_whatsapp_with_media(self, notification: Dict[str, Any]):
         """Send WhatsApp message with media attachment (PDF/image)"""
-        if not self.twilio_client:
-            logger.warning("Twilio client not available for WhatsApp media")
+        if not twilio_transport.is_configured:
+            logger.warning("Twilio transport not configured for WhatsApp media")
             return
         
         phone = notification.get('phone')
@@ -135,11 +148,11 @@ class AsyncNotificationService:
         
         try:
             # Send message with media
-            msg = self.twilio_client.messages.create(
+            msg = await twilio_transport.create_message(
                 from_=from_number,
                 to=to_number,
                 body=message,
-                media_url=[media_url] if media_url else None
+                media_url=media_url or None
             )
             logger.info(f"WhatsApp media sent: {msg.sid}")
         except Exception as e:
@@ -148,7 +161,7 @@ class AsyncNotificationService:
     
     async def _send_whatsapp(self, notification: Dict[str, Any]):
         """Send freeform WhatsApp message (only works within 24h window)"""
-        if not self.twilio_client:
+        if not twilio_transport.is_configured:
             return
         
         phone = notification.get('phone')
@@ -163,7 +176,7 @@ class AsyncNotificationService:
         to_number = f"whatsapp:{phone}" if not phone.startswith('whatsapp:') else phone
         
         try:
-            msg = self.twilio_client.messages.create(
+            msg = await twilio_transport.create_message(
                 from_=from_number,
                 to=to_number,
                 body=message
@@ -175,7 +188,7 @@ class AsyncNotificationService:
     
     async def _send_whatsapp_template(self, notification: Dict[str, Any]):
         """Send WhatsApp template message (works outside 24h window)"""
-        if not self.twilio_client:
+        if not twilio_transport.is_configured:
             return
         
         phone = notification.get('phone')
@@ -186,7 +199,7 @@ class AsyncNotificationService:
         to_number = f"whatsapp:{phone}" if not phone.startswith('whatsapp:') else phone
         
         try:
-            msg = self.twilio_client.messages.create(
+            msg = await twilio_transport.create_message(
                 from_=from_number,
                 to=to_number,
                 content_sid=content_sid,
@@ -214,7 +227,7 @@ class AsyncNotificationService:
         )
         
         try:
-            response = self.sendgrid_client.send(message)
+            response = await self.sendgrid_client.send(message)
             logger.info(f"Email sent: {response.status_code}")
         except Exception as e:
             logger.error(f"Email send failed: {e}")
@@ -222,7 +235,7 @@ class AsyncNotificationService:
     
     async def _send_sms(self, notification: Dict[str, Any]):
         """Send SMS via Twilio"""
-        if not self.twilio_client:
+        if not twilio_transport.is_configured:
             return
         
         phone = notification.get('phone')
@@ -233,7 +246,7 @@ class AsyncNotificationService:
             return
         
         try:
-            msg = self.twilio_client.messages.create(
+            msg = await twilio_transport.create_message(
                 from_=from_number,
                 to=phone,
                 body=message
@@ -275,7 +288,8 @@ class AsyncNotificationService:
             logger.error(f"Error checking 24h window: {e}")
             return False  # Default to false to avoid failed freeform attempts
     
-    async def _log_notification(self, notification: Dict[str, Any], status: str, error: str = None):
+    async def _log_notification(self, notification: Dict[str, Any], status: str, error: str = None,
+                                entry: Dict[str, Any] = None):
         """Log notification to database asynchronously"""
         try:
             log_entry = {
@@ -289,59 +303,84 @@ class AsyncNotificationService:
                     if k not in ['phone', 'to_email', 'html_content', 'message']
                 }
             }
+            if entry:
+                log_entry["outbox_id"] = entry.get('id')
+                log_entry["attempt"] = entry.get('attempts')
             await db.notification_logs.insert_one(log_entry)
         except Exception as e:
             logger.error(f"Failed to log notification: {e}")
     
     # Public API - Queue notifications for async processing
     
-    def queue_whatsapp(self, phone: str, message: str, **kwargs):
+    async def enqueue(self, notification: Dict[str, Any], idempotency_key: str = None) -> str:
+        """
+        Persist a notification to the outbox and wake a local worker.
+        Returns the outbox entry id.
+        """
+        entry_id = await self.outbox.enqueue(notification, idempotency_key=idempotency_key)
+        self._wakeup.set()
+        return entry_id
+    
+    async def queue_whatsapp(self, phone: str, message: str, idempotency_key: str = None, **kwargs) -> str:
         """Queue a WhatsApp message for async delivery"""
-        asyncio.create_task(notification_queue.put({
+        return await self.enqueue({
             'type': 'whatsapp',
             'phone': phone,
             'message': message,
             **kwargs
-        }))
+        }, idempotency_key=idempotency_key)
     
-    def queue_whatsapp_template(self, phone: str, content_sid: str, variables: Dict, **kwargs):
+    async def queue_whatsapp_template(self, phone: str, content_sid: str, variables: Dict,
+                                      idempotency_key: str = None, **kwargs) -> str:
         """Queue a WhatsApp template message for async delivery"""
-        asyncio.create_task(notification_queue.put({
+        return await self.enqueue({
             'type': 'whatsapp_template',
             'phone': phone,
             'content_sid': content_sid,
             'variables': variables,
             **kwargs
-        }))
+        }, idempotency_key=idempotency_key)
     
-    def queue_whatsapp_with_media(self, phone: str, media_url: str, message: str = '', **kwargs):
+    async def queue_whatsapp_with_media(self, phone: str, media_url: str, message: str = '',
+                                        idempotency_key: str = None, **kwargs) -> str:
         """Queue a WhatsApp message with media attachment"""
-        asyncio.create_task(notification_queue.put({
+        return await self.enqueue({
             'type': 'whatsapp_media',
             'phone': phone,
             'media_url': media_url,
             'message': message,
             **kwargs
-        }))
+        }, idempotency_key=idempotency_key)
     
-    def queue_email(self, to_email: str, subject: str, html_content: str, **kwargs):
+    async def queue_email(self, to_email: str, subject: str, html_content: str,
+                          idempotency_key: str = None, **kwargs) -> str:
         """Queue an email for async delivery"""
-        asyncio.create_task(notification_queue.put({
+        return await self.enqueue({
             'type': 'email',
             'to_email': to_email,
             'subject': subject,
             'html_content': html_content,
             **kwargs
-        }))
+        }, idempotency_key=idempotency_key)
     
-    def queue_sms(self, phone: str, message: str, **kwargs):
+    async def queue_sms(self, phone: str, message: str, idempotency_key: str = None, **kwargs) -> str:
         """Queue an SMS for async delivery"""
-        asyncio.create_task(notification_queue.put({
+        return await self.enqueue({
             'type': 'sms',
             'phone': phone,
             'message': message,
             **kwargs
-        }))
+        }, idempotency_key=idempotency_key)
+
+
+def _is_permanent_error(error: Exception) -> bool:
+    """Errors that retrying cannot fix: bad requests rejected by the provider"""
+    if isinstance(error, PermanentDeliveryError):
+        return True
+    if isinstance(error, (TwilioError, SendGridError)) and error.status:
+        # 4xx other than rate limiting / auth hiccups means the message itself is bad
+        return 400 <= error.status < 500 and error.status not in (401, 408, 429)
+    return False
 
 
 # Singleton instance
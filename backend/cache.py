@@ -1,58 +1,46 @@
 """
 Cache module for performance optimization
 Caches static/semi-static data to reduce database calls
+
+Entries live in the shared in-process cache engine (see cache_service)
+under the "app:" namespace, so they count against the same bounds and
+show up in the same metrics.
 """
 
 from typing import Dict, Any, Optional
-from datetime import datetime, timezone, timedelta
 import logging
 
+from cache_service import memory_cache, KIND_KEYS, KIND_TAGS
+from utils.invalidation_bus import invalidation_bus
+
 logger = logging.getLogger(__name__)
 
-# In-memory cache with TTL
-_cache: Dict[str, Dict[str, Any]] = {}
 DEFAULT_TTL_MINUTES = 10
+_NAMESPACE = "app:"
+_TAG = "app"
 
 
 def get_cached(key: str) -> Optional[Any]:
     """Get cached value if exists and not expired"""
-    if key in _cache:
-        entry = _cache[key]
-        if datetime.now(timezone.utc) < entry['expires_at']:
-            return entry['value']
-        else:
-            # Expired, remove from cache
-            del _cache[key]
-    return None
+    return memory_cache.get(_NAMESPACE + key)
 
 
 def set_cached(key: str, value: Any, ttl_minutes: int = DEFAULT_TTL_MINUTES):
     """Set cache value with TTL"""
-    _cache[key] = {
-        'value': value,
-        'expires_at': datetime.now(timezone.utc) + timedelta(minutes=ttl_minutes),
-        'created_at': datetime.now(timezone.utc)
-    }
+    memory_cache.set(_NAMESPACE + key, value, ttl_minutes * 60, tags=(_TAG,))
 
 
 def invalidate_cache(key: str = None):
-    """Invalidate specific key or all cache"""
-    global _cache
+    """Invalidate specific key or all cache (on every worker)"""
     if key:
-        _cache.pop(key, None)
+        invalidation_bus.publish(KIND_KEYS, keys=[_NAMESPACE + key])
     else:
-        _cache = {}
+        invalidation_bus.publish(KIND_TAGS, tags=[_TAG])
 
 
 def get_cache_stats() -> Dict:
-    """Get cache statistics"""
-    now = datetime.now(timezone.utc)
-    valid_entries = sum(1 for e in _cache.values() if now < e['expires_at'])
-    return {
-        "total_entries": len(_cache),
-        "valid_entries": valid_entries,
-        "expired_entries": len(_cache) - valid_entries
-    }
+    """Get cache statistics (of the shared engine)"""
+    return memory_cache.stats()
 
 
 # Pre-loaded configuration (loaded once at startup)
@@ -1,138 +1,120 @@
 """
 In-Memory Cache Service
 Short-term caching (30-60 seconds) for frequently accessed data
+
+Entries are tagged so writes can drop everything derived from a record
+(see the helpers below) without scanning keys. Bounds are set with
+CACHE_MAX_ENTRIES / CACHE_MAX_BYTES; hit, miss and eviction counters
+are served by /api/ops/status/cache. Invalidations are broadcast to the
+other workers through utils.invalidation_bus.
 """
 
-import asyncio
+import os
 import logging
-from typing import Any, Optional, Callable
-from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Iterable, Optional
 from functools import wraps
 
-logger = logging.getLogger(__name__)
+from utils.memory_cache import ShardedLRUCache
+from utils.invalidation_bus import invalidation_bus
 
+logger = logging.getLogger(__name__)
 
-class CacheEntry:
-    """Single cache entry with expiration"""
-    
-    def __init__(self, value: Any, ttl_seconds: int):
-        self.value = value
-        self.expires_at = datetime.now(timezone.utc).timestamp() + ttl_seconds
-    
-    def is_expired(self) -> bool:
-        return datetime.now(timezone.utc).timestamp() > self.expires_at
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', '10000'))
+CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+CACHE_SHARDS = int(os.environ.get('CACHE_SHARDS', '16'))
+# Writes invalidate these across workers, so they can live well beyond the old 60s
+PROJECT_STATS_CACHE_TTL = int(os.environ.get('PROJECT_STATS_CACHE_TTL', '600'))
 
 
 class InMemoryCache:
     """
-    Simple in-memory cache with TTL support.
-    Designed for short-term caching of frequently accessed data.
+    Async facade over the process-wide ShardedLRUCache.
+    Designed for short-term caching of frequently accessed data; reads
+    never wait on a lock and the engine is bounded in entries and bytes.
     """
     
-    def __init__(self):
-        self._cache: dict[str, CacheEntry] = {}
-        self._lock = asyncio.Lock()
-        self._cleanup_task = None
+    def __init__(self, engine: ShardedLRUCache):
+        self.engine = engine
     
-    async def start_cleanup(self):
-        """Start background cleanup task"""
-        if self._cleanup_task is None:
-            self._cleanup_task = asyncio.create_task(self._cleanup_loop())
-            logger.info("Cache cleanup task started")
-    
-    async def stop_cleanup(self):
-        """Stop background cleanup task"""
-        if self._cleanup_task:
-            self._cleanup_task.cancel()
-            try:
-                await self._cleanup_task
-            except asyncio.CancelledError:
-                pass
-            self._cleanup_task = None
-    
-    async def _cleanup_loop(self):
-        """Periodically clean up expired entries"""
-        while True:
-            try:
-                await asyncio.sleep(30)  # Run cleanup every 30 seconds
-                await self._cleanup_expired()
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error(f"Cache cleanup error: {e}")
-    
-    async def _cleanup_expired(self):
-        """Remove expired entries from cache"""
-        async with self._lock:
-            expired_keys = [
-                key for key, entry in self._cache.items() 
-                if entry.is_expired()
-            ]
-            for key in expired_keys:
-                del self._cache[key]
-            
-            if expired_keys:
-                logger.debug(f"Cleaned up {len(expired_keys)} expired cache entries")
+    async def cleanup_expired(self) -> int:
+        """Remove expired entries from cache; returns how many were removed"""
+        removed = self.engine.purge_expired()
+        if removed:
+            logger.debug(f"Cleaned up {removed} expired cache entries")
+        return removed
     
     async def get(self, key: str) -> Optional[Any]:
         """Get value from cache if not expired"""
-        async with self._lock:
-            entry = self._cache.get(key)
-            if entry and not entry.is_expired():
-                return entry.value
-            elif entry:
-                # Remove expired entry
-                del self._cache[key]
-            return None
+        return self.engine.get(key)
+    
+    async def set(self, key: str, value: Any, ttl_seconds: int = 30, tags: Iterable[str] = ()):
+        """Set value in cache with TTL and invalidation tags"""
+        self.engine.set(key, value, ttl_seconds, tags)
     
-    async def set(self, key: str, value: Any, ttl_seconds: int = 30):
-        """Set value in cache with TTL"""
-        async with self._lock:
-            self._cache[key] = CacheEntry(value, ttl_seconds)
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl_seconds: int = 30,
+        tags: Iterable[str] = ()
+    ) -> Any:
+        """Get value from cache, loading it once for all concurrent callers on a miss"""
+        return await self.engine.get_or_load(key, loader, ttl_seconds, tags)
     
     async def delete(self, key: str):
-        """Delete key from cache"""
-        async with self._lock:
-            self._cache.pop(key, None)
+        """Delete key from cache (on every worker)"""
+        invalidation_bus.publish(KIND_KEYS, keys=[key])
+    
+    async def invalidate_tags(self, *tags: str) -> int:
+        """Invalidate all entries carrying any of the tags (on every worker)"""
+        removed = invalidation_bus.publish(KIND_TAGS, tags=list(tags)) or 0
+        if removed:
+            logger.debug(f"Invalidated {removed} cache entries tagged {', '.join(tags)}")
+        return removed
     
     async def invalidate_pattern(self, pattern: str):
-        """Invalidate all keys matching a pattern (prefix match)"""
-        async with self._lock:
-            keys_to_delete = [
-                key for key in self._cache.keys() 
-                if key.startswith(pattern)
-            ]
-            for key in keys_to_delete:
-                del self._cache[key]
-            
-            if keys_to_delete:
-                logger.debug(f"Invalidated {len(keys_to_delete)} cache entries matching '{pattern}'")
+        """Invalidate all keys matching a pattern (prefix match; scans every key, prefer tags)"""
+        removed = invalidation_bus.publish(KIND_PREFIX, prefix=pattern)
+        if removed:
+            logger.debug(f"Invalidated {removed} cache entries matching '{pattern}'")
     
     async def clear(self):
-        """Clear all cache entries"""
-        async with self._lock:
-            self._cache.clear()
-            logger.info("Cache cleared")
+        """Clear all cache entries (on every worker)"""
+        invalidation_bus.publish(KIND_CLEAR)
+        logger.info("Cache cleared")
     
     def stats(self) -> dict:
         """Get cache statistics"""
-        return {
-            "total_entries": len(self._cache),
-            "active_entries": sum(
-                1 for entry in self._cache.values() 
-                if not entry.is_expired()
-            )
-        }
+        return self.engine.stats()
+
+
+# Singleton instances: the engine is shared with the older cache module
+memory_cache = ShardedLRUCache(
+    max_entries=CACHE_MAX_ENTRIES,
+    max_bytes=CACHE_MAX_BYTES,
+    shards=CACHE_SHARDS,
+)
+cache = InMemoryCache(memory_cache)
 
+# Invalidations are broadcast to the other workers' engines
+KIND_KEYS = "cache.keys"
+KIND_TAGS = "cache.tags"
+KIND_PREFIX = "cache.prefix"
+KIND_CLEAR = "cache.clear"
 
-# Singleton instance
-cache = InMemoryCache()
+invalidation_bus.register(KIND_KEYS, lambda data: sum(memory_cache.delete(key) for key in data["keys"]))
+invalidation_bus.register(KIND_TAGS, lambda data: memory_cache.invalidate_tag(*data["tags"]))
+invalidation_bus.register(KIND_PREFIX, lambda data: memory_cache.invalidate_prefix(data["prefix"]))
+invalidation_bus.register(KIND_CLEAR, lambda data: memory_cache.clear())
+invalidation_bus.on_resync(memory_cache.clear)
 
 
 # Cache decorator for async functions
 def cached(ttl_seconds: int = 30, key_prefix: str = ""):
     """
-    Decorator to cache async function results.
+    Decorator to cache async function results. Concurrent calls with the
+    same arguments share one execution; results are tagged with the
+    prefix, so ``cache.invalidate_tags(prefix)`` drops them all.
     
     Usage:
         @cached(ttl_seconds=60, key_prefix="projects")
@@ -140,32 +122,28 @@ def cached(ttl_seconds: int = 30, key_prefix: str = ""):
             ...
     """
     def decorator(func: Callable):
+        prefix = key_prefix or func.__name__
+        
         @wraps(func)
         async def wrapper(*args, **kwargs):
             # Generate cache key from function name and arguments
-            key_parts = [key_prefix or func.__name__]
+            key_parts = [prefix]
             key_parts.extend(str(arg) for arg in args)
             key_parts.extend(f"{k}={v}" for k, v in sorted(kwargs.items()))
             cache_key = ":".join(key_parts)
             
-            # Try to get from cache
-            cached_value = await cache.get(cache_key)
-            if cached_value is not None:
-                logger.debug(f"Cache hit: {cache_key}")
-                return cached_value
-            
-            # Execute function and cache result
-            result = await func(*args, **kwargs)
-            await cache.set(cache_key, result, ttl_seconds)
-            logger.debug(f"Cache miss, stored: {cache_key}")
-            
-            return result
+            return await cache.get_or_load(
+                cache_key, lambda: func(*args, **kwargs), ttl_seconds, tags=(prefix,)
+            )
         
         return wrapper
     return decorator
 
 
 # Specific cache helpers
+# Tags: "projects" / "projects:<user_id>", "drawings:<project_id>",
+# "project_stats:<project_id>", "transmittal:<project_id>", "user:<user_id>",
+# plus "project:<project_id>" on everything scoped to one project.
 async def get_cached_projects(user_id: str, is_owner: bool) -> Optional[list]:
     """Get cached projects list"""
     key = f"projects:{user_id}:{is_owner}"
@@ -175,15 +153,15 @@ async def get_cached_projects(user_id: str, is_owner: bool) -> Optional[list]:
 async def set_cached_projects(user_id: str, is_owner: bool, projects: list, ttl: int = 30):
     """Cache projects list"""
     key = f"projects:{user_id}:{is_owner}"
-    await cache.set(key, projects, ttl)
+    await cache.set(key, projects, ttl, tags=("projects", f"projects:{user_id}"))
 
 
 async def invalidate_projects_cache(user_id: str = None):
     """Invalidate projects cache for a user or all users"""
     if user_id:
-        await cache.invalidate_pattern(f"projects:{user_id}")
+        await cache.invalidate_tags(f"projects:{user_id}")
     else:
-        await cache.invalidate_pattern("projects:")
+        await cache.invalidate_tags("projects")
 
 
 async def get_cached_drawings(project_id: str) -> Optional[list]:
@@ -195,12 +173,12 @@ async def get_cached_drawings(project_id: str) -> Optional[list]:
 async def set_cached_drawings(project_id: str, drawings: list, ttl: int = 30):
     """Cache drawings for a project"""
     key = f"drawings:{project_id}"
-    await cache.set(key, drawings, ttl)
+    await cache.set(key, drawings, ttl, tags=(f"drawings:{project_id}", f"project:{project_id}"))
 
 
 async def invalidate_drawings_cache(project_id: str):
     """Invalidate drawings cache for a project"""
-    await cache.invalidate_pattern(f"drawings:{project_id}")
+    await cache.invalidate_tags(f"drawings:{project_id}")
 
 
 async def get_cached_roles() -> Optional[list]:
@@ -210,7 +188,7 @@ async def get_cached_roles() -> Optional[list]:
 
 async def set_cached_roles(roles: list, ttl: int = 60):
     """Cache roles list (longer TTL as roles rarely change)"""
-    await cache.set("roles:all", roles, ttl)
+    await cache.set("roles:all", roles, ttl, tags=("roles",))
 
 
 async def get_cached_user(user_id: str) -> Optional[dict]:
@@ -220,9 +198,77 @@ async def get_cached_user(user_id: str) -> Optional[dict]:
 
 async def set_cached_user(user_id: str, user: dict, ttl: int = 60):
     """Cache user data"""
-    await cache.set(f"user:{user_id}", user, ttl)
+    await cache.set(f"user:{user_id}", user, ttl, tags=(f"user:{user_id}",))
 
 
 async def invalidate_user_cache(user_id: str):
     """Invalidate user cache"""
-    await cache.delete(f"user:{user_id}")
+    await cache.invalidate_tags(f"user:{user_id}")
+
+
+def _project_stats_key(project_id: str, part: str) -> str:
+    return f"project_stats:{project_id}:{part}"
+
+
+def _project_stats_tags(project_id: str) -> tuple:
+    return (f"project_stats:{project_id}", f"project:{project_id}")
+
+
+async def get_cached_project_stats(project_id: str, part: str) -> Optional[dict]:
+    """Get cached dashboard stats for a project (part: 'drawings' or 'comments:<user_id>')"""
+    return await cache.get(_project_stats_key(project_id, part))
+
+
+async def set_cached_project_stats(project_id: str, part: str, stats: dict, ttl: int = PROJECT_STATS_CACHE_TTL):
+    """Cache dashboard stats for a project"""
+    await cache.set(_project_stats_key(project_id, part), stats, ttl, tags=_project_stats_tags(project_id))
+
+
+async def load_cached_project_stats(
+    project_id: str,
+    part: str,
+    loader: Callable[[], Awaitable[dict]],
+    ttl: int = PROJECT_STATS_CACHE_TTL
+) -> dict:
+    """Get cached dashboard stats, computing them once for concurrent callers on a miss"""
+    return await cache.get_or_load(
+        _project_stats_key(project_id, part), loader, ttl, tags=_project_stats_tags(project_id)
+    )
+
+
+async def invalidate_project_cache(project_id: str):
+    """Invalidate everything cached for a project after the project itself changes"""
+    if project_id:
+        await cache.invalidate_tags(f"project:{project_id}")
+
+
+async def invalidate_project_stats(project_id: str):
+    """Invalidate dashboard stats after a drawing or comment write"""
+    if project_id:
+        await cache.invalidate_tags(f"project_stats:{project_id}")
+
+
+async def get_cached_transmittal(project_id: str, fingerprint: str) -> Optional[dict]:
+    """Get a cached issued-drawing transmittal (fingerprint covers the issued set and filters)"""
+    return await cache.get(f"transmittal:{project_id}:{fingerprint}")
+
+
+async def set_cached_transmittal(project_id: str, fingerprint: str, transmittal: dict, ttl: int = 3600):
+    """Cache an issued-drawing transmittal"""
+    await cache.set(
+        f"transmittal:{project_id}:{fingerprint}", transmittal, ttl,
+        tags=(f"transmittal:{project_id}", f"project:{project_id}")
+    )
+
+
+async def load_cached_transmittal(
+    project_id: str,
+    fingerprint: str,
+    loader: Callable[[], Awaitable[dict]],
+    ttl: int = 3600
+) -> dict:
+    """Get a cached transmittal, building it once for concurrent exports on a miss"""
+    return await cache.get_or_load(
+        f"transmittal:{project_id}:{fingerprint}", loader, ttl,
+        tags=(f"transmittal:{project_id}", f"project:{project_id}")
+    )
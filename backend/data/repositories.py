@@ -9,16 +9,12 @@ import os
 import logging
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any, List
-from motor.motor_asyncio import AsyncIOMotorClient
+from utils.database import get_database
 
 logger = logging.getLogger(__name__)
 
 # Database connection
-MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-DB_NAME = os.environ.get('DB_NAME', 'archflow')
-
-client = AsyncIOMotorClient(MONGO_URL)
-db = client[DB_NAME]
+db = get_database()
 
 
 class BaseRepository:
@@ -201,10 +197,8 @@ class ProjectRepository(BaseRepository):
             # Contractors/consultants see projects they're assigned to
             return await db[cls.collection_name].find(
                 {
-                    "$or": [
-                        {"assigned_contractors": {"$regex": user_id}},
-                        {"assigned_consultants": {"$regex": user_id}}
-                    ],
+                    # Ids from assigned_contractors / assigned_consultants (services/project_assignments)
+                    "assigned_party_ids": user_id,
                     "archived": {"$ne": True}
                 },
                 {"_id": 0}
@@ -1,6 +1,12 @@
 """
 Drawing Approval Reminder System
 Sends immediate notification when drawing uploaded, then hourly reminders after 6 hours
+
+Each pending drawing carries ``next_reminder_at``; the scheduler pulls only
+due drawings (indexed, in batches, soonest first), claims each with a
+short lease (``reminder_lease_until``) so that with several app workers a
+reminder is sent once. check_and_send_reminders() is run every minute by
+the job runner (services.scheduled_jobs).
 """
 
 import os
@@ -8,37 +14,53 @@ import asyncio
 import logging
 from datetime import datetime, timezone, timedelta
 from typing import Optional, Dict, List
-from motor.motor_asyncio import AsyncIOMotorClient
+from utils.database import get_database
+from services.project_stats import flag_filter
 
 logger = logging.getLogger(__name__)
 
 # Database connection
-mongo_url = os.environ.get('MONGO_URL')
-db_name = os.environ.get('DB_NAME', 'architecture_firm')
-client = AsyncIOMotorClient(mongo_url)
-db = client[db_name]
+db = get_database()
 
 APP_URL = os.environ.get('REACT_APP_BACKEND_URL', '')
 
+# First reminder this long after a drawing is uploaded for review, then every REMINDER_INTERVAL
+FIRST_REMINDER_DELAY = timedelta(hours=float(os.environ.get('APPROVAL_REMINDER_FIRST_HOURS', '6')))
+REMINDER_INTERVAL = timedelta(hours=float(os.environ.get('APPROVAL_REMINDER_INTERVAL_HOURS', '1')))
+# A reminder that could not be delivered is retried after this
+REMINDER_RETRY = timedelta(minutes=15)
+# How long a worker holds a drawing while sending its reminder
+REMINDER_LEASE = timedelta(seconds=int(os.environ.get('APPROVAL_REMINDER_LEASE_SECONDS', '300')))
+REMINDER_BATCH_SIZE = int(os.environ.get('APPROVAL_REMINDER_BATCH_SIZE', '100'))
+REMINDER_CONCURRENCY = int(os.environ.get('APPROVAL_REMINDER_CONCURRENCY', '8'))
+
+# Drawings uploaded for review and still waiting for the owner's approval
+# (flags use the same truthiness rule as drawing_state)
+PENDING_APPROVAL = {
+    **flag_filter("under_review"),
+    **flag_filter("is_approved", False),
+    **flag_filter("is_not_applicable", False),
+    "deleted_at": None,
+}
+
 
 async def get_owner_info() -> Optional[Dict]:
     """Get owner user info"""
     return await db.users.find_one({"is_owner": True}, {"_id": 0})
 
 
-async def get_pending_approval_drawings() -> List[Dict]:
-    """
-    Get all drawings that are uploaded for review (under_review=True) 
-    but not yet approved (is_approved=False)
-    """
-    cursor = db.project_drawings.find({
-        "under_review": True,
-        "is_approved": {"$ne": True},
-        "is_not_applicable": {"$ne": True}
-    }, {"_id": 0})
-    
-    drawings = await cursor.to_list(100)
-    return drawings
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _as_utc(value: datetime) -> datetime:
+    # Motor returns naive datetimes (UTC)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def first_reminder_at(uploaded_at: Optional[datetime] = None) -> datetime:
+    """When the first reminder is due for a drawing put up for review at uploaded_at (default: now)"""
+    return (uploaded_at or _now()) + FIRST_REMINDER_DELAY
 
 
 async def send_approval_reminder(
@@ -133,86 +155,110 @@ async def update_reminder_tracking(drawing_id: str):
     )
 
 
-async def check_and_send_reminders():
+async def _clear_stale_schedules(now: datetime):
+    """Drop due schedules of drawings that were approved, withdrawn or deleted since"""
+    await db.project_drawings.update_many(
+        {"next_reminder_at": {"$lte": now}, "$nor": [PENDING_APPROVAL]},
+        {"$unset": {"next_reminder_at": "", "reminder_lease_until": ""}}
+    )
+
+
+def _unleased(now: datetime) -> Dict:
+    return {"$or": [{"reminder_lease_until": None}, {"reminder_lease_until": {"$lte": now}}]}
+
+
+async def _due_drawings(now: datetime) -> List[Dict]:
+    """Next batch of due, unclaimed reminders, soonest first"""
+    return await db.project_drawings.find(
+        {**PENDING_APPROVAL, "next_reminder_at": {"$lte": now}, **_unleased(now)},
+        {"_id": 0, "id": 1, "name": 1, "project_id": 1, "next_reminder_at": 1,
+         "uploaded_for_review_at": 1, "updated_at": 1}
+    ).sort("next_reminder_at", 1).limit(REMINDER_BATCH_SIZE).to_list(None)
+
+
+async def _claim(drawing: Dict, now: datetime) -> bool:
+    """Lease a due drawing; fails if another worker claimed or rescheduled it first"""
+    result = await db.project_drawings.update_one(
+        {"id": drawing["id"], "next_reminder_at": drawing["next_reminder_at"], **_unleased(now)},
+        {"$set": {"reminder_lease_until": _now() + REMINDER_LEASE}}
+    )
+    return result.modified_count == 1
+
+
+async def _remind(drawing: Dict, project: Optional[Dict], owner: Dict, semaphore: asyncio.Semaphore, now: datetime) -> bool:
+    async with semaphore:
+        if not await _claim(drawing, now):
+            return False
+
+        success = False
+        if project:
+            try:
+                success = await send_approval_reminder(drawing, project, owner, is_initial=False)
+            except Exception as e:
+                logger.error(f"Approval reminder failed for drawing {drawing['id']}: {str(e)}")
+
+        sent_at = _now()
+        if success:
+            update = {
+                "$set": {
+                    "last_approval_reminder_at": sent_at.isoformat(),
+                    "next_reminder_at": sent_at + REMINDER_INTERVAL,
+                },
+                "$inc": {"approval_reminder_count": 1},
+            }
+        else:
+            # Without a project there is nothing to send yet; check again next interval
+            update = {"$set": {"next_reminder_at": sent_at + (REMINDER_RETRY if project else REMINDER_INTERVAL)}}
+        update["$unset"] = {"reminder_lease_until": ""}
+        await db.project_drawings.update_one({"id": drawing["id"]}, update)
+        return success
+
+
+async def check_and_send_reminders() -> int:
     """
-    Main function to check pending drawings and send reminders
-    
+    Send every due approval reminder; returns how many were sent
+
     Logic:
-    - If drawing uploaded < 6 hours ago: No reminder (initial notification already sent)
-    - If drawing uploaded >= 6 hours ago: Send hourly reminders
+    - A drawing uploaded for review is first due FIRST_REMINDER_DELAY (6 hours)
+      after upload (the immediate notification covers the first hours)
+    - After each reminder, the next is due REMINDER_INTERVAL (1 hour) later
     """
+    reminders_sent = 0
     try:
         owner = await get_owner_info()
         if not owner or not owner.get('mobile'):
             logger.warning("Owner not found or no mobile number for reminders")
-            return
-        
-        pending_drawings = await get_pending_approval_drawings()
-        
-        if not pending_drawings:
-            logger.debug("No pending drawings for approval")
-            return
-        
-        now = datetime.now(timezone.utc)
-        reminders_sent = 0
-        
-        for drawing in pending_drawings:
-            drawing_id = drawing.get('id')
-            project_id = drawing.get('project_id')
-            
-            # Get project info
-            project = await db.projects.find_one({"id": project_id}, {"_id": 0})
-            if not project:
-                continue
-            
-            # Get upload time
-            uploaded_at = drawing.get('uploaded_for_review_at') or drawing.get('updated_at')
-            if isinstance(uploaded_at, str):
-                try:
-                    uploaded_at = datetime.fromisoformat(uploaded_at.replace('Z', '+00:00'))
-                except:
-                    uploaded_at = now - timedelta(hours=7)  # Default to eligible for reminder
-            
-            if not uploaded_at:
-                continue
-            
-            hours_since_upload = (now - uploaded_at).total_seconds() / 3600
-            
-            # Only send reminders if uploaded >= 6 hours ago
-            if hours_since_upload < 6:
-                continue
-            
-            # Check when last reminder was sent
-            last_reminder = drawing.get('last_approval_reminder_at')
-            if last_reminder:
-                if isinstance(last_reminder, str):
-                    last_reminder = datetime.fromisoformat(last_reminder.replace('Z', '+00:00'))
-                
-                hours_since_reminder = (now - last_reminder).total_seconds() / 3600
-                
-                # Only send if >= 1 hour since last reminder
-                if hours_since_reminder < 1:
-                    continue
-            
-            # Send reminder
-            success = await send_approval_reminder(drawing, project, owner, is_initial=False)
-            
-            if success:
-                # Update tracking
-                await db.project_drawings.update_one(
-                    {"id": drawing_id},
-                    {
-                        "$set": {"last_approval_reminder_at": now.isoformat()},
-                        "$inc": {"approval_reminder_count": 1}
-                    }
-                )
-                reminders_sent += 1
-        
+            return 0
+
+        now = _now()
+        await _clear_stale_schedules(now)
+        semaphore = asyncio.Semaphore(REMINDER_CONCURRENCY)
+
+        while True:
+            drawings = await _due_drawings(now)
+            if not drawings:
+                break
+
+            project_ids = list({drawing.get('project_id') for drawing in drawings})
+            projects = {
+                project["id"]: project
+                async for project in db.projects.find({"id": {"$in": project_ids}}, {"_id": 0, "id": 1, "title": 1})
+            }
+            results = await asyncio.gather(*[
+                _remind(drawing, projects.get(drawing.get('project_id')), owner, semaphore, now)
+                for drawing in drawings
+            ])
+            reminders_sent += sum(1 for sent in results if sent)
+
+            if len(drawings) < REMINDER_BATCH_SIZE:
+                break
+
         if reminders_sent > 0:
             logger.info(f"Sent {reminders_sent} approval reminders")
-            
+
     except Exception as e:
         logger.error(f"Error in check_and_send_reminders: {str(e)}")
+    return reminders_sent
 
 
 async def send_immediate_approval_notification(
@@ -319,19 +365,3 @@ Please review and approve: {deep_link}"""
         
     except Exception as e:
         logger.error(f"Error sending immediate approval notification: {str(e)}")
-
-
-# Background task for periodic reminder checks
-async def reminder_scheduler():
-    """
-    Background task that runs every 15 minutes to check for pending approvals
-    and send reminders as needed
-    """
-    while True:
-        try:
-            await check_and_send_reminders()
-        except Exception as e:
-            logger.error(f"Reminder scheduler error: {str(e)}")
-        
-        # Wait 15 minutes before next check
-        await asyncio.sleep(900)  # 900 seconds = 15 minutes
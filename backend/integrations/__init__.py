@@ -8,5 +8,10 @@ All external API calls should go through this layer.
 from .twilio_service import TwilioService
 from .sendgrid_service import SendGridService
 from .notification_logger import NotificationLogger
+from .twilio_transport import AsyncTwilioTransport, TwilioError
+from .sendgrid_transport import AsyncSendGridTransport, SendGridError
 
-__all__ = ['TwilioService', 'SendGridService', 'NotificationLogger']
+__all__ = [
+    'TwilioService', 'SendGridService', 'NotificationLogger',
+    'AsyncTwilioTransport', 'TwilioError', 'AsyncSendGridTransport', 'SendGridError'
+]
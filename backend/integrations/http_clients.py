@@ -0,0 +1,140 @@
+"""
+Shared HTTP Clients
+
+App-scoped, pooled httpx.AsyncClient instances, one per upstream
+(Twilio, Meta WhatsApp Business, SendGrid), so outbound calls reuse
+keep-alive connections instead of paying a new TCP/TLS handshake per
+message.
+
+Clients are created lazily on first use (inside the running event loop)
+and closed by close_http_clients() on app shutdown.
+
+Retry policy: connection failures (where the request never reached the
+upstream) are retried by the transport; 429 responses are retried by
+request_with_retry() honouring Retry-After. Other errors are returned to
+the caller, since message sends are not idempotent.
+"""
+
+import os
+import asyncio
+import logging
+import importlib.util
+from typing import Dict
+
+import httpx
+
+from integrations.rate_limiter import get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Known upstreams and their defaults (overridable via HTTP_<NAME>_* env vars)
+UPSTREAMS = {
+    "twilio": {"base_url": "https://api.twilio.com", "http2": True},
+    "whatsapp_business": {"base_url": "https://graph.facebook.com", "http2": True},
+    "sendgrid": {"base_url": "https://api.sendgrid.com", "http2": True},
+}
+
+# HTTP/2 needs the optional h2 package; fall back to HTTP/1.1 keep-alive without it
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+def _upstream_settings(name: str) -> dict:
+    """Pool, timeout and retry settings for an upstream, overridable per upstream via env"""
+    prefix = f"HTTP_{name.upper()}"
+    defaults = UPSTREAMS.get(name, {})
+    http2 = os.environ.get(f"{prefix}_HTTP2", str(defaults.get("http2", False))).lower() == "true"
+    return {
+        "base_url": defaults.get("base_url", ""),
+        "http2": http2 and HTTP2_AVAILABLE,
+        "max_connections": int(os.environ.get(f"{prefix}_MAX_CONNECTIONS", "20")),
+        "max_keepalive": int(os.environ.get(f"{prefix}_MAX_KEEPALIVE", "10")),
+        "keepalive_expiry": float(os.environ.get(f"{prefix}_KEEPALIVE_EXPIRY", "60")),
+        "timeout": float(os.environ.get(f"{prefix}_TIMEOUT", "15")),
+        "connect_timeout": float(os.environ.get(f"{prefix}_CONNECT_TIMEOUT", "5")),
+        "connect_retries": int(os.environ.get(f"{prefix}_CONNECT_RETRIES", "2")),
+        "rate_limit_retries": int(os.environ.get(f"{prefix}_RATE_LIMIT_RETRIES", "2")),
+    }
+
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+_settings: Dict[str, dict] = {}
+
+
+def get_http_client(name: str) -> httpx.AsyncClient:
+    """Get the shared client for an upstream (e.g. 'twilio')"""
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        settings = _settings[name] = _upstream_settings(name)
+        limits = httpx.Limits(
+            max_connections=settings["max_connections"],
+            max_keepalive_connections=settings["max_keepalive"],
+            keepalive_expiry=settings["keepalive_expiry"],
+        )
+        transport = httpx.AsyncHTTPTransport(
+            http2=settings["http2"],
+            limits=limits,
+            retries=settings["connect_retries"],
+        )
+        client = httpx.AsyncClient(
+            base_url=settings["base_url"],
+            transport=transport,
+            timeout=httpx.Timeout(settings["timeout"], connect=settings["connect_timeout"]),
+        )
+        _clients[name] = client
+        logger.info(f"HTTP client pool created for {name} (http2={settings['http2']})")
+    return client
+
+
+def _retry_after_seconds(response: httpx.Response, attempt: int) -> float:
+    value = response.headers.get("Retry-After")
+    if value:
+        try:
+            return min(float(value), 30.0)
+        except ValueError:
+            pass
+    return min(0.5 * (2 ** attempt), 8.0)
+
+
+async def request_with_retry(name: str, method: str, url: str, **kwargs) -> httpx.Response:
+    """
+    Send a request on an upstream's shared client, paced by the
+    upstream's rate limiter, retrying rate-limited (429) responses with
+    backoff.
+    """
+    client = get_http_client(name)
+    limiter = get_rate_limiter(name)
+    retries = _settings[name]["rate_limit_retries"]
+    attempt = 0
+    while True:
+        await limiter.acquire()
+        response = await client.request(method, url, **kwargs)
+        if response.status_code != 429 or attempt >= retries:
+            return response
+        delay = _retry_after_seconds(response, attempt)
+        logger.warning(f"{name} rate limited, retrying in {delay:.1f}s")
+        await asyncio.sleep(delay)
+        attempt += 1
+
+
+def client_stats() -> list:
+    """Configured upstream clients"""
+    return [
+        {
+            "upstream": name,
+            "closed": client.is_closed,
+            "http2": _settings[name]["http2"],
+            "max_connections": _settings[name]["max_connections"],
+            "max_keepalive": _settings[name]["max_keepalive"],
+        }
+        for name, client in list(_clients.items())
+    ]
+
+
+async def close_http_clients():
+    """Close every shared client (app shutdown)"""
+    for name, client in list(_clients.items()):
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"Error closing HTTP client {name}: {e}")
+    _clients.clear()
@@ -9,17 +9,13 @@ import os
 import logging
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any, List
-from motor.motor_asyncio import AsyncIOMotorClient
 from uuid import uuid4
+from utils.database import get_database
 
 logger = logging.getLogger(__name__)
 
 # Database connection
-MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017')
-DB_NAME = os.environ.get('DB_NAME', 'archflow')
-
-client = AsyncIOMotorClient(MONGO_URL)
-db = client[DB_NAME]
+db = get_database()
 
 
 class NotificationLogger:
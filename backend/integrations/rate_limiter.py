@@ -0,0 +1,68 @@
+"""
+Provider Rate Limiting
+
+Token-bucket limiters, one per upstream, shared by every send path in
+the process so concurrent fan-outs stay under the provider's
+messages-per-second limit instead of tripping 429s.
+
+Rates are configured per provider with RATE_LIMIT_<PROVIDER>_PER_SECOND
+and RATE_LIMIT_<PROVIDER>_BURST. Note the limit is per process: with
+several uvicorn workers, divide the account limit between them.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Dict
+
+logger = logging.getLogger(__name__)
+
+# Default sends per second for each provider
+DEFAULT_RATES = {
+    "twilio": 10.0,
+    "sendgrid": 10.0,
+    "whatsapp_business": 20.0,
+}
+
+
+class AsyncRateLimiter:
+    """Token bucket: ``rate`` tokens per second, up to ``burst`` saved up"""
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.waits = 0
+
+    async def acquire(self):
+        """Wait until a send is allowed"""
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                self.waits += 1
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+_limiters: Dict[str, AsyncRateLimiter] = {}
+
+
+def get_rate_limiter(provider: str) -> AsyncRateLimiter:
+    """Get the shared limiter for a provider"""
+    limiter = _limiters.get(provider)
+    if limiter is None:
+        prefix = f"RATE_LIMIT_{provider.upper()}"
+        rate = float(os.environ.get(f"{prefix}_PER_SECOND", DEFAULT_RATES.get(provider, 10.0)))
+        burst = int(os.environ.get(f"{prefix}_BURST", max(int(rate), 1)))
+        limiter = _limiters[provider] = AsyncRateLimiter(rate, burst)
+        logger.info(f"Rate limiter for {provider}: {rate}/s (burst {burst})")
+    return limiter
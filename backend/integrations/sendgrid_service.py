@@ -12,11 +12,15 @@ import os
 import logging
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any, List
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail, Email, TrackingSettings, ClickTracking
+from sendgrid.helpers.mail import Mail, Email, To, Personalization, TrackingSettings, ClickTracking
+
+from integrations.sendgrid_transport import AsyncSendGridTransport
 
 logger = logging.getLogger(__name__)
 
+# SendGrid accepts at most 1000 personalizations per Mail Send request
+MAX_PERSONALIZATIONS = 1000
+
 
 class SendGridService:
     """
@@ -41,11 +45,9 @@ class SendGridService:
         
         self.client = None
         if self.api_key:
-            try:
-                self.client = SendGridAPIClient(self.api_key)
-                logger.info("SendGrid client initialized successfully")
-            except Exception as e:
-                logger.error(f"Failed to initialize SendGrid client: {str(e)}")
+            # Sends go through the shared pooled HTTP client
+            self.client = AsyncSendGridTransport(self.api_key)
+            logger.info("SendGrid client initialized successfully")
         else:
             logger.warning("SendGrid API key not configured")
         
@@ -134,7 +136,7 @@ class SendGridService:
                     message.add_bcc(bcc_email)
             
             # Send the email
-            response = self.client.send(message)
+            response = await self.client.send(message)
             
             result["success"] = True
             result["status_code"] = response.status_code
@@ -154,7 +156,11 @@ class SendGridService:
         html_content: str
     ) -> Dict[str, Any]:
         """
-        Send emails to multiple recipients.
+        Send the same email to multiple recipients.
+        
+        Uses one personalization per recipient (so nobody sees the other
+        addresses), batched up to SendGrid's per-request limit, so N
+        recipients cost ceil(N / 1000) API calls instead of N.
         
         Args:
             recipients: List of dicts with 'email' and optional 'name'
@@ -172,18 +178,63 @@ class SendGridService:
             "details": []
         }
         
-        for recipient in recipients:
-            email = recipient.get('email')
-            if email:
-                result = await self.send_email(email, subject, html_content)
-                results["details"].append(result)
-                if result["success"]:
-                    results["sent"] += 1
-                else:
-                    results["failed"] += 1
-                    results["success"] = False
+        valid = [r for r in recipients if r.get('email')]
+        if not valid:
+            return results
+        
+        if not self.is_configured:
+            for recipient in valid:
+                results["details"].append(self._bulk_detail(recipient, subject, False, error="SendGrid not configured"))
+            results["failed"] = len(valid)
+            results["success"] = False
+            return results
+        
+        for start in range(0, len(valid), MAX_PERSONALIZATIONS):
+            batch = valid[start:start + MAX_PERSONALIZATIONS]
+            try:
+                message = Mail(
+                    from_email=Email(self.sender_email, self.sender_name),
+                    subject=subject,
+                    html_content=html_content
+                )
+                for recipient in batch:
+                    personalization = Personalization()
+                    personalization.add_to(To(recipient['email'], recipient.get('name')))
+                    message.add_personalization(personalization)
+                
+                tracking_settings = TrackingSettings()
+                tracking_settings.click_tracking = ClickTracking(enable=False, enable_text=False)
+                message.tracking_settings = tracking_settings
+                
+                response = await self.client.send(message)
+                for recipient in batch:
+                    results["details"].append(
+                        self._bulk_detail(recipient, subject, True, status_code=response.status_code)
+                    )
+                results["sent"] += len(batch)
+                logger.info(f"Bulk email sent to {len(batch)} recipients: {subject}")
+                
+            except Exception as e:
+                for recipient in batch:
+                    results["details"].append(self._bulk_detail(recipient, subject, False, error=str(e)))
+                results["failed"] += len(batch)
+                results["success"] = False
+                logger.error(f"Bulk email failed for {len(batch)} recipients: {str(e)}")
         
         return results
+    
+    def _bulk_detail(self, recipient: Dict[str, str], subject: str, success: bool,
+                     status_code: Optional[int] = None, error: Optional[str] = None) -> Dict[str, Any]:
+        """Per-recipient result entry, shaped like send_email's result"""
+        return {
+            "success": success,
+            "channel": "email",
+            "to": recipient.get('email'),
+            "subject": subject,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "status_code": status_code,
+            "error_message": error
+        }
 
 
 # Singleton instance
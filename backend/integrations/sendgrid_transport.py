@@ -0,0 +1,74 @@
+"""
+Async SendGrid Transport
+
+Non-blocking replacement for ``SendGridAPIClient.send``. The SDK's Mail
+helper is still used to build messages; the serialized payload is posted
+to the v3 Mail Send API over the shared pooled HTTP client.
+"""
+
+import os
+import logging
+from typing import Any, Dict, Optional, Union
+
+import httpx
+from pathlib import Path
+from dotenv import load_dotenv
+
+from integrations.http_clients import request_with_retry
+
+ROOT_DIR = Path(__file__).parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+SENDGRID_MAIL_SEND_URL = "https://api.sendgrid.com/v3/mail/send"
+
+
+class SendGridError(Exception):
+    """Error returned by the SendGrid API"""
+
+    def __init__(self, msg: str, status: Optional[int] = None, body: Optional[str] = None):
+        super().__init__(msg)
+        self.msg = msg
+        self.status = status
+        self.body = body
+
+
+class AsyncSendGridTransport:
+    """Async SendGrid Mail Send client"""
+
+    def __init__(self, api_key: Optional[str] = None):
+        self.api_key = api_key or os.environ.get('SENDGRID_API_KEY')
+        self.timeout = float(os.environ.get('SENDGRID_TIMEOUT_SECONDS', '15'))
+
+    @property
+    def is_configured(self) -> bool:
+        return bool(self.api_key)
+
+    async def send(self, message: Union[Any, Dict[str, Any]]) -> httpx.Response:
+        """
+        Send a ``sendgrid.helpers.mail.Mail`` (or an already-serialized
+        v3 payload). Returns the response (202 on success) and raises
+        SendGridError on API errors.
+        """
+        if not self.is_configured:
+            raise SendGridError("SendGrid not configured")
+
+        payload = message.get() if hasattr(message, "get") and not isinstance(message, dict) else message
+        response = await request_with_retry(
+            "sendgrid", "POST", SENDGRID_MAIL_SEND_URL,
+            json=payload,
+            headers={"Authorization": f"Bearer {self.api_key}"},
+            timeout=self.timeout
+        )
+        if response.status_code >= 400:
+            raise SendGridError(
+                f"SendGrid returned HTTP {response.status_code}: {response.text[:500]}",
+                status=response.status_code,
+                body=response.text
+            )
+        return response
+
+
+# Singleton instance
+sendgrid_transport = AsyncSendGridTransport()
@@ -13,8 +13,8 @@ import os
 import logging
 from datetime import datetime, timezone
 from typing import Optional, Dict, Any
-from twilio.rest import Client
-from twilio.base.exceptions import TwilioRestException
+
+from integrations.twilio_transport import twilio_transport, TwilioError
 
 logger = logging.getLogger(__name__)
 
@@ -42,13 +42,10 @@ class TwilioService:
         self.whatsapp_from = os.environ.get('TWILIO_WHATSAPP_FROM', 'whatsapp:+14155238886')
         self.sms_from = os.environ.get('TWILIO_SMS_FROM')
         
-        self.client = None
-        if self.account_sid and self.auth_token:
-            try:
-                self.client = Client(self.account_sid, self.auth_token)
-                logger.info("Twilio client initialized successfully")
-            except Exception as e:
-                logger.error(f"Failed to initialize Twilio client: {str(e)}")
+        # Messages go through the shared non-blocking transport
+        self.transport = twilio_transport
+        if self.transport.is_configured:
+            logger.info("Twilio transport initialized successfully")
         else:
             logger.warning("Twilio credentials not configured")
         
@@ -57,7 +54,7 @@ class TwilioService:
     @property
     def is_configured(self) -> bool:
         """Check if Twilio is properly configured"""
-        return self.client is not None
+        return self.transport.is_configured
     
     def get_status(self) -> Dict[str, Any]:
         """Get Twilio service status"""
@@ -113,10 +110,10 @@ class TwilioService:
             }
             
             if media_url:
-                msg_params['media_url'] = [media_url]
+                msg_params['media_url'] = media_url
             
             # Send the message
-            twilio_message = self.client.messages.create(**msg_params)
+            twilio_message = await self.transport.create_message(**msg_params)
             
             result["success"] = True
             result["message_sid"] = twilio_message.sid
@@ -124,7 +121,7 @@ class TwilioService:
             
             logger.info(f"WhatsApp sent to {to_number}: {twilio_message.sid}")
             
-        except TwilioRestException as e:
+        except TwilioError as e:
             result["error_code"] = e.code
             result["error_message"] = self._get_friendly_error(e.code, str(e))
             logger.error(f"WhatsApp failed to {to_number}: [{e.code}] {e.msg}")
@@ -172,7 +169,7 @@ class TwilioService:
             # Remove whatsapp: prefix if present
             clean_number = to_number.replace('whatsapp:', '')
             
-            twilio_message = self.client.messages.create(
+            twilio_message = await self.transport.create_message(
                 from_=self.sms_from,
                 to=clean_number,
                 body=message
@@ -184,7 +181,7 @@ class TwilioService:
             
             logger.info(f"SMS sent to {to_number}: {twilio_message.sid}")
             
-        except TwilioRestException as e:
+        except TwilioError as e:
             result["error_code"] = e.code
             result["error_message"] = self._get_friendly_error(e.code, str(e))
             logger.error(f"SMS failed to {to_number}: [{e.code}] {e.msg}")
@@ -236,9 +233,9 @@ class TwilioService:
             }
             
             if template_variables:
-                msg_params['content_variables'] = str(template_variables)
+                msg_params['content_variables'] = template_variables
             
-            twilio_message = self.client.messages.create(**msg_params)
+            twilio_message = await self.transport.create_message(**msg_params)
             
             result["success"] = True
             result["message_sid"] = twilio_message.sid
@@ -246,7 +243,7 @@ class TwilioService:
             
             logger.info(f"WhatsApp template sent to {to_number}: {twilio_message.sid}")
             
-        except TwilioRestException as e:
+        except TwilioError as e:
             result["error_code"] = e.code
             result["error_message"] = self._get_friendly_error(e.code, str(e))
             logger.error(f"WhatsApp template failed to {to_number}: [{e.code}] {e.msg}")
@@ -0,0 +1,137 @@
+"""
+Async Twilio Transport
+
+Non-blocking replacement for ``twilio.rest.Client.messages.create``.
+Messages are posted straight to the Twilio REST API over the shared
+pooled HTTP client, with a bounded number of requests in flight and a
+per-call timeout, so a send never blocks the event loop.
+"""
+
+import os
+import json
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Union
+
+from pathlib import Path
+from dotenv import load_dotenv
+
+from integrations.http_clients import request_with_retry
+
+# Credentials are read at import, so make sure .env is loaded first
+ROOT_DIR = Path(__file__).parent.parent
+load_dotenv(ROOT_DIR / '.env')
+
+logger = logging.getLogger(__name__)
+
+TWILIO_API_BASE = "https://api.twilio.com/2010-04-01"
+
+
+class TwilioError(Exception):
+    """Error returned by the Twilio API (mirrors TwilioRestException's code/msg)"""
+
+    def __init__(self, msg: str, code: Optional[int] = None, status: Optional[int] = None):
+        super().__init__(msg)
+        self.msg = msg
+        self.code = code
+        self.status = status
+
+    def __str__(self):
+        return f"[{self.code}] {self.msg}" if self.code else self.msg
+
+
+class TwilioMessage:
+    """Subset of the Twilio message resource used by callers"""
+
+    def __init__(self, data: Dict[str, Any]):
+        self.sid = data.get("sid")
+        self.status = data.get("status")
+        self.to = data.get("to")
+        self.from_ = data.get("from")
+        self.error_code = data.get("error_code")
+        self.error_message = data.get("error_message")
+
+
+class AsyncTwilioTransport:
+    """
+    Async Twilio Messages API client.
+
+    Concurrency is capped by TWILIO_MAX_CONCURRENCY and each call is
+    bounded by TWILIO_TIMEOUT_SECONDS.
+    """
+
+    def __init__(self):
+        self.account_sid = os.environ.get('TWILIO_ACCOUNT_SID')
+        self.auth_token = os.environ.get('TWILIO_AUTH_TOKEN')
+        self.max_concurrency = int(os.environ.get('TWILIO_MAX_CONCURRENCY', '10'))
+        self.timeout = float(os.environ.get('TWILIO_TIMEOUT_SECONDS', '15'))
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    @property
+    def is_configured(self) -> bool:
+        return bool(self.account_sid and self.auth_token)
+
+    @property
+    def messages_url(self) -> str:
+        return f"{TWILIO_API_BASE}/Accounts/{self.account_sid}/Messages.json"
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._semaphore
+
+    async def create_message(
+        self,
+        to: str,
+        from_: str,
+        body: Optional[str] = None,
+        media_url: Optional[Union[str, List[str]]] = None,
+        content_sid: Optional[str] = None,
+        content_variables: Optional[Union[str, Dict[str, Any]]] = None,
+        timeout: Optional[float] = None
+    ) -> TwilioMessage:
+        """
+        Create (send) a message. Raises TwilioError on API errors and
+        httpx.TimeoutException when the call exceeds its timeout.
+        """
+        if not self.is_configured:
+            raise TwilioError("Twilio not configured")
+
+        data: List[tuple] = [("To", to), ("From", from_)]
+        if body is not None:
+            data.append(("Body", body))
+        if media_url:
+            for url in ([media_url] if isinstance(media_url, str) else media_url):
+                data.append(("MediaUrl", url))
+        if content_sid:
+            data.append(("ContentSid", content_sid))
+        if content_variables:
+            if not isinstance(content_variables, str):
+                content_variables = json.dumps(content_variables)
+            data.append(("ContentVariables", content_variables))
+
+        async with self._get_semaphore():
+            response = await request_with_retry(
+                "twilio", "POST", self.messages_url,
+                data=data,
+                auth=(self.account_sid, self.auth_token),
+                timeout=timeout or self.timeout
+            )
+
+        try:
+            payload = response.json()
+        except ValueError:
+            payload = {}
+
+        if response.status_code >= 400:
+            raise TwilioError(
+                payload.get("message") or response.text or f"HTTP {response.status_code}",
+                code=payload.get("code"),
+                status=response.status_code
+            )
+
+        return TwilioMessage(payload)
+
+
+# Singleton instance
+twilio_transport = AsyncTwilioTransport()
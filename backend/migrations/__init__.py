@@ -0,0 +1,97 @@
+"""
+One-time data migrations
+
+Each migration is an async function taking the database handle and
+returning a summary dict. Applied migrations are recorded in the
+``schema_migrations`` collection; a migration is claimed by inserting its
+record first, so with several workers starting at once only one runs it.
+
+Run pending migrations from the command line with:
+
+    python -m migrations
+"""
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+from pymongo.errors import DuplicateKeyError
+
+from utils.database import get_database
+
+from migrations import (
+    fix_legacy_project_status, dedupe_uploads, backfill_resource_file_paths, schedule_approval_reminders,
+    backfill_drawing_state, backfill_assigned_party_ids
+)
+
+logger = logging.getLogger(__name__)
+
+# A "running" record older than this is assumed to belong to a crashed worker
+STALE_RUN_AFTER = timedelta(hours=1)
+
+# Ordered list of (migration_id, migration function)
+MIGRATIONS: List[Tuple[str, Callable[..., Awaitable[Dict]]]] = [
+    ("0001_fix_legacy_project_status", fix_legacy_project_status.run),
+    ("0002_dedupe_uploads", dedupe_uploads.run),
+    ("0003_backfill_resource_file_paths", backfill_resource_file_paths.run),
+    ("0004_schedule_approval_reminders", schedule_approval_reminders.run),
+    ("0005_backfill_drawing_state", backfill_drawing_state.run),
+    ("0006_backfill_assigned_party_ids", backfill_assigned_party_ids.run),
+]
+
+
+async def run_pending_migrations(db=None) -> List[Dict]:
+    """Run every migration that hasn't been applied yet, in order"""
+    db = db if db is not None else get_database()
+    results = []
+
+    for migration_id, migrate in MIGRATIONS:
+        existing = await db.schema_migrations.find_one({"_id": migration_id})
+        if existing and existing.get("status") == "applied":
+            continue
+        now = datetime.now(timezone.utc)
+
+        try:
+            if existing:
+                # Retry a failed run, or take over one abandoned by a crashed worker
+                claimed = await db.schema_migrations.update_one(
+                    {"_id": migration_id, "$or": [
+                        {"status": "failed"},
+                        {"status": "running", "started_at": {"$lt": now - STALE_RUN_AFTER}}
+                    ]},
+                    {"$set": {"status": "running", "started_at": now}}
+                )
+                if claimed.modified_count == 0:
+                    # Another worker holds it; later migrations wait for it
+                    break
+            else:
+                await db.schema_migrations.insert_one({
+                    "_id": migration_id,
+                    "status": "running",
+                    "started_at": now
+                })
+        except DuplicateKeyError:
+            break
+
+        try:
+            summary = await migrate(db)
+            await db.schema_migrations.update_one(
+                {"_id": migration_id},
+                {"$set": {
+                    "status": "applied",
+                    "applied_at": datetime.now(timezone.utc),
+                    "summary": summary
+                }}
+            )
+            logger.info(f"Migration {migration_id} applied: {summary}")
+            results.append({"id": migration_id, "status": "applied", "summary": summary})
+        except Exception as e:
+            await db.schema_migrations.update_one(
+                {"_id": migration_id},
+                {"$set": {"status": "failed", "error": str(e)}}
+            )
+            logger.error(f"Migration {migration_id} failed: {e}")
+            results.append({"id": migration_id, "status": "failed", "error": str(e)})
+            # Later migrations may depend on this one
+            break
+
+    return results
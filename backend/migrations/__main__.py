@@ -0,0 +1,22 @@
+"""Run pending data migrations: python -m migrations"""
+import asyncio
+import logging
+
+from utils.database import close_database
+from migrations import run_pending_migrations
+
+
+async def main():
+    try:
+        results = await run_pending_migrations()
+        if not results:
+            print("No pending migrations")
+        for result in results:
+            print(f"{result['id']}: {result['status']} {result.get('summary') or result.get('error', '')}")
+    finally:
+        close_database()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,24 @@
+"""
+Store assigned_party_ids on every project
+
+Contractor/consultant project lists used to match the values of
+``assigned_contractors`` / ``assigned_consultants`` with an unindexable
+``$expr``; they now match the indexed ``assigned_party_ids`` array kept
+by services.project_assignments. This (re)computes the array, in a single
+server-side update, for projects where it is missing or disagrees with
+the assignment maps.
+"""
+from services.project_assignments import ASSIGNED_PARTY_IDS_EXPRESSION
+
+
+async def run(db) -> dict:
+    result = await db.projects.update_many(
+        {"$or": [
+            {"assigned_party_ids": {"$exists": False}},
+            {"$expr": {"$not": [{"$setEquals": [
+                {"$ifNull": ["$assigned_party_ids", []]}, ASSIGNED_PARTY_IDS_EXPRESSION
+            ]}]}},
+        ]},
+        [{"$set": {"assigned_party_ids": ASSIGNED_PARTY_IDS_EXPRESSION}}]
+    )
+    return {"matched": result.matched_count, "updated": result.modified_count}
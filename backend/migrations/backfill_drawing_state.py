@@ -0,0 +1,28 @@
+"""
+Store the lifecycle state on every drawing
+
+``state`` used to be written only by PUT /drawings/{id} and is now kept
+by services.drawing_state.transition_drawing on every write path. This
+first rewrites legacy flag values (1, "true", 0, ...) as booleans, by
+the same rule the state and progress buckets use, then (re)computes
+``state`` for documents where it is missing or disagrees with the flags,
+in single server-side updates.
+"""
+from services.drawing_state import STATE_EXPRESSION, STATE_FLAGS
+from services.project_stats import flag_expression
+
+
+async def run(db) -> dict:
+    normalized = 0
+    for field in STATE_FLAGS:
+        result = await db.project_drawings.update_many(
+            {field: {"$exists": True, "$nin": [True, False, None]}},
+            [{"$set": {field: flag_expression(field)}}]
+        )
+        normalized += result.modified_count
+
+    result = await db.project_drawings.update_many(
+        {"$expr": {"$ne": [{"$ifNull": ["$state", None]}, STATE_EXPRESSION]}},
+        [{"$set": {"state": STATE_EXPRESSION}}]
+    )
+    return {"flags_normalized": normalized, "matched": result.matched_count, "updated": result.modified_count}
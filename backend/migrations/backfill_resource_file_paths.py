@@ -0,0 +1,55 @@
+"""
+Record each resource's stored file path on the resource document
+
+Resource files are stored as ``<resource_id>_<suffix>.<ext>`` in the
+resources upload directory. Serving used to find them by listing that
+directory and prefix-matching every filename on each request; uploads
+now store ``file_path`` directly, and this migration fills it in for
+resources uploaded before that, with a single directory scan.
+
+When several files exist for one resource (older uploads were never
+removed on re-upload), the most recently modified one is used.
+"""
+import os
+import asyncio
+from typing import Dict
+
+RESOURCES_UPLOAD_DIR = "/app/backend/uploads/resources"
+
+
+def _latest_file_per_resource(directory: str) -> Dict[str, str]:
+    latest: Dict[str, tuple] = {}
+    if not os.path.isdir(directory):
+        return {}
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.name.startswith(".") or "_" not in entry.name or not entry.is_file():
+                continue
+            resource_id = entry.name.split("_", 1)[0]
+            mtime = entry.stat().st_mtime
+            if resource_id not in latest or mtime > latest[resource_id][0]:
+                latest[resource_id] = (mtime, entry.path)
+    return {resource_id: path for resource_id, (_, path) in latest.items()}
+
+
+async def run(db) -> dict:
+    loop = asyncio.get_event_loop()
+    files = await loop.run_in_executor(None, _latest_file_per_resource, RESOURCES_UPLOAD_DIR)
+
+    updated = 0
+    missing = 0
+    async for resource in db.resources.find(
+        {"file_path": {"$exists": False}, "url": {"$regex": "/download$"}},
+        {"_id": 0, "id": 1}
+    ):
+        path = files.get(resource["id"])
+        if not path:
+            missing += 1
+            continue
+        await db.resources.update_one(
+            {"id": resource["id"], "file_path": {"$exists": False}},
+            {"$set": {"file_path": path}}
+        )
+        updated += 1
+
+    return {"updated": updated, "missing_file": missing}
@@ -0,0 +1,107 @@
+"""
+Deduplicate the existing uploads tree into the blob store
+
+Walks every upload root (services.blob_store.LEGACY_URL_ROOTS), hashes
+each file and registers it in the content-addressed store. The first
+file seen with a given content becomes the blob; later copies are
+replaced in place by hard links to it, so every existing path and URL
+keeps working and is recorded in the ``blob_links`` lookup table.
+
+Safe to re-run: files already linked to their blob are only re-recorded.
+Report what would be saved without changing anything with:
+
+    python -m migrations.dedupe_uploads --dry-run
+"""
+import os
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import Iterator
+
+from services.blob_store import blob_store, LEGACY_URL_ROOTS
+
+logger = logging.getLogger(__name__)
+
+_HASH_READ_SIZE = 1024 * 1024
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_READ_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _upload_files() -> Iterator[Path]:
+    """Regular files under the upload roots, skipping hidden/staging entries"""
+    seen_roots = set()
+    for root, _ in LEGACY_URL_ROOTS:
+        root = root.resolve()
+        if root in seen_roots or not root.is_dir():
+            continue
+        seen_roots.add(root)
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames[:] = [d for d in dirnames if not d.startswith(".")]
+            for name in filenames:
+                path = Path(dirpath) / name
+                if name.startswith(".") or path.is_symlink():
+                    continue
+                yield path
+
+
+async def run(db, dry_run: bool = False) -> dict:
+    loop = asyncio.get_event_loop()
+    files = await loop.run_in_executor(None, lambda: list(_upload_files()))
+
+    scanned = 0
+    total_bytes = 0
+    freed_bytes = 0
+    duplicates = 0
+    seen = {}
+
+    for path in files:
+        try:
+            size = path.stat().st_size
+            sha256 = await loop.run_in_executor(None, _file_sha256, path)
+            if dry_run:
+                # Compare against the first copy seen, or an already stored blob
+                first = seen.setdefault(sha256, path)
+                blob = blob_store.blob_path(sha256)
+                kept = first if first != path else (blob if blob.exists() else None)
+                freed = size if kept is not None and not os.path.samefile(kept, path) else 0
+            else:
+                freed = await blob_store.adopt(path, sha256, size)
+        except OSError as e:
+            logger.warning(f"Skipping {path}: {e}")
+            continue
+
+        scanned += 1
+        total_bytes += size
+        if freed:
+            duplicates += 1
+            freed_bytes += freed
+
+    return {
+        "dry_run": dry_run,
+        "files": scanned,
+        "bytes": total_bytes,
+        "duplicates": duplicates,
+        "freed_bytes": freed_bytes,
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    from utils.database import get_database, close_database
+
+    async def main():
+        try:
+            summary = await run(get_database(), dry_run="--dry-run" in sys.argv)
+            print(summary)
+        finally:
+            close_database()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
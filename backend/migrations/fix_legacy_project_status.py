@@ -0,0 +1,18 @@
+"""
+Normalise legacy project status values
+
+Older projects were stored with free-form statuses (e.g. "active").
+GET /api/projects used to rewrite these one project at a time on every
+read; this migration does it once with a single update_many.
+"""
+from models_projects import ProjectStatus
+
+VALID_PROJECT_STATUSES = [status.value for status in ProjectStatus]
+
+
+async def run(db) -> dict:
+    result = await db.projects.update_many(
+        {"status": {"$nin": VALID_PROJECT_STATUSES}},
+        {"$set": {"status": ProjectStatus.LEAD.value}}
+    )
+    return {"updated": result.modified_count}
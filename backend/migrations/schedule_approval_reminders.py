@@ -0,0 +1,46 @@
+"""
+Schedule approval reminders for drawings already waiting for approval
+
+The reminder scheduler now only looks at drawings whose ``next_reminder_at``
+is due. This sets it for drawings that were put up for review before
+that: FIRST_REMINDER_DELAY after upload, or REMINDER_INTERVAL after the
+last reminder if one was already sent, whichever is later.
+"""
+from datetime import datetime, timezone
+from typing import Optional
+
+from drawing_approval_reminders import PENDING_APPROVAL, FIRST_REMINDER_DELAY, REMINDER_INTERVAL
+
+
+def _parse(value) -> Optional[datetime]:
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    return None
+
+
+async def run(db) -> dict:
+    now = datetime.now(timezone.utc)
+    scheduled = 0
+    async for drawing in db.project_drawings.find(
+        {**PENDING_APPROVAL, "next_reminder_at": {"$exists": False}},
+        {"_id": 0, "id": 1, "uploaded_for_review_at": 1, "updated_at": 1, "last_approval_reminder_at": 1}
+    ):
+        uploaded_at = _parse(drawing.get("uploaded_for_review_at") or drawing.get("updated_at"))
+        # Unknown upload time: remind now, as the old scheduler did
+        due = uploaded_at + FIRST_REMINDER_DELAY if uploaded_at else now
+        last_reminder = _parse(drawing.get("last_approval_reminder_at"))
+        if last_reminder:
+            due = max(due, last_reminder + REMINDER_INTERVAL)
+
+        await db.project_drawings.update_one(
+            {"id": drawing["id"], "next_reminder_at": {"$exists": False}},
+            {"$set": {"next_reminder_at": due}}
+        )
+        scheduled += 1
+
+    return {"scheduled": scheduled}
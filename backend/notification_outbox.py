@@ -0,0 +1,270 @@
+"""
+Notification Outbox
+Mongo-backed, crash-safe queue for outgoing notifications.
+
+Every notification is persisted to ``notification_outbox`` before it is
+sent. Dispatch workers (in any number of processes) claim entries with an
+atomic find-and-modify that sets a lease; a worker that dies mid-send
+simply lets its lease expire and another worker picks the entry up.
+
+Entry lifecycle:
+    pending -> processing -> sent
+                          -> pending (retry with exponential backoff)
+                          -> dead    (attempts exhausted / permanent error)
+"""
+
+import os
+import uuid
+import random
+import socket
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from utils.database import get_database
+
+logger = logging.getLogger(__name__)
+
+db = get_database()
+
+OUTBOX_COLLECTION = "notification_outbox"
+
+STATUS_PENDING = "pending"
+STATUS_PROCESSING = "processing"
+STATUS_SENT = "sent"
+STATUS_DEAD = "dead"
+
+# Notification type -> delivery channel (retry policy is per channel)
+CHANNEL_BY_TYPE = {
+    "whatsapp": "whatsapp",
+    "whatsapp_template": "whatsapp",
+    "whatsapp_media": "whatsapp",
+    "email": "email",
+    "sms": "sms",
+}
+
+
+class RetryPolicy:
+    """Exponential backoff with jitter"""
+
+    def __init__(self, max_attempts: int, base_delay: float, max_delay: float):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def delay(self, attempts: int) -> float:
+        """Seconds to wait before the next attempt, after ``attempts`` failures"""
+        delay = min(self.base_delay * (2 ** max(attempts - 1, 0)), self.max_delay)
+        return delay * random.uniform(0.8, 1.2)
+
+
+def _channel_policy(channel: str) -> RetryPolicy:
+    prefix = f"OUTBOX_{channel.upper()}"
+    return RetryPolicy(
+        max_attempts=int(os.environ.get(f"{prefix}_MAX_ATTEMPTS", "5")),
+        base_delay=float(os.environ.get(f"{prefix}_BASE_DELAY", "30")),
+        max_delay=float(os.environ.get(f"{prefix}_MAX_DELAY", "3600")),
+    )
+
+
+RETRY_POLICIES: Dict[str, RetryPolicy] = {
+    channel: _channel_policy(channel) for channel in set(CHANNEL_BY_TYPE.values())
+}
+
+
+class PermanentDeliveryError(Exception):
+    """Delivery failed in a way retrying cannot fix (e.g. invalid number)"""
+
+
+class NotificationOutbox:
+    """Persistent outbox with claim/lease semantics"""
+
+    def __init__(self, lease_seconds: float = 120):
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+    @property
+    def collection(self):
+        return db[OUTBOX_COLLECTION]
+
+    async def enqueue(self, notification: Dict[str, Any],
+                      idempotency_key: Optional[str] = None) -> str:
+        """
+        Persist a notification for delivery and return its outbox id.
+
+        Enqueuing the same ``idempotency_key`` twice is a no-op that
+        returns the id of the existing entry.
+        """
+        notif_type = notification.get("type")
+        channel = CHANNEL_BY_TYPE.get(notif_type, notif_type)
+        policy = RETRY_POLICIES.get(channel) or _channel_policy(channel)
+        now = datetime.now(timezone.utc)
+        entry = {
+            "id": str(uuid.uuid4()),
+            "type": notif_type,
+            "channel": channel,
+            "payload": notification,
+            "status": STATUS_PENDING,
+            "attempts": 0,
+            "max_attempts": policy.max_attempts,
+            "next_attempt_at": now,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "last_error": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        if idempotency_key:
+            entry["idempotency_key"] = idempotency_key
+
+        try:
+            await self.collection.insert_one(entry)
+        except DuplicateKeyError:
+            existing = await self.collection.find_one(
+                {"idempotency_key": idempotency_key}, {"_id": 0, "id": 1}
+            )
+            logger.info(f"Outbox entry for idempotency key {idempotency_key} already exists")
+            return existing["id"] if existing else entry["id"]
+        return entry["id"]
+
+    async def claim(self) -> Optional[Dict[str, Any]]:
+        """
+        Atomically claim the next due entry: a pending entry whose retry
+        time has come, or a processing entry whose lease has expired and
+        that still has attempts left.
+        """
+        now = datetime.now(timezone.utc)
+        entry = await self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": STATUS_PENDING, "next_attempt_at": {"$lte": now}},
+                    {
+                        "status": STATUS_PROCESSING,
+                        "lease_expires_at": {"$lte": now},
+                        "$expr": {"$lt": ["$attempts", "$max_attempts"]},
+                    },
+                ]
+            },
+            {
+                "$set": {
+                    "status": STATUS_PROCESSING,
+                    "lease_owner": self.owner,
+                    "lease_expires_at": now + timedelta(seconds=self.lease_seconds),
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("next_attempt_at", 1)],
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER,
+        )
+        if entry is None:
+            await self._dead_letter_exhausted(now)
+        return entry
+
+    async def _dead_letter_exhausted(self, now: datetime) -> int:
+        """
+        Dead-letter entries whose lease expired on their final attempt
+        (the worker died mid-send); claim() no longer picks them up.
+        """
+        result = await self.collection.update_many(
+            {
+                "status": STATUS_PROCESSING,
+                "lease_expires_at": {"$lte": now},
+                "$expr": {"$gte": ["$attempts", "$max_attempts"]},
+            },
+            {"$set": {
+                "status": STATUS_DEAD,
+                "dead_at": now,
+                "updated_at": now,
+                "lease_owner": None,
+                "lease_expires_at": None,
+                "last_error": "Lease expired on the final attempt",
+            }}
+        )
+        if result.modified_count:
+            logger.warning(f"Dead-lettered {result.modified_count} outbox entries with exhausted attempts")
+        return result.modified_count
+
+    async def mark_sent(self, entry: Dict[str, Any]):
+        """Acknowledge a delivered entry"""
+        now = datetime.now(timezone.utc)
+        await self.collection.update_one(
+            {"id": entry["id"], "lease_owner": self.owner},
+            {"$set": {
+                "status": STATUS_SENT,
+                "sent_at": now,
+                "updated_at": now,
+                "lease_owner": None,
+                "lease_expires_at": None,
+                "last_error": None,
+            }}
+        )
+
+    async def mark_failed(self, entry: Dict[str, Any], error: str, permanent: bool = False) -> str:
+        """
+        Record a failed attempt. Schedules a retry with backoff, or moves
+        the entry to the dead-letter state. Returns the new status.
+        """
+        now = datetime.now(timezone.utc)
+        attempts = entry.get("attempts", 1)
+        policy = RETRY_POLICIES.get(entry.get("channel")) or _channel_policy(entry.get("channel") or "default")
+
+        update = {
+            "last_error": error,
+            "updated_at": now,
+            "lease_owner": None,
+            "lease_expires_at": None,
+        }
+        if permanent or attempts >= entry.get("max_attempts", policy.max_attempts):
+            update["status"] = STATUS_DEAD
+            update["dead_at"] = now
+        else:
+            update["status"] = STATUS_PENDING
+            update["next_attempt_at"] = now + timedelta(seconds=policy.delay(attempts))
+
+        await self.collection.update_one(
+            {"id": entry["id"], "lease_owner": self.owner},
+            {"$set": update}
+        )
+        return update["status"]
+
+    async def requeue_dead(self, entry_id: Optional[str] = None) -> int:
+        """Move dead-lettered entries (one, or all) back to pending"""
+        query = {"status": STATUS_DEAD}
+        if entry_id:
+            query["id"] = entry_id
+        now = datetime.now(timezone.utc)
+        result = await self.collection.update_many(
+            query,
+            {"$set": {"status": STATUS_PENDING, "attempts": 0,
+                      "next_attempt_at": now, "updated_at": now},
+             "$unset": {"dead_at": ""}}
+        )
+        return result.modified_count
+
+    async def stats(self) -> Dict[str, Any]:
+        """Entry counts per status and channel"""
+        counts: Dict[str, Dict[str, int]] = {}
+        pipeline = [{"$group": {"_id": {"status": "$status", "channel": "$channel"}, "count": {"$sum": 1}}}]
+        async for row in self.collection.aggregate(pipeline):
+            status = row["_id"].get("status")
+            channel = row["_id"].get("channel")
+            counts.setdefault(status, {})[channel] = row["count"]
+
+        oldest = await self.collection.find_one(
+            {"status": STATUS_PENDING}, {"_id": 0, "created_at": 1}, sort=[("next_attempt_at", 1)]
+        )
+        return {
+            "counts": counts,
+            "oldest_pending_at": oldest["created_at"].isoformat() if oldest else None,
+        }
+
+
+# Singleton instance
+notification_outbox = NotificationOutbox(
+    lease_seconds=float(os.environ.get("OUTBOX_LEASE_SECONDS", "120"))
+)
@@ -12,13 +12,13 @@ import os
 import logging
 from typing import List, Optional, Dict
 from datetime import datetime, timezone
-from motor.motor_asyncio import AsyncIOMotorClient
-import httpx
-from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail
 from pathlib import Path
 from dotenv import load_dotenv
 from whatsapp_business_service import whatsapp_business_service
+from integrations.http_clients import request_with_retry
+from integrations.sendgrid_transport import sendgrid_transport
+from utils.database import get_database
 
 # Import notification logger for tracking
 try:
@@ -32,10 +32,7 @@ load_dotenv(Path(__file__).parent / '.env')
 logger = logging.getLogger(__name__)
 
 # Database connection
-mongo_url = os.environ.get('MONGO_URL')
-db_name = os.environ.get('DB_NAME', 'architecture_firm')
-client = AsyncIOMotorClient(mongo_url)
-db = client[db_name]
+db = get_database()
 
 # App URL
 APP_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://pmapp-stability.preview.emergentagent.com')
@@ -124,27 +121,26 @@ class NotificationService:
                 "ContentVariables": json.dumps(content_variables)
             }
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    url,
-                    data=data,
-                    auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN),
-                    timeout=30.0
-                )
+            response = await request_with_retry(
+                "twilio", "POST", url,
+                data=data,
+                auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN),
+                timeout=30.0
+            )
+            
+            if response.status_code == 201:
+                result = response.json()
+                logger.info(f"WhatsApp template sent to {phone_number}: {result.get('sid')}")
+                return {
+                    "success": True,
+                    "message_sid": result.get('sid'),
+                    "status": result.get('status')
+                }
+            else:
+                error_msg = response.text
+                logger.error(f"WhatsApp template failed to {phone_number}: {error_msg}")
+                return {"success": False, "error": error_msg}
                 
-                if response.status_code == 201:
-                    result = response.json()
-                    logger.info(f"WhatsApp template sent to {phone_number}: {result.get('sid')}")
-                    return {
-                        "success": True,
-                        "message_sid": result.get('sid'),
-                        "status": result.get('status')
-                    }
-                else:
-                    error_msg = response.text
-                    logger.error(f"WhatsApp template failed to {phone_number}: {error_msg}")
-                    return {"success": False, "error": error_msg}
-                    
         except Exception as e:
             logger.error(f"WhatsApp template error: {str(e)}")
             return {"success": False, "error": str(e)}
@@ -179,27 +175,26 @@ class NotificationService:
                 "Body": message
             }
             
-            async with httpx.AsyncClient() as http_client:
-                response = await http_client.post(
-                    url,
-                    data=data,
-                    auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN),
-                    timeout=30.0
-                )
+            response = await request_with_retry(
+                "twilio", "POST", url,
+                data=data,
+                auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN),
+                timeout=30.0
+            )
+            
+            if response.status_code == 201:
+                result = response.json()
+                logger.info(f"SMS sent to {phone_number}: {result.get('sid')}")
+                return {
+                    "success": True,
+                    "message_sid": result.get('sid'),
+                    "status": result.get('status')
+                }
+            else:
+                error_msg = response.text
+                logger.error(f"SMS failed to {phone_number}: {error_msg}")
+                return {"success": False, "error": error_msg}
                 
-                if response.status_code == 201:
-                    result = response.json()
-                    logger.info(f"SMS sent to {phone_number}: {result.get('sid')}")
-                    return {
-                        "success": True,
-                        "message_sid": result.get('sid'),
-                        "status": result.get('status')
-                    }
-                else:
-                    error_msg = response.text
-                    logger.error(f"SMS failed to {phone_number}: {error_msg}")
-                    return {"success": False, "error": error_msg}
-                    
         except Exception as e:
             logger.error(f"SMS error: {str(e)}")
             return {"success": False, "error": str(e)}
@@ -257,54 +252,53 @@ class NotificationService:
                     "Body": message
                 }
                 
-                async with httpx.AsyncClient() as client:
-                    response = await client.post(
-                        url,
-                        data=data,
-                        auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN),
-                        timeout=30.0
-                    )
+                response = await request_with_retry(
+                    "twilio", "POST", url,
+                    data=data,
+                    auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN),
+                    timeout=30.0
+                )
+                
+                if response.status_code == 201:
+                    result = response.json()
+                    logger.info(f"WhatsApp sent to {phone_number}: {result.get('sid')}")
+                    
+                    # Log to notification logger
+                    if notification_logger:
+                        await notification_logger.log(
+                            notification_type="whatsapp_message",
+                            channel="whatsapp",
+                            recipient=phone_number,
+                            message_preview=message[:200] if message else None,
+                            success=True,
+                            message_sid=result.get('sid')
+                        )
+                    
+                    return {
+                        "success": True,
+                        "message_sid": result.get('sid'),
+                        "status": result.get('status')
+                    }
+                else:
+                    error_data = response.json() if response.text else {}
+                    error_code = error_data.get('code')
+                    error_msg = error_data.get('message', response.text)
+                    logger.error(f"WhatsApp failed to {phone_number}: [{error_code}] {error_msg}")
                     
-                    if response.status_code == 201:
-                        result = response.json()
-                        logger.info(f"WhatsApp sent to {phone_number}: {result.get('sid')}")
-                        
-                        # Log to notification logger
-                        if notification_logger:
-                            await notification_logger.log(
-                                notification_type="whatsapp_message",
-                                channel="whatsapp",
-                                recipient=phone_number,
-                                message_preview=message[:200] if message else None,
-                                success=True,
-                                message_sid=result.get('sid')
-                            )
-                        
-                        return {
-                            "success": True,
-                            "message_sid": result.get('sid'),
-                            "status": result.get('status')
-                        }
-                    else:
-                        error_data = response.json() if response.text else {}
-                        error_code = error_data.get('code')
-                        error_msg = error_data.get('message', response.text)
-                        logger.error(f"WhatsApp failed to {phone_number}: [{error_code}] {error_msg}")
-                        
-                        # Log failure to notification logger
-                        if notification_logger:
-                            await notification_logger.log(
-                                notification_type="whatsapp_message",
-                                channel="whatsapp",
-                                recipient=phone_number,
-                                message_preview=message[:200] if message else None,
-                                success=False,
-                                error_code=str(error_code) if error_code else None,
-                                error_message=error_msg
-                            )
-                        
-                        return {"success": False, "error": error_msg, "error_code": error_code}
+                    # Log failure to notification logger
+                    if notification_logger:
+                        await notification_logger.log(
+                            notification_type="whatsapp_message",
+                            channel="whatsapp",
+                            recipient=phone_number,
+                            message_preview=message[:200] if message else None,
+                            success=False,
+                            error_code=str(error_code) if error_code else None,
+                            error_message=error_msg
+                        )
                     
+                    return {"success": False, "error": error_msg, "error_code": error_code}
+                
         except Exception as e:
             logger.error(f"WhatsApp error: {str(e)}")
             
@@ -342,8 +336,7 @@ class NotificationService:
             tracking_settings.click_tracking = ClickTracking(enable=False, enable_text=False)
             message.tracking_settings = tracking_settings
             
-            sg = SendGridAPIClient(SENDGRID_API_KEY)
-            response = sg.send(message)
+            response = await sendgrid_transport.send(message)
             
             logger.info(f"Email sent to {to_email}: {subject}")
             
@@ -4,10 +4,12 @@ These are called from different parts of the application when events occur
 """
 
 import os
+import asyncio
 import logging
-from typing import List, Optional, Dict
+from typing import List, Optional, Dict, Tuple
 from datetime import datetime, timezone
-from motor.motor_asyncio import AsyncIOMotorClient
+from utils.database import get_database
+from utils.loaders import get_loaders
 
 # Import WhatsApp service - will be initialized after .env loads
 from whatsapp_service import whatsapp_service, templates
@@ -15,17 +17,12 @@ from whatsapp_service import whatsapp_service, templates
 logger = logging.getLogger(__name__)
 
 # Database connection
+db = get_database()
+
+
 def get_db():
     """Get database connection"""
-    mongo_url = os.environ['MONGO_URL']
-    client = AsyncIOMotorClient(mongo_url)
-    return client[os.environ['DB_NAME']]
-
-# Database connection
-mongo_url = os.environ.get('MONGO_URL')
-db_name = os.environ.get('DB_NAME', 'architecture_firm')
-client = AsyncIOMotorClient(mongo_url)
-db = client[db_name]
+    return db
 
 
 async def check_user_notifications_enabled(user_id: str, notification_type: str) -> bool:
@@ -40,24 +37,60 @@ async def check_user_notifications_enabled(user_id: str, notification_type: str)
         True if notifications enabled, False otherwise
     """
     try:
-        settings = await db.whatsapp_settings.find_one({"user_id": user_id}, {"_id": 0})
-        
-        if not settings:
-            # If no settings exist, notifications are enabled by default
-            return True
-        
-        # Check if notifications are enabled globally
-        if not settings.get("enabled", True):
-            return False
-        
-        # Check specific notification type
-        return settings.get(notification_type, True)
+        settings = await get_loaders().loader("whatsapp_settings", key="user_id").load(user_id)
+        return _notifications_enabled(settings, notification_type)
     
     except Exception as e:
         logger.error(f"Error checking notification settings: {str(e)}")
         return True  # Default to enabled if there's an error
 
 
+def _notifications_enabled(settings: Optional[Dict], notification_type: str) -> bool:
+    if not settings:
+        # If no settings exist, notifications are enabled by default
+        return True
+    
+    # Check if notifications are enabled globally
+    if not settings.get("enabled", True):
+        return False
+    
+    # Check specific notification type
+    return settings.get(notification_type, True)
+
+
+async def load_recipients(
+    user_ids: List[str],
+    notification_type: Optional[str] = None
+) -> List[Tuple[str, Optional[Dict]]]:
+    """
+    Resolve recipients in one batched query (plus one for their settings
+    when ``notification_type`` is given). Returns ``(user_id, user)`` pairs
+    in order, without users who turned that notification off; ``user`` is
+    None for unknown ids.
+    """
+    user_ids = list(user_ids)
+    loaders = get_loaders()
+    if not notification_type:
+        users = await loaders.users.load_many(user_ids)
+        return [(uid, users.get(uid)) for uid in user_ids]
+    
+    users, settings = await asyncio.gather(
+        loaders.users.load_many(user_ids),
+        loaders.loader("whatsapp_settings", key="user_id").load_many(user_ids),
+        return_exceptions=True
+    )
+    if isinstance(users, BaseException):
+        raise users
+    if isinstance(settings, BaseException):
+        logger.error(f"Error checking notification settings: {str(settings)}")
+        settings = {}  # Default to enabled if there's an error
+    
+    return [
+        (uid, users.get(uid)) for uid in user_ids
+        if _notifications_enabled(settings.get(uid), notification_type)
+    ]
+
+
 async def save_notification_log(
     user_id: Optional[str],
     phone_number: str,
@@ -114,7 +147,7 @@ async def notify_user_registered(user_data: Dict):
         )
         
         # Send WhatsApp
-        result = whatsapp_service.send_message(owner["mobile"], message)
+        result = await whatsapp_service.send_message(owner["mobile"], message)
         
         # Log the notification
         await save_notification_log(
@@ -155,7 +188,7 @@ async def notify_user_approved(user_id: str):
         message = templates.user_approved(user.get("name", "User"))
         
         # Send WhatsApp
-        result = whatsapp_service.send_message(user["mobile"], message)
+        result = await whatsapp_service.send_message(user["mobile"], message)
         
         # Log the notification
         await save_notification_log(
@@ -221,13 +254,9 @@ Next Actions:
 - 4th Dimension Team"""
         
         # Send to all team members
-        for user_id in all_user_ids:
-            if not await check_user_notifications_enabled(user_id, "notify_drawing_uploaded"):
-                continue
-            
-            user = await db.users.find_one({"id": user_id}, {"_id": 0})
+        for user_id, user in await load_recipients(all_user_ids, "notify_drawing_uploaded"):
             if user and user.get("mobile"):
-                result = whatsapp_service.send_message(user["mobile"], message)
+                result = await whatsapp_service.send_message(user["mobile"], message)
                 await save_notification_log(
                     user_id=user_id,
                     phone_number=user["mobile"],
@@ -294,13 +323,9 @@ Quick Actions:
         recipients.discard(commenter_id)
         
         # Send notifications
-        for user_id in recipients:
-            if not await check_user_notifications_enabled(user_id, "notify_new_comment"):
-                continue
-            
-            user = await db.users.find_one({"id": user_id}, {"_id": 0})
+        for user_id, user in await load_recipients(recipients, "notify_new_comment"):
             if user and user.get("mobile"):
-                result = whatsapp_service.send_message(user["mobile"], message)
+                result = await whatsapp_service.send_message(user["mobile"], message)
                 await save_notification_log(
                     user_id=user_id,
                     phone_number=user["mobile"],
@@ -375,7 +400,7 @@ Quick Actions:
 - 4th Dimension Team"""
         
         # Send WhatsApp
-        result = whatsapp_service.send_message(user["mobile"], message)
+        result = await whatsapp_service.send_message(user["mobile"], message)
         
         # Log notification
         await save_notification_log(
@@ -421,13 +446,9 @@ async def notify_milestone_completed(project_id: str, milestone_name: str):
         all_user_ids = set(team_member_ids + assigned_contractors + assigned_clients)
         
         # Send to all
-        for user_id in all_user_ids:
-            if not await check_user_notifications_enabled(user_id, "notify_milestone_completed"):
-                continue
-            
-            user = await db.users.find_one({"id": user_id}, {"_id": 0})
+        for user_id, user in await load_recipients(all_user_ids, "notify_milestone_completed"):
             if user and user.get("mobile"):
-                result = whatsapp_service.send_message(user["mobile"], message)
+                result = await whatsapp_service.send_message(user["mobile"], message)
                 await save_notification_log(
                     user_id=user_id,
                     phone_number=user["mobile"],
@@ -462,13 +483,9 @@ async def notify_payment_due(project_id: str, amount: float, due_date: str, reci
         message = templates.payment_due(project_name, f"{amount:,.2f}", due_date)
         
         # Send to recipients
-        for user_id in recipient_ids:
-            if not await check_user_notifications_enabled(user_id, "notify_payment"):
-                continue
-            
-            user = await db.users.find_one({"id": user_id}, {"_id": 0})
+        for user_id, user in await load_recipients(recipient_ids, "notify_payment"):
             if user and user.get("mobile"):
-                result = whatsapp_service.send_message(user["mobile"], message)
+                result = await whatsapp_service.send_message(user["mobile"], message)
                 await save_notification_log(
                     user_id=user_id,
                     phone_number=user["mobile"],
@@ -513,13 +530,9 @@ async def notify_site_visit_scheduled(project_id: str, visit_date: str, visit_ti
         all_user_ids = set(team_member_ids + assigned_contractors)
         
         # Send notifications
-        for user_id in all_user_ids:
-            if not await check_user_notifications_enabled(user_id, "notify_site_visit"):
-                continue
-            
-            user = await db.users.find_one({"id": user_id}, {"_id": 0})
+        for user_id, user in await load_recipients(all_user_ids, "notify_site_visit"):
             if user and user.get("mobile"):
-                result = whatsapp_service.send_message(user["mobile"], message)
+                result = await whatsapp_service.send_message(user["mobile"], message)
                 await save_notification_log(
                     user_id=user_id,
                     phone_number=user["mobile"],
@@ -585,13 +598,9 @@ Quick Actions:
 - 4th Dimension Team"""
         
         # Send to all team members
-        for user_id in all_user_ids:
-            if not await check_user_notifications_enabled(user_id, "notify_new_comment"):
-                continue
-            
-            user = await db.users.find_one({"id": user_id}, {"_id": 0})
+        for user_id, user in await load_recipients(all_user_ids, "notify_new_comment"):
             if user and user.get("mobile"):
-                result = whatsapp_service.send_message(user["mobile"], message)
+                result = await whatsapp_service.send_message(user["mobile"], message)
                 await save_notification_log(
                     user_id=user_id,
                     phone_number=user["mobile"],
@@ -658,10 +667,9 @@ Welcome to the team! 🏗️
 - 4th Dimension Team"""
         
         # Send to all stakeholders
-        for user_id in stakeholder_ids:
-            user = await db.users.find_one({"id": user_id}, {"_id": 0})
+        for user_id, user in await load_recipients(stakeholder_ids):
             if user and user.get("mobile"):
-                result = whatsapp_service.send_message(user["mobile"], message)
+                result = await whatsapp_service.send_message(user["mobile"], message)
                 await save_notification_log(
                     user_id=user_id,
                     phone_number=user["mobile"],
@@ -719,10 +727,9 @@ Drawing: {drawing_name}
 
 - 4th Dimension Team"""
         
-        for user_id in notify_user_ids:
-            user = await db.users.find_one({"id": user_id}, {"_id": 0})
+        for user_id, user in await load_recipients(notify_user_ids):
             if user and user.get("mobile"):
-                result = whatsapp_service.send_message(user["mobile"], message)
+                result = await whatsapp_service.send_message(user["mobile"], message)
                 await save_notification_log(
                     user_id=user_id,
                     phone_number=user["mobile"],
@@ -779,10 +786,9 @@ Quick Actions:
 - 4th Dimension Team"""
         
         # Send to each recipient
-        for user_id in recipient_ids:
-            user = await db.users.find_one({"id": user_id}, {"_id": 0})
+        for user_id, user in await load_recipients(recipient_ids):
             if user and user.get("mobile"):
-                result = whatsapp_service.send_message(user["mobile"], message)
+                result = await whatsapp_service.send_message(user["mobile"], message)
                 await save_notification_log(
                     user_id=user_id,
                     phone_number=user["mobile"],
@@ -839,10 +845,9 @@ Sequence: #{sequence_number}
 
 - 4th Dimension Team"""
         
-        for user_id in notify_user_ids:
-            user = await db.users.find_one({"id": user_id}, {"_id": 0})
+        for user_id, user in await load_recipients(notify_user_ids):
             if user and user.get("mobile"):
-                result = whatsapp_service.send_message(user["mobile"], message)
+                result = await whatsapp_service.send_message(user["mobile"], message)
                 await save_notification_log(
                     user_id=user_id,
                     phone_number=user["mobile"],
@@ -904,14 +909,9 @@ Issued by: {issuer_name}
 - 4th Dimension Team"""
         
         # Send to each recipient
-        for user_id in recipient_ids:
-            # Check if user has notifications enabled
-            if not await check_user_notifications_enabled(user_id, "notify_drawing_issued"):
-                continue
-            
-            user = await db.users.find_one({"id": user_id}, {"_id": 0})
+        for user_id, user in await load_recipients(recipient_ids, "notify_drawing_issued"):
             if user and user.get("mobile"):
-                result = whatsapp_service.send_message(user["mobile"], message)
+                result = await whatsapp_service.send_message(user["mobile"], message)
                 await save_notification_log(
                     user_id=user_id,
                     phone_number=user["mobile"],
@@ -974,14 +974,9 @@ Sequence: #{sequence_number}
 - 4th Dimension Team"""
         
         # Send to all assigned team members
-        for user_id in assigned_user_ids:
-            # Check if user has notifications enabled
-            if not await check_user_notifications_enabled(user_id, "notify_next_drawing_available"):
-                continue
-            
-            user = await db.users.find_one({"id": user_id}, {"_id": 0})
+        for user_id, user in await load_recipients(assigned_user_ids, "notify_next_drawing_available"):
             if user and user.get("mobile"):
-                result = whatsapp_service.send_message(user["mobile"], message)
+                result = await whatsapp_service.send_message(user["mobile"], message)
                 await save_notification_log(
                     user_id=user_id,
                     phone_number=user["mobile"],
@@ -1019,7 +1014,7 @@ async def notify_owner_new_registration(user_name: str, user_email: str, role: s
         )
         
         # Send WhatsApp to owner
-        result = whatsapp_service.send_message(owner["mobile"], message)
+        result = await whatsapp_service.send_message(owner["mobile"], message)
         
         # Log the notification
         await save_notification_log(
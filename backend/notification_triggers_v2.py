@@ -11,10 +11,11 @@ import logging
 import asyncio
 from typing import List, Optional, Dict
 from datetime import datetime, timezone
-from motor.motor_asyncio import AsyncIOMotorClient
 from notification_service import notification_service, message_templates, APP_URL
 from email_templates import get_welcome_email_content
 from whatsapp_templates import WHATSAPP_TEMPLATES
+from utils.database import get_database
+from utils.loaders import get_loaders
 
 # Import template notification service
 try:
@@ -50,10 +51,7 @@ except ImportError:
 logger = logging.getLogger(__name__)
 
 # Database connection
-mongo_url = os.environ.get('MONGO_URL')
-db_name = os.environ.get('DB_NAME', 'architecture_firm')
-client = AsyncIOMotorClient(mongo_url)
-db = client[db_name]
+db = get_database()
 
 
 async def get_magic_link_for_project(
@@ -196,17 +194,27 @@ async def get_magic_link_for_dashboard(recipient_id: str) -> str:
     return f"{APP_URL}/dashboard"
 
 
-def queue_whatsapp_async(phone: str, message: str = None, content_sid: str = None, variables: dict = None):
-    """Queue WhatsApp notification for async delivery (non-blocking)"""
+async def queue_whatsapp_async(phone: str, message: str = None, content_sid: str = None, variables: dict = None,
+                               idempotency_key: str = None):
+    """
+    Queue WhatsApp notification for async delivery (non-blocking).
+
+    The outbox write is awaited so the notification is durable once this
+    returns; ``idempotency_key`` (event id + recipient) makes a retried
+    trigger a no-op.
+    """
     if USE_ASYNC_NOTIFICATIONS and async_notification_service:
         if content_sid:
-            async_notification_service.queue_whatsapp_template(
+            await async_notification_service.queue_whatsapp_template(
                 phone=phone,
                 content_sid=content_sid,
-                variables=variables or {}
+                variables=variables or {},
+                idempotency_key=idempotency_key
             )
         elif message:
-            async_notification_service.queue_whatsapp(phone=phone, message=message)
+            await async_notification_service.queue_whatsapp(
+                phone=phone, message=message, idempotency_key=idempotency_key
+            )
         logger.debug(f"Queued WhatsApp notification to {phone}")
     else:
         # Fallback to sync - create task to avoid blocking
@@ -233,7 +241,8 @@ async def _send_whatsapp_background(phone: str, message: str = None, content_sid
 # All other notifications go via WhatsApp/SMS only
 ALLOWED_EMAIL_TYPES = ['otp', 'registration', 'welcome', 'password_reset', 'verification']
 
-def queue_email_async(to_email: str, subject: str, html_content: str, email_type: str = None):
+async def queue_email_async(to_email: str, subject: str, html_content: str, email_type: str = None,
+                            idempotency_key: str = None):
     """Queue email notification for async delivery (non-blocking)
     
     NOTE: Email notifications are disabled except for onboarding.
@@ -253,10 +262,11 @@ def queue_email_async(to_email: str, subject: str, html_content: str, email_type
         return
     
     if USE_ASYNC_NOTIFICATIONS and async_notification_service:
-        async_notification_service.queue_email(
+        await async_notification_service.queue_email(
             to_email=to_email,
             subject=subject,
-            html_content=html_content
+            html_content=html_content,
+            idempotency_key=idempotency_key
         )
         logger.debug(f"Queued email notification to {to_email}")
     else:
@@ -997,26 +1007,30 @@ async def notify_drawing_issued(
         revision = str(revision_number or drawing.get('current_revision', 0))
         issue_date = datetime.now(timezone.utc).strftime('%d %b %Y')
         
+        loaders = get_loaders()
+        
         # Handle new recipients format (list of dicts)
         if recipients:
-            for recipient in recipients:
+            # Look up missing phones in one batched query per collection
+            phone_collections = {'client': 'clients', 'contractor': 'contractors', 'co_client': 'project_co_clients'}
+            phone_records = await asyncio.gather(*(
+                loaders.loader(phone_collections[r.get('type')]).load(r.get('id'))
+                if not r.get('phone') and r.get('type') in phone_collections else asyncio.sleep(0)
+                for r in recipients
+            ))
+            
+            for recipient, record in zip(recipients, phone_records):
                 recipient_id = recipient.get('id')
                 recipient_name = recipient.get('name', 'User')
                 recipient_phone = recipient.get('phone')
                 recipient_type = recipient.get('type', '')
                 contractor_type = recipient.get('contractor_type', 'Contractor')
                 
-                if not recipient_phone:
-                    # Try to get phone from database
+                if not recipient_phone and record:
+                    # Phone from database (clients may only have a mobile)
+                    recipient_phone = record.get('phone')
                     if recipient_type == 'client':
-                        client = await db.clients.find_one({"id": recipient_id}, {"_id": 0, "phone": 1, "mobile": 1})
-                        recipient_phone = client.get('phone') or client.get('mobile') if client else None
-                    elif recipient_type == 'contractor':
-                        contractor = await db.contractors.find_one({"id": recipient_id}, {"_id": 0, "phone": 1})
-                        recipient_phone = contractor.get('phone') if contractor else None
-                    elif recipient_type == 'co_client':
-                        co_client = await db.project_co_clients.find_one({"id": recipient_id}, {"_id": 0, "phone": 1})
-                        recipient_phone = co_client.get('phone') if co_client else None
+                        recipient_phone = recipient_phone or record.get('mobile')
                 
                 # Send WhatsApp notification
                 if template_notification_service and recipient_phone:
@@ -1067,12 +1081,12 @@ async def notify_drawing_issued(
             if owner and owner['id'] not in recipient_ids:
                 recipient_ids.append(owner['id'])
             
-            for recipient_id in recipient_ids:
-                recipient = await get_user_by_id(recipient_id)
-                if not recipient:
-                    recipient = await db.clients.find_one({"id": recipient_id}, {"_id": 0})
-                if not recipient:
-                    recipient = await db.contractors.find_one({"id": recipient_id}, {"_id": 0})
+            resolved = await asyncio.gather(*(
+                loaders.find_first(recipient_id, "users", "clients", "contractors")
+                for recipient_id in recipient_ids
+            ))
+            
+            for recipient_id, recipient in zip(recipient_ids, resolved):
                 if not recipient:
                     logger.warning(f"Drawing issued: Recipient not found: {recipient_id}")
                     continue
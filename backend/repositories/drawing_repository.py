@@ -7,6 +7,8 @@ from datetime import datetime, timezone
 import logging
 
 from .base import BaseRepository
+from models_projects import DrawingState
+from services.drawing_state import AWAITING_APPROVAL_STATES, transition_drawing
 
 logger = logging.getLogger(__name__)
 
@@ -110,11 +112,8 @@ class DrawingRepository(BaseRepository):
     async def get_pending_approvals(self, user_id: Optional[str] = None) -> List[Dict]:
         """Get drawings pending approval"""
         query = {
-            "deleted_at": None,
-            "file_url": {"$exists": True, "$ne": None},
-            "is_approved": {"$ne": True},
-            "is_issued": {"$ne": True},
-            "is_not_applicable": {"$ne": True}
+            "state": {"$in": list(AWAITING_APPROVAL_STATES)},
+            "deleted_at": None
         }
         
         return await self.find_many(query, projection=DRAWING_SLIM_PROJECTION)
@@ -123,10 +122,9 @@ class DrawingRepository(BaseRepository):
         """Get overdue drawings"""
         now = datetime.now(timezone.utc).isoformat()
         query = {
-            "deleted_at": None,
-            "is_issued": {"$ne": True},
-            "is_not_applicable": {"$ne": True},
-            "due_date": {"$lt": now, "$exists": True}
+            "state": {"$nin": [DrawingState.ISSUED.value, DrawingState.NOT_APPLICABLE.value]},
+            "due_date": {"$lt": now, "$exists": True},
+            "deleted_at": None
         }
         
         if project_id:
@@ -134,9 +132,14 @@ class DrawingRepository(BaseRepository):
         
         return await self.find_many(query, projection=DRAWING_SLIM_PROJECTION)
     
+    async def _update_tracked(self, drawing_id: str, update: Dict) -> bool:
+        """Update a drawing and its project's progress counters"""
+        update["updated_at"] = datetime.now(timezone.utc).isoformat()
+        return await transition_drawing({"id": drawing_id}, update) is not None
+    
     async def approve_drawing(self, drawing_id: str, approved_by: str) -> bool:
         """Approve a drawing"""
-        return await self.update_by_id(drawing_id, {
+        return await self._update_tracked(drawing_id, {
             "is_approved": True,
             "approved_by": approved_by,
             "approved_at": datetime.now(timezone.utc).isoformat()
@@ -144,7 +147,7 @@ class DrawingRepository(BaseRepository):
     
     async def issue_drawing(self, drawing_id: str, file_url: str, issued_by: str) -> bool:
         """Issue a drawing"""
-        return await self.update_by_id(drawing_id, {
+        return await self._update_tracked(drawing_id, {
             "is_issued": True,
             "file_url": file_url,
             "issued_by": issued_by,
@@ -153,7 +156,7 @@ class DrawingRepository(BaseRepository):
     
     async def mark_not_applicable(self, drawing_id: str, marked_by: str, reason: Optional[str] = None) -> bool:
         """Mark drawing as not applicable"""
-        return await self.update_by_id(drawing_id, {
+        return await self._update_tracked(drawing_id, {
             "is_not_applicable": True,
             "na_marked_by": marked_by,
             "na_reason": reason,
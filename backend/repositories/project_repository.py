@@ -6,6 +6,7 @@ from typing import Dict, List, Optional
 import logging
 
 from .base import BaseRepository
+from services.project_stats import get_project_progress
 
 logger = logging.getLogger(__name__)
 
@@ -74,21 +75,13 @@ class ProjectRepository(BaseRepository):
         if not project:
             return None
         
-        # Get drawings for progress calculation
-        drawings = await self.db.project_drawings.find(
-            {"project_id": project_id, "deleted_at": None},
-            {"_id": 0, "is_issued": 1, "is_approved": 1, "is_not_applicable": 1}
-        ).to_list(500)
-        
-        total = len(drawings)
-        applicable = len([d for d in drawings if not d.get("is_not_applicable")])
-        completed = len([d for d in drawings if d.get("is_issued") or d.get("is_approved")])
-        
+        progress = (await get_project_progress([project_id]))[project_id]
         project["progress"] = {
-            "total_drawings": total,
-            "applicable_drawings": applicable,
-            "completed_drawings": completed,
-            "percentage": round((completed / applicable * 100) if applicable > 0 else 0)
+            "total_drawings": progress["total_drawings"],
+            "applicable_drawings": progress["applicable_drawings"],
+            "completed_drawings": progress["completed_drawings"],
+            "percentage": progress["percent_complete"],
+            "last_activity_at": progress["last_activity_at"]
         }
         
         return project
@@ -98,27 +91,28 @@ class ProjectRepository(BaseRepository):
         project = await self.find_by_id(project_id, projection=PROJECT_SLIM_PROJECTION)
         if not project:
             return None
+        cards = await self.get_slim_project_cards([project])
+        return cards[0]
+    
+    async def get_slim_project_cards(self, projects: List[Dict]) -> List[Dict]:
+        """
+        Add progress percentage and team leader name to slim projects, with
+        one counters read and one users read for the whole list
+        """
+        progress = await get_project_progress(p["id"] for p in projects)
         
-        # Add progress percentage
-        drawings = await self.db.project_drawings.find(
-            {"project_id": project_id, "deleted_at": None, "is_not_applicable": {"$ne": True}},
-            {"_id": 0, "is_issued": 1, "is_approved": 1}
-        ).to_list(500)
-        
-        total = len(drawings)
-        completed = len([d for d in drawings if d.get("is_issued") or d.get("is_approved")])
-        
-        project["progress_percent"] = round((completed / total * 100) if total > 0 else 0)
+        leader_ids = list({p["team_leader_id"] for p in projects if p.get("team_leader_id")})
+        leaders = {}
+        if leader_ids:
+            async for leader in self.db.users.find({"id": {"$in": leader_ids}}, {"_id": 0, "id": 1, "name": 1}):
+                leaders[leader["id"]] = leader.get("name")
         
-        # Get team leader name
-        if project.get("team_leader_id"):
-            leader = await self.db.users.find_one(
-                {"id": project["team_leader_id"]},
-                {"_id": 0, "name": 1}
-            )
-            project["team_leader_name"] = leader.get("name") if leader else None
+        for project in projects:
+            project["progress_percent"] = progress[project["id"]]["percent_complete"]
+            if project.get("team_leader_id"):
+                project["team_leader_name"] = leaders.get(project["team_leader_id"])
         
-        return project
+        return projects
     
     async def get_projects_for_user(
         self,
@@ -152,6 +146,20 @@ class ProjectRepository(BaseRepository):
         ]
         results = await self.collection.aggregate(pipeline).to_list(100)
         return {r["_id"]: r["count"] for r in results if r["_id"]}
+    
+    async def get_project_count_by_client(self, client_ids: List[str]) -> Dict[str, int]:
+        """Live project counts for the given clients in one $group pass"""
+        if not client_ids:
+            return {}
+        pipeline = [
+            {"$match": {"client_id": {"$in": client_ids}, "deleted_at": None}},
+            {"$group": {
+                "_id": "$client_id",
+                "count": {"$sum": 1}
+            }}
+        ]
+        results = await self.collection.aggregate(pipeline).to_list(len(client_ids))
+        return {r["_id"]: r["count"] for r in results}
 
 
 # Singleton instance
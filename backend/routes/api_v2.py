@@ -43,19 +43,17 @@ async def get_projects_slim(
         skip=skip
     )
     
-    # Enrich with progress and team leader name
+    # Enrich with progress (materialized counters) and team leader name
     result = []
-    for project in projects:
-        card = await project_repo.get_slim_project_card(project["id"])
-        if card:
-            result.append({
-                "id": card["id"],
-                "title": card.get("title"),
-                "project_code": card.get("project_code"),
-                "progress_percent": card.get("progress_percent", 0),
-                "team_leader_name": card.get("team_leader_name"),
-                "status": card.get("status", "active")
-            })
+    for card in await project_repo.get_slim_project_cards(projects):
+        result.append({
+            "id": card["id"],
+            "title": card.get("title"),
+            "project_code": card.get("project_code"),
+            "progress_percent": card.get("progress_percent", 0),
+            "team_leader_name": card.get("team_leader_name"),
+            "status": card.get("status", "active")
+        })
     
     return {
         "projects": result,
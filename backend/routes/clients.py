@@ -9,6 +9,7 @@ from models_projects import (
     BrandCategoryMaster, BrandCategoryMasterCreate, BrandCategoryMasterUpdate,
     ContactTypeMaster, ContactTypeMasterCreate, ContactTypeMasterUpdate
 )
+from repositories import get_project_repository
 
 router = APIRouter(tags=["clients"])
 
@@ -56,14 +57,15 @@ async def get_clients(
     
     clients = await db.clients.find(query, {"_id": 0}).to_list(1000)
     
+    project_counts = await get_project_repository().get_project_count_by_client([c["id"] for c in clients])
+    
     for client in clients:
         if isinstance(client.get('created_at'), str):
             client['created_at'] = datetime.fromisoformat(client['created_at'])
         if isinstance(client.get('updated_at'), str):
             client['updated_at'] = datetime.fromisoformat(client['updated_at'])
         
-        project_count = await db.projects.count_documents({"client_id": client["id"], "deleted_at": None})
-        client['total_projects'] = project_count
+        client['total_projects'] = project_counts.get(client["id"], 0)
     
     return clients
 
@@ -3,8 +3,7 @@ Comments Router - Project and Drawing Comments
 Refactored from server.py for better code organization
 """
 
-from fastapi import APIRouter, Depends, HTTPException, Form, File, UploadFile
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Form, File, UploadFile, Request
 from datetime import datetime, timezone
 from pathlib import Path
 import logging
@@ -13,6 +12,11 @@ import os
 
 from utils.auth import get_current_user, User
 from utils.database import get_database
+from cache_service import invalidate_project_stats
+from services.drawing_state import transition_drawing
+from services.upload_service import save_upload
+from services.blob_store import blob_store
+from services.file_serving import serve_file
 from pydantic import BaseModel
 
 db = get_database()
@@ -94,11 +98,8 @@ async def create_project_comment(
             file_ext = os.path.splitext(file.filename)[1]
             safe_filename = f"{comment_id}_file{file_ext}"
             file_path = UPLOAD_DIR / "comments" / safe_filename
-            file_path.parent.mkdir(parents=True, exist_ok=True)
             
-            content = await file.read()
-            with open(file_path, "wb") as f:
-                f.write(content)
+            await save_upload(file, file_path)
             
             comment["file_url"] = f"/api/uploads/comments/{safe_filename}"
             comment["file_name"] = file.filename
@@ -108,11 +109,8 @@ async def create_project_comment(
             voice_ext = os.path.splitext(voice_note.filename)[1] or ".webm"
             safe_voice_name = f"{comment_id}_voice{voice_ext}"
             voice_path = UPLOAD_DIR / "comments" / safe_voice_name
-            voice_path.parent.mkdir(parents=True, exist_ok=True)
             
-            content = await voice_note.read()
-            with open(voice_path, "wb") as f:
-                f.write(content)
+            await save_upload(voice_note, voice_path)
             
             comment["voice_note_url"] = f"/api/uploads/comments/{safe_voice_name}"
         
@@ -159,14 +157,10 @@ async def delete_project_comment(
         
         # Delete associated files
         if comment.get("file_url"):
-            file_path = UPLOAD_DIR / comment["file_url"].replace("/api/uploads/", "")
-            if file_path.exists():
-                file_path.unlink()
+            await blob_store.release(UPLOAD_DIR / comment["file_url"].replace("/api/uploads/", ""))
         
         if comment.get("voice_note_url"):
-            voice_path = UPLOAD_DIR / comment["voice_note_url"].replace("/api/uploads/", "")
-            if voice_path.exists():
-                voice_path.unlink()
+            await blob_store.release(UPLOAD_DIR / comment["voice_note_url"].replace("/api/uploads/", ""))
         
         await db.project_comments.delete_one({"id": comment_id})
         
@@ -210,17 +204,16 @@ async def create_drawing_comment(
     
     # If comment requires revision, update drawing status
     if comment_data.requires_revision:
-        await db.project_drawings.update_one(
+        await transition_drawing(
             {"id": drawing_id},
             {
-                "$set": {
-                    "has_pending_revision": True,
-                    "status": "revision_needed",
-                    "updated_at": datetime.now(timezone.utc).isoformat()
-                }
+                "has_pending_revision": True,
+                "status": "revision_needed",
+                "updated_at": datetime.now(timezone.utc).isoformat()
             }
         )
         logger.info(f"Drawing {drawing_id} marked for revision due to comment")
+        await invalidate_project_stats(drawing.get('project_id'))
     
     # Increment comment count
     await db.project_drawings.update_one(
@@ -439,9 +432,7 @@ async def upload_comment_reference(
         unique_filename = f"{comment_id}_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}_{len(uploaded_files)}{file_extension}"
         file_path = upload_dir / unique_filename
         
-        with open(file_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        await save_upload(file, file_path)
         
         file_url = f"/uploads/comment_references/{unique_filename}"
         uploaded_files.append({
@@ -488,9 +479,7 @@ async def upload_comment_voice_note(
     unique_filename = f"voice_{comment_id}_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.webm"
     file_path = upload_dir / unique_filename
     
-    with open(file_path, "wb") as buffer:
-        content = await voice_note.read()
-        buffer.write(content)
+    await save_upload(voice_note, file_path)
     
     voice_url = f"/uploads/voice_notes/{unique_filename}"
     
@@ -519,53 +508,28 @@ async def upload_comment_voice_note(
 # ==================== FILE SERVING ====================
 
 @router.get("/comments/file/{filename}")
-async def get_comment_file(filename: str):
+async def get_comment_file(filename: str, request: Request):
     """Serve comment file attachments (legacy path)"""
-    file_path = Path("/app/backend/uploads/comments") / filename
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="File not found")
-    return FileResponse(str(file_path))
+    return await serve_file(request, Path("/app/backend/uploads/comments") / filename, immutable=True)
 
 
 @router.get("/comments/voice/{filename}")
-async def get_comment_voice(filename: str):
+async def get_comment_voice(filename: str, request: Request):
     """Serve comment voice notes (legacy path)"""
-    file_path = Path("/app/backend/uploads/voice_notes") / filename
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="Voice note not found")
-    return FileResponse(str(file_path), media_type="audio/webm")
+    return await serve_file(
+        request,
+        Path("/app/backend/uploads/voice_notes") / filename,
+        immutable=True,
+        not_found="Voice note not found"
+    )
 
 
 @router.get("/uploads/comments/{filename}")
-async def serve_comment_file(filename: str):
+async def serve_comment_file(filename: str, request: Request):
     """Serve uploaded comment files"""
-    file_path = UPLOAD_DIR / "comments" / filename
-    
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="File not found")
-    
-    extension = file_path.suffix.lower()
-    media_types = {
-        '.pdf': 'application/pdf',
-        '.png': 'image/png',
-        '.jpg': 'image/jpeg',
-        '.jpeg': 'image/jpeg',
-        '.gif': 'image/gif',
-        '.webm': 'audio/webm',
-        '.mp3': 'audio/mpeg',
-        '.wav': 'audio/wav',
-        '.ogg': 'audio/ogg',
-        '.m4a': 'audio/mp4'
-    }
-    
-    media_type = media_types.get(extension, 'application/octet-stream')
-    
-    return FileResponse(
-        path=str(file_path),
-        media_type=media_type,
+    return await serve_file(
+        request,
+        UPLOAD_DIR / "comments" / filename,
         filename=filename,
-        headers={
-            "Content-Disposition": f'inline; filename="{filename}"',
-            "Cache-Control": "public, max-age=3600",
-        }
+        immutable=True
     )
@@ -8,18 +8,19 @@ import uuid
 import logging
 from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, Query, Header
-from motor.motor_asyncio import AsyncIOMotorClient
 import jwt
+from utils.database import get_database
+from utils.principal_cache import principal_cache
+from cache_service import invalidate_project_stats
+from services.drawing_state import transition_drawing
+from drawing_approval_reminders import first_reminder_at
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(tags=["drawings-whatsapp"])
 
 # Database connection
-mongo_url = os.environ.get('MONGO_URL')
-db_name = os.environ.get('DB_NAME', 'architecture_firm')
-client = AsyncIOMotorClient(mongo_url)
-db = client[db_name]
+db = get_database()
 
 SECRET_KEY = os.environ.get("JWT_SECRET_KEY", "your-secret-key")
 
@@ -40,6 +41,11 @@ async def get_current_user_from_token(authorization: str = Header(None)):
         if not user_identifier:
             raise HTTPException(status_code=401, detail="Invalid token")
         
+        cache_key = f"token:jwt:{user_identifier}"
+        cached_user = principal_cache.get(cache_key)
+        if cached_user is not None:
+            return dict(cached_user)
+        
         user = await db.users.find_one({"id": user_identifier}, {"_id": 0})
         if not user:
             user = await db.users.find_one({"email": user_identifier}, {"_id": 0})
@@ -47,7 +53,8 @@ async def get_current_user_from_token(authorization: str = Header(None)):
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
         
-        return user
+        principal_cache.set(cache_key, user, user_id=user.get("id"), email=user.get("email"))
+        return dict(user)
         
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
@@ -120,21 +127,26 @@ async def send_drawing_via_whatsapp(
         try:
             from async_notifications import async_notification_service
             
+            # One outbox entry per send, even if this request is retried
+            send_id = str(uuid.uuid4())
+            idempotency_key = f"drawing_review:{send_id}:{phone_number}"
             if media_url:
-                async_notification_service.queue_whatsapp_with_media(
+                await async_notification_service.queue_whatsapp_with_media(
                     phone=phone_number,
                     media_url=media_url,
-                    message=message
+                    message=message,
+                    idempotency_key=idempotency_key
                 )
                 logger.info(f"Queued WhatsApp with media for drawing {drawing_id}")
             else:
-                async_notification_service.queue_whatsapp(
+                await async_notification_service.queue_whatsapp(
                     phone=phone_number,
-                    message=message
+                    message=message,
+                    idempotency_key=idempotency_key
                 )
             
             await db.whatsapp_notifications.insert_one({
-                "id": str(uuid.uuid4()),
+                "id": send_id,
                 "user_id": current_user.get('id'),
                 "recipient_phone": phone_number,
                 "message_type": "drawing_review",
@@ -201,14 +213,17 @@ async def request_drawing_approval(
         if not owner or not owner.get('mobile'):
             raise HTTPException(status_code=400, detail="Owner contact not available")
         
-        await db.project_drawings.update_one(
+        requested_at = datetime.now(timezone.utc).isoformat()
+        await transition_drawing(
             {"id": drawing_id},
-            {"$set": {
+            {
                 "under_review": True,
-                "review_requested_at": datetime.now(timezone.utc).isoformat(),
+                "next_reminder_at": first_reminder_at(),
+                "review_requested_at": requested_at,
                 "review_requested_by": current_user.get('id')
-            }}
+            }
         )
+        await invalidate_project_stats(drawing.get('project_id'))
         
         app_url = os.environ.get('REACT_APP_BACKEND_URL', 'https://pmapp-stability.preview.emergentagent.com')
         # Use Drawing Review Page format
@@ -234,16 +249,20 @@ async def request_drawing_approval(
         try:
             from async_notifications import async_notification_service
             
+            # The review request is the event: one message per request and owner
+            idempotency_key = f"drawing_approval:{drawing_id}:{requested_at}:{owner['id']}"
             if media_url:
-                async_notification_service.queue_whatsapp_with_media(
+                await async_notification_service.queue_whatsapp_with_media(
                     phone=owner['mobile'],
                     media_url=media_url,
-                    message=message
+                    message=message,
+                    idempotency_key=idempotency_key
                 )
             else:
-                async_notification_service.queue_whatsapp(
+                await async_notification_service.queue_whatsapp(
                     phone=owner['mobile'],
-                    message=message
+                    message=message,
+                    idempotency_key=idempotency_key
                 )
             
             await db.notifications.insert_one({
@@ -2,15 +2,25 @@
 Drawing Management Routes
 Handles drawing operations, uploads, comments, and issue notifications
 """
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request
+from fastapi.responses import JSONResponse
 from datetime import datetime, timezone, timedelta
 from typing import List, Optional
+import re
 import logging
 from uuid import uuid4
 from pathlib import Path
 
 from utils.auth import get_current_user, User
 from utils.database import get_database
+from services.upload_service import save_upload
+from services.file_serving import serve_file
+from services.image_derivatives import STATUS_PENDING, STATUS_READY, STATUS_FAILED
+from services.project_stats import record_drawing_created
+from services.drawing_state import transition_drawing
+from services.drawing_previews import (
+    request_drawing_preview, drawing_file_path, get_manifest, preview_dir
+)
 from models_projects import (
     ProjectDrawing, ProjectDrawingUpdate, DrawingStatus,
     DrawingComment, DrawingCommentCreate, DrawingCommentUpdate
@@ -25,6 +35,8 @@ logger = logging.getLogger(__name__)
 UPLOAD_DIR = Path("/app/uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
+SHA256_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
 
 @router.get("/{drawing_id}")
 async def get_drawing(drawing_id: str, current_user: User = Depends(get_current_user)):
@@ -100,16 +112,15 @@ async def update_drawing(
                             new_drawing_dict[field] = new_drawing_dict[field].isoformat() if isinstance(new_drawing_dict[field], datetime) else new_drawing_dict[field]
                     
                     await db.project_drawings.insert_one(new_drawing_dict)
+                    await record_drawing_created(new_drawing_dict)
                     logger.info(f"Created new drawing #{new_sequence}: {new_drawing_name}")
     
-    result = await db.project_drawings.update_one(
-        {"id": drawing_id, "deleted_at": None},
-        {"$set": update_data}
-    )
-    
-    if result.matched_count == 0:
+    if not await transition_drawing({"id": drawing_id, "deleted_at": None}, update_data):
         raise HTTPException(status_code=404, detail="Drawing not found")
     
+    if update_data.get('is_issued') or update_data.get('under_review'):
+        await request_drawing_preview(drawing_id)
+    
     return {"message": "Drawing updated successfully"}
 
 
@@ -124,12 +135,12 @@ async def mark_drawing_not_applicable(
         raise HTTPException(status_code=404, detail="Drawing not found")
     
     # Mark as N/A
-    await db.project_drawings.update_one(
+    await transition_drawing(
         {"id": drawing_id},
-        {"$set": {
+        {
             "is_not_applicable": True,
             "deleted_at": datetime.now(timezone.utc).isoformat()
-        }}
+        }
     )
     
     # Advance sequence logic (same as issuing)
@@ -181,6 +192,110 @@ async def notify_drawing_issue(
         raise HTTPException(status_code=500, detail=f"Failed to send notification: {str(e)}")
 
 
+def _preview_pending() -> JSONResponse:
+    return JSONResponse(status_code=202, content={"status": STATUS_PENDING, "retry_after": 5})
+
+
+async def _rendered_manifest(drawing_id: str) -> Optional[dict]:
+    """
+    Tile manifest once the drawing's current PDF has been rendered;
+    otherwise queues the render and returns None.
+    """
+    drawing = await db.project_drawings.find_one(
+        {"id": drawing_id, "deleted_at": None},
+        {"_id": 0, "id": 1, "file_url": 1, "preview_file_url": 1, "preview_status": 1, "preview_sha256": 1}
+    )
+    if not drawing:
+        raise HTTPException(status_code=404, detail="Drawing not found")
+    if not drawing_file_path(drawing.get("file_url")):
+        raise HTTPException(status_code=404, detail="No PDF attached to this drawing")
+
+    status = drawing.get("preview_status")
+    current = drawing.get("preview_file_url") == drawing["file_url"]
+    if current and status == STATUS_FAILED:
+        raise HTTPException(status_code=422, detail="Drawing preview could not be rendered")
+    if current and status == STATUS_READY and drawing.get("preview_sha256"):
+        manifest = await get_manifest(drawing["preview_sha256"])
+        if manifest:
+            return manifest
+        # Rendered files were cleared; render again
+        await request_drawing_preview(drawing_id, force=True)
+    else:
+        await request_drawing_preview(drawing_id)
+    return None
+
+
+@router.get("/{drawing_id}/preview")
+async def get_drawing_preview(
+    drawing_id: str,
+    request: Request,
+    fmt: Optional[str] = Query(None, description="webp or jpeg (default: webp if accepted, else jpeg)"),
+    current_user: User = Depends(get_current_user)
+):
+    """First-page preview image of the drawing's PDF (202 while it is being rendered)"""
+    headers = {}
+    if fmt:
+        fmt = "jpeg" if fmt.lower() == "jpg" else fmt.lower()
+        if fmt not in ("webp", "jpeg"):
+            raise HTTPException(status_code=400, detail="fmt must be webp or jpeg")
+    else:
+        fmt = "webp" if "image/webp" in request.headers.get("accept", "") else "jpeg"
+        headers["Vary"] = "Accept"
+
+    manifest = await _rendered_manifest(drawing_id)
+    if not manifest:
+        return _preview_pending()
+
+    sha256 = manifest["sha256"]
+    extension = "webp" if fmt == "webp" else "jpg"
+    return await serve_file(
+        request,
+        preview_dir(sha256) / f"preview.{extension}",
+        media_type=f"image/{fmt}",
+        etag=f"{sha256}-preview.{extension}",
+        private=True,
+        headers=headers
+    )
+
+
+@router.get("/{drawing_id}/tiles")
+async def get_drawing_tiles(drawing_id: str, current_user: User = Depends(get_current_user)):
+    """Tile pyramid geometry and URLs for the zoomable drawing viewer (202 while rendering)"""
+    manifest = await _rendered_manifest(drawing_id)
+    if not manifest:
+        return _preview_pending()
+
+    sha256 = manifest["sha256"]
+    return {
+        **manifest,
+        "preview_url": f"/api/drawings/{drawing_id}/preview",
+        "tile_url_template": f"/api/drawings/previews/{sha256}/tiles/{{z}}/{{x}}_{{y}}.webp",
+    }
+
+
+@router.get("/previews/{sha256}/tiles/{level}/{x}_{y}.webp")
+async def get_drawing_tile(
+    sha256: str,
+    level: int,
+    x: int,
+    y: int,
+    request: Request,
+    current_user: User = Depends(get_current_user)
+):
+    """One tile of a rendered drawing; addressed by file hash, so cached as immutable"""
+    if not SHA256_PATTERN.match(sha256) or min(level, x, y) < 0:
+        raise HTTPException(status_code=404, detail="Tile not found")
+    return await serve_file(
+        request,
+        preview_dir(sha256) / "tiles" / str(level) / f"{x}_{y}.webp",
+        media_type="image/webp",
+        etag=f"{sha256}-{level}-{x}-{y}",
+        immutable=True,
+        private=True,
+        not_found="Tile not found"
+    )
+
+
 @router.post("/{drawing_id}/comments")
 async def add_drawing_comment(
     drawing_id: str,
@@ -278,13 +393,13 @@ async def upload_drawing_file(
     unique_filename = f"{uuid4()}{file_extension}"
     file_path = project_upload_dir / unique_filename
     
-    # Save file
-    with open(file_path, "wb") as buffer:
-        content = await file.read()
-        buffer.write(content)
+    # Stream to disk
+    stored = await save_upload(file, file_path)
     
     return {
         "filename": unique_filename,
+        "size": stored.size,
+        "sha256": stored.sha256,
         "file_path": str(file_path),
         "url": f"/uploads/{project_id}/{unique_filename}"
     }
@@ -296,12 +411,12 @@ async def delete_drawing(
     current_user: User = Depends(get_current_user)
 ):
     """Soft delete a drawing"""
-    result = await db.project_drawings.update_one(
+    deleted = await transition_drawing(
         {"id": drawing_id},
-        {"$set": {"deleted_at": datetime.now(timezone.utc).isoformat()}}
+        {"deleted_at": datetime.now(timezone.utc).isoformat()}
     )
     
-    if result.matched_count == 0:
+    if not deleted:
         raise HTTPException(status_code=404, detail="Drawing not found")
     
     return {"message": "Drawing deleted successfully"}
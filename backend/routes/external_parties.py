@@ -10,6 +10,7 @@ import logging
 
 from utils.auth import get_current_user, User
 from utils.database import get_database
+from utils.principal_cache import invalidate_user
 from models_projects import (
     Contractor, ContractorCreate, ContractorType,
     Vendor, VendorCreate, VendorUpdate, VendorType,
@@ -184,6 +185,7 @@ async def delete_contractor(
     
     if contractor_user_id:
         await db.users.delete_one({"id": contractor_user_id})
+        invalidate_user(contractor_user_id)
         logger.info(f"Hard deleted user account for contractor: {contractor.get('name')}")
     
     if contractor_email:
@@ -418,6 +420,7 @@ async def delete_consultant(
     
     if consultant_user_id:
         await db.users.delete_one({"id": consultant_user_id})
+        invalidate_user(consultant_user_id)
         logger.info("Hard deleted user account for consultant")
     
     if consultant_email:
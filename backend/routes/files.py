@@ -9,6 +9,7 @@ import sys
 sys.path.append(str(Path(__file__).parent.parent))
 
 from models_projects import *
+from services.upload_service import save_upload
 
 # File storage settings
 MAX_FILE_SIZE = int(os.environ.get('MAX_FILE_SIZE', 524288000))
@@ -29,31 +30,24 @@ async def upload_file(
     current_user = Depends(get_current_user)
 ):
     try:
-        file.file.seek(0, 2)
-        file_size = file.file.tell()
-        file.file.seek(0)
-        
-        if file_size > MAX_FILE_SIZE:
-            raise HTTPException(status_code=413, detail="File size exceeds maximum")
-        
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         category_dir = UPLOAD_DIR / "files" / category / (project_id or "general")
-        category_dir.mkdir(parents=True, exist_ok=True)
         
         file_path = category_dir / f"{timestamp}_{file.filename}"
         
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        stored = await save_upload(file, file_path, max_size=MAX_FILE_SIZE)
         
         file_key = str(file_path.relative_to(UPLOAD_DIR))
         
         return {
             "message": "File uploaded successfully",
             "file_key": file_key,
-            "size": file_size
+            "size": stored.size,
+            "sha256": stored.sha256
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -0,0 +1,104 @@
+"""
+On-Demand Image Routes
+Resized renditions of project 3D images at whitelisted sizes and formats.
+
+    GET /api/img/{project_id}/{image_id}?w=640&fmt=webp
+
+Renditions are rendered on first request on the image worker pool and
+kept in the disk LRU cache (services.image_cache); concurrent requests
+for the same rendition share one render.
+"""
+import os
+import asyncio
+import logging
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request
+
+from utils.database import get_database
+from services.blob_store import blob_store
+from services.file_serving import serve_file
+from services.image_cache import image_cache
+from services.image_derivatives import run_image_job
+from services.image_service import render_resized
+
+db = get_database()
+router = APIRouter(prefix="/img", tags=["Images"])
+logger = logging.getLogger(__name__)
+
+# Bounding-box edges (pixels) a client may ask for
+ALLOWED_DIMENSIONS = sorted(
+    int(value) for value in os.environ.get(
+        'IMAGE_RESIZE_DIMENSIONS',
+        '64,96,128,160,200,256,320,400,480,640,800,960,1024,1280,1600,1920,2560'
+    ).split(",") if value.strip()
+)
+
+FORMAT_MEDIA_TYPES = {"webp": "image/webp", "jpeg": "image/jpeg", "png": "image/png"}
+FORMAT_ALIASES = {"jpg": "jpeg"}
+
+
+def _check_dimension(name: str, value: Optional[int]):
+    if value is not None and value not in ALLOWED_DIMENSIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"{name} must be one of {', '.join(str(d) for d in ALLOWED_DIMENSIONS)}"
+        )
+
+
+@router.get("/{project_id}/{image_id}")
+async def resized_3d_image(
+    project_id: str,
+    image_id: str,
+    request: Request,
+    w: Optional[int] = Query(None, description="Max width"),
+    h: Optional[int] = Query(None, description="Max height"),
+    fmt: Optional[str] = Query(None, description="webp, jpeg or png (default: webp if accepted, else jpeg)")
+):
+    """Serve a 3D image scaled to fit within w x h (never upscaled)"""
+    if w is None and h is None:
+        raise HTTPException(status_code=400, detail="At least one of w or h is required")
+    _check_dimension("w", w)
+    _check_dimension("h", h)
+
+    headers = {}
+    if fmt:
+        fmt = FORMAT_ALIASES.get(fmt.lower(), fmt.lower())
+        if fmt not in FORMAT_MEDIA_TYPES:
+            raise HTTPException(status_code=400, detail=f"fmt must be one of {', '.join(FORMAT_MEDIA_TYPES)}")
+    else:
+        fmt = "webp" if "image/webp" in request.headers.get("accept", "") else "jpeg"
+        headers["Vary"] = "Accept"
+
+    image = await db.project_3d_images.find_one(
+        {"id": image_id, "project_id": project_id, "deleted_at": None},
+        {"_id": 0, "file_path": 1, "sha256": 1}
+    )
+    if not image or not image.get("file_path"):
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    source = await blob_store.locate(image["file_path"])
+    if not source:
+        raise HTTPException(status_code=404, detail="Image not found")
+
+    digest = await blob_store.content_hash(image["file_path"], source) or image.get("sha256")
+    if not digest:
+        stat = await asyncio.get_event_loop().run_in_executor(None, os.stat, source)
+        digest = f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+    key = f"{digest}_{w or 0}x{h or 0}.{fmt}"
+
+    async def render(temp_path):
+        await run_image_job(render_resized, str(source), str(temp_path), w, h, fmt)
+
+    try:
+        path = await image_cache.get_or_create(key, render)
+    except Exception as e:
+        logger.error(f"Resize failed for 3D image {image_id} ({key}): {e}")
+        raise HTTPException(status_code=422, detail="Image could not be resized")
+
+    return await serve_file(
+        request,
+        path,
+        media_type=FORMAT_MEDIA_TYPES[fmt],
+        etag=key,
+        headers=headers
+    )
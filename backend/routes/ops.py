@@ -11,12 +11,23 @@ import os
 import logging
 from datetime import datetime, timezone
 from typing import Optional
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Depends, Query, HTTPException
 from fastapi.security import HTTPBearer
 
 from integrations.twilio_service import twilio_service
 from integrations.sendgrid_service import sendgrid_service
 from integrations.notification_logger import notification_logger
+from utils.database import registry as db_registry
+from integrations.http_clients import client_stats as http_client_stats
+from utils.indexes import INDEX_MANIFEST, ensure_indexes, explain_coverage
+from notification_outbox import notification_outbox, STATUS_DEAD
+from services.blob_store import blob_store
+from services.image_cache import image_cache
+from cache_service import cache as memory_cache
+from utils.principal_cache import principal_cache
+from utils.invalidation_bus import invalidation_bus
+from services.job_runner import job_runner
+from utils.auth import require_admin, User
 
 logger = logging.getLogger(__name__)
 security = HTTPBearer()
@@ -56,7 +67,8 @@ async def system_status():
             "database": {
                 "service": "mongodb",
                 "configured": bool(os.environ.get('MONGO_URL')),
-                "database": os.environ.get('DB_NAME', 'archflow')
+                "database": os.environ.get('DB_NAME', 'archflow'),
+                "pools": db_registry.stats()
             }
         },
         "environment": {
@@ -88,6 +100,190 @@ async def integration_status():
     }
 
 
+@router.get("/status/database")
+async def database_status():
+    """
+    Get connection pool metrics for the shared MongoDB client registry.
+    """
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "pools": db_registry.stats()
+    }
+
+
+@router.get("/status/http-clients")
+async def http_client_status():
+    """
+    Get the shared outbound HTTP client pools (one per upstream).
+    """
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "clients": http_client_stats()
+    }
+
+
+@router.get("/status/blob-store")
+async def blob_store_status(current_user: User = Depends(require_admin)):
+    """
+    Get content-addressed upload storage usage (stored vs logical bytes).
+    """
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "blob_store": await blob_store.stats()
+    }
+
+
+@router.get("/status/image-cache")
+async def image_cache_status():
+    """
+    Get resized-image cache usage and hit ratio (for this worker process).
+    """
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "pid": os.getpid(),
+        "image_cache": image_cache.stats()
+    }
+
+
+@router.get("/status/cache")
+async def memory_cache_status():
+    """
+    Get in-memory data cache and principal cache size, hit ratio and
+    eviction counters, and the cross-worker invalidation bus state (for
+    this worker process).
+    """
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "pid": os.getpid(),
+        "cache": memory_cache.stats(),
+        "principal_cache": principal_cache.stats(),
+        "invalidation_bus": invalidation_bus.stats()
+    }
+
+
+# ============================================
+# SCHEDULED JOB ENDPOINTS
+# ============================================
+
+@router.get("/jobs")
+async def get_jobs(current_user: User = Depends(require_admin)):
+    """
+    List periodic jobs with their schedule, current leader, last result
+    and recent run durations.
+    """
+    status = await job_runner.status()
+    status["timestamp"] = datetime.now(timezone.utc).isoformat()
+    return status
+
+
+@router.get("/jobs/{job_name}/runs")
+async def get_job_runs(
+    job_name: str,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Run history of a cluster-wide job, newest first.
+    """
+    if job_name not in job_runner.jobs:
+        raise HTTPException(status_code=404, detail="Job not found")
+    runs = await job_runner.history(job_name, limit)
+    return {"job": job_name, "total": len(runs), "runs": runs}
+
+
+@router.post("/jobs/{job_name}/run")
+async def run_job_now(job_name: str, current_user: User = Depends(require_admin)):
+    """
+    Make a job due now; the worker that runs it picks it up within seconds.
+    """
+    if not await job_runner.trigger(job_name):
+        raise HTTPException(status_code=404, detail="Job not found")
+    logger.info(f"Job {job_name} triggered by {current_user.email}")
+    return {"job": job_name, "triggered": True}
+
+
+# ============================================
+# INDEX ENDPOINTS
+# ============================================
+
+@router.get("/indexes")
+async def get_index_manifest(current_user: User = Depends(require_admin)):
+    """
+    List the declared index manifest.
+    """
+    return {
+        "total": len(INDEX_MANIFEST),
+        "indexes": [spec.to_dict() for spec in INDEX_MANIFEST]
+    }
+
+
+@router.post("/indexes/apply")
+async def apply_index_manifest(current_user: User = Depends(require_admin)):
+    """
+    Apply the index manifest (idempotent).
+    """
+    return await ensure_indexes()
+
+
+@router.get("/indexes/coverage")
+async def get_index_coverage(current_user: User = Depends(require_admin)):
+    """
+    Run explain() on representative queries from each router.
+    
+    Flags any query whose winning plan is a COLLSCAN so missing
+    indexes are caught before they reach production load.
+    """
+    coverage = await explain_coverage()
+    coverage["timestamp"] = datetime.now(timezone.utc).isoformat()
+    return coverage
+
+
+# ============================================
+# NOTIFICATION OUTBOX ENDPOINTS
+# ============================================
+
+@router.get("/notifications/outbox")
+async def get_outbox_stats(current_user: User = Depends(require_admin)):
+    """
+    Outbox entry counts by status and channel.
+    """
+    stats = await notification_outbox.stats()
+    stats["timestamp"] = datetime.now(timezone.utc).isoformat()
+    return stats
+
+
+@router.get("/notifications/outbox/dead")
+async def get_dead_letters(
+    channel: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(require_admin)
+):
+    """
+    List dead-lettered notifications (attempts exhausted or permanent error).
+    """
+    query = {"status": STATUS_DEAD}
+    if channel:
+        query["channel"] = channel
+    entries = await notification_outbox.collection.find(
+        query, {"_id": 0, "payload.html_content": 0}
+    ).sort("dead_at", -1).limit(limit).to_list(limit)
+    return {"total": len(entries), "entries": entries}
+
+
+@router.post("/notifications/outbox/requeue")
+async def requeue_dead_letters(
+    entry_id: Optional[str] = None,
+    current_user: User = Depends(require_admin)
+):
+    """
+    Move dead-lettered notifications back to pending (one entry, or all).
+    """
+    requeued = await notification_outbox.requeue_dead(entry_id)
+    if entry_id and not requeued:
+        raise HTTPException(status_code=404, detail="Dead-lettered entry not found")
+    return {"requeued": requeued}
+
+
 # ============================================
 # NOTIFICATION LOGS ENDPOINTS
 # ============================================
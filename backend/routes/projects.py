@@ -2,8 +2,10 @@
 Project Management Routes
 Handles project CRUD operations, drawings association, and co-clients
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from datetime import datetime, timezone, timedelta
+from typing import Optional
 import logging
 from uuid import uuid4
 
@@ -15,6 +17,13 @@ from models_projects import (
 )
 from models_coclients import CoClient, CoClientCreate
 from drawing_templates import get_template_drawings
+from services.drawing_export import (
+    build_transmittal, transmittal_csv, stream_zip, export_basename, TRANSMITTAL_CSV_NAME
+)
+from services.file_serving import etag_matches
+from cache_service import invalidate_project_cache
+from services.project_stats import record_drawing_created
+from services.project_assignments import assigned_party_ids, assignment_update, touches_assignments
 
 db = get_database()
 router = APIRouter(prefix="/projects", tags=["projects"])
@@ -73,6 +82,7 @@ async def create_project(project_data: NewProjectCreate, current_user: User = De
         if project_dict.get(field):
             project_dict[field] = project_dict[field].isoformat() if isinstance(project_dict[field], datetime) else project_dict[field]
     
+    project_dict["assigned_party_ids"] = assigned_party_ids(project_dict)
     await db.projects.insert_one(project_dict)
     
     # Auto-create ONLY first 3 drawings from template lists for each project type
@@ -118,6 +128,7 @@ async def create_project(project_data: NewProjectCreate, current_user: User = De
                     drawing_dict[field] = drawing_dict[field].isoformat() if isinstance(drawing_dict[field], datetime) else drawing_dict[field]
             
             await db.project_drawings.insert_one(drawing_dict)
+            await record_drawing_created(drawing_dict)
             logger.info(f"Created drawing #{sequence_num}: {drawing_name} for project {project.id}")
     
     # Send project creation notifications
@@ -164,11 +175,12 @@ async def update_project(
     
     result = await db.projects.update_one(
         {"id": project_id, "deleted_at": None},
-        {"$set": update_data}
+        assignment_update(update_data) if touches_assignments(update_data) else {"$set": update_data}
     )
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Project not found")
+    await invalidate_project_cache(project_id)
     
     return {"message": "Project updated successfully"}
 
@@ -184,6 +196,7 @@ async def delete_project(
         {"id": project_id},
         {"$set": {"deleted_at": datetime.now(timezone.utc).isoformat()}}
     )
+    await invalidate_project_cache(project_id)
     
     return {"message": "Project deleted successfully"}
 
@@ -243,3 +256,69 @@ async def remove_co_client(
         raise HTTPException(status_code=404, detail="Co-client not found")
     
     return {"message": "Co-client removed successfully"}
+
+
+async def _export_project(project_id: str) -> dict:
+    project = await db.projects.find_one(
+        {"id": project_id, "deleted_at": None},
+        {"_id": 0, "id": 1, "code": 1, "title": 1}
+    )
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return project
+
+
+@router.get("/{project_id}/issued-drawings/transmittal")
+async def get_issued_drawings_transmittal(
+    project_id: str,
+    request: Request,
+    category: Optional[str] = Query(None),
+    revision: Optional[int] = Query(None, ge=0),
+    fmt: str = Query("json", pattern="^(json|csv)$"),
+    current_user: User = Depends(get_current_user)
+):
+    """Transmittal (drawing list with revisions and checksums) for the issued drawing set"""
+    transmittal = await build_transmittal(await _export_project(project_id), category, revision)
+    manifest = transmittal["manifest"]
+
+    etag = f'"{manifest["fingerprint"]}-{fmt}"'
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    if fmt == "csv":
+        headers["Content-Disposition"] = f'attachment; filename="{export_basename(manifest)}_transmittal.csv"'
+        return Response(content=transmittal_csv(manifest), media_type="text/csv; charset=utf-8", headers=headers)
+    return JSONResponse(content=manifest, headers=headers)
+
+
+@router.get("/{project_id}/issued-drawings/archive")
+async def download_issued_drawings(
+    project_id: str,
+    category: Optional[str] = Query(None),
+    revision: Optional[int] = Query(None, ge=0),
+    current_user: User = Depends(get_current_user)
+):
+    """ZIP of every issued drawing (optionally one category or revision), streamed as it is built"""
+    transmittal = await build_transmittal(await _export_project(project_id), category, revision)
+    manifest = transmittal["manifest"]
+    if not manifest["drawings"]:
+        raise HTTPException(status_code=404, detail="No issued drawings to export")
+
+    logger.info(
+        f"Exporting {manifest['drawing_count']} issued drawing(s) ({manifest['total_bytes']} bytes) "
+        f"for project {project_id} by {current_user.id}"
+    )
+    return StreamingResponse(
+        stream_zip(
+            transmittal["sources"],
+            [(TRANSMITTAL_CSV_NAME, transmittal_csv(manifest).encode("utf-8"))]
+        ),
+        media_type="application/zip",
+        headers={
+            "Content-Disposition": f'attachment; filename="{export_basename(manifest)}.zip"',
+            "Cache-Control": "private, no-store",
+            "X-Transmittal-Fingerprint": manifest["fingerprint"],
+        }
+    )
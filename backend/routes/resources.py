@@ -8,8 +8,11 @@ import logging
 from uuid import uuid4
 from datetime import datetime, timezone
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query
-from motor.motor_asyncio import AsyncIOMotorClient
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Request
+from utils.database import get_database
+from services.upload_service import save_upload
+from services.blob_store import blob_store
+from services.file_serving import serve_file
 
 from models_resources import (
     Resource, ResourceCreate, ResourceUpdate, ResourceResponse,
@@ -21,10 +24,7 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/resources", tags=["resources"])
 
 # Database connection
-mongo_url = os.environ.get('MONGO_URL')
-db_name = os.environ.get('DB_NAME', 'architecture_firm')
-client = AsyncIOMotorClient(mongo_url)
-db = client[db_name]
+db = get_database()
 
 # File upload directory
 UPLOAD_DIR = "/app/backend/uploads/resources"
@@ -246,10 +246,8 @@ async def upload_resource_file(
         unique_filename = f"{resource_id}_{uuid4().hex[:8]}.{file_ext}"
         file_path = os.path.join(UPLOAD_DIR, unique_filename)
         
-        # Save file
-        content = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(content)
+        # Stream to disk
+        stored = await save_upload(file, file_path)
         
         # Update resource with file info
         file_url = f"/api/resources/{resource_id}/download"
@@ -258,20 +256,26 @@ async def upload_resource_file(
             {"$set": {
                 "url": file_url,
                 "file_name": file.filename,
-                "file_size": len(content),
+                "file_size": stored.size,
+                "sha256": stored.sha256,
+                "file_path": str(stored.path),
                 "mime_type": content_type,
                 "type": file_type,
                 "updated_at": datetime.now(timezone.utc).isoformat()
             }}
         )
         
+        # Drop the file this upload replaced
+        if resource.get("file_path") and resource["file_path"] != str(stored.path):
+            await blob_store.release(resource["file_path"])
+        
         logger.info(f"File uploaded for resource {resource_id}: {file.filename}")
         
         return {
             "success": True,
             "message": "File uploaded successfully",
             "file_name": file.filename,
-            "file_size": len(content),
+            "file_size": stored.size,
             "url": file_url
         }
         
@@ -285,37 +289,30 @@ async def upload_resource_file(
 @router.get("/{resource_id}/public-view")
 async def public_view_resource(
     resource_id: str,
+    request: Request,
     token: str = Query(None, description="Optional view token for authentication")
 ):
     """
     Public endpoint for viewing resource files (for Office Online viewer)
     This endpoint allows unauthenticated access for document viewers
     """
-    from fastapi.responses import FileResponse
-    
     try:
         resource = await db.resources.find_one({"id": resource_id}, {"_id": 0})
         
         if not resource:
             raise HTTPException(status_code=404, detail="Resource not found")
         
-        # Find the file
-        file_pattern = f"{resource_id}_"
-        for filename in os.listdir(UPLOAD_DIR):
-            if filename.startswith(file_pattern):
-                file_path = os.path.join(UPLOAD_DIR, filename)
-                
-                return FileResponse(
-                    path=file_path,
-                    filename=resource.get("file_name", filename),
-                    media_type=resource.get("mime_type", "application/octet-stream"),
-                    headers={
-                        "Access-Control-Allow-Origin": "*",
-                        "Cache-Control": "public, max-age=3600"
-                    }
-                )
-        
-        raise HTTPException(status_code=404, detail="File not found")
+        if not resource.get("file_path"):
+            raise HTTPException(status_code=404, detail="File not found")
+        
+        return await serve_file(
+            request,
+            resource["file_path"],
+            filename=resource.get("file_name") or os.path.basename(resource["file_path"]),
+            media_type=resource.get("mime_type"),
+            sha256=resource.get("sha256"),
+            headers={"Access-Control-Allow-Origin": "*"}
+        )
         
     except HTTPException:
         raise
@@ -327,13 +324,12 @@ async def public_view_resource(
 @router.get("/{resource_id}/download")
 async def download_resource(
     resource_id: str,
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
     """
     Download a resource file
     """
-    from fastapi.responses import FileResponse
-    
     try:
         resource = await db.resources.find_one({"id": resource_id}, {"_id": 0})
         
@@ -345,29 +341,27 @@ async def download_resource(
         if "all" not in visible_to and current_user.role not in visible_to and not current_user.is_owner:
             raise HTTPException(status_code=403, detail="You don't have access to this resource")
         
-        # Find the file
-        file_pattern = f"{resource_id}_"
-        for filename in os.listdir(UPLOAD_DIR):
-            if filename.startswith(file_pattern):
-                file_path = os.path.join(UPLOAD_DIR, filename)
-                
-                # Increment download count
-                await db.resources.update_one(
-                    {"id": resource_id},
-                    {"$inc": {"download_count": 1}}
-                )
-                
-                return FileResponse(
-                    path=file_path,
-                    filename=resource.get("file_name", filename),
-                    media_type=resource.get("mime_type", "application/octet-stream"),
-                    headers={
-                        "Content-Disposition": f'attachment; filename="{resource.get("file_name", filename)}"',
-                        "Cache-Control": "no-cache"
-                    }
-                )
-        
-        raise HTTPException(status_code=404, detail="File not found")
+        if not resource.get("file_path"):
+            raise HTTPException(status_code=404, detail="File not found")
+        
+        response = await serve_file(
+            request,
+            resource["file_path"],
+            filename=resource.get("file_name") or os.path.basename(resource["file_path"]),
+            media_type=resource.get("mime_type"),
+            disposition="attachment",
+            sha256=resource.get("sha256"),
+            private=True
+        )
+        
+        # Count full downloads only (not revalidations or resumed ranges)
+        if response.status_code == 200:
+            await db.resources.update_one(
+                {"id": resource_id},
+                {"$inc": {"download_count": 1}}
+            )
+        
+        return response
         
     except HTTPException:
         raise
@@ -492,12 +486,8 @@ async def delete_resource(
             raise HTTPException(status_code=404, detail="Resource not found")
         
         # Delete file if exists
-        file_pattern = f"{resource_id}_"
-        for filename in os.listdir(UPLOAD_DIR):
-            if filename.startswith(file_pattern):
-                file_path = os.path.join(UPLOAD_DIR, filename)
-                os.remove(file_path)
-                break
+        if resource.get("file_path"):
+            await blob_store.release(resource["file_path"])
         
         # Delete from database
         await db.resources.delete_one({"id": resource_id})
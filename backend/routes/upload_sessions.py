@@ -0,0 +1,122 @@
+"""
+Resumable Upload Routes
+Chunked upload sessions for large drawing files and revision reference
+files, as a resumable alternative to /api/drawings/upload and
+/api/drawings/{id}/revision-files.
+
+    POST   /api/upload-sessions                   create a session
+    PUT    /api/upload-sessions/{id}              send a chunk (Content-Range)
+    GET    /api/upload-sessions/{id}              current offset
+    POST   /api/upload-sessions/{id}/finalize     complete the upload
+    DELETE /api/upload-sessions/{id}              abort
+"""
+
+import re
+import logging
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Header, Request
+from pydantic import BaseModel
+
+from utils.auth import get_current_user, User
+from services import upload_sessions
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/upload-sessions", tags=["Uploads"])
+
+CONTENT_RANGE_RE = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+
+class UploadSessionCreate(BaseModel):
+    target: str = upload_sessions.TARGET_DRAWING  # "drawing" or "revision_file"
+    drawing_id: str
+    filename: str
+    size: int
+    upload_type: Optional[str] = None
+    sha256: Optional[str] = None
+
+
+@router.post("")
+async def create_upload_session(
+    payload: UploadSessionCreate,
+    current_user: User = Depends(get_current_user)
+):
+    """Start a resumable upload"""
+    return await upload_sessions.create_session(
+        target=payload.target,
+        drawing_id=payload.drawing_id,
+        filename=payload.filename,
+        size=payload.size,
+        user_id=current_user.id,
+        upload_type=payload.upload_type,
+        sha256=payload.sha256
+    )
+
+
+@router.get("/{session_id}")
+async def get_upload_session(
+    session_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Get the current offset of an upload (where to resume from)"""
+    return await upload_sessions.get_session(session_id, current_user.id)
+
+
+@router.put("/{session_id}")
+async def upload_session_chunk(
+    session_id: str,
+    request: Request,
+    content_range: str = Header(...),
+    x_chunk_sha256: Optional[str] = Header(None),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Append a chunk. Requires ``Content-Range: bytes <start>-<end>/<total>``;
+    ``X-Chunk-SHA256`` is verified when present.
+    """
+    match = CONTENT_RANGE_RE.match(content_range.strip())
+    if not match:
+        raise HTTPException(status_code=400, detail="Content-Range must be 'bytes <start>-<end>/<total>'")
+    start, end, total = (int(value) for value in match.groups())
+    if end < start:
+        raise HTTPException(status_code=400, detail="Invalid Content-Range")
+
+    session = await upload_sessions.get_session(session_id, current_user.id)
+    if total != session["size"]:
+        raise HTTPException(status_code=400, detail="Content-Range total does not match the session size")
+
+    return await upload_sessions.append_chunk(
+        session_id,
+        current_user.id,
+        start=start,
+        chunk=request.stream(),
+        chunk_sha256=x_chunk_sha256,
+        declared_length=end - start + 1
+    )
+
+
+@router.post("/{session_id}/finalize")
+async def finalize_upload_session(
+    session_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Complete an upload. Returns the same payload as the one-shot endpoint
+    for the session's target.
+    """
+    file_info = await upload_sessions.finalize(session_id, current_user.id)
+    return {
+        "uploaded_files": [file_info],
+        "files": [file_info],
+        "message": "Successfully uploaded 1 file(s)"
+    }
+
+
+@router.delete("/{session_id}")
+async def abort_upload_session(
+    session_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    """Abort an upload and discard its partial data"""
+    await upload_sessions.abort_session(session_id, current_user.id)
+    return {"message": "Upload session aborted"}
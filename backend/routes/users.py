@@ -14,6 +14,7 @@ import uuid
 
 from utils.auth import get_current_user, require_admin, require_owner, User
 from utils.database import get_database
+from utils.principal_cache import invalidate_user
 
 db = get_database()
 router = APIRouter(tags=["Users"])
@@ -118,6 +119,7 @@ async def validate_user(user_id: str, current_user: User = Depends(require_admin
         {"id": user_id},
         {"$set": {"is_validated": True}}
     )
+    invalidate_user(user_id)
     
     return {"message": "User validated successfully"}
 
@@ -133,6 +135,7 @@ async def reject_user(user_id: str, current_user: User = Depends(require_admin))
         raise HTTPException(status_code=400, detail="User already validated")
     
     await db.users.delete_one({"id": user_id})
+    invalidate_user(user_id)
     
     return {"message": "User rejected and removed"}
 
@@ -152,6 +155,7 @@ async def toggle_admin_rights(user_id: str, current_user: User = Depends(require
         {"id": user_id},
         {"$set": {"is_admin": new_status}}
     )
+    invalidate_user(user_id)
     
     action = "granted" if new_status else "revoked"
     return {"message": f"Administrator rights {action} successfully", "is_admin": new_status}
@@ -171,6 +175,7 @@ async def generate_otp(request: OTPRequest, current_user: User = Depends(require
     
     otp_dict = otp.model_dump()
     otp_dict['created_at'] = otp_dict['created_at'].isoformat()
+    otp_dict['expire_at'] = otp_dict['expires_at']  # BSON date for the TTL index
     otp_dict['expires_at'] = otp_dict['expires_at'].isoformat()
     
     await db.otps.insert_one(otp_dict)
@@ -225,6 +230,7 @@ async def delete_user(user_id: str, current_user: User = Depends(require_owner))
     user_phone = user.get('mobile')
     
     await db.users.delete_one({"id": user_id})
+    invalidate_user(user_id)
     logger.info(f"Hard deleted user: {user.get('name')}")
     
     await db.user_sessions.delete_many({"user_id": user_id})
@@ -275,5 +281,6 @@ async def update_user(user_id: str, user_data: UpdateTeamMember, current_user: U
             "contribution": user_data.contribution
         }}
     )
+    invalidate_user(user_id)
     
     return {"message": "User updated successfully"}
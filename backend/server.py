@@ -1,10 +1,8 @@
-from fastapi import FastAPI, APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Body, Cookie
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Body, Cookie, Response, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.responses import FileResponse
-from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 import asyncio
@@ -19,6 +17,8 @@ import httpx
 from emergentintegrations.llm.chat import LlmChat, UserMessage, FileContentWithMimeType
 import random
 import string
+import json
+import base64
 
 # Import new project models
 from models_projects import (
@@ -35,6 +35,7 @@ from models_projects import (
 from models_coclients import CoClientCreate
 from drawing_templates import get_template_drawings
 from email_templates import get_welcome_email_content
+from migrations.fix_legacy_project_status import VALID_PROJECT_STATUSES
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -42,10 +43,24 @@ load_dotenv(ROOT_DIR / '.env')
 # Import notification_triggers AFTER loading .env so WhatsApp service can access credentials
 import notification_triggers
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+# MongoDB connection (shared pooled client, see utils/database.py)
+from utils.database import get_database, connect_database, close_database
+from utils.principal_cache import principal_cache, session_deadline, invalidate_user, invalidate_session
+from utils.loaders import RequestLoaderMiddleware, get_loaders
+from integrations.sendgrid_transport import sendgrid_transport
+from services.upload_service import save_upload
+from services.blob_store import BlobAwareStaticFiles
+from services.file_serving import serve_file
+from services.image_derivatives import schedule_derivatives, DERIVATIVES_DIR
+from services.drawing_previews import request_drawing_preview
+from services.upload_sessions import DRAWING_EXTENSIONS, REVISION_FILE_EXTENSIONS
+from cache_service import invalidate_project_stats, invalidate_project_cache
+from services.project_stats import record_drawing_created
+from services.drawing_state import transition_drawing
+from services.project_assignments import assigned_party_ids, assignment_update, touches_assignments
+from repositories import get_project_repository
+from drawing_approval_reminders import first_reminder_at
+db = get_database()
 
 # Security
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -435,13 +450,25 @@ async def get_current_user(
         if email is None:
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
         
+        cache_key = f"server:jwt:{email}"
+        cached_user = principal_cache.get(cache_key)
+        if cached_user is not None:
+            return cached_user
+        
         user_doc = await db.users.find_one({"email": email}, {"_id": 0})
         if not user_doc:
             raise HTTPException(status_code=401, detail="User not found")
         
-        return User(**user_doc)
+        user = User(**user_doc)
+        principal_cache.set(cache_key, user, user_id=user.id, email=user.email)
+        return user
     
     except JWTError:
+        cache_key = f"server:session:{token}"
+        cached_user = principal_cache.get(cache_key)
+        if cached_user is not None:
+            return cached_user
+        
         # Try Emergent session token
         session = await db.user_sessions.find_one({"session_token": token})
         if not session:
@@ -460,7 +487,12 @@ async def get_current_user(
         if not user_doc:
             raise HTTPException(status_code=401, detail="User not found")
         
-        return User(**user_doc)
+        user = User(**user_doc)
+        principal_cache.set(
+            cache_key, user, user_id=user.id, email=user.email,
+            expires_at=session_deadline(expires_at)
+        )
+        return user
 
 async def require_owner(current_user: User = Depends(get_current_user)):
     if not current_user.is_owner:
@@ -709,6 +741,7 @@ async def process_google_session(session_id: str):
         
         session_dict = session.model_dump()
         session_dict['created_at'] = session_dict['created_at'].isoformat()
+        session_dict['expire_at'] = session_dict['expires_at']  # BSON date for the TTL index
         session_dict['expires_at'] = session_dict['expires_at'].isoformat()
         
         await db.user_sessions.insert_one(session_dict)
@@ -743,6 +776,7 @@ async def get_me(current_user: User = Depends(get_current_user)):
 async def logout(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
     await db.user_sessions.delete_one({"session_token": token})
+    invalidate_session(token)
     return {"message": "Logged out successfully"}
 
 
@@ -764,6 +798,7 @@ async def public_register(registration_data: PublicRegistration):
             if existing_user.get('approval_status') == 'rejected':
                 # Delete the rejected user to allow fresh registration
                 await db.users.delete_one({"email": registration_data.email})
+                invalidate_user(email=registration_data.email)
             elif existing_user.get('approval_status') == 'approved':
                 raise HTTPException(status_code=400, detail="Email already registered. Please login instead.")
             elif existing_user.get('approval_status') == 'pending':
@@ -771,6 +806,7 @@ async def public_register(registration_data: PublicRegistration):
         
         # Also clean up any soft-deleted user records with the same email
         await db.users.delete_many({"email": registration_data.email, "deleted_at": {"$ne": None}})
+        invalidate_user(email=registration_data.email)
         
         # Check if there's a pending registration
         pending_reg = await db.pending_registrations.find_one({"email": registration_data.email}, {"_id": 0})
@@ -839,8 +875,6 @@ async def public_register(registration_data: PublicRegistration):
             </body>
         </html>
         """
-        
-        from sendgrid import SendGridAPIClient
         from sendgrid.helpers.mail import Mail
         
         message = Mail(
@@ -849,9 +883,7 @@ async def public_register(registration_data: PublicRegistration):
             subject='Verify Your Registration - 4th Dimension',
             html_content=html_content
         )
-        
-        sendgrid_client = SendGridAPIClient(os.getenv('SENDGRID_API_KEY'))
-        email_response = sendgrid_client.send(message)
+        email_response = await sendgrid_transport.send(message)
         email_sent = email_response.status_code in [200, 201, 202]
         
         # Send SMS OTP (will fail for unverified numbers in trial)
@@ -1122,8 +1154,6 @@ async def send_approval_request_email(owner_email: str, user_data: dict):
             </body>
         </html>
         """
-        
-        from sendgrid import SendGridAPIClient
         from sendgrid.helpers.mail import Mail
         
         message = Mail(
@@ -1132,9 +1162,7 @@ async def send_approval_request_email(owner_email: str, user_data: dict):
             subject=f'New Registration - {user_data["name"]} ({user_data["role"].replace("_", " ").title()})',
             html_content=html_content
         )
-        
-        sendgrid_client = SendGridAPIClient(os.getenv('SENDGRID_API_KEY'))
-        sendgrid_client.send(message)
+        await sendgrid_transport.send(message)
         
     except Exception as e:
         print(f"Failed to send approval email: {str(e)}")
@@ -1187,8 +1215,6 @@ async def send_registration_complete_email(user_data: dict):
             </body>
         </html>
         """
-        
-        from sendgrid import SendGridAPIClient
         from sendgrid.helpers.mail import Mail
         
         message = Mail(
@@ -1197,9 +1223,7 @@ async def send_registration_complete_email(user_data: dict):
             subject='Welcome to 4th Dimension Family!',
             html_content=html_content
         )
-        
-        sendgrid_client = SendGridAPIClient(os.getenv('SENDGRID_API_KEY'))
-        sendgrid_client.send(message)
+        await sendgrid_transport.send(message)
         
     except Exception as e:
         print(f"Failed to send welcome email: {str(e)}")
@@ -1362,6 +1386,7 @@ async def approve_reject_user(user_id: str, action: str):
                     "is_validated": True
                 }}
             )
+            invalidate_user(user_id)
             
             # Send approval notification to user
             await send_approval_notification(user, approved=True)
@@ -1383,6 +1408,7 @@ async def approve_reject_user(user_id: str, action: str):
                     "approval_status": "rejected"
                 }}
             )
+            invalidate_user(user_id)
             
             # Send rejection notification to user
             await send_approval_notification(user, approved=False)
@@ -1432,6 +1458,7 @@ async def approve_user_from_dashboard(
                 {"id": user_id},
                 {"$set": update_data}
             )
+            invalidate_user(user_id)
             
             # Update contractor/consultant record with the assigned type
             original_role = user.get('role', '')
@@ -1487,6 +1514,7 @@ async def approve_user_from_dashboard(
                     "approval_status": "rejected"
                 }}
             )
+            invalidate_user(user_id)
             
             # Send rejection notification to user
             try:
@@ -1594,8 +1622,6 @@ async def send_approval_notification(user: dict, approved: bool):
                 </body>
             </html>
             """
-        
-        from sendgrid import SendGridAPIClient
         from sendgrid.helpers.mail import Mail
         
         message = Mail(
@@ -1604,9 +1630,7 @@ async def send_approval_notification(user: dict, approved: bool):
             subject=subject,
             html_content=html_content
         )
-        
-        sendgrid_client = SendGridAPIClient(os.getenv('SENDGRID_API_KEY'))
-        sendgrid_client.send(message)
+        await sendgrid_transport.send(message)
         print(f"✅ {'Approval' if approved else 'Rejection'} notification sent to {user['email']}")
         
     except Exception as e:
@@ -1662,16 +1686,17 @@ async def forgot_password(request: ForgotPasswordRequest):
         
         # Store token with expiry (1 hour)
         from datetime import datetime, timezone, timedelta
+        reset_expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
         await db.password_resets.insert_one({
             "email": request.email,
             "token": reset_token,
             "created_at": datetime.now(timezone.utc).isoformat(),
-            "expires_at": (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat(),
+            "expires_at": reset_expires_at.isoformat(),
+            "expire_at": reset_expires_at,  # BSON date for the TTL index
             "used": False
         })
         
         # Send password reset email
-        from sendgrid import SendGridAPIClient
         from sendgrid.helpers.mail import Mail
         
         frontend_url = os.getenv('REACT_APP_BACKEND_URL')
@@ -1733,9 +1758,7 @@ async def forgot_password(request: ForgotPasswordRequest):
             subject='Reset Your 4th Dimension Password',
             html_content=html_content
         )
-        
-        sendgrid_client = SendGridAPIClient(os.getenv('SENDGRID_API_KEY'))
-        sendgrid_client.send(message)
+        await sendgrid_transport.send(message)
         
         print(f"✅ Password reset email sent to {request.email}")
         
@@ -1811,6 +1834,7 @@ async def reset_password(request: ResetPasswordRequest):
             {"email": reset_request['email']},
             {"$set": {"password_hash": new_password_hash}}
         )
+        invalidate_user(email=reset_request['email'])
         
         if result.modified_count == 0:
             raise HTTPException(status_code=404, detail="User not found")
@@ -1878,6 +1902,7 @@ async def verify_team_member_email(request: VerifyEmailRequest):
             {"id": verification['user_id']},
             {"$set": {"email_verified": True}}
         )
+        invalidate_user(verification['user_id'])
         
         return {
             "message": "Email verified successfully",
@@ -1933,11 +1958,13 @@ async def verify_team_member_phone(request: VerifyPhoneRequest):
                     "registration_completed": True
                 }}
             )
+            invalidate_user(request.user_id)
         else:
             await db.users.update_one(
                 {"id": request.user_id},
                 {"$set": {"mobile_verified": True}}
             )
+            invalidate_user(request.user_id)
         
         return {
             "message": "Phone verified successfully",
@@ -2037,6 +2064,7 @@ async def request_verification_otp(mobile: str, email: str, current_user: User =
     )
     mobile_dict = mobile_otp_doc.model_dump()
     mobile_dict['created_at'] = mobile_dict['created_at'].isoformat()
+    mobile_dict['expire_at'] = mobile_dict['expires_at']  # BSON date for the TTL index
     mobile_dict['expires_at'] = mobile_dict['expires_at'].isoformat()
     await db.otps.insert_one(mobile_dict)
     
@@ -2049,6 +2077,7 @@ async def request_verification_otp(mobile: str, email: str, current_user: User =
     )
     email_dict = email_otp_doc.model_dump()
     email_dict['created_at'] = email_dict['created_at'].isoformat()
+    email_dict['expire_at'] = email_dict['expires_at']  # BSON date for the TTL index
     email_dict['expires_at'] = email_dict['expires_at'].isoformat()
     await db.otps.insert_one(email_dict)
     
@@ -2095,6 +2124,7 @@ async def complete_profile(
             "is_validated": True  # Auto-validate user
         }}
     )
+    invalidate_user(current_user.id)
     
     return {
         "message": "Profile completed successfully! You can now access the system.",
@@ -2141,36 +2171,27 @@ async def get_clients(
     
     clients = await db.clients.find(query, {"_id": 0}).to_list(1000)
     
+    # Linked user accounts and project counts, one query each
+    users = await get_loaders().users.load_many(c['user_id'] for c in clients if c.get('user_id'))
+    project_counts = await get_project_repository().get_project_count_by_client([c["id"] for c in clients])
+    
     # Filter out clients whose user accounts are not approved
     approved_clients = []
     for client in clients:
         # Check if client has a user_id and if that user is approved
+        # (clients created manually without user account are legacy - always show)
         if client.get('user_id'):
-            user = await db.users.find_one(
-                {"id": client['user_id']}, 
-                {"_id": 0, "approval_status": 1}
-            )
-            # Only include if user is approved
-            if user and user.get('approval_status') == 'approved':
-                if isinstance(client.get('created_at'), str):
-                    client['created_at'] = datetime.fromisoformat(client['created_at'])
-                if isinstance(client.get('updated_at'), str):
-                    client['updated_at'] = datetime.fromisoformat(client['updated_at'])
-                
-                # Count projects for this client
-                project_count = await db.projects.count_documents({"client_id": client["id"], "deleted_at": None})
-                client['total_projects'] = project_count
-                approved_clients.append(client)
-        else:
-            # Client created manually without user account (legacy) - always show
-            if isinstance(client.get('created_at'), str):
-                client['created_at'] = datetime.fromisoformat(client['created_at'])
-            if isinstance(client.get('updated_at'), str):
-                client['updated_at'] = datetime.fromisoformat(client['updated_at'])
-            
-            project_count = await db.projects.count_documents({"client_id": client["id"], "deleted_at": None})
-            client['total_projects'] = project_count
-            approved_clients.append(client)
+            user = users.get(client['user_id'])
+            if not user or user.get('approval_status') != 'approved':
+                continue
+        
+        if isinstance(client.get('created_at'), str):
+            client['created_at'] = datetime.fromisoformat(client['created_at'])
+        if isinstance(client.get('updated_at'), str):
+            client['updated_at'] = datetime.fromisoformat(client['updated_at'])
+        
+        client['total_projects'] = project_counts.get(client["id"], 0)
+        approved_clients.append(client)
     
     return approved_clients
 
@@ -2292,11 +2313,13 @@ async def delete_client(client_id: str, current_user: User = Depends(require_own
     # Delete from users collection if exists (legacy clients stored as users)
     if user_client:
         await db.users.delete_one({"id": client_id})
+        invalidate_user(client_id)
         logger.info(f"Hard deleted legacy client from users: {user_client.get('name')}")
     
     # Also delete associated user account if stored separately
     if client_user_id:
         await db.users.delete_one({"id": client_user_id})
+        invalidate_user(client_user_id)
         logger.info(f"Hard deleted user account for client: {client.get('name')}")
     
     # Clean up related records to allow fresh re-registration
@@ -2472,6 +2495,7 @@ async def create_project(project_data: NewProjectCreate, current_user: User = De
         if project_dict.get(field):
             project_dict[field] = project_dict[field].isoformat() if isinstance(project_dict[field], datetime) else project_dict[field]
     
+    project_dict["assigned_party_ids"] = assigned_party_ids(project_dict)
     await db.projects.insert_one(project_dict)
     
     # Auto-create ONLY first 3 drawings from template lists for each project type
@@ -2522,6 +2546,7 @@ async def create_project(project_data: NewProjectCreate, current_user: User = De
                     drawing_dict[field] = drawing_dict[field].isoformat() if isinstance(drawing_dict[field], datetime) else drawing_dict[field]
             
             await db.project_drawings.insert_one(drawing_dict)
+            await record_drawing_created(drawing_dict)
             
             logger.info(f"Created drawing #{sequence_num}: {drawing_name} for project {project.id}")
     
@@ -2573,15 +2598,42 @@ async def create_project(project_data: NewProjectCreate, current_user: User = De
                     if drawing_dict.get(field):
                         drawing_dict[field] = drawing_dict[field].isoformat() if isinstance(drawing_dict[field], datetime) else drawing_dict[field]
                 await db.project_drawings.insert_one(drawing_dict)
+                await record_drawing_created(drawing_dict)
     
     return project
 
+def _encode_projects_cursor(project: dict) -> str:
+    """Opaque pagination cursor for the (created_at, id) sort key"""
+    created_at = project.get('created_at')
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    payload = json.dumps({"c": created_at, "i": project.get('id')})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def _decode_projects_cursor(cursor: str) -> dict:
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()).decode())
+        return {"created_at": payload["c"], "id": payload["i"]}
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
 @api_router.get("/projects")
 async def get_projects(
+    response: Response,
     include_archived: bool = False,
+    limit: Optional[int] = Query(None, ge=1, le=500),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
-    """Get projects based on user role with proper access control"""
+    """
+    Get projects based on user role with proper access control.
+    
+    Built from a fixed number of queries regardless of project count.
+    Pass ``limit`` to page through results; the cursor for the next page
+    is returned in the ``X-Next-Cursor`` header.
+    """
     query = {"deleted_at": None}
     if not include_archived:
         query["archived"] = {"$ne": True}
@@ -2617,36 +2669,11 @@ async def get_projects(
         if not contractor:
             contractor = await db.consultants.find_one({"email": current_user.email}, {"_id": 0, "id": 1})
         
-        if contractor:
-            contractor_id = contractor["id"]
-            # Need to find projects where this contractor is in assigned_contractors or assigned_consultants
-            all_projects = await db.projects.find(query, {"_id": 0}).to_list(1000)
-            filtered_projects = []
-            
-            for project in all_projects:
-                assigned_contractors = project.get('assigned_contractors', {})
-                assigned_consultants = project.get('assigned_consultants', {})
-                
-                # Check if contractor is assigned
-                is_assigned = False
-                if isinstance(assigned_contractors, dict) and contractor_id in assigned_contractors.values():
-                    is_assigned = True
-                elif isinstance(assigned_consultants, dict) and contractor_id in assigned_consultants.values():
-                    is_assigned = True
-                
-                if is_assigned:
-                    # Convert date fields
-                    for field in ['created_at', 'updated_at', 'start_date', 'end_date']:
-                        if isinstance(project.get(field), str) and project.get(field):
-                            try:
-                                project[field] = datetime.fromisoformat(project[field])
-                            except ValueError:
-                                pass
-                    filtered_projects.append(project)
-            
-            return filtered_projects
-        else:
+        if not contractor:
             return []
+        
+        # assigned_party_ids mirrors assigned_contractors / assigned_consultants (indexed)
+        query["assigned_party_ids"] = contractor["id"]
     else:
         # All other roles (team_member, senior_architect, junior_architect, 
         # senior_interior_designer, junior_interior_designer, landscape_designer,
@@ -2684,7 +2711,26 @@ async def get_projects(
             else:
                 query["team_leader_id"] = current_user.id
     
-    projects = await db.projects.find(query, {"_id": 0}).to_list(1000)
+    if limit:
+        if cursor:
+            after = _decode_projects_cursor(cursor)
+            query = {"$and": [query, {"$or": [
+                {"created_at": {"$lt": after["created_at"]}},
+                {"created_at": after["created_at"], "id": {"$lt": after["id"]}}
+            ]}]}
+        projects = await db.projects.find(query, {"_id": 0}).sort(
+            [("created_at", -1), ("id", -1)]
+        ).limit(limit).to_list(limit)
+        if len(projects) == limit:
+            response.headers["X-Next-Cursor"] = _encode_projects_cursor(projects[-1])
+    else:
+        projects = await db.projects.find(query, {"_id": 0}).to_list(1000)
+    
+    # Batch-load team leaders in one query
+    team_leaders = await get_loaders().users.load_many(
+        p['team_leader_id'] for p in projects if p.get('team_leader_id')
+    )
+    
     for project in projects:
         # Convert ISO strings to datetime for proper serialization
         for field in ['created_at', 'updated_at', 'start_date', 'end_date']:
@@ -2694,26 +2740,18 @@ async def get_projects(
                 except ValueError:
                     pass
         
-        # Auto-fix legacy status values
-        if project.get('status') not in ['Lead', 'Concept', 'Layout_Dev', 'Elevation_3D', 'Structural_Coord', 'Working_Drawings', 'Execution', 'OnHold', 'Closed']:
+        # Legacy status values are repaired by migration 0001; normalise any
+        # stragglers in the response only
+        if project.get('status') not in VALID_PROJECT_STATUSES:
             project['status'] = 'Lead'
-            # Update in database
-            await db.projects.update_one(
-                {"id": project['id']},
-                {"$set": {"status": "Lead"}}
-            )
         
         # Populate team leader info
-        if project.get('team_leader_id'):
-            team_leader = await db.users.find_one(
-                {"id": project['team_leader_id']},
-                {"_id": 0, "id": 1, "name": 1, "email": 1, "mobile": 1, "role": 1}
-            )
-            if team_leader:
-                project['team_leader_name'] = team_leader.get('name')
-                project['team_leader_email'] = team_leader.get('email')
-                project['team_leader_phone'] = team_leader.get('mobile')
-                project['team_leader_role'] = team_leader.get('role')
+        team_leader = team_leaders.get(project.get('team_leader_id'))
+        if team_leader:
+            project['team_leader_name'] = team_leader.get('name')
+            project['team_leader_email'] = team_leader.get('email')
+            project['team_leader_phone'] = team_leader.get('mobile')
+            project['team_leader_role'] = team_leader.get('role')
     
     return projects
 
@@ -2840,11 +2878,12 @@ async def update_project(
     
     result = await db.projects.update_one(
         {"id": project_id},
-        {"$set": update_dict}
+        assignment_update(update_dict) if touches_assignments(update_dict) else {"$set": update_dict}
     )
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Project not found")
+    await invalidate_project_cache(project_id)
     
     # Check if contractors or consultants were added and send notifications
     try:
@@ -2961,8 +3000,6 @@ async def request_project_deletion_otp(
             </body>
         </html>
         """
-        
-        from sendgrid import SendGridAPIClient
         from sendgrid.helpers.mail import Mail
         
         message = Mail(
@@ -2971,9 +3008,7 @@ async def request_project_deletion_otp(
             subject='🚨 Project Deletion - OTP Verification Required',
             html_content=html_content
         )
-        
-        sg = SendGridAPIClient(os.getenv('SENDGRID_API_KEY'))
-        sg.send(message)
+        await sendgrid_transport.send(message)
         
         return {"message": "OTP sent to your email", "expires_in": 600}
     
@@ -3025,6 +3060,7 @@ async def delete_project(
             {"id": project_id},
             {"$set": {"deleted_at": datetime.now(timezone.utc).isoformat()}}
         )
+        await invalidate_project_cache(project_id)
         
         return {"message": "Project deleted successfully"}
     
@@ -3306,11 +3342,8 @@ async def create_execution_update(
         file_extension = os.path.splitext(image.filename)[1]
         unique_filename = f"execution_{drawing_id}_{uuid.uuid4()}{file_extension}"
         file_path = f"/app/uploads/execution/{unique_filename}"
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
         
-        with open(file_path, "wb") as f:
-            content = await image.read()
-            f.write(content)
+        await save_upload(image, file_path, max_size=MAX_FILE_SIZE)
         
         image_url = f"/api/uploads/execution/{unique_filename}"
     
@@ -3368,26 +3401,13 @@ async def create_drawing(
             drawing_dict[field] = drawing_dict[field].isoformat() if isinstance(drawing_dict[field], datetime) else drawing_dict[field]
     
     await db.project_drawings.insert_one(drawing_dict)
+    await record_drawing_created(drawing_dict)
+    await invalidate_project_stats(project_id)
     
     # Return without _id
     return {k: v for k, v in drawing_dict.items() if k != '_id'}
 
 
-def compute_drawing_state(drawing: dict) -> str:
-    """Compute drawing state from its flags - Single Source of Truth"""
-    if drawing.get('is_not_applicable'):
-        return "not_applicable"
-    if drawing.get('is_issued') and not drawing.get('has_pending_revision'):
-        return "issued"
-    if drawing.get('has_pending_revision'):
-        return "revision_required"
-    if drawing.get('is_approved') and not drawing.get('is_issued'):
-        return "approved_ready_to_issue"
-    if drawing.get('under_review') or drawing.get('file_url'):
-        return "uploaded_waiting_approval"
-    return "pending_upload"
-
-
 @api_router.put("/drawings/{drawing_id}")
 async def update_drawing(
     drawing_id: str,
@@ -3406,6 +3426,7 @@ async def update_drawing(
     if update_dict.get('under_review') == True:
         update_dict['reviewed_date'] = datetime.now(timezone.utc).isoformat()
         update_dict['is_approved'] = False  # Reset approval when new file uploaded
+        update_dict['next_reminder_at'] = first_reminder_at()
     
     # If marking as approved
     if update_dict.get('is_approved') == True:
@@ -3555,19 +3576,19 @@ async def update_drawing(
                             new_drawing_dict[field] = new_drawing_dict[field].isoformat() if isinstance(new_drawing_dict[field], datetime) else new_drawing_dict[field]
                     
                     await db.project_drawings.insert_one(new_drawing_dict)
+                    await record_drawing_created(new_drawing_dict)
                     logger.info(f"Auto-created drawing #{fourth_sequence}: {drawing_name} as UPCOMING")
     
-    # Update the drawing
+    # Update the drawing; the transition recomputes its state from the flags
     update_dict['updated_at'] = datetime.now(timezone.utc).isoformat()
+    update_dict.pop('state', None)
     
-    # Compute and set the state based on flags
-    merged_drawing = {**drawing, **update_dict}
-    update_dict['state'] = compute_drawing_state(merged_drawing)
+    await transition_drawing({"id": drawing_id}, update_dict)
+    await invalidate_project_stats(drawing.get('project_id'))
     
-    await db.project_drawings.update_one(
-        {"id": drawing_id},
-        {"$set": update_dict}
-    )
+    # Render the PDF preview/tiles for the review page in the background
+    if update_dict.get('under_review') == True or update_dict.get('is_issued') == True:
+        await request_drawing_preview(drawing_id)
     
     # Fetch and return updated drawing
     updated_drawing = await db.project_drawings.find_one({"id": drawing_id}, {"_id": 0})
@@ -3654,20 +3675,13 @@ async def upload_drawing_file(
     
     for file in files:
         # Validate file type - expanded to support architectural files
-        allowed_extensions = ['.pdf', '.dwg', '.dxf', '.dwf', '.dgn']
+        allowed_extensions = DRAWING_EXTENSIONS
         file_extension = Path(file.filename).suffix.lower()
         
         if file_extension not in allowed_extensions:
             raise HTTPException(status_code=400, detail=f"File {file.filename}: Only PDF and CAD files (.dwg, .dxf, .dwf, .dgn) are allowed for drawings")
         
-        # Check file size (50MB limit)
-        content = await file.read()
-        if len(content) > MAX_FILE_SIZE:
-            raise HTTPException(status_code=413, detail=f"File {file.filename}: File size exceeds maximum")
-        
-        # Create uploads directory
         upload_dir = Path("uploads/drawings")
-        upload_dir.mkdir(parents=True, exist_ok=True)
         
         # Generate unique filename
         timestamp = datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')
@@ -3675,9 +3689,8 @@ async def upload_drawing_file(
         unique_filename = f"{drawing_id}_{upload_type}_{timestamp}_{len(uploaded_files)}{file_extension}"
         file_path = upload_dir / unique_filename
         
-        # Save file
-        with open(file_path, "wb") as buffer:
-            buffer.write(content)
+        # Stream to disk (size limit enforced while receiving)
+        stored = await save_upload(file, file_path, max_size=MAX_FILE_SIZE)
         
         # Return file URL
         file_url = f"/uploads/drawings/{unique_filename}"
@@ -3685,7 +3698,8 @@ async def upload_drawing_file(
             "url": file_url,
             "filename": file.filename,
             "original_name": file.filename,
-            "size": len(content)
+            "size": stored.size,
+            "sha256": stored.sha256
         })
     
     return {
@@ -3696,6 +3710,7 @@ async def upload_drawing_file(
 @api_router.get("/drawings/{drawing_id}/download")
 async def download_drawing_file(
     drawing_id: str,
+    request: Request,
     current_user: User = Depends(get_current_user)
 ):
     """Download drawing file with proper headers for iOS compatibility"""
@@ -3711,29 +3726,24 @@ async def download_drawing_file(
     # Extract filename from file_url (e.g., "/uploads/drawings/filename.pdf")
     file_url = drawing["file_url"]
     filename = file_url.split("/")[-1]
-    file_path = Path("uploads/drawings") / filename
     
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="File not found on server")
-    
-    from fastapi.responses import FileResponse
-    
-    # Create a clean filename for download
+    # Create a clean filename for download (keeping the stored file's type)
     drawing_name = drawing.get("name", "drawing").replace(" ", "_")
-    download_filename = f"{drawing_name}.pdf"
-    
-    # Return file with proper headers for iOS compatibility
-    # Using 'inline' for viewing in browser (iOS-friendly)
-    return FileResponse(
-        path=str(file_path),
-        media_type="application/pdf",
+    download_filename = f"{drawing_name}{Path(filename).suffix.lower() or '.pdf'}"
+    
+    # Using 'inline' for viewing in browser (iOS-friendly). The drawing's
+    # file_url changes on re-upload, so clients revalidate (304) rather
+    # than caching the URL as immutable.
+    return await serve_file(
+        request,
+        Path("uploads/drawings") / filename,
         filename=download_filename,
+        private=True,
         headers={
-            "Content-Disposition": f'inline; filename="{download_filename}"',
-            "Cache-Control": "public, max-age=3600",
             "Access-Control-Allow-Origin": "*",
-            "Access-Control-Expose-Headers": "Content-Disposition",
-        }
+            "Access-Control-Expose-Headers": "Content-Disposition, Content-Range, ETag",
+        },
+        not_found="File not found on server"
     )
 
 
@@ -3760,13 +3770,12 @@ async def upload_drawing_voice_note(
     
     # Save voice note
     upload_dir = Path("uploads/drawing_voice_notes")
-    upload_dir.mkdir(parents=True, exist_ok=True)
     
     file_path = upload_dir / unique_filename
     try:
-        content = await voice_note.read()
-        with open(file_path, "wb") as f:
-            f.write(content)
+        await save_upload(voice_note, file_path, max_size=MAX_FILE_SIZE)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save voice note: {str(e)}")
     
@@ -3796,7 +3805,7 @@ async def upload_drawing_revision_files(
         raise HTTPException(status_code=404, detail="Drawing not found")
     
     # Allowed file types
-    allowed_extensions = ['.pdf', '.jpg', '.jpeg', '.png', '.dwg', '.dxf', '.webp']
+    allowed_extensions = REVISION_FILE_EXTENSIONS
     
     upload_dir = Path("uploads/revision_files")
     upload_dir.mkdir(parents=True, exist_ok=True)
@@ -3812,9 +3821,7 @@ async def upload_drawing_revision_files(
         file_path = upload_dir / unique_filename
         
         try:
-            content = await file.read()
-            with open(file_path, "wb") as f:
-                f.write(content)
+            await save_upload(file, file_path, max_size=MAX_FILE_SIZE)
             
             file_url = f"/api/revision-files/{unique_filename}"
             uploaded_files.append({
@@ -3822,6 +3829,8 @@ async def upload_drawing_revision_files(
                 "url": file_url,
                 "uploaded_at": datetime.now(timezone.utc).isoformat()
             })
+        except HTTPException:
+            raise
         except Exception as e:
             logger.error(f"Failed to save revision file: {str(e)}")
     
@@ -3837,46 +3846,29 @@ async def upload_drawing_revision_files(
 
 
 @api_router.get("/drawing-voice-notes/{filename}")
-async def serve_drawing_voice_note(filename: str, current_user: User = Depends(get_current_user)):
-    """Serve drawing voice note files"""
-    from fastapi.responses import FileResponse
-    
-    file_path = Path("uploads/drawing_voice_notes") / filename
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="Voice note not found")
-    
-    return FileResponse(
-        path=str(file_path),
-        media_type="audio/webm",
-        filename=filename
+async def serve_drawing_voice_note(filename: str, request: Request, current_user: User = Depends(get_current_user)):
+    """Serve drawing voice note files (seekable via Range requests)"""
+    return await serve_file(
+        request,
+        Path("uploads/drawing_voice_notes") / filename,
+        filename=filename,
+        disposition="attachment",
+        immutable=True,
+        private=True,
+        not_found="Voice note not found"
     )
 
 
 @api_router.get("/revision-files/{filename}")
-async def serve_revision_file(filename: str, current_user: User = Depends(get_current_user)):
+async def serve_revision_file(filename: str, request: Request, current_user: User = Depends(get_current_user)):
     """Serve revision reference files"""
-    from fastapi.responses import FileResponse
-    
-    file_path = Path("uploads/revision_files") / filename
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="File not found")
-    
-    # Determine media type
-    ext = Path(filename).suffix.lower()
-    media_types = {
-        '.pdf': 'application/pdf',
-        '.jpg': 'image/jpeg',
-        '.jpeg': 'image/jpeg',
-        '.png': 'image/png',
-        '.webp': 'image/webp',
-        '.dwg': 'application/acad',
-        '.dxf': 'application/dxf'
-    }
-    
-    return FileResponse(
-        path=str(file_path),
-        media_type=media_types.get(ext, 'application/octet-stream'),
-        filename=filename
+    return await serve_file(
+        request,
+        Path("uploads/revision_files") / filename,
+        filename=filename,
+        disposition="attachment",
+        immutable=True,
+        private=True
     )
 
 
@@ -4651,16 +4643,6 @@ async def get_project_team(
         "team_leader": None
     }
     
-    # Get assigned contractors
-    assigned_contractors = project.get('assigned_contractors', {})
-    for contractor_type, contractor_id in assigned_contractors.items():
-        if contractor_id:
-            contractor = await db.contractors.find_one({"id": contractor_id, "deleted_at": None}, {"_id": 0})
-            if contractor:
-                contractor['assigned_type'] = contractor_type
-                team['contractors'].append(contractor)
-    
-    # Get assigned consultants from project fields
     consultant_fields = {
         'structural_consultant': 'Structural',
         'electrical_consultant': 'Electrical',
@@ -4668,25 +4650,47 @@ async def get_project_team(
         'landscape_consultant': 'Landscape',
         'automation_consultant': 'Automation'
     }
+    assigned_contractors = [
+        (contractor_type, contractor_id)
+        for contractor_type, contractor_id in project.get('assigned_contractors', {}).items()
+        if contractor_id
+    ]
+    assigned_consultants = [
+        (consultant_type, project.get(field))
+        for field, consultant_type in consultant_fields.items()
+        if project.get(field) and isinstance(project.get(field), dict)
+    ]
+    
+    # Resolve everyone in one batched query per collection
+    loaders = get_loaders()
+    contractors, consultants, team_leader = await asyncio.gather(
+        asyncio.gather(*(loaders.contractors.load(cid) for _, cid in assigned_contractors)),
+        asyncio.gather(*(loaders.consultants.load(info.get('id')) for _, info in assigned_consultants)),
+        loaders.users.load(project.get('team_leader_id'))
+    )
     
-    for field, consultant_type in consultant_fields.items():
-        consultant_info = project.get(field)
-        if consultant_info and isinstance(consultant_info, dict):
-            # Check if it has an ID (linked to consultant record)
-            if consultant_info.get('id'):
-                consultant = await db.consultants.find_one({"id": consultant_info['id'], "deleted_at": None}, {"_id": 0})
-                if consultant:
-                    consultant['assigned_type'] = consultant_type
-                    team['consultants'].append(consultant)
-            elif consultant_info.get('name'):
-                # Contact info style (not linked to consultant record)
-                team['consultants'].append({
-                    'name': consultant_info.get('name'),
-                    'phone': consultant_info.get('phone'),
-                    'email': consultant_info.get('email'),
-                    'assigned_type': consultant_type,
-                    'is_contact_only': True
-                })
+    # Get assigned contractors
+    for (contractor_type, _), contractor in zip(assigned_contractors, contractors):
+        if contractor and not contractor.get('deleted_at'):
+            contractor['assigned_type'] = contractor_type
+            team['contractors'].append(contractor)
+    
+    # Get assigned consultants from project fields
+    for (consultant_type, consultant_info), consultant in zip(assigned_consultants, consultants):
+        # Check if it has an ID (linked to consultant record)
+        if consultant_info.get('id'):
+            if consultant and not consultant.get('deleted_at'):
+                consultant['assigned_type'] = consultant_type
+                team['consultants'].append(consultant)
+        elif consultant_info.get('name'):
+            # Contact info style (not linked to consultant record)
+            team['consultants'].append({
+                'name': consultant_info.get('name'),
+                'phone': consultant_info.get('phone'),
+                'email': consultant_info.get('email'),
+                'assigned_type': consultant_type,
+                'is_contact_only': True
+            })
     
     # Get co-clients
     co_clients = await db.co_clients.find(
@@ -4694,14 +4698,7 @@ async def get_project_team(
         {"_id": 0}
     ).to_list(100)
     team['co_clients'] = co_clients
-    
-    # Get team leader
-    if project.get('team_leader_id'):
-        team_leader = await db.users.find_one(
-            {"id": project['team_leader_id']},
-            {"_id": 0, "password": 0}
-        )
-        team['team_leader'] = team_leader
+    team['team_leader'] = team_leader
     
     return team
 
@@ -4730,10 +4727,10 @@ async def assign_contractor_to_project(
     
     await db.projects.update_one(
         {"id": project_id},
-        {"$set": {
+        assignment_update({
             "assigned_contractors": assigned_contractors,
             "updated_at": datetime.now(timezone.utc).isoformat()
-        }}
+        })
     )
     
     # Send notification to contractor
@@ -4771,10 +4768,10 @@ async def unassign_contractor_from_project(
         
         await db.projects.update_one(
             {"id": project_id},
-            {"$set": {
+            assignment_update({
                 "assigned_contractors": assigned_contractors,
                 "updated_at": datetime.now(timezone.utc).isoformat()
-            }}
+            })
         )
     
     return {"message": f"{contractor_type} contractor unassigned from project"}
@@ -5057,77 +5054,10 @@ async def calculate_weekly_ratings(
     week_start: str,
     current_user: User = Depends(require_owner)
 ):
-    """Calculate ratings for all team members for a specific week (owner only, run on Saturday)"""
-    from datetime import timedelta
+    """Calculate ratings for all team members for a specific week (owner only; also run every Saturday by the job runner)"""
+    from services.weekly_ratings import calculate_weekly_ratings as calculate_ratings
     
-    week_start_date = datetime.fromisoformat(week_start)
-    week_end_date = week_start_date + timedelta(days=6)
-    
-    # Get all team members
-    team_members = await db.users.find({}, {"_id": 0}).to_list(1000)
-    
-    ratings_created = []
-    
-    for member in team_members:
-        # Get weekly targets for this member
-        targets = await db.weekly_targets.find({
-            "assigned_to_id": member['id'],
-            "week_start_date": week_start
-        }, {"_id": 0}).to_list(100)
-        
-        if not targets:
-            continue
-        
-        total_targets = sum(t.get('target_quantity', 0) for t in targets)
-        completed_targets = sum(t.get('completed_quantity', 0) for t in targets)
-        
-        if total_targets == 0:
-            continue
-        
-        completion_percentage = (completed_targets / total_targets) * 100
-        
-        # Rating scale: 0-5
-        # 100%+ = 5, 90-99% = 4.5, 80-89% = 4, 70-79% = 3.5, 60-69% = 3, 50-59% = 2.5, <50% = 1-2
-        if completion_percentage >= 100:
-            rating = 5.0
-        elif completion_percentage >= 90:
-            rating = 4.5
-        elif completion_percentage >= 80:
-            rating = 4.0
-        elif completion_percentage >= 70:
-            rating = 3.5
-        elif completion_percentage >= 60:
-            rating = 3.0
-        elif completion_percentage >= 50:
-            rating = 2.5
-        else:
-            rating = max(1.0, completion_percentage / 50 * 2)
-        
-        weekly_rating = WeeklyRating(
-            team_member_id=member['id'],
-            week_start_date=week_start_date,
-            week_end_date=week_end_date,
-            total_targets=total_targets,
-            completed_targets=completed_targets,
-            completion_percentage=completion_percentage,
-            rating=rating,
-            weekly_targets=[t['id'] for t in targets]
-        )
-        
-        rating_dict = weekly_rating.model_dump()
-        for field in ['week_start_date', 'week_end_date', 'created_at']:
-            if rating_dict.get(field):
-                rating_dict[field] = rating_dict[field].isoformat() if isinstance(rating_dict[field], datetime) else rating_dict[field]
-        
-        # Update weekly targets with ratings
-        for target in targets:
-            await db.weekly_targets.update_one(
-                {"id": target['id']},
-                {"$set": {"rating": rating}}
-            )
-        
-        await db.weekly_ratings.insert_one(rating_dict)
-        ratings_created.append({k: v for k, v in rating_dict.items() if k != '_id'})
+    ratings_created = await calculate_ratings(week_start)
     
     return {"message": f"Calculated ratings for {len(ratings_created)} team members", "ratings": ratings_created}
 
@@ -5163,10 +5093,12 @@ async def delete_drawing(
     current_user: User = Depends(get_current_user)
 ):
     """Soft delete a drawing"""
-    await db.project_drawings.update_one(
+    drawing = await transition_drawing(
         {"id": drawing_id},
-        {"$set": {"deleted_at": datetime.now(timezone.utc).isoformat()}}
+        {"deleted_at": datetime.now(timezone.utc).isoformat()}
     )
+    if drawing:
+        await invalidate_project_stats(drawing.get('project_id'))
     return {"message": "Drawing deleted successfully"}
 
 
@@ -5181,24 +5113,13 @@ async def upload_drawing(
         raise HTTPException(status_code=404, detail="Drawing not found")
     
     try:
-        # Validate file size
-        file.file.seek(0, 2)
-        file_size = file.file.tell()
-        file.file.seek(0)
-        
-        if file_size > MAX_FILE_SIZE:
-            raise HTTPException(status_code=413, detail="File size exceeds maximum allowed size")
-        
-        # Save to local storage
+        # Stream to local storage (size limit enforced while receiving)
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         project_dir = UPLOAD_DIR / "drawings" / drawing['project_id']
-        project_dir.mkdir(parents=True, exist_ok=True)
         
         file_path = project_dir / f"{drawing_id}_{timestamp}_{file.filename}"
         
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        await save_upload(file, file_path, max_size=MAX_FILE_SIZE)
         
         file_key = str(file_path.relative_to(UPLOAD_DIR))
         
@@ -5213,6 +5134,8 @@ async def upload_drawing(
             "file_key": file_key
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
@@ -5295,9 +5218,9 @@ async def mark_drawing_not_applicable(
             raise HTTPException(status_code=404, detail="Drawing not found")
         
         # Mark as N/A
-        await db.project_drawings.update_one(
+        await transition_drawing(
             {"id": drawing_id},
-            {"$set": {"is_not_applicable": True, "updated_at": datetime.now(timezone.utc)}}
+            {"is_not_applicable": True, "updated_at": datetime.now(timezone.utc)}
         )
         
         # Now create the next drawing to replace it (maintain 3 visible drawings)
@@ -5346,8 +5269,10 @@ async def mark_drawing_not_applicable(
                             new_drawing_dict[field] = new_drawing_dict[field].isoformat() if isinstance(new_drawing_dict[field], datetime) else new_drawing_dict[field]
                     
                     await db.project_drawings.insert_one(new_drawing_dict)
+                    await record_drawing_created(new_drawing_dict)
                     logger.info(f"Auto-created drawing #{next_sequence} to replace N/A drawing")
         
+        await invalidate_project_stats(drawing.get('project_id'))
         return {"message": "Drawing marked as not applicable"}
     except Exception as e:
         logger.error(f"Error marking drawing as N/A: {str(e)}")
@@ -5629,31 +5554,24 @@ async def upload_file(
     current_user: User = Depends(get_current_user)
 ):
     try:
-        file.file.seek(0, 2)
-        file_size = file.file.tell()
-        file.file.seek(0)
-        
-        if file_size > MAX_FILE_SIZE:
-            raise HTTPException(status_code=413, detail="File size exceeds maximum")
-        
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         category_dir = UPLOAD_DIR / "files" / category / (project_id or "general")
-        category_dir.mkdir(parents=True, exist_ok=True)
         
         file_path = category_dir / f"{timestamp}_{file.filename}"
         
-        with open(file_path, "wb") as f:
-            content = await file.read()
-            f.write(content)
+        stored = await save_upload(file, file_path, max_size=MAX_FILE_SIZE)
         
         file_key = str(file_path.relative_to(UPLOAD_DIR))
         
         return {
             "message": "File uploaded successfully",
             "file_key": file_key,
-            "size": file_size
+            "size": stored.size,
+            "sha256": stored.sha256
         }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -5693,6 +5611,8 @@ async def create_project_drawing(project_id: str, drawing_data: ProjectDrawingCr
     if drawing_dict.get('due_date'):
         drawing_dict['due_date'] = drawing_dict['due_date'].isoformat()
     await db.project_drawings.insert_one(drawing_dict)
+    await record_drawing_created(drawing_dict)
+    await invalidate_project_stats(project_id)
     return drawing
 
 @api_router.put("/drawings/{drawing_id}/status")
@@ -5742,8 +5662,10 @@ async def generate_drawings_from_preset(
             drawing_dict['due_date'] = drawing_dict['due_date'].isoformat()
             
             await db.project_drawings.insert_one(drawing_dict)
+            await record_drawing_created(drawing_dict)
             generated.append(drawing_dict)
     
+    await invalidate_project_stats(project_id)
     return {"message": f"Generated {len(generated)} drawings", "count": len(generated)}
 
 # Tasks
@@ -6612,10 +6534,6 @@ async def upload_3d_images(
     images_dir = UPLOAD_DIR / "3d_images" / project_id
     images_dir.mkdir(parents=True, exist_ok=True)
     
-    # Create thumbnails directory
-    thumbs_dir = UPLOAD_DIR / "thumbnails" / "3d_images" / project_id
-    thumbs_dir.mkdir(parents=True, exist_ok=True)
-    
     uploaded_images = []
     
     for file in files:
@@ -6631,20 +6549,8 @@ async def upload_3d_images(
         unique_filename = f"{uuid.uuid4()}{file_ext}"
         file_path = images_dir / unique_filename
         
-        # Save file
-        content = await file.read()
-        with open(file_path, "wb") as f:
-            f.write(content)
-        
-        # Generate thumbnail
-        thumbnail_url = None
-        try:
-            from services.image_service import generate_thumbnail
-            thumb_path = await generate_thumbnail(str(file_path), size="medium")
-            if thumb_path:
-                thumbnail_url = f"/api/uploads/thumbnails/3d_images/{project_id}/{Path(thumb_path).name}"
-        except Exception as e:
-            logger.warning(f"Failed to generate thumbnail: {e}")
+        # Stream to disk; thumbnails/variants are rendered in the background
+        stored = await save_upload(file, file_path, max_size=MAX_FILE_SIZE)
         
         # Create database record
         image_record = {
@@ -6655,8 +6561,11 @@ async def upload_3d_images(
             "original_filename": file.filename,
             "file_path": str(file_path),
             "file_url": f"/api/uploads/3d_images/{project_id}/{unique_filename}",
-            "thumbnail_url": thumbnail_url,
-            "file_size": len(content),
+            "thumbnail_url": None,
+            "variants": {},
+            "derivatives_status": "pending",
+            "file_size": stored.size,
+            "sha256": stored.sha256,
             "mime_type": file.content_type,
             "uploaded_by_id": current_user.id,
             "uploaded_by_name": current_user.name,
@@ -6668,6 +6577,7 @@ async def upload_3d_images(
         response_record = {k: v for k, v in image_record.items() if k != "file_path"}
         
         await db.project_3d_images.insert_one(image_record)
+        schedule_derivatives(image_record["id"])
         uploaded_images.append(response_record)
     
     # Send notification to client about new images
@@ -6741,13 +6651,25 @@ async def delete_3d_image(
 
 
 @api_router.get("/uploads/3d_images/{project_id}/{filename}")
-async def serve_3d_image(project_id: str, filename: str):
+async def serve_3d_image(project_id: str, filename: str, request: Request):
     """Serve 3D image files"""
-    file_path = UPLOAD_DIR / "3d_images" / project_id / filename
-    if not file_path.exists():
-        raise HTTPException(status_code=404, detail="Image not found")
-    
-    return FileResponse(file_path)
+    return await serve_file(
+        request,
+        UPLOAD_DIR / "3d_images" / project_id / filename,
+        immutable=True,
+        not_found="Image not found"
+    )
+
+
+@api_router.get("/uploads/thumbnails/3d_images/{project_id}/{filename}")
+async def serve_3d_image_variant(project_id: str, filename: str, request: Request):
+    """Serve resized 3D image variants (WebP/JPEG)"""
+    return await serve_file(
+        request,
+        DERIVATIVES_DIR / project_id / filename,
+        immutable=True,
+        not_found="Image not found"
+    )
 
 
 # Include modular routers
@@ -6763,6 +6685,8 @@ from routes import external_parties as external_parties_routes
 from routes import api_v2
 from routes import metrics as metrics_routes
 from routes import magic_link as magic_link_routes
+from routes import upload_sessions as upload_sessions_routes
+from routes import images as images_routes
 
 # Include the new modular routers under /api
 api_router.include_router(auth.router)
@@ -6777,6 +6701,8 @@ api_router.include_router(external_parties_routes.router)
 api_router.include_router(api_v2.router)  # v2 endpoints for mobile
 api_router.include_router(metrics_routes.router)  # Phase 5 monitoring metrics
 api_router.include_router(magic_link_routes.router)  # Magic link authentication
+api_router.include_router(upload_sessions_routes.router)  # Resumable drawing uploads
+api_router.include_router(images_routes.router)  # On-demand resized 3D images
 
 # Include drawing WhatsApp routes
 drawing_whatsapp.set_auth_dependency(get_current_user)
@@ -6811,7 +6737,10 @@ except Exception as e:
 from pathlib import Path
 uploads_path = Path(__file__).parent / "uploads"
 uploads_path.mkdir(parents=True, exist_ok=True)
-app.mount("/api/uploads", StaticFiles(directory=str(uploads_path)), name="uploads")
+app.mount("/api/uploads", BlobAwareStaticFiles(directory=str(uploads_path)), name="uploads")
+
+# Per-request batch loaders (utils/loaders.py)
+app.add_middleware(RequestLoaderMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -6828,19 +6757,43 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Background task reference
-_reminder_task = None
-
 @app.on_event("startup")
 async def startup_event():
     """Start background tasks on app startup"""
-    global _reminder_task
-    try:
-        from drawing_approval_reminders import reminder_scheduler
-        _reminder_task = asyncio.create_task(reminder_scheduler())
-        logger.info("Drawing approval reminder scheduler started")
-    except Exception as e:
-        logger.error(f"Failed to start reminder scheduler: {str(e)}")
+    # Open the shared MongoDB pool before anything else touches the database
+    await connect_database()
+    
+    # Apply the index manifest in the background (idempotent)
+    if os.environ.get("AUTO_CREATE_INDEXES", "true").lower() == "true":
+        from utils.indexes import ensure_indexes
+        asyncio.create_task(ensure_indexes())
+        logger.info("Index manifest scheduled")
+    
+    # Apply pending one-time data migrations in the background
+    if os.environ.get("AUTO_RUN_MIGRATIONS", "true").lower() == "true":
+        from migrations import run_pending_migrations
+        asyncio.create_task(run_pending_migrations())
+        logger.info("Pending migrations scheduled")
+    
+    # Broadcast cache invalidations to (and apply them from) the other workers
+    if os.environ.get("INVALIDATION_BUS_ENABLED", "true").lower() == "true":
+        try:
+            from utils.invalidation_bus import invalidation_bus
+            await invalidation_bus.start()
+        except Exception as e:
+            logger.error(f"Failed to start cache invalidation bus: {str(e)}")
+    
+    # Periodic maintenance (approval reminders, cleanups, weekly ratings).
+    # Every worker runs the job runner; cluster-wide jobs only run on the
+    # worker holding the leader lease.
+    if os.environ.get("JOB_RUNNER_ENABLED", "true").lower() == "true":
+        try:
+            from services.job_runner import job_runner
+            from services.scheduled_jobs import register_default_jobs
+            register_default_jobs(job_runner)
+            await job_runner.start()
+        except Exception as e:
+            logger.error(f"Failed to start job runner: {str(e)}")
     
     # Start async notification worker
     try:
@@ -6850,23 +6803,35 @@ async def startup_event():
     except Exception as e:
         logger.error(f"Failed to start async notification worker: {str(e)}")
     
-    # Start cache cleanup
+    # Pick up 3D images whose derivatives weren't finished before the last shutdown
     try:
-        from cache_service import cache
-        await cache.start_cleanup()
-        logger.info("Cache cleanup task started")
+        from services.image_derivatives import resume_pending_derivatives
+        asyncio.create_task(resume_pending_derivatives())
     except Exception as e:
-        logger.error(f"Failed to start cache cleanup: {str(e)}")
+        logger.error(f"Failed to resume image derivatives: {str(e)}")
+    
+    # Same for drawing PDF previews
+    try:
+        from services.drawing_previews import resume_pending_previews
+        asyncio.create_task(resume_pending_previews())
+    except Exception as e:
+        logger.error(f"Failed to resume drawing previews: {str(e)}")
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    global _reminder_task
-    if _reminder_task:
-        _reminder_task.cancel()
-        try:
-            await _reminder_task
-        except asyncio.CancelledError:
-            pass
+    # Stop periodic jobs (hands the leader lease to another worker)
+    try:
+        from services.job_runner import job_runner
+        await job_runner.stop()
+    except Exception:
+        pass
+    
+    # Flush queued cache invalidations to the other workers
+    try:
+        from utils.invalidation_bus import invalidation_bus
+        await invalidation_bus.stop()
+    except Exception:
+        pass
     
     # Stop async notification worker
     try:
@@ -6875,14 +6840,23 @@ async def shutdown_db_client():
     except Exception:
         pass
     
-    # Stop cache cleanup
+    # Stop image derivative and drawing preview workers (shared pool)
     try:
-        from cache_service import cache
-        await cache.stop_cleanup()
+        from services.drawing_previews import cancel_preview_tasks
+        from services.image_derivatives import shutdown_derivative_pool
+        await cancel_preview_tasks()
+        await shutdown_derivative_pool()
     except Exception:
         pass
-    
-    client.close()
+
+    # Close pooled outbound HTTP clients
+    try:
+        from integrations.http_clients import close_http_clients
+        await close_http_clients()
+    except Exception:
+        pass
+
+    close_database()
 
 # ==================== WHATSAPP NOTIFICATION ENDPOINTS ====================
 
@@ -6907,7 +6881,7 @@ async def test_whatsapp_notification(
             "If you received this, WhatsApp alerts are working correctly!"
         )
         
-        result = whatsapp_service.send_message(phone_number, message)
+        result = await whatsapp_service.send_message(phone_number, message)
         
         if result["success"]:
             return {
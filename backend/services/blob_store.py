@@ -0,0 +1,407 @@
+"""
+Content-Addressed Blob Store
+Deduplicating, SHA-256 keyed storage for uploaded files.
+
+Every upload is stored once under ``<BLOB_STORE_DIR>/ab/cd/<sha256>``,
+however many times the same bytes are uploaded. The path the upload
+handler asked for (e.g. ``uploads/drawings/<drawing>_<ts>.pdf``) is then
+materialized as a hard link to the blob, so existing readers, the
+``/api/uploads`` static mount and URLs already stored in documents keep
+working unchanged while identical files share one copy on disk.
+
+Two collections track the layout:
+    blobs       one document per distinct content: sha256, size and a
+                reference count (the number of paths linked to it)
+    blob_links  the lookup table: one document per logical path, with
+                the sha256 it points at and the public URLs it is known by
+
+When a hard link is not possible (blob store on another filesystem) a
+symlink is used instead, and URLs are resolved through ``blob_links``
+(see resolve_url() / locate() and BlobAwareStaticFiles).
+
+Blobs whose reference count drops to zero are removed by
+collect_garbage() after BLOB_GC_GRACE_HOURS. ingest() refreshes the
+blob's record before reusing it and removes the uploaded source only
+once the new link exists, so a concurrent collection can't leave a
+path pointing at a deleted blob.
+"""
+
+import os
+import uuid
+import errno
+import shutil
+import asyncio
+import logging
+import mimetypes
+from pathlib import Path
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, List, Optional, Union
+
+from pymongo import ReturnDocument
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from starlette.responses import FileResponse
+from starlette.staticfiles import StaticFiles
+
+from utils.database import get_database
+
+logger = logging.getLogger(__name__)
+
+db = get_database()
+
+BLOBS_COLLECTION = "blobs"
+LINKS_COLLECTION = "blob_links"
+
+BLOB_STORE_ENABLED = os.environ.get('BLOB_STORE_ENABLED', 'true').lower() == 'true'
+BLOB_STORE_DIR = Path(os.environ.get('BLOB_STORE_DIR', '/app/uploads/.blobs'))
+BLOB_GC_GRACE_HOURS = float(os.environ.get('BLOB_GC_GRACE_HOURS', '24'))
+
+# Upload roots and the URL prefixes their files are published under
+BACKEND_UPLOADS = Path(__file__).resolve().parent.parent / "uploads"
+APP_UPLOADS = Path("/app/uploads")
+LEGACY_URL_ROOTS = [
+    (BACKEND_UPLOADS, ("/api/uploads/", "/uploads/")),
+    (APP_UPLOADS, ("/api/uploads/",)),
+]
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _path_key(path: Union[str, Path]) -> str:
+    """Canonical lookup key for a logical path"""
+    return str(Path(path).resolve())
+
+
+def legacy_urls(path: Union[str, Path]) -> List[str]:
+    """Public URLs a file under one of the upload roots is reachable at"""
+    resolved = Path(path).resolve()
+    urls = []
+    for root, prefixes in LEGACY_URL_ROOTS:
+        try:
+            relative = resolved.relative_to(root.resolve())
+        except ValueError:
+            continue
+        if relative.parts and relative.parts[0].startswith("."):
+            continue
+        urls.extend(f"{prefix}{relative.as_posix()}" for prefix in prefixes)
+    return list(dict.fromkeys(urls))
+
+
+def _remove_quietly(path: Path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Could not remove {path}: {e}")
+
+
+def _same_file(a: Path, b: Path) -> bool:
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
+
+
+class BlobStore:
+    """SHA-256 keyed file store with reference-counted links"""
+
+    def __init__(self, root: Path, gc_grace_hours: float = 24):
+        self.root = root
+        self.gc_grace = timedelta(hours=gc_grace_hours)
+
+    @property
+    def blobs(self):
+        return db[BLOBS_COLLECTION]
+
+    @property
+    def links(self):
+        return db[LINKS_COLLECTION]
+
+    def blob_path(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256[2:4] / sha256
+
+    # ---------------------------------------------------------------- disk
+
+    def _place_blob(self, source: Path, sha256: str, keep_source: bool) -> Path:
+        """
+        Make ``source`` the blob for ``sha256`` unless that blob already
+        exists. With ``keep_source`` the source file stays where it is
+        (it is hard-linked, or copied, into the store).
+        """
+        blob = self.blob_path(sha256)
+        if blob.exists():
+            if not keep_source:
+                _remove_quietly(source)
+            return blob
+
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        staging = blob.parent / f".{sha256}.{uuid.uuid4().hex}.tmp"
+        try:
+            if keep_source:
+                try:
+                    os.link(source, staging)
+                except OSError:
+                    shutil.copy2(source, staging)
+            else:
+                try:
+                    os.replace(source, staging)
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+                    shutil.move(str(source), staging)
+            os.chmod(staging, 0o644)
+            os.replace(staging, blob)
+        except BaseException:
+            _remove_quietly(staging)
+            raise
+        return blob
+
+    @staticmethod
+    def _materialize(blob: Path, destination: Path):
+        """Atomically point ``destination`` at ``blob`` (hard link, else symlink)"""
+        if _same_file(blob, destination):
+            return
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        staging = destination.parent / f".{destination.name}.{uuid.uuid4().hex}.link"
+        try:
+            try:
+                os.link(blob, staging)
+            except FileNotFoundError:
+                # The blob is gone (collected); the caller places it again
+                raise
+            except OSError:
+                os.symlink(blob, staging)
+                if not staging.exists():
+                    raise FileNotFoundError(errno.ENOENT, "Blob disappeared", str(blob))
+            os.replace(staging, destination)
+        except BaseException:
+            _remove_quietly(staging)
+            raise
+
+    # ---------------------------------------------------------- references
+
+    async def _pin(self, sha256: str, size: int, content_type: Optional[str]) -> datetime:
+        """
+        Create or refresh a blob's record. A just-refreshed record doesn't
+        match collect_garbage's filter, so the blob is safe to link to
+        for the grace period.
+        """
+        now = _now()
+        await self.blobs.update_one(
+            {"sha256": sha256},
+            {"$setOnInsert": {"sha256": sha256, "size": size, "refcount": 0,
+                              "content_type": content_type, "created_at": now},
+             "$set": {"updated_at": now}},
+            upsert=True
+        )
+        return now
+
+    async def _link(self, destination: Path, sha256: str, size: int,
+                    content_type: Optional[str], urls: List[str]):
+        """Record ``destination -> sha256`` and adjust reference counts"""
+        now = await self._pin(sha256, size, content_type)
+        previous = await self.links.find_one_and_update(
+            {"path": _path_key(destination)},
+            {"$set": {"sha256": sha256, "size": size, "updated_at": now},
+             "$addToSet": {"urls": {"$each": urls}},
+             "$setOnInsert": {"created_at": now}},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
+        )
+        if previous and previous.get("sha256") == sha256:
+            return
+        await self.blobs.update_one({"sha256": sha256}, {"$inc": {"refcount": 1}})
+        if previous:
+            await self._unref(previous["sha256"])
+
+    async def _unref(self, sha256: str):
+        await self.blobs.update_one(
+            {"sha256": sha256},
+            {"$inc": {"refcount": -1}, "$set": {"updated_at": _now()}}
+        )
+
+    # ------------------------------------------------------------- public
+
+    async def ingest(self, source: Union[str, Path], destination: Union[str, Path],
+                     sha256: str, size: int, content_type: Optional[str] = None) -> Path:
+        """
+        Move a fully written file (``source``, already hashed) into the
+        store and make ``destination`` a link to it. If the content is
+        already stored, ``source`` is discarded.
+        """
+        source, destination = Path(source), Path(destination)
+        loop = asyncio.get_event_loop()
+        # Pin the blob before looking at the disk, so GC can't remove it under us
+        await self._pin(sha256, size, content_type)
+        blob = await loop.run_in_executor(None, self._place_blob, source, sha256, True)
+        try:
+            await loop.run_in_executor(None, self._materialize, blob, destination)
+        except FileNotFoundError:
+            # Collected between the check and the link: store it again from the source
+            blob = await loop.run_in_executor(None, self._place_blob, source, sha256, True)
+            await loop.run_in_executor(None, self._materialize, blob, destination)
+        # Only now is the source redundant
+        if source.resolve() != destination.resolve():
+            await loop.run_in_executor(None, _remove_quietly, source)
+        await self._link(destination, sha256, size, content_type, legacy_urls(destination))
+        return destination
+
+    async def adopt(self, path: Union[str, Path], sha256: str, size: int) -> int:
+        """
+        Bring an existing file under the store (deduplication tool).
+        Returns the bytes freed: the file's size if its content was
+        already stored under another path, else 0.
+        """
+        path = Path(path)
+        loop = asyncio.get_event_loop()
+        blob = self.blob_path(sha256)
+        freed = 0
+        if blob.exists():
+            if not await loop.run_in_executor(None, _same_file, blob, path):
+                await loop.run_in_executor(None, self._materialize, blob, path)
+                freed = size
+        else:
+            await loop.run_in_executor(None, self._place_blob, path, sha256, True)
+        await self._link(path, sha256, size, None, legacy_urls(path))
+        return freed
+
+    async def release(self, path: Union[str, Path]) -> bool:
+        """
+        Delete a logical file: remove its path and drop its reference.
+        Files that were never linked are simply removed.
+        """
+        path = Path(path)
+        link = await self.links.find_one_and_delete({"path": _path_key(path)})
+        await asyncio.get_event_loop().run_in_executor(None, _remove_quietly, path)
+        if link:
+            await self._unref(link["sha256"])
+        return link is not None
+
+    async def resolve_url(self, url: str) -> Optional[Path]:
+        """Find the file behind a stored upload URL via the lookup table"""
+        link = await self.links.find_one({"urls": url}, {"_id": 0, "path": 1, "sha256": 1})
+        return self._existing(link)
+
+    async def locate(self, path: Union[str, Path]) -> Optional[Path]:
+        """
+        The readable file for a logical path: the path itself if present,
+        otherwise its blob from the lookup table.
+        """
+        path = Path(path)
+        if path.is_file():
+            return path
+        link = await self.links.find_one({"path": _path_key(path)}, {"_id": 0, "path": 1, "sha256": 1})
+        return self._existing(link)
+
+    async def content_hash(self, path: Union[str, Path], resolved: Optional[Path] = None) -> Optional[str]:
+        """
+        SHA-256 of a logical path's content, from the lookup table. Only
+        returned while the file on disk (``resolved``, default ``path``)
+        is still the linked blob, so a file rewritten outside the store
+        never gets a stale hash.
+        """
+        link = await self.links.find_one({"path": _path_key(path)}, {"_id": 0, "sha256": 1})
+        if not link:
+            return None
+        blob = self.blob_path(link["sha256"])
+        on_disk = Path(resolved or path)
+        loop = asyncio.get_event_loop()
+        if await loop.run_in_executor(None, _same_file, on_disk, blob):
+            return link["sha256"]
+        return None
+
+    def _existing(self, link: Optional[Dict[str, Any]]) -> Optional[Path]:
+        if not link:
+            return None
+        for candidate in (Path(link["path"]), self.blob_path(link["sha256"])):
+            if candidate.is_file():
+                return candidate
+        return None
+
+    async def collect_garbage(self) -> int:
+        """Remove blobs that have had no references for the grace period"""
+        cutoff = _now() - self.gc_grace
+        removed = 0
+        while True:
+            blob = await self.blobs.find_one_and_delete(
+                {"refcount": {"$lte": 0}, "updated_at": {"$lt": cutoff}}
+            )
+            if not blob:
+                break
+            if await self._remove_blob_file(blob["sha256"]):
+                removed += 1
+        if removed:
+            logger.info(f"Blob store GC removed {removed} unreferenced blob(s)")
+        return removed
+
+    async def _remove_blob_file(self, sha256: str) -> bool:
+        """
+        Delete a collected blob's file, unless an ingest pinned it again
+        meanwhile: the file is moved aside first and put back if a record
+        reappeared, so an ingest either sees it re-pinned or finds it gone
+        and stores it again.
+        """
+        loop = asyncio.get_event_loop()
+        path = self.blob_path(sha256)
+        tombstone = path.parent / f".{sha256}.{uuid.uuid4().hex}.gc"
+        try:
+            await loop.run_in_executor(None, os.replace, path, tombstone)
+        except FileNotFoundError:
+            return False
+        if await self.blobs.find_one({"sha256": sha256}, {"_id": 1}):
+            await loop.run_in_executor(None, os.replace, tombstone, path)
+            return False
+        await loop.run_in_executor(None, _remove_quietly, tombstone)
+        return True
+
+    async def stats(self) -> Dict[str, Any]:
+        """Stored vs logical bytes"""
+        stored = {"blobs": 0, "bytes": 0}
+        async for row in self.blobs.aggregate([
+            {"$match": {"refcount": {"$gt": 0}}},
+            {"$group": {"_id": None, "blobs": {"$sum": 1}, "bytes": {"$sum": "$size"}}}
+        ]):
+            stored = {"blobs": row["blobs"], "bytes": row["bytes"]}
+        logical = {"files": 0, "bytes": 0}
+        async for row in self.links.aggregate([
+            {"$group": {"_id": None, "files": {"$sum": 1}, "bytes": {"$sum": "$size"}}}
+        ]):
+            logical = {"files": row["files"], "bytes": row["bytes"]}
+        unreferenced = await self.blobs.count_documents({"refcount": {"$lte": 0}})
+        return {
+            "enabled": BLOB_STORE_ENABLED,
+            "root": str(self.root),
+            "stored": stored,
+            "logical": logical,
+            "saved_bytes": max(logical["bytes"] - stored["bytes"], 0),
+            "unreferenced_blobs": unreferenced,
+        }
+
+
+# Singleton instance
+blob_store = BlobStore(BLOB_STORE_DIR, gc_grace_hours=BLOB_GC_GRACE_HOURS)
+
+
+class BlobAwareStaticFiles(StaticFiles):
+    """
+    StaticFiles mount that falls back to the blob lookup table for URLs
+    whose file is not (or no longer) a regular file under the mount.
+    """
+
+    def __init__(self, *args, url_prefix: str = "/api/uploads/", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.url_prefix = url_prefix
+
+    async def get_response(self, path: str, scope):
+        try:
+            return await super().get_response(path, scope)
+        except StarletteHTTPException as exc:
+            if exc.status_code != 404:
+                raise
+            url = f"{self.url_prefix}{path.lstrip('/')}"
+            resolved = await blob_store.resolve_url(url)
+            if not resolved:
+                raise
+            return FileResponse(resolved, media_type=mimetypes.guess_type(path)[0])
@@ -0,0 +1,267 @@
+"""
+Issued Drawing Export
+Streams a project's issued drawing set as a ZIP, with a transmittal.
+
+The archive is built on the fly while it is sent: zipfile writes into a
+non-seekable sink (so it emits data descriptors instead of seeking back
+to patch headers), and each file is copied in EXPORT_CHUNK_SIZE blocks
+that are yielded as soon as they are written. Memory use is constant in
+the number and size of drawings; nothing is buffered on disk.
+
+The transmittal (drawing list with revisions, issue dates, sizes and
+SHA-256 checksums) is the first entry of the archive and is also served
+on its own. Checksums are read from the blob store where possible and
+the transmittal is cached under a fingerprint of the issued set, so it
+is only rebuilt when a drawing is issued or re-issued (once, however
+many exports ask for it at the same time).
+"""
+
+import io
+import os
+import re
+import csv
+import asyncio
+import hashlib
+import logging
+import zipfile
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from utils.database import get_database
+from services.blob_store import blob_store
+from cache_service import load_cached_transmittal
+
+logger = logging.getLogger(__name__)
+
+db = get_database()
+
+DRAWINGS_DIR = Path("uploads/drawings")
+# Bytes copied from disk into the archive per step
+EXPORT_CHUNK_SIZE = int(os.environ.get('DRAWING_EXPORT_CHUNK_SIZE', 256 * 1024))
+TRANSMITTAL_CACHE_TTL = int(os.environ.get('DRAWING_TRANSMITTAL_CACHE_TTL', 3600))
+
+TRANSMITTAL_CSV_NAME = "TRANSMITTAL.csv"
+TRANSMITTAL_COLUMNS = [
+    ("sequence_number", "No."),
+    ("name", "Drawing"),
+    ("category", "Category"),
+    ("revision", "Revision"),
+    ("issued_date", "Issued"),
+    ("archive_path", "File"),
+    ("size", "Size (bytes)"),
+    ("sha256", "SHA-256"),
+]
+
+
+def _safe_name(value: str, fallback: str) -> str:
+    cleaned = re.sub(r"[^\w\-. ()&]+", "_", value or "").strip(" ._")
+    return cleaned[:120] or fallback
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _fingerprint(project_id: str, category: Optional[str], revision: Optional[int], drawings: List[dict]) -> str:
+    digest = hashlib.sha1(f"{project_id}|{category}|{revision}".encode())
+    for drawing in drawings:
+        digest.update(
+            f"|{drawing['id']}:{drawing.get('file_url')}:{drawing.get('revision_count')}:"
+            f"{drawing.get('issued_date')}:{drawing.get('name')}".encode()
+        )
+    return digest.hexdigest()
+
+
+async def _issued_drawings(project_id: str, category: Optional[str], revision: Optional[int]) -> List[dict]:
+    query: Dict[str, Any] = {
+        "project_id": project_id,
+        "deleted_at": None,
+        "is_issued": True,
+        "file_url": {"$nin": [None, ""]},
+    }
+    if category:
+        query["category"] = category
+    if revision is not None:
+        query["revision_count"] = revision
+
+    drawings = await db.project_drawings.find(
+        query,
+        {"_id": 0, "id": 1, "name": 1, "category": 1, "sequence_number": 1,
+         "revision_count": 1, "issued_date": 1, "file_url": 1}
+    ).to_list(None)
+    drawings.sort(key=lambda d: (d.get("category") or "", d.get("sequence_number") or 999999, d.get("name") or ""))
+    return drawings
+
+
+async def build_transmittal(
+    project: dict,
+    category: Optional[str] = None,
+    revision: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Transmittal for a project's issued drawings (optionally one category or
+    revision): ``{"manifest": {...}, "sources": [(archive_path, file path)]}``.
+    """
+    project_id = project["id"]
+    drawings = await _issued_drawings(project_id, category, revision)
+    fingerprint = _fingerprint(project_id, category, revision, drawings)
+
+    return await load_cached_transmittal(
+        project_id, fingerprint,
+        lambda: _build_transmittal(project, category, revision, drawings, fingerprint),
+        TRANSMITTAL_CACHE_TTL
+    )
+
+
+async def _build_transmittal(
+    project: dict,
+    category: Optional[str],
+    revision: Optional[int],
+    drawings: List[dict],
+    fingerprint: str
+) -> Dict[str, Any]:
+    project_id = project["id"]
+    loop = asyncio.get_event_loop()
+    entries = []
+    missing = []
+    sources: List[Tuple[str, str]] = []
+    used_names = set()
+    total_bytes = 0
+
+    for drawing in drawings:
+        file_name = drawing["file_url"].split("/")[-1]
+        stored_path = DRAWINGS_DIR / file_name
+        source = await blob_store.locate(stored_path)
+        if not source:
+            missing.append({"drawing_id": drawing["id"], "name": drawing.get("name"), "file_url": drawing["file_url"]})
+            continue
+
+        size = (await loop.run_in_executor(None, os.stat, source)).st_size
+        sha256 = await blob_store.content_hash(stored_path, source)
+        if not sha256:
+            sha256 = await loop.run_in_executor(None, _file_sha256, source)
+
+        revision_label = f"R{drawing.get('revision_count') or 0}"
+        sequence = drawing.get("sequence_number")
+        stem = _safe_name(drawing.get("name"), drawing["id"])
+        if sequence is not None:
+            stem = f"{sequence:03d} {stem}"
+        folder = _safe_name(drawing.get("category"), "Uncategorised")
+        suffix = Path(file_name).suffix.lower() or ".pdf"
+        archive_path = f"{folder}/{stem} {revision_label}{suffix}"
+        if archive_path in used_names:
+            archive_path = f"{folder}/{stem} {revision_label} ({drawing['id'][:8]}){suffix}"
+        used_names.add(archive_path)
+
+        entries.append({
+            "drawing_id": drawing["id"],
+            "sequence_number": sequence,
+            "name": drawing.get("name"),
+            "category": drawing.get("category"),
+            "revision": revision_label,
+            "issued_date": drawing.get("issued_date"),
+            "archive_path": archive_path,
+            "size": size,
+            "sha256": sha256,
+        })
+        sources.append((archive_path, str(source)))
+        total_bytes += size
+
+    manifest = {
+        "project_id": project_id,
+        "project_code": project.get("code"),
+        "project_title": project.get("title"),
+        "filters": {"category": category, "revision": revision},
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "fingerprint": fingerprint,
+        "drawing_count": len(entries),
+        "total_bytes": total_bytes,
+        "drawings": entries,
+        "missing": missing,
+    }
+    return {"manifest": manifest, "sources": sources}
+
+
+def export_basename(manifest: Dict[str, Any]) -> str:
+    """Download filename stem for an export, e.g. ``PRJ-12_issued_drawings_Architecture_R2``"""
+    parts = [_safe_name(manifest.get("project_code") or manifest.get("project_title"), manifest["project_id"]), "issued_drawings"]
+    filters = manifest["filters"]
+    if filters.get("category"):
+        parts.append(_safe_name(filters["category"], "category"))
+    if filters.get("revision") is not None:
+        parts.append(f"R{filters['revision']}")
+    return "_".join(parts).replace(" ", "_")
+
+
+def transmittal_csv(manifest: Dict[str, Any]) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([f"Transmittal: {manifest.get('project_code') or ''} {manifest.get('project_title') or ''}".strip()])
+    writer.writerow([f"Generated: {manifest['generated_at']}"])
+    writer.writerow([])
+    writer.writerow([label for _, label in TRANSMITTAL_COLUMNS])
+    for entry in manifest["drawings"]:
+        writer.writerow(["" if entry.get(key) is None else entry[key] for key, _ in TRANSMITTAL_COLUMNS])
+    for entry in manifest["missing"]:
+        writer.writerow(["", entry.get("name"), "", "", "", "MISSING FILE", "", ""])
+    return buffer.getvalue()
+
+
+class _StreamSink(io.RawIOBase):
+    """Write-only, non-seekable target for zipfile; output is collected until drained"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._offset = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def drain(self) -> Iterator[bytes]:
+        if self._chunks:
+            data = b"".join(self._chunks)
+            self._chunks.clear()
+            yield data
+
+
+def stream_zip(sources: List[Tuple[str, str]], extra_files: List[Tuple[str, bytes]] = ()) -> Iterator[bytes]:
+    """
+    Yield a ZIP of ``extra_files`` (name, bytes; deflated) followed by the
+    ``sources`` files (archive name, path; stored, as drawings are already
+    compressed). Blocking: iterate in a worker thread.
+    """
+    sink = _StreamSink()
+    with zipfile.ZipFile(sink, "w", allowZip64=True) as archive:
+        now = datetime.now().timetuple()[:6]
+        for arcname, data in extra_files:
+            archive.writestr(zipfile.ZipInfo(arcname, date_time=now), data, compress_type=zipfile.ZIP_DEFLATED)
+        yield from sink.drain()
+
+        for arcname, path in sources:
+            try:
+                source = open(path, "rb")
+            except OSError as e:
+                # Removed after the transmittal was built; headers are already sent, so skip it
+                logger.warning(f"Skipping {arcname} in drawing export: {e}")
+                continue
+            with source:
+                info = zipfile.ZipInfo.from_file(path, arcname)
+                with archive.open(info, "w") as entry:
+                    for block in iter(lambda: source.read(EXPORT_CHUNK_SIZE), b""):
+                        entry.write(block)
+                        yield from sink.drain()
+            yield from sink.drain()
+    yield from sink.drain()
@@ -0,0 +1,206 @@
+"""
+Drawing Preview Pipeline
+Background rasterization of drawing PDFs for the review page.
+
+When a drawing is put under review or issued, request_drawing_preview()
+marks it ``preview_status: "pending"`` and the work is done here, off the
+request path:
+
+    1. claim the drawing (lease on the project_drawings document, so with
+       several app workers each file is rendered once)
+    2. render the first page as a preview image plus a zoomable tile
+       pyramid (services.pdf_render) on the shared image worker pool
+    3. record the file's hash and the pyramid's geometry on the drawing
+
+Renders are cached by the PDF's SHA-256 under DRAWING_PREVIEW_DIR, so a
+file that was already rendered (another drawing, a re-issue) is not
+rendered again. Drawings left pending or with an expired lease are picked
+up again by resume_pending_previews() at startup.
+"""
+
+import os
+import asyncio
+import logging
+from pathlib import Path
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, Optional, Set
+
+from pymongo import ReturnDocument
+
+from utils.database import get_database
+from services.blob_store import blob_store
+from services.image_derivatives import (
+    run_image_job, STATUS_PENDING, STATUS_PROCESSING, STATUS_READY, STATUS_FAILED
+)
+from services.pdf_render import render_pdf_preview, load_manifest
+
+logger = logging.getLogger(__name__)
+
+db = get_database()
+
+DRAWINGS_DIR = Path("uploads/drawings")
+DRAWING_PREVIEW_DIR = Path(os.environ.get('DRAWING_PREVIEW_DIR', '/app/uploads/.cache/pdf'))
+# How long a claimed drawing may stay in processing before another worker retries it
+PREVIEW_LEASE_SECONDS = int(os.environ.get('DRAWING_PREVIEW_LEASE_SECONDS', '900'))
+
+_tasks: Set[asyncio.Task] = set()
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def drawing_file_path(file_url: Optional[str]) -> Optional[Path]:
+    """Stored path of a drawing's PDF (file_url is /uploads/drawings/<name>), or None"""
+    if not file_url:
+        return None
+    filename = file_url.split("/")[-1]
+    if Path(filename).suffix.lower() != ".pdf":
+        return None
+    return DRAWINGS_DIR / filename
+
+
+def preview_dir(sha256: str) -> Path:
+    return DRAWING_PREVIEW_DIR / sha256
+
+
+async def request_drawing_preview(drawing_id: str, force: bool = False) -> bool:
+    """
+    Queue a preview render for the drawing's current file. Returns False
+    when there is nothing to do (no PDF, or already rendered/queued);
+    ``force`` re-queues a ready drawing whose rendered files are gone.
+    """
+    drawing = await db.project_drawings.find_one(
+        {"id": drawing_id, "deleted_at": None},
+        {"_id": 0, "file_url": 1, "preview_file_url": 1, "preview_status": 1}
+    )
+    if not drawing or not drawing_file_path(drawing.get("file_url")):
+        return False
+
+    file_url = drawing["file_url"]
+    done = (STATUS_PENDING, STATUS_PROCESSING) if force else (STATUS_PENDING, STATUS_PROCESSING, STATUS_READY)
+    if drawing.get("preview_file_url") == file_url and drawing.get("preview_status") in done:
+        return False
+
+    await db.project_drawings.update_one(
+        {"id": drawing_id},
+        {"$set": {"preview_status": STATUS_PENDING, "preview_file_url": file_url},
+         "$unset": {"preview_error": "", "preview_lease_until": ""}}
+    )
+    schedule_drawing_preview(drawing_id)
+    return True
+
+
+async def _claim(drawing_id: str) -> Optional[Dict[str, Any]]:
+    now = _now()
+    return await db.project_drawings.find_one_and_update(
+        {
+            "id": drawing_id,
+            "deleted_at": None,
+            "$or": [
+                {"preview_status": STATUS_PENDING},
+                {"preview_status": STATUS_PROCESSING, "preview_lease_until": {"$lte": now}},
+            ],
+        },
+        {"$set": {
+            "preview_status": STATUS_PROCESSING,
+            "preview_lease_until": now + timedelta(seconds=PREVIEW_LEASE_SECONDS),
+        }},
+        projection={"_id": 0, "id": 1, "preview_file_url": 1},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def process_drawing_preview(drawing_id: str) -> Optional[Dict[str, Any]]:
+    """Render and record the preview and tiles for one drawing; returns the manifest"""
+    drawing = await _claim(drawing_id)
+    if not drawing:
+        return None
+
+    file_url = drawing.get("preview_file_url")
+    # Only record the result if the drawing still points at the file that was rendered
+    current = {"id": drawing_id, "preview_file_url": file_url}
+
+    try:
+        pdf_path = drawing_file_path(file_url)
+        source = await blob_store.locate(pdf_path) if pdf_path else None
+        if not source:
+            raise FileNotFoundError(f"Drawing file not found: {file_url}")
+
+        sha256 = await blob_store.content_hash(pdf_path, source)
+        manifest = await run_image_job(render_pdf_preview, str(source), str(DRAWING_PREVIEW_DIR), sha256)
+    except asyncio.CancelledError:
+        # Shutting down: hand the drawing back for the next start
+        await db.project_drawings.update_one(
+            current,
+            {"$set": {"preview_status": STATUS_PENDING}, "$unset": {"preview_lease_until": ""}}
+        )
+        raise
+    except Exception as e:
+        logger.error(f"Preview failed for drawing {drawing_id}: {e}")
+        await db.project_drawings.update_one(
+            current,
+            {"$set": {"preview_status": STATUS_FAILED, "preview_error": str(e)},
+             "$unset": {"preview_lease_until": ""}}
+        )
+        return None
+
+    await db.project_drawings.update_one(
+        current,
+        {"$set": {
+            "preview_status": STATUS_READY,
+            "preview_sha256": manifest["sha256"],
+            "preview_at": _now().isoformat(),
+            "preview_pages": manifest["pages"],
+        }, "$unset": {"preview_lease_until": "", "preview_error": ""}}
+    )
+    logger.info(f"Preview ready for drawing {drawing_id} ({manifest['sha256'][:12]})")
+    return manifest
+
+
+async def get_manifest(sha256: str) -> Optional[dict]:
+    return await asyncio.get_event_loop().run_in_executor(None, load_manifest, preview_dir(sha256))
+
+
+async def _run(drawing_id: str):
+    try:
+        await process_drawing_preview(drawing_id)
+    except Exception as e:
+        logger.error(f"Preview task for drawing {drawing_id} crashed: {e}")
+
+
+def schedule_drawing_preview(drawing_id: str) -> asyncio.Task:
+    """Queue preview rendering for a drawing already marked pending"""
+    task = asyncio.create_task(_run(drawing_id))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+
+async def resume_pending_previews() -> int:
+    """Schedule drawings left pending, or whose processing lease expired"""
+    count = 0
+    cursor = db.project_drawings.find(
+        {
+            "deleted_at": None,
+            "$or": [
+                {"preview_status": STATUS_PENDING},
+                {"preview_status": STATUS_PROCESSING, "preview_lease_until": {"$lte": _now()}},
+            ],
+        },
+        {"_id": 0, "id": 1}
+    )
+    async for drawing in cursor:
+        schedule_drawing_preview(drawing["id"])
+        count += 1
+    if count:
+        logger.info(f"Resumed preview rendering for {count} drawing(s)")
+    return count
+
+
+async def cancel_preview_tasks():
+    """Cancel in-flight renders (app shutdown); they are resumed next start"""
+    tasks = list(_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
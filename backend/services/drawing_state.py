@@ -0,0 +1,106 @@
+"""
+Drawing Lifecycle State
+The canonical ``state`` stored on every project_drawings document.
+
+A drawing's state follows from its flags (``is_not_applicable``,
+``has_pending_revision``, ``is_issued``, ``is_approved``,
+``under_review`` / ``file_url``), see ``drawing_state``; a flag counts
+as set by the same rule as the progress buckets (project_stats.flag_set). It is stored so
+that "which drawings are in state X" is an indexed query on
+``(state, project_id)`` or ``(state, due_date)`` instead of a scan of
+flag combinations.
+
+Writes that may change those flags go through ``transition_drawing``:
+a single pipeline update that sets the fields and recomputes ``state``
+from the resulting document (STATE_EXPRESSION, the same rules as
+``drawing_state``), so the stored state can't disagree with the flags
+even under concurrent writes. The transition is also recorded in the
+project's progress counters. New drawings start as ``pending_upload``
+(the ProjectDrawing default); migration 0005 backfills older documents.
+"""
+
+import logging
+from typing import Any, Dict, Optional
+
+from pymongo import ReturnDocument
+
+from utils.database import get_database
+from models_projects import DrawingState
+from services.project_stats import BUCKET_PROJECTION, flag_expression, flag_set, record_drawing_transition
+
+logger = logging.getLogger(__name__)
+
+db = get_database()
+
+# States waiting on the owner, for "pending approval" style queries
+AWAITING_APPROVAL_STATES = (DrawingState.UPLOADED_WAITING_APPROVAL.value,)
+
+
+# Flags the state depends on, besides file_url
+STATE_FLAGS = ("is_not_applicable", "has_pending_revision", "is_issued", "is_approved", "under_review")
+
+
+def drawing_state(drawing: Dict[str, Any]) -> str:
+    """State of a drawing from its flags - Single Source of Truth"""
+    if flag_set(drawing, "is_not_applicable"):
+        return DrawingState.NOT_APPLICABLE.value
+    if flag_set(drawing, "has_pending_revision"):
+        return DrawingState.REVISION_REQUIRED.value
+    if flag_set(drawing, "is_issued"):
+        return DrawingState.ISSUED.value
+    if flag_set(drawing, "is_approved"):
+        return DrawingState.APPROVED_READY_TO_ISSUE.value
+    if flag_set(drawing, "under_review") or drawing.get("file_url"):
+        return DrawingState.UPLOADED_WAITING_APPROVAL.value
+    return DrawingState.PENDING_UPLOAD.value
+
+
+# drawing_state as an aggregation expression, for pipeline updates and backfills
+STATE_EXPRESSION = {
+    "$switch": {
+        "branches": [
+            {"case": flag_expression("is_not_applicable"), "then": DrawingState.NOT_APPLICABLE.value},
+            {"case": flag_expression("has_pending_revision"), "then": DrawingState.REVISION_REQUIRED.value},
+            {"case": flag_expression("is_issued"), "then": DrawingState.ISSUED.value},
+            {"case": flag_expression("is_approved"), "then": DrawingState.APPROVED_READY_TO_ISSUE.value},
+            {"case": {"$or": [
+                flag_expression("under_review"),
+                {"$not": [{"$in": [{"$ifNull": ["$file_url", ""]}, ["", False]]}]},
+            ]}, "then": DrawingState.UPLOADED_WAITING_APPROVAL.value},
+        ],
+        "default": DrawingState.PENDING_UPLOAD.value,
+    }
+}
+
+_STATE_PROJECTION = {
+    **BUCKET_PROJECTION,
+    "state": 1, "has_pending_revision": 1, "under_review": 1, "file_url": 1,
+}
+
+
+async def transition_drawing(query: Dict[str, Any], fields: Dict[str, Any]) -> Optional[dict]:
+    """
+    Set ``fields`` on one drawing, recompute its state and record the
+    change in the project's counters. Returns the drawing's state and
+    progress fields from before the write, or None if nothing matched.
+    """
+    pipeline = [
+        {"$set": {key: {"$literal": value} for key, value in fields.items()}},
+        {"$set": {"state": STATE_EXPRESSION}},
+    ]
+    before = await db.project_drawings.find_one_and_update(
+        query,
+        pipeline,
+        projection=_STATE_PROJECTION,
+        return_document=ReturnDocument.BEFORE
+    )
+    if before is None:
+        return None
+
+    after = {**before, **fields}
+    new_state = drawing_state(after)
+    if before.get("state") != new_state:
+        logger.debug(f"Drawing {before.get('id')}: {before.get('state')} -> {new_state}")
+    await record_drawing_transition(before, after)
+    return before
+
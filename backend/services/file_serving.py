@@ -0,0 +1,271 @@
+"""
+File Serving
+Shared response builder for endpoints that return uploaded files.
+
+serve_file() adds what a plain FileResponse lacks:
+    - Range requests: single ``bytes=`` ranges are answered with
+      206 Partial Content (or 416 when unsatisfiable), so audio can seek
+      and interrupted PDF downloads can resume; If-Range is honoured
+    - Validators: a strong ETag from the content hash (blob store or a
+      stored ``sha256``), falling back to a weak size/mtime ETag, plus
+      Last-Modified
+    - Revalidation: If-None-Match / If-Modified-Since answered with 304
+    - Caching: ``immutable`` for URLs whose content never changes,
+      otherwise ``no-cache`` (clients keep the file and revalidate)
+    - MIME detection from the filename, then from the file's leading
+      bytes, instead of hardcoded media types
+"""
+
+import os
+import asyncio
+import logging
+import mimetypes
+from pathlib import Path
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Dict, Optional, Tuple, Union
+
+from fastapi import HTTPException, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+from services.blob_store import blob_store
+
+logger = logging.getLogger(__name__)
+
+# Bytes read from disk per step when streaming a range
+RANGE_CHUNK_SIZE = 64 * 1024
+
+# Max-age for immutable (never rewritten) URLs: one year
+IMMUTABLE_MAX_AGE = 31536000
+
+# Types mimetypes doesn't know (or gets wrong) for files we store
+EXTRA_MEDIA_TYPES = {
+    ".dwg": "application/acad",
+    ".dxf": "application/dxf",
+    ".dwf": "model/vnd.dwf",
+    ".dgn": "application/octet-stream",
+    ".webm": "audio/webm",
+    ".m4a": "audio/mp4",
+    ".ogg": "audio/ogg",
+    ".webp": "image/webp",
+}
+
+# Leading-byte signatures for files without a usable extension
+MAGIC_SIGNATURES = [
+    (b"%PDF-", "application/pdf"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"\x1a\x45\xdf\xa3", "audio/webm"),
+    (b"OggS", "audio/ogg"),
+    (b"ID3", "audio/mpeg"),
+    (b"AC10", "application/acad"),
+    (b"PK\x03\x04", "application/zip"),
+]
+
+
+def _sniff(path: Path) -> Optional[str]:
+    try:
+        with open(path, "rb") as f:
+            head = f.read(16)
+    except OSError:
+        return None
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+        return "audio/wav"
+    if head[4:8] == b"ftyp":
+        return "audio/mp4" if head[8:11] == b"M4A" else "video/mp4"
+    for signature, media_type in MAGIC_SIGNATURES:
+        if head.startswith(signature):
+            return media_type
+    return None
+
+
+def detect_media_type(path: Path, filename: Optional[str] = None) -> str:
+    """Media type from the (download) filename or path suffix, else the file's content"""
+    for name in (filename, path.name):
+        if not name:
+            continue
+        suffix = Path(name).suffix.lower()
+        if suffix in EXTRA_MEDIA_TYPES:
+            return EXTRA_MEDIA_TYPES[suffix]
+        guessed = mimetypes.guess_type(name)[0]
+        if guessed:
+            return guessed
+    return _sniff(path) or "application/octet-stream"
+
+
+def etag_matches(header: str, etag: str) -> bool:
+    """If-None-Match comparison (weak, as RFC 9110 requires for this header)"""
+    if header.strip() == "*":
+        return True
+    bare = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+def _not_modified(request: Request, etag: str, mtime: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _range_applies(request: Request, etag: str, last_modified: str) -> bool:
+    """If-Range: only honour Range while the client's copy is current (strong match)"""
+    if_range = request.headers.get("if-range")
+    if if_range is None:
+        return True
+    if_range = if_range.strip()
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return not etag.startswith("W/") and if_range == etag
+    return if_range == last_modified
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single ``bytes=`` range into inclusive (start, end).
+    Returns None for headers we ignore (multiple ranges, other units,
+    malformed) and raises ValueError when the range is unsatisfiable.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+    first, dash, last = spec.strip().partition("-")
+    first, last = first.strip(), last.strip()
+    if not dash or not (first or last) or not all(p == "" or p.isdigit() for p in (first, last)):
+        return None
+    if first == "":
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError("range not satisfiable")
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = int(last) if last else size - 1
+    if last and end < start:
+        return None
+    if start >= size:
+        raise ValueError("range not satisfiable")
+    return start, min(end, size - 1)
+
+
+async def _read_range(path: Path, start: int, end: int):
+    loop = asyncio.get_event_loop()
+    handle = await loop.run_in_executor(None, open, path, "rb")
+    try:
+        await loop.run_in_executor(None, handle.seek, start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await loop.run_in_executor(None, handle.read, min(RANGE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        await loop.run_in_executor(None, handle.close)
+
+
+async def serve_file(
+    request: Request,
+    path: Union[str, Path],
+    *,
+    filename: Optional[str] = None,
+    media_type: Optional[str] = None,
+    disposition: str = "inline",
+    sha256: Optional[str] = None,
+    etag: Optional[str] = None,
+    immutable: bool = False,
+    private: bool = False,
+    headers: Optional[Dict[str, str]] = None,
+    not_found: str = "File not found"
+) -> Response:
+    """
+    Serve an uploaded file with range, validator and caching support.
+
+    ``path`` is the logical upload path; files that only exist in the
+    blob store are resolved through its lookup table. ``sha256`` is the
+    content hash recorded on the owning document, used for the ETag when
+    the blob store doesn't know the file; ``etag`` overrides both with
+    an explicit strong validator (e.g. a cache key). Set ``immutable``
+    only for URLs whose file is never rewritten (unique, per-upload
+    filenames).
+    """
+    resolved = await blob_store.locate(path)
+    if not resolved:
+        raise HTTPException(status_code=404, detail=not_found)
+
+    loop = asyncio.get_event_loop()
+    try:
+        stat = await loop.run_in_executor(None, os.stat, resolved)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail=not_found)
+
+    digest = etag or await blob_store.content_hash(path, resolved) or sha256
+    if digest:
+        etag = f'"{digest}"'
+    else:
+        etag = f'W/"{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    last_modified = formatdate(stat.st_mtime, usegmt=True)
+
+    scope = "private" if private else "public"
+    if immutable:
+        cache_control = f"{scope}, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    else:
+        cache_control = f"{scope}, no-cache"
+
+    response_headers = {
+        "ETag": etag,
+        "Last-Modified": last_modified,
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+    if filename:
+        response_headers["Content-Disposition"] = f'{disposition}; filename="{filename}"'
+    response_headers.update(headers or {})
+
+    if _not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=304, headers=response_headers)
+
+    if media_type is None:
+        media_type = await loop.run_in_executor(None, detect_media_type, resolved, filename or Path(path).name)
+
+    range_header = request.headers.get("range")
+    if range_header and _range_applies(request, etag, last_modified):
+        try:
+            byte_range = parse_range(range_header, stat.st_size)
+        except ValueError:
+            response_headers["Content-Range"] = f"bytes */{stat.st_size}"
+            return Response(status_code=416, headers=response_headers)
+
+        if byte_range:
+            start, end = byte_range
+            response_headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+            response_headers["Content-Length"] = str(end - start + 1)
+            if request.method == "HEAD":
+                return Response(status_code=206, headers=response_headers, media_type=media_type)
+            return StreamingResponse(
+                _read_range(resolved, start, end),
+                status_code=206,
+                media_type=media_type,
+                headers=response_headers
+            )
+
+    return FileResponse(
+        path=str(resolved),
+        media_type=media_type,
+        headers=response_headers,
+        stat_result=stat
+    )
@@ -0,0 +1,193 @@
+"""
+Resized Image Cache
+Bounded on-disk LRU cache for images rendered on demand by /api/img.
+
+Entries are files under IMAGE_CACHE_DIR named by their cache key, which
+includes the source's content hash, so a changed original never serves a
+stale variant. The cache keeps an in-memory LRU index of its files (built
+from the directory on first use, oldest access first) and evicts the
+least recently used entries once IMAGE_CACHE_MAX_BYTES is exceeded.
+
+Concurrent requests for a variant that is not cached yet share one render:
+the first request starts it in its own task and every request awaits that
+task, so a client disconnecting doesn't abort the render for the others.
+"""
+
+import os
+import uuid
+import asyncio
+import logging
+from pathlib import Path
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+IMAGE_CACHE_DIR = Path(os.environ.get('IMAGE_CACHE_DIR', '/app/uploads/.cache/img'))
+IMAGE_CACHE_MAX_BYTES = int(os.environ.get('IMAGE_CACHE_MAX_BYTES', 2 * 1024 * 1024 * 1024))
+
+
+def _retrieve_exception(task: asyncio.Task):
+    # Every caller may have gone away; don't warn about an unretrieved exception
+    if not task.cancelled():
+        task.exception()
+
+
+class DiskLRUCache:
+    """Size-capped file cache with LRU eviction and in-flight coalescing"""
+
+    def __init__(self, root: Path, max_bytes: int):
+        self.root = root
+        self.max_bytes = max_bytes
+        self._index: "OrderedDict[str, int]" = OrderedDict()
+        self._bytes = 0
+        self._loaded = False
+        self._load_lock = asyncio.Lock()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.errors = 0
+
+    def path_for(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def _scan(self):
+        entries = []
+        if self.root.is_dir():
+            for dirpath, _, filenames in os.walk(self.root):
+                for name in filenames:
+                    if name.startswith("."):
+                        continue
+                    try:
+                        stat = os.stat(os.path.join(dirpath, name))
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, name, stat.st_size))
+        entries.sort()
+        return entries
+
+    async def _ensure_loaded(self):
+        if self._loaded:
+            return
+        async with self._load_lock:
+            if self._loaded:
+                return
+            entries = await asyncio.get_event_loop().run_in_executor(None, self._scan)
+            for _, key, size in entries:
+                self._index[key] = size
+                self._bytes += size
+            self._loaded = True
+            logger.info(f"Image cache loaded: {len(self._index)} entries, {self._bytes} bytes")
+
+    def _forget(self, key: str):
+        size = self._index.pop(key, None)
+        if size is not None:
+            self._bytes -= size
+
+    def _pop_victims(self) -> list:
+        """Remove least recently used entries from the index until under the cap"""
+        victims = []
+        while self._bytes > self.max_bytes and self._index:
+            key, size = self._index.popitem(last=False)
+            self._bytes -= size
+            victims.append(self.path_for(key))
+        self.evictions += len(victims)
+        return victims
+
+    @staticmethod
+    def _unlink_all(paths: list):
+        for path in paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not evict cached image {path}: {e}")
+
+    @staticmethod
+    def _utime(path: Path) -> bool:
+        try:
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    async def get_or_create(self, key: str, render: Callable[[Path], Awaitable[Any]]) -> Path:
+        """
+        Path of the cached entry for ``key``, rendering it with
+        ``render(temp_path)`` on a miss. ``render`` must write the file.
+        """
+        await self._ensure_loaded()
+        loop = asyncio.get_event_loop()
+
+        if key in self._index:
+            path = self.path_for(key)
+            # mtime records recency across restarts; a missing file was evicted by another worker
+            if await loop.run_in_executor(None, self._utime, path):
+                if key in self._index:
+                    self._index.move_to_end(key)
+                self.hits += 1
+                return path
+            self._forget(key)
+
+        inflight = self._inflight.get(key)
+        if inflight:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+
+        self.misses += 1
+        # The render runs in its own task so that cancelling the request that
+        # started it (a client disconnecting) doesn't cancel the waiters
+        task = asyncio.ensure_future(self._render(key, render))
+        task.add_done_callback(_retrieve_exception)
+        self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _render(self, key: str, render: Callable[[Path], Awaitable[Any]]) -> Path:
+        loop = asyncio.get_event_loop()
+        try:
+            path = self.path_for(key)
+            temp_path = path.parent / f".{key}.{uuid.uuid4().hex}.tmp"
+            await loop.run_in_executor(None, lambda: path.parent.mkdir(parents=True, exist_ok=True))
+            try:
+                await render(temp_path)
+                await loop.run_in_executor(None, os.replace, temp_path, path)
+            except BaseException:
+                await loop.run_in_executor(None, lambda: temp_path.unlink(missing_ok=True))
+                raise
+            size = (await loop.run_in_executor(None, os.stat, path)).st_size
+            self._forget(key)
+            self._index[key] = size
+            self._bytes += size
+            victims = self._pop_victims()
+            if victims:
+                await loop.run_in_executor(None, self._unlink_all, victims)
+            return path
+        except asyncio.CancelledError:
+            raise
+        except BaseException:
+            self.errors += 1
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._index),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "errors": self.errors,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "inflight": len(self._inflight),
+        }
+
+
+# Singleton instance
+image_cache = DiskLRUCache(IMAGE_CACHE_DIR, IMAGE_CACHE_MAX_BYTES)
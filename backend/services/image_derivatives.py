@@ -0,0 +1,253 @@
+"""
+3D Image Derivative Pipeline
+Background generation of resized variants for project 3D images.
+
+upload_3d_images persists the original and returns immediately with
+``derivatives_status: "pending"``; the work is then done here, off the
+request path:
+
+    1. claim the image (lease on the project_3d_images document, so with
+       several app workers each image is processed once)
+    2. render small/medium/large WebP + JPEG variants and a capped,
+       EXIF-free original in one decode pass, on a bounded
+       ProcessPoolExecutor (CPU-heavy resizes don't hold the GIL of the
+       serving process)
+    3. publish the capped original through the blob store under a new
+       filename (``file_path`` / ``file_url`` are updated, the upload is
+       released) and record the variant URLs on the document
+       (``variants``, ``thumbnail_url``). Upload URLs are served as
+       immutable, so the bytes behind one are never swapped.
+
+Images left pending or with an expired lease (e.g. after a restart) are
+picked up again by resume_pending_derivatives() at startup.
+"""
+
+import os
+import asyncio
+import logging
+import multiprocessing
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timezone, timedelta
+from typing import Any, Dict, Optional, Set
+
+from pymongo import ReturnDocument
+
+from utils.database import get_database
+from services.blob_store import blob_store
+from services.image_service import render_derivatives, THUMBNAIL_DIR, MAX_ORIGINAL_DIMENSION
+
+logger = logging.getLogger(__name__)
+
+db = get_database()
+
+STATUS_PENDING = "pending"
+STATUS_PROCESSING = "processing"
+STATUS_READY = "ready"
+STATUS_FAILED = "failed"
+
+# Worker processes for image derivatives (bounded: each holds a decoded image)
+DERIVATIVE_WORKERS = int(os.environ.get('IMAGE_DERIVATIVE_WORKERS', min(2, os.cpu_count() or 1)))
+# How long a claimed image may stay in processing before another worker retries it
+DERIVATIVE_LEASE_SECONDS = int(os.environ.get('IMAGE_DERIVATIVE_LEASE_SECONDS', '600'))
+
+DERIVATIVES_DIR = THUMBNAIL_DIR / "3d_images"
+DERIVATIVES_URL_PREFIX = "/api/uploads/thumbnails/3d_images"
+
+_pool: Optional[ProcessPoolExecutor] = None
+_tasks: Set[asyncio.Task] = set()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    if _pool is None:
+        # spawn: don't fork a process holding the event loop and DB pool threads
+        _pool = ProcessPoolExecutor(
+            max_workers=DERIVATIVE_WORKERS,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+        logger.info(f"Image derivative pool started ({DERIVATIVE_WORKERS} workers)")
+    return _pool
+
+
+async def run_image_job(fn, *args):
+    """Run a CPU-bound image function on the shared worker pool"""
+    global _pool
+    loop = asyncio.get_event_loop()
+    try:
+        return await loop.run_in_executor(_get_pool(), fn, *args)
+    except BrokenProcessPool:
+        # A worker died (e.g. OOM on a huge image); start a fresh pool next time
+        _pool = None
+        raise
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def _claim(image_id: str) -> Optional[Dict[str, Any]]:
+    now = _now()
+    return await db.project_3d_images.find_one_and_update(
+        {
+            "id": image_id,
+            "deleted_at": None,
+            "$or": [
+                {"derivatives_status": STATUS_PENDING},
+                {"derivatives_status": STATUS_PROCESSING, "derivatives_lease_until": {"$lte": now}},
+            ],
+        },
+        {"$set": {
+            "derivatives_status": STATUS_PROCESSING,
+            "derivatives_lease_until": now + timedelta(seconds=DERIVATIVE_LEASE_SECONDS),
+        }},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def _mark_failed(image_id: str, error: Exception):
+    logger.error(f"Derivatives failed for 3D image {image_id}: {error}")
+    await db.project_3d_images.update_one(
+        {"id": image_id},
+        {"$set": {"derivatives_status": STATUS_FAILED, "derivatives_error": str(error)},
+         "$unset": {"derivatives_lease_until": ""}}
+    )
+
+
+def _capped_path(original_path: Path, sha256: str) -> Path:
+    return original_path.with_name(f"{original_path.stem}-{sha256[:12]}{original_path.suffix}")
+
+
+def _variant_url(project_id: str, path: str) -> str:
+    return f"{DERIVATIVES_URL_PREFIX}/{project_id}/{Path(path).name}"
+
+
+async def process_3d_image(image_id: str) -> Optional[Dict[str, Any]]:
+    """Render and record derivatives for one 3D image; returns the variants"""
+    image = await _claim(image_id)
+    if not image:
+        return None
+
+    project_id = image["project_id"]
+    original_path = Path(image["file_path"])
+
+    try:
+        source = await blob_store.locate(original_path)
+        if not source:
+            raise FileNotFoundError(f"Original not found: {original_path}")
+
+        result = await run_image_job(
+            render_derivatives,
+            str(source),
+            str(DERIVATIVES_DIR / project_id),
+            original_path.stem,
+            None,
+            MAX_ORIGINAL_DIMENSION
+        )
+    except asyncio.CancelledError:
+        # Shutting down: hand the image back for the next start
+        await db.project_3d_images.update_one(
+            {"id": image_id},
+            {"$set": {"derivatives_status": STATUS_PENDING}, "$unset": {"derivatives_lease_until": ""}}
+        )
+        raise
+    except Exception as e:
+        await _mark_failed(image_id, e)
+        return None
+
+    update: Dict[str, Any] = {
+        "derivatives_status": STATUS_READY,
+        "derivatives_at": _now().isoformat(),
+        "width": result["width"],
+        "height": result["height"],
+    }
+
+    capped = result.get("original")
+    if capped:
+        # The capped, EXIF-free original is published under a new filename:
+        # the upload's URL is served as immutable, so its bytes never change
+        capped_path = _capped_path(original_path, capped["sha256"])
+        try:
+            await blob_store.ingest(capped["path"], capped_path, capped["sha256"], capped["size"], image.get("mime_type"))
+        except Exception as e:
+            # Don't leave render_derivatives' temp file behind
+            Path(capped["path"]).unlink(missing_ok=True)
+            await _mark_failed(image_id, e)
+            return None
+        update["file_path"] = str(capped_path)
+        update["file_url"] = f"/api/uploads/3d_images/{project_id}/{capped_path.name}"
+        update["sha256"] = capped["sha256"]
+        update["file_size"] = capped["size"]
+
+    variants = {
+        name: {
+            "webp": _variant_url(project_id, variant["webp"]),
+            "jpeg": _variant_url(project_id, variant["jpeg"]),
+            "width": variant["width"],
+            "height": variant["height"],
+        }
+        for name, variant in result["variants"].items()
+    }
+    update["variants"] = variants
+    if "medium" in variants:
+        update["thumbnail_url"] = variants["medium"]["jpeg"]
+
+    await db.project_3d_images.update_one(
+        {"id": image_id},
+        {"$set": update, "$unset": {"derivatives_lease_until": "", "derivatives_error": ""}}
+    )
+    if capped:
+        # Drop the full-resolution upload (and its EXIF) now nothing points at it
+        await blob_store.release(original_path)
+    logger.info(f"Derivatives ready for 3D image {image_id}")
+    return variants
+
+
+async def _run(image_id: str):
+    try:
+        await process_3d_image(image_id)
+    except Exception as e:
+        logger.error(f"Derivative task for 3D image {image_id} crashed: {e}")
+
+
+def schedule_derivatives(image_id: str) -> asyncio.Task:
+    """Queue derivative generation for a just-uploaded 3D image"""
+    task = asyncio.create_task(_run(image_id))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+    return task
+
+
+async def resume_pending_derivatives() -> int:
+    """Schedule images left pending, or whose processing lease expired"""
+    count = 0
+    cursor = db.project_3d_images.find(
+        {
+            "deleted_at": None,
+            "$or": [
+                {"derivatives_status": STATUS_PENDING},
+                {"derivatives_status": STATUS_PROCESSING, "derivatives_lease_until": {"$lte": _now()}},
+            ],
+        },
+        {"_id": 0, "id": 1}
+    )
+    async for image in cursor:
+        schedule_derivatives(image["id"])
+        count += 1
+    if count:
+        logger.info(f"Resumed derivative generation for {count} 3D image(s)")
+    return count
+
+
+async def shutdown_derivative_pool():
+    """Stop the worker processes (app shutdown); unfinished images are resumed next start"""
+    global _pool
+    tasks = list(_tasks)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
@@ -1,14 +1,20 @@
 """
 Image Processing Service
 Handles thumbnail generation and image optimization
+
+render_derivatives() is the CPU-bound part of the 3D image derivative
+pipeline (services.image_derivatives) and runs in a worker process, so
+it must stay free of database and event-loop dependencies.
 """
 
 import os
+import uuid
 import asyncio
+import hashlib
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Dict, Optional, Tuple
 import logging
-from PIL import Image
+from PIL import Image, ImageOps
 
 logger = logging.getLogger(__name__)
 
@@ -26,6 +32,16 @@ THUMBNAIL_SIZES = {
 # Max file size for processing (10MB)
 MAX_PROCESS_SIZE = 10 * 1024 * 1024
 
+# Longest edge kept for stored originals; larger uploads are downscaled
+MAX_ORIGINAL_DIMENSION = int(os.environ.get('IMAGE_MAX_ORIGINAL_DIMENSION', 4096))
+
+# Encoder settings for derivatives (WebP first, JPEG fallback)
+DERIVATIVE_WEBP_QUALITY = int(os.environ.get('IMAGE_DERIVATIVE_WEBP_QUALITY', 80))
+DERIVATIVE_JPEG_QUALITY = int(os.environ.get('IMAGE_DERIVATIVE_JPEG_QUALITY', 85))
+
+# Formats whose originals are re-encoded (capped, EXIF stripped); others are kept as uploaded
+REENCODE_FORMATS = {"JPEG": "jpeg", "PNG": "png", "WEBP": "webp"}
+
 
 async def generate_thumbnail(
     source_path: str,
@@ -114,6 +130,141 @@ def _create_thumbnail(
         raise
 
 
+def _flatten(img: Image.Image) -> Image.Image:
+    """RGB copy of an image, compositing transparency onto white (for JPEG)"""
+    if img.mode != "RGBA":
+        return img.convert("RGB")
+    background = Image.new("RGB", img.size, (255, 255, 255))
+    background.paste(img, mask=img.getchannel("A"))
+    return background
+
+
+def _save_atomic(img: Image.Image, path: Path, fmt: str, **params):
+    """Encode to a temp file and rename into place, so readers never see a partial image"""
+    temp_path = path.parent / f".{path.name}.{uuid.uuid4().hex}.tmp"
+    try:
+        img.save(temp_path, fmt, **params)
+        os.replace(temp_path, path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+
+
+def _sha256_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def render_derivatives(
+    source_path: str,
+    output_dir: str,
+    stem: str,
+    sizes: Dict[str, Tuple[int, int]] = None,
+    max_dimension: int = MAX_ORIGINAL_DIMENSION
+) -> dict:
+    """
+    Decode an image once and write every derivative from it (runs in a
+    worker process):
+
+    - a WebP and a JPEG per size in ``sizes`` (default THUMBNAIL_SIZES),
+      each downscaled from the next larger variant
+    - a re-encoded original, capped at ``max_dimension`` on its longest
+      edge, when the upload is larger or carries EXIF. It is written to a
+      temporary file next to the source; the caller moves it into place.
+
+    Derivatives never carry EXIF; orientation is applied to the pixels
+    first so rotated phone/camera images stay upright.
+    """
+    sizes = sizes or THUMBNAIL_SIZES
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+
+    with Image.open(source_path) as img:
+        source_format = img.format
+        has_exif = bool(img.info.get("exif")) or bool(img.getexif())
+        img.load()
+        image = ImageOps.exif_transpose(img)
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    result = {"width": image.width, "height": image.height, "original": None, "variants": {}}
+
+    if source_format in REENCODE_FORMATS and (max(image.size) > max_dimension or has_exif):
+        if max(image.size) > max_dimension:
+            image.thumbnail((max_dimension, max_dimension), Image.Resampling.LANCZOS)
+        capped_path = Path(source_path).parent / f".{Path(source_path).name}.{uuid.uuid4().hex}.capped"
+        save_format = REENCODE_FORMATS[source_format]
+        if save_format == "jpeg":
+            _flatten(image).save(capped_path, "JPEG", quality=90, optimize=True, progressive=True)
+        elif save_format == "webp":
+            image.save(capped_path, "WEBP", quality=90, method=4)
+        else:
+            image.save(capped_path, "PNG", optimize=True)
+        result["width"], result["height"] = image.size
+        result["original"] = {
+            "path": str(capped_path),
+            "size": capped_path.stat().st_size,
+            "sha256": _sha256_file(str(capped_path)),
+        }
+
+    current = image
+    for name, dimensions in sorted(sizes.items(), key=lambda item: item[1][0] * item[1][1], reverse=True):
+        current = current.copy()
+        current.thumbnail(dimensions, Image.Resampling.LANCZOS)
+        webp_path = out / f"{stem}_{name}.webp"
+        jpeg_path = out / f"{stem}_{name}.jpg"
+        _save_atomic(current, webp_path, "WEBP", quality=DERIVATIVE_WEBP_QUALITY, method=4)
+        _save_atomic(_flatten(current), jpeg_path, "JPEG",
+                     quality=DERIVATIVE_JPEG_QUALITY, optimize=True, progressive=True)
+        result["variants"][name] = {
+            "webp": str(webp_path),
+            "jpeg": str(jpeg_path),
+            "width": current.width,
+            "height": current.height,
+        }
+
+    return result
+
+
+def render_resized(
+    source_path: str,
+    dest_path: str,
+    width: Optional[int],
+    height: Optional[int],
+    fmt: str,
+    quality: int = DERIVATIVE_WEBP_QUALITY
+) -> Tuple[int, int]:
+    """
+    Write ``source_path`` scaled to fit within ``width`` x ``height``
+    (either may be None; never upscales) as ``fmt`` (webp/jpeg/png).
+    Runs in a worker process. Returns the output dimensions.
+    """
+    side = max(width or 0, height or 0)
+    with Image.open(source_path) as img:
+        if img.format == "JPEG" and side:
+            # Let libjpeg decode at a reduced scale (still >= the requested size)
+            img.draft("RGB", (side, side))
+        img.load()
+        image = ImageOps.exif_transpose(img)
+        has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    image.thumbnail((width or image.width, height or image.height), Image.Resampling.LANCZOS)
+
+    dest = Path(dest_path)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    if fmt == "webp":
+        _save_atomic(image, dest, "WEBP", quality=quality, method=4)
+    elif fmt == "png":
+        _save_atomic(image, dest, "PNG", optimize=True)
+    else:
+        _save_atomic(_flatten(image), dest, "JPEG", quality=DERIVATIVE_JPEG_QUALITY, optimize=True, progressive=True)
+    return image.size
+
+
 async def process_uploaded_image(
     file_path: str,
     generate_thumbnails: bool = True
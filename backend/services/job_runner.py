@@ -0,0 +1,448 @@
+"""
+Periodic Job Runner
+Cron-style scheduling for background maintenance, shared by all workers.
+
+Every app worker runs a JobRunner, but cluster-wide jobs run on one of
+them only:
+
+    - Leader election: workers compete for a lease document in
+      ``job_leases``; the holder renews it every LEADER_RENEW_SECONDS and
+      another worker takes over once it lapses (crash, shutdown)
+    - Overlap protection: each run of a cluster job is claimed on its
+      ``scheduled_jobs`` document (``running_until``), so a slow run is
+      never started again alongside itself, even across a leader change
+    - Jitter: each next run is pushed back by up to ``jitter_seconds`` so
+      jobs sharing a schedule don't all hit the database at once
+    - History: every run is recorded in ``job_runs`` (duration, status,
+      result or error; purged after JOB_HISTORY_DAYS) and the latest run
+      is summarised on the job's ``scheduled_jobs`` document
+
+Jobs with ``leader_only=False`` maintain per-process state (e.g. the
+in-memory cache) and run on every worker; their state is kept in memory.
+"""
+
+import os
+import socket
+import random
+import asyncio
+import logging
+from uuid import uuid4
+from datetime import datetime, timezone, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from utils.database import get_database
+
+logger = logging.getLogger(__name__)
+
+db = get_database()
+
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:6]}"
+LEADER_LEASE_SECONDS = int(os.environ.get('JOB_LEADER_LEASE_SECONDS', '30'))
+LEADER_RENEW_SECONDS = int(os.environ.get('JOB_LEADER_RENEW_SECONDS', '10'))
+# How often each worker checks for due jobs
+TICK_SECONDS = float(os.environ.get('JOB_RUNNER_TICK_SECONDS', '5'))
+JOB_HISTORY_DAYS = int(os.environ.get('JOB_HISTORY_DAYS', '30'))
+# Extra time a run's claim is held beyond its timeout before another worker may start it
+CLAIM_GRACE_SECONDS = 60
+
+LEADER_LEASE_ID = "job_runner_leader"
+
+STATUS_OK = "ok"
+STATUS_FAILED = "failed"
+STATUS_TIMEOUT = "timeout"
+STATUS_CANCELLED = "cancelled"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _parse_cron_field(field: str, low: int, high: int) -> Set[int]:
+    values: Set[int] = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = int(part)
+            end = high if step > 1 else start
+        if start < low or end > high or start > end or step < 1:
+            raise ValueError(f"Cron field '{field}' out of range {low}-{high}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """
+    Five-field cron expression in UTC: minute hour day-of-month month
+    day-of-week (0 or 7 = Sunday). Supports ``*``, lists, ranges and steps.
+    """
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Cron expression needs 5 fields: '{expression}'")
+        self.expression = expression
+        self.minutes = _parse_cron_field(fields[0], 0, 59)
+        self.hours = _parse_cron_field(fields[1], 0, 23)
+        self.days = _parse_cron_field(fields[2], 1, 31)
+        self.months = _parse_cron_field(fields[3], 1, 12)
+        # cron: Sunday is 0 (or 7); Python: Monday is 0
+        self.weekdays = {(day - 1) % 7 for day in _parse_cron_field(fields[4], 0, 7)}
+        self._any_day = fields[2] == "*"
+        self._any_weekday = fields[4] == "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_ok = moment.day in self.days
+        weekday_ok = moment.weekday() in self.weekdays
+        if self._any_day or self._any_weekday:
+            return day_ok and weekday_ok
+        # Both restricted: cron runs when either matches
+        return day_ok or weekday_ok
+
+    def next_after(self, after: datetime) -> datetime:
+        moment = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=366 * 5)
+        while moment < limit:
+            if moment.month not in self.months:
+                moment = (moment.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment
+        raise ValueError(f"Cron expression never matches: '{self.expression}'")
+
+    def describe(self) -> str:
+        return f"cron {self.expression}"
+
+
+class IntervalSchedule:
+    """Fixed interval between runs"""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+
+    def next_after(self, after: datetime) -> datetime:
+        return after + timedelta(seconds=self.seconds)
+
+    def describe(self) -> str:
+        return f"every {self.seconds:g}s"
+
+
+class Job:
+    """A periodic job declaration"""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable[[], Awaitable[Any]],
+        schedule,
+        jitter_seconds: float = 0,
+        timeout_seconds: float = 600,
+        leader_only: bool = True,
+        run_on_start: bool = False,
+        description: str = ""
+    ):
+        self.name = name
+        self.func = func
+        self.schedule = schedule
+        self.jitter_seconds = jitter_seconds
+        self.timeout_seconds = timeout_seconds
+        self.leader_only = leader_only
+        self.run_on_start = run_on_start
+        self.description = description
+
+    def next_run(self, after: datetime) -> datetime:
+        return self.schedule.next_after(after) + timedelta(seconds=random.uniform(0, self.jitter_seconds))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "description": self.description,
+            "schedule": self.schedule.describe(),
+            "jitter_seconds": self.jitter_seconds,
+            "timeout_seconds": self.timeout_seconds,
+            "leader_only": self.leader_only,
+        }
+
+
+def _summarise(result: Any) -> Any:
+    """Keep job results storable (small JSON-like values only)"""
+    if result is None or isinstance(result, (bool, int, float)):
+        return result
+    if isinstance(result, dict):
+        return {str(key): _summarise(value) for key, value in list(result.items())[:20]}
+    if isinstance(result, (list, tuple)):
+        return {"count": len(result)}
+    return str(result)[:500]
+
+
+class JobRunner:
+    """Runs registered jobs; cluster jobs only while this worker holds the leader lease"""
+
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+        self.is_leader = False
+        self._tasks: List[asyncio.Task] = []
+        self._running: Dict[str, asyncio.Task] = {}
+        # Schedule and last-run state of per-worker jobs
+        self._local: Dict[str, Dict[str, Any]] = {}
+
+    @property
+    def leases(self):
+        return db.job_leases
+
+    @property
+    def states(self):
+        return db.scheduled_jobs
+
+    @property
+    def runs(self):
+        return db.job_runs
+
+    def register(self, job: Job):
+        if job.name in self.jobs:
+            raise ValueError(f"Job '{job.name}' is already registered")
+        self.jobs[job.name] = job
+
+    # ----- lifecycle -----
+
+    async def start(self):
+        if self._tasks:
+            return
+        now = _now()
+        for job in self.jobs.values():
+            first_run = now if job.run_on_start else job.next_run(now)
+            if job.leader_only:
+                await self.states.update_one(
+                    {"_id": job.name},
+                    {"$set": {"schedule": job.schedule.describe()},
+                     "$setOnInsert": {"next_run_at": first_run, "run_count": 0, "failure_count": 0}},
+                    upsert=True
+                )
+            else:
+                self._local[job.name] = {"next_run_at": first_run, "run_count": 0, "failure_count": 0}
+        self._tasks = [asyncio.create_task(self._leader_loop()), asyncio.create_task(self._tick_loop())]
+        logger.info(f"Job runner started on {WORKER_ID} ({len(self.jobs)} jobs)")
+
+    async def stop(self):
+        tasks = self._tasks + list(self._running.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._tasks = []
+        if self.is_leader:
+            # Step down so another worker takes over without waiting for the lease to lapse
+            try:
+                await self.leases.update_one(
+                    {"_id": LEADER_LEASE_ID, "holder": WORKER_ID},
+                    {"$set": {"lease_until": _now()}}
+                )
+            except Exception:
+                pass
+            self.is_leader = False
+
+    # ----- leader election -----
+
+    async def _elect(self) -> bool:
+        now = _now()
+        try:
+            await self.leases.find_one_and_update(
+                {"_id": LEADER_LEASE_ID, "$or": [{"holder": WORKER_ID}, {"lease_until": {"$lte": now}}]},
+                {"$set": {
+                    "holder": WORKER_ID,
+                    "lease_until": now + timedelta(seconds=LEADER_LEASE_SECONDS),
+                    "renewed_at": now,
+                }},
+                upsert=True,
+                return_document=ReturnDocument.AFTER
+            )
+            return True
+        except DuplicateKeyError:
+            # Held by another worker (the upsert collided with its document)
+            return False
+
+    async def _leader_loop(self):
+        while True:
+            try:
+                leader = await self._elect()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job runner leader election failed: {e}")
+                leader = False
+            if leader != self.is_leader:
+                logger.info(f"Job runner {WORKER_ID} {'is now' if leader else 'is no longer'} the leader")
+                self.is_leader = leader
+            await asyncio.sleep(LEADER_RENEW_SECONDS)
+
+    # ----- scheduling -----
+
+    async def _claim(self, job: Job, now: datetime) -> bool:
+        """Claim a due run of a cluster job and schedule the next one"""
+        claimed = await self.states.find_one_and_update(
+            {
+                "_id": job.name,
+                "next_run_at": {"$lte": now},
+                "$or": [{"running_until": None}, {"running_until": {"$lte": now}}],
+            },
+            {"$set": {
+                "running_until": now + timedelta(seconds=job.timeout_seconds + CLAIM_GRACE_SECONDS),
+                "running_on": WORKER_ID,
+                "next_run_at": job.next_run(now),
+            }},
+            projection={"_id": 1}
+        )
+        return claimed is not None
+
+    async def _tick_loop(self):
+        while True:
+            try:
+                now = _now()
+                for job in self.jobs.values():
+                    if job.name in self._running:
+                        continue
+                    if job.leader_only:
+                        if not self.is_leader or not await self._claim(job, now):
+                            continue
+                    else:
+                        state = self._local[job.name]
+                        if state["next_run_at"] > now:
+                            continue
+                        state["next_run_at"] = job.next_run(now)
+                    task = asyncio.create_task(self._execute(job))
+                    self._running[job.name] = task
+                    task.add_done_callback(lambda _, name=job.name: self._running.pop(name, None))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Job runner tick failed: {e}")
+            await asyncio.sleep(TICK_SECONDS)
+
+    async def _execute(self, job: Job) -> Dict[str, Any]:
+        started = _now()
+        result = error = None
+        try:
+            result = await asyncio.wait_for(job.func(), timeout=job.timeout_seconds)
+            status = STATUS_OK
+        except asyncio.TimeoutError:
+            status, error = STATUS_TIMEOUT, f"Timed out after {job.timeout_seconds:g}s"
+        except asyncio.CancelledError:
+            status, error = STATUS_CANCELLED, "Worker shutting down"
+        except Exception as e:
+            status, error = STATUS_FAILED, str(e)
+        finished = _now()
+        duration_ms = round((finished - started).total_seconds() * 1000, 1)
+
+        if status == STATUS_OK:
+            logger.info(f"Job {job.name} finished in {duration_ms}ms")
+        else:
+            logger.error(f"Job {job.name} {status} after {duration_ms}ms: {error}")
+
+        summary = {
+            "last_started_at": started,
+            "last_finished_at": finished,
+            "last_duration_ms": duration_ms,
+            "last_status": status,
+            "last_result": _summarise(result),
+            "last_error": error,
+        }
+        failed = 0 if status == STATUS_OK else 1
+
+        if not job.leader_only:
+            state = self._local[job.name]
+            state.update(summary)
+            state["run_count"] += 1
+            state["failure_count"] += failed
+            return summary
+
+        try:
+            await self.states.update_one(
+                {"_id": job.name},
+                {"$set": summary, "$unset": {"running_until": "", "running_on": ""},
+                 "$inc": {"run_count": 1, "failure_count": failed}}
+            )
+            await self.runs.insert_one({
+                "job": job.name,
+                "worker": WORKER_ID,
+                "started_at": started,
+                "finished_at": finished,
+                "duration_ms": duration_ms,
+                "status": status,
+                "result": summary["last_result"],
+                "error": error,
+                "expire_at": started + timedelta(days=JOB_HISTORY_DAYS),
+            })
+        except Exception as e:
+            logger.error(f"Could not record run of job {job.name}: {e}")
+        if status == STATUS_CANCELLED:
+            raise asyncio.CancelledError()
+        return summary
+
+    # ----- ops -----
+
+    async def trigger(self, name: str) -> bool:
+        """Make a job due now (picked up on the next tick by the worker that runs it)"""
+        job = self.jobs.get(name)
+        if not job:
+            return False
+        if job.leader_only:
+            await self.states.update_one({"_id": name}, {"$set": {"next_run_at": _now()}})
+        else:
+            self._local[name]["next_run_at"] = _now()
+        return True
+
+    async def status(self, history: int = 20) -> Dict[str, Any]:
+        """Leader, schedule and recent run durations/results of every job"""
+        leader = await self.leases.find_one({"_id": LEADER_LEASE_ID}, {"_id": 0})
+        states = {doc["_id"]: doc async for doc in self.states.find({"_id": {"$in": list(self.jobs)}})}
+
+        jobs = []
+        for job in self.jobs.values():
+            info = job.to_dict()
+            if job.leader_only:
+                state = states.get(job.name, {})
+                recent = await self.runs.find(
+                    {"job": job.name}, {"_id": 0, "duration_ms": 1, "status": 1, "started_at": 1}
+                ).sort("started_at", -1).limit(history).to_list(history)
+                durations = [run["duration_ms"] for run in recent]
+                info["recent_runs"] = {
+                    "count": len(recent),
+                    "failures": sum(1 for run in recent if run["status"] != STATUS_OK),
+                    "avg_duration_ms": round(sum(durations) / len(durations), 1) if durations else None,
+                    "max_duration_ms": max(durations) if durations else None,
+                }
+            else:
+                state = self._local.get(job.name, {})
+            info.update({key: value for key, value in state.items() if key != "_id"})
+            info["running_here"] = job.name in self._running
+            jobs.append(info)
+
+        return {
+            "worker_id": WORKER_ID,
+            "is_leader": self.is_leader,
+            "leader": leader,
+            "jobs": jobs,
+        }
+
+    async def history(self, name: str, limit: int = 50) -> List[Dict[str, Any]]:
+        return await self.runs.find(
+            {"job": name}, {"_id": 0, "expire_at": 0}
+        ).sort("started_at", -1).limit(limit).to_list(limit)
+
+
+# Singleton instance
+job_runner = JobRunner()
@@ -82,6 +82,7 @@ async def generate_magic_token(
             "extra_params": extra_params or {},
             "issued_at": now.isoformat(),
             "expires_at": expires_at.isoformat(),
+            "expire_at": expires_at,  # BSON date for the TTL index
             "used": False,
             "used_at": None,
             "created_at": now.isoformat()
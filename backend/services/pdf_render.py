@@ -0,0 +1,170 @@
+"""
+PDF Rasterizer
+First-page preview and tile pyramid rendering for drawing PDFs.
+
+render_pdf_preview() is the CPU-bound part of the drawing preview pipeline
+(services.drawing_previews) and runs in a worker process, so it must stay
+free of database and event-loop dependencies.
+
+Output is keyed by the PDF's SHA-256, so re-issued or duplicated files
+are rendered once:
+
+    <cache_root>/<sha256>/manifest.json
+    <cache_root>/<sha256>/preview.webp, preview.jpg
+    <cache_root>/<sha256>/tiles/<level>/<x>_<y>.webp
+
+Level ``max_level`` is the full-resolution render; each level below it is
+half the size of the one above, down to level 0 which fits in one tile.
+"""
+
+import os
+import json
+import math
+import uuid
+import shutil
+import logging
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image
+
+from services.image_service import _sha256_file, _flatten, DERIVATIVE_WEBP_QUALITY, DERIVATIVE_JPEG_QUALITY
+
+logger = logging.getLogger(__name__)
+
+# Longest edge (pixels) of the full-resolution render the tiles are cut from
+PDF_TILE_MAX_DIMENSION = int(os.environ.get('PDF_TILE_MAX_DIMENSION', 8192))
+# Never render above this resolution, however small the page
+PDF_MAX_DPI = int(os.environ.get('PDF_MAX_DPI', 300))
+PDF_TILE_SIZE = int(os.environ.get('PDF_TILE_SIZE', 256))
+# Longest edge (pixels) of the first-page preview image
+PDF_PREVIEW_DIMENSION = int(os.environ.get('PDF_PREVIEW_DIMENSION', 1600))
+
+MANIFEST_NAME = "manifest.json"
+
+
+def load_manifest(output_dir: Path) -> Optional[dict]:
+    try:
+        with open(output_dir / MANIFEST_NAME) as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _render_first_page(pdf_path: str, max_dimension: int):
+    import pypdfium2 as pdfium
+
+    pdf = pdfium.PdfDocument(pdf_path)
+    try:
+        page_count = len(pdf)
+        if not page_count:
+            raise ValueError("PDF has no pages")
+        page = pdf[0]
+        try:
+            width_pt, height_pt = page.get_size()
+            scale = min(max_dimension / max(width_pt, height_pt), PDF_MAX_DPI / 72)
+            bitmap = page.render(scale=scale, may_draw_forms=True)
+            image = bitmap.to_pil()
+        finally:
+            page.close()
+    finally:
+        pdf.close()
+    return image, page_count, (round(width_pt, 2), round(height_pt, 2))
+
+
+def _write_tiles(image: Image.Image, tiles_dir: Path, tile_size: int) -> list:
+    """Cut the pyramid from full size down; returns level descriptors, level 0 first"""
+    max_level = max(0, math.ceil(math.log2(max(image.width, image.height) / tile_size)))
+    levels = []
+    current = image
+    for level in range(max_level, -1, -1):
+        columns = math.ceil(current.width / tile_size)
+        rows = math.ceil(current.height / tile_size)
+        level_dir = tiles_dir / str(level)
+        level_dir.mkdir(parents=True)
+        for x in range(columns):
+            for y in range(rows):
+                box = (
+                    x * tile_size,
+                    y * tile_size,
+                    min((x + 1) * tile_size, current.width),
+                    min((y + 1) * tile_size, current.height),
+                )
+                current.crop(box).save(level_dir / f"{x}_{y}.webp", "WEBP", quality=DERIVATIVE_WEBP_QUALITY, method=4)
+        levels.append({
+            "level": level,
+            "width": current.width,
+            "height": current.height,
+            "columns": columns,
+            "rows": rows,
+        })
+        if level:
+            current = current.reduce(2)
+    levels.reverse()
+    return levels
+
+
+def render_pdf_preview(
+    pdf_path: str,
+    cache_root: str,
+    sha256: Optional[str] = None,
+    max_dimension: int = PDF_TILE_MAX_DIMENSION,
+    tile_size: int = PDF_TILE_SIZE,
+    preview_dimension: int = PDF_PREVIEW_DIMENSION
+) -> dict:
+    """
+    Render the first page of ``pdf_path`` as a preview image and tile
+    pyramid under ``cache_root/<sha256>`` (skipped when already rendered).
+    Runs in a worker process. Returns the manifest.
+    """
+    sha256 = sha256 or _sha256_file(pdf_path)
+    root = Path(cache_root)
+    output_dir = root / sha256
+    manifest = load_manifest(output_dir)
+    if manifest:
+        return manifest
+
+    image, page_count, page_size = _render_first_page(pdf_path, max_dimension)
+    image = _flatten(image)
+
+    # Render into a scratch directory and rename it into place, so readers
+    # never see a half-written pyramid
+    root.mkdir(parents=True, exist_ok=True)
+    work_dir = root / f".{sha256}.{uuid.uuid4().hex}.tmp"
+    work_dir.mkdir()
+    try:
+        preview = image.copy()
+        preview.thumbnail((preview_dimension, preview_dimension), Image.Resampling.LANCZOS)
+        preview.save(work_dir / "preview.webp", "WEBP", quality=DERIVATIVE_WEBP_QUALITY, method=4)
+        preview.save(work_dir / "preview.jpg", "JPEG", quality=DERIVATIVE_JPEG_QUALITY, optimize=True, progressive=True)
+
+        levels = _write_tiles(image, work_dir / "tiles", tile_size)
+        manifest = {
+            "sha256": sha256,
+            "pages": page_count,
+            "page_size_pt": list(page_size),
+            "width": image.width,
+            "height": image.height,
+            "preview_width": preview.width,
+            "preview_height": preview.height,
+            "tile_size": tile_size,
+            "tile_format": "webp",
+            "max_level": levels[-1]["level"],
+            "levels": levels,
+        }
+        with open(work_dir / MANIFEST_NAME, "w") as f:
+            json.dump(manifest, f)
+
+        try:
+            os.rename(work_dir, output_dir)
+        except OSError:
+            # Another worker finished the same file first
+            existing = load_manifest(output_dir)
+            if not existing:
+                raise
+            shutil.rmtree(work_dir, ignore_errors=True)
+            return existing
+    except BaseException:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
+    return manifest
@@ -0,0 +1,65 @@
+"""
+Project Assignments
+The ``assigned_party_ids`` array stored on every project.
+
+Contractors and consultants are assigned through maps of type -> id
+(``assigned_contractors``, ``assigned_consultants``). "Projects this
+contractor is assigned to" over the map values needs an ``$expr``, which
+can't use an index, so the ids are also kept in ``assigned_party_ids``
+(multikey-indexed) and matched with a plain equality / ``$in``.
+
+New projects get the field from ``assigned_party_ids``; updates that
+touch an assignment map go through ``assignment_update``, a pipeline
+update that recomputes the field from the resulting document
+(ASSIGNED_PARTY_IDS_EXPRESSION) so it can't disagree with the maps.
+Migration 0006 backfills older documents.
+"""
+
+from typing import Any, Dict, List
+
+# Maps whose values are the assigned party ids
+ASSIGNMENT_FIELDS = ("assigned_contractors", "assigned_consultants")
+
+
+def assigned_party_ids(project: Dict[str, Any]) -> List[str]:
+    """Ids of the contractors/consultants assigned to a project"""
+    ids = set()
+    for field in ASSIGNMENT_FIELDS:
+        assigned = project.get(field)
+        if isinstance(assigned, dict):
+            ids.update(v for v in assigned.values() if isinstance(v, str) and v)
+    return sorted(ids)
+
+
+def _values_expression(field: str) -> Dict:
+    return {"$cond": [
+        {"$eq": [{"$type": f"${field}"}, "object"]},
+        {"$map": {"input": {"$objectToArray": f"${field}"}, "as": "a", "in": "$$a.v"}},
+        []
+    ]}
+
+
+# Same ids as assigned_party_ids (unordered), for pipeline updates
+ASSIGNED_PARTY_IDS_EXPRESSION = {
+    "$filter": {
+        "input": {"$setUnion": [_values_expression(field) for field in ASSIGNMENT_FIELDS]},
+        "as": "id",
+        "cond": {"$and": [{"$eq": [{"$type": "$$id"}, "string"]}, {"$ne": ["$$id", ""]}]},
+    }
+}
+
+
+def touches_assignments(fields: Dict[str, Any]) -> bool:
+    """Whether a $set document changes an assignment map"""
+    return any(field in fields for field in ASSIGNMENT_FIELDS)
+
+
+def assignment_update(fields: Dict[str, Any]) -> List[Dict]:
+    """
+    Pipeline update setting ``fields`` (taken literally) and recomputing
+    ``assigned_party_ids`` from the result.
+    """
+    return [
+        {"$set": {field: {"$literal": value} for field, value in fields.items()}},
+        {"$set": {"assigned_party_ids": ASSIGNED_PARTY_IDS_EXPRESSION}},
+    ]
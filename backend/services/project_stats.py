@@ -0,0 +1,298 @@
+"""
+Project Progress Counters
+Materialized per-project drawing counts behind progress bars.
+
+Each project has a ``project_stats`` document holding how many of its
+live (not deleted) drawings are in each progress bucket:
+
+    not_applicable  - marked N/A
+    issued          - issued
+    approved        - approved, not issued yet
+    pending         - everything else
+
+Drawing writes record their before/after images through
+``record_drawing_transition`` (via drawing_state.transition_drawing for
+updates, ``record_drawing_created`` for inserts), which ``$inc`` the two buckets
+involved in one atomic update and bump ``last_activity_at``. Readers get
+counts, totals and percent complete from ``get_project_progress``
+without loading drawings; a project without a stats document yet is
+counted once and stored on first read.
+
+Counters can drift if a write path bypasses these helpers (or a process
+dies between the drawing write and the counter update), so the
+``project_stats_reconcile`` job recounts every project and repairs
+mismatches. Counter upserts wait for the unique ``project_id`` index and
+are skipped while it is missing, so they never create a second stats
+document for a project; reconcile removes any duplicates that block it.
+"""
+
+import os
+import time
+import logging
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from utils.database import get_database
+from utils.indexes import INDEX_MANIFEST
+
+logger = logging.getLogger(__name__)
+
+db = get_database()
+
+BUCKETS = ("pending", "approved", "issued", "not_applicable")
+
+# Unique index on project_id: upserts by project_id rely on it to never
+# create a second stats document for the same project
+STATS_INDEX = next(spec for spec in INDEX_MANIFEST if spec.collection == "project_stats")
+INDEX_RETRY_SECONDS = int(os.environ.get('PROJECT_STATS_INDEX_RETRY_SECONDS', '60'))
+_index_ready = False
+_index_retry_at = 0.0
+
+# Drawing fields the bucket depends on
+BUCKET_PROJECTION = {
+    "_id": 0, "id": 1, "project_id": 1, "deleted_at": 1,
+    "is_issued": 1, "is_approved": 1, "is_not_applicable": 1,
+}
+
+# Values that count as a set drawing flag. Legacy documents hold 1 or
+# "true" as well as True; flag_set and flag_expression apply the same
+# rule so Python and aggregation classify a drawing identically.
+TRUE_VALUES = (True, 1, "true")
+
+
+def flag_set(drawing: dict, field: str) -> bool:
+    """Whether a drawing flag is set"""
+    return drawing.get(field) in TRUE_VALUES
+
+
+def flag_expression(field: str) -> Dict:
+    """flag_set as an aggregation expression"""
+    return {"$in": [f"${field}", list(TRUE_VALUES)]}
+
+
+def flag_filter(field: str, value: bool = True) -> Dict:
+    """flag_set (or its negation) as a find filter, usable with an index"""
+    return {field: {"$in" if value else "$nin": list(TRUE_VALUES)}}
+
+
+# Same classification as drawing_bucket, for aggregation pipelines
+BUCKET_EXPRESSION = {
+    "$switch": {
+        "branches": [
+            {"case": flag_expression("is_not_applicable"), "then": "not_applicable"},
+            {"case": flag_expression("is_issued"), "then": "issued"},
+            {"case": flag_expression("is_approved"), "then": "approved"},
+        ],
+        "default": "pending",
+    }
+}
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+async def _ensure_stats_index() -> bool:
+    """
+    Make sure the unique project_id index exists before counters are
+    upserted (ensure_indexes builds it in the background at startup, which
+    may not have happened yet). Returns False while it can't be built,
+    e.g. because duplicate documents exist; reconcile removes those.
+    """
+    global _index_ready, _index_retry_at
+    if _index_ready:
+        return True
+    if time.monotonic() < _index_retry_at:
+        return False
+    try:
+        await db.project_stats.create_indexes([STATS_INDEX.to_model()])
+        _index_ready = True
+    except Exception as e:
+        _index_retry_at = time.monotonic() + INDEX_RETRY_SECONDS
+        logger.error(f"project_stats unique index unavailable, counter writes skipped: {e}")
+    return _index_ready
+
+
+def drawing_bucket(drawing: Optional[dict]) -> Optional[str]:
+    """Progress bucket of a drawing, or None if it doesn't count (missing or deleted)"""
+    if not drawing or drawing.get("deleted_at"):
+        return None
+    if flag_set(drawing, "is_not_applicable"):
+        return "not_applicable"
+    if flag_set(drawing, "is_issued"):
+        return "issued"
+    if flag_set(drawing, "is_approved"):
+        return "approved"
+    return "pending"
+
+
+def progress_from_counts(counts: Dict[str, int]) -> Dict[str, Any]:
+    """Totals and percent complete from bucket counts"""
+    counts = {bucket: max(int(counts.get(bucket) or 0), 0) for bucket in BUCKETS}
+    total = sum(counts.values())
+    applicable = total - counts["not_applicable"]
+    completed = counts["issued"] + counts["approved"]
+    return {
+        "counts": counts,
+        "total_drawings": total,
+        "applicable_drawings": applicable,
+        "completed_drawings": completed,
+        "percent_complete": round(completed / applicable * 100) if applicable > 0 else 0,
+    }
+
+
+async def record_drawing_transition(before: Optional[dict], after: Optional[dict]):
+    """
+    Apply a drawing write to its project's counters. ``before`` is None
+    for an insert and ``after`` None for a hard delete.
+    """
+    project_id = (after or before or {}).get("project_id")
+    if not project_id:
+        return
+    if not await _ensure_stats_index():
+        # Skipped rather than risk a duplicate document; reconcile repairs the counts
+        return
+    old_bucket, new_bucket = drawing_bucket(before), drawing_bucket(after)
+    update: Dict[str, Any] = {"$max": {"last_activity_at": _now()}}
+    if old_bucket != new_bucket:
+        inc = {}
+        if old_bucket:
+            inc[f"counts.{old_bucket}"] = -1
+        if new_bucket:
+            inc[f"counts.{new_bucket}"] = 1
+        update["$inc"] = inc
+    await db.project_stats.update_one({"project_id": project_id}, update, upsert=True)
+
+
+async def record_drawing_created(drawing: dict):
+    """Count a newly inserted drawing"""
+    await record_drawing_transition(None, drawing)
+
+
+async def count_project_drawings(project_ids: List[str]) -> Dict[str, Dict[str, int]]:
+    """Recount bucket totals from the drawings themselves (one aggregation)"""
+    counts: Dict[str, Dict[str, int]] = {pid: {bucket: 0 for bucket in BUCKETS} for pid in project_ids}
+    pipeline = [
+        {"$match": {"project_id": {"$in": project_ids}, "deleted_at": None}},
+        {"$group": {"_id": {"project_id": "$project_id", "bucket": BUCKET_EXPRESSION}, "count": {"$sum": 1}}},
+    ]
+    async for row in db.project_drawings.aggregate(pipeline):
+        counts[row["_id"]["project_id"]][row["_id"]["bucket"]] = row["count"]
+    return counts
+
+
+async def get_project_progress(project_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """Progress per project (see progress_from_counts), plus ``last_activity_at``"""
+    project_ids = list(dict.fromkeys(pid for pid in project_ids if pid))
+    if not project_ids:
+        return {}
+    stored = {
+        doc["project_id"]: doc
+        async for doc in db.project_stats.find({"project_id": {"$in": project_ids}}, {"_id": 0})
+    }
+
+    # Projects never counted (or only touched by $max so far) are counted once here
+    uncounted = [pid for pid in project_ids if "reconciled_at" not in stored.get(pid, {})]
+    if uncounted:
+        fresh = await count_project_drawings(uncounted)
+        for project_id in uncounted:
+            stored[project_id] = await _store_counts(project_id, fresh[project_id], stored.get(project_id))
+
+    progress = {}
+    for project_id in project_ids:
+        doc = stored.get(project_id) or {}
+        progress[project_id] = {
+            **progress_from_counts(doc.get("counts") or {}),
+            "last_activity_at": doc.get("last_activity_at"),
+        }
+    return progress
+
+
+async def _store_counts(project_id: str, counts: Dict[str, int], previous: Optional[dict]) -> dict:
+    """
+    Replace a project's counts, unless a counted write changed them since
+    ``previous`` was read (that write wins; the next reconcile re-checks).
+    """
+    if not await _ensure_stats_index():
+        return {"project_id": project_id, "counts": counts}
+
+    now = _now()
+    query: Dict[str, Any] = {"project_id": project_id}
+    if previous is None:
+        # Create the document first; the compare-and-set below never upserts,
+        # so a failed comparison can't insert a second one
+        try:
+            await db.project_stats.update_one(
+                {"project_id": project_id},
+                {"$setOnInsert": {"project_id": project_id}},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # Another writer created it first
+            pass
+        query["counts"] = {"$exists": False}
+    else:
+        query["counts"] = previous.get("counts")
+    updated = await db.project_stats.find_one_and_update(
+        query,
+        {"$set": {"counts": counts, "reconciled_at": now}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER
+    )
+    if updated is None:
+        updated = await db.project_stats.find_one({"project_id": project_id}, {"_id": 0})
+    return updated or {"project_id": project_id, "counts": counts}
+
+
+async def _remove_duplicate_stats() -> int:
+    """Keep one stats document per project (duplicates block the unique index)"""
+    global _index_retry_at
+    pipeline = [
+        {"$group": {"_id": "$project_id", "ids": {"$push": "$_id"}, "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}},
+    ]
+    removed = 0
+    async for row in db.project_stats.aggregate(pipeline):
+        result = await db.project_stats.delete_many({"_id": {"$in": row["ids"][1:]}})
+        removed += result.deleted_count
+        # The survivor's counts may be partial; make the recount below re-initialize it
+        await db.project_stats.update_one({"_id": row["ids"][0]}, {"$unset": {"reconciled_at": ""}})
+    if removed:
+        logger.warning(f"Removed {removed} duplicate project_stats documents")
+        _index_retry_at = 0.0
+    return removed
+
+
+async def reconcile_project_stats(batch_size: int = 200) -> Dict[str, int]:
+    """Recount every project's drawings and repair counters that drifted"""
+    checked = repaired = initialized = 0
+    duplicates = 0 if _index_ready else await _remove_duplicate_stats()
+    project_ids = [
+        p["id"] async for p in db.projects.find({"deleted_at": None}, {"_id": 0, "id": 1})
+    ]
+    for start in range(0, len(project_ids), batch_size):
+        batch = project_ids[start:start + batch_size]
+        actual = await count_project_drawings(batch)
+        stored = {
+            doc["project_id"]: doc
+            async for doc in db.project_stats.find({"project_id": {"$in": batch}}, {"_id": 0})
+        }
+        now = _now()
+        for project_id in batch:
+            checked += 1
+            doc = stored.get(project_id)
+            if doc is None or "reconciled_at" not in doc:
+                await _store_counts(project_id, actual[project_id], doc)
+                initialized += 1
+                continue
+            current = {bucket: (doc.get("counts") or {}).get(bucket, 0) for bucket in BUCKETS}
+            if current == actual[project_id]:
+                await db.project_stats.update_one({"project_id": project_id}, {"$set": {"reconciled_at": now}})
+                continue
+            logger.warning(f"Project stats drift for {project_id}: stored {current}, actual {actual[project_id]}")
+            await _store_counts(project_id, actual[project_id], doc)
+            repaired += 1
+    return {"checked": checked, "repaired": repaired, "initialized": initialized, "duplicates_removed": duplicates}
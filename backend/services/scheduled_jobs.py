@@ -0,0 +1,97 @@
+"""
+Scheduled Jobs
+The app's periodic maintenance, registered with the job runner at startup.
+
+Schedules can be overridden through the environment; cron expressions are
+in UTC.
+"""
+
+import os
+import logging
+
+from services.job_runner import JobRunner, Job, CronSchedule, IntervalSchedule
+
+logger = logging.getLogger(__name__)
+
+APPROVAL_REMINDER_CHECK_SECONDS = float(os.environ.get('APPROVAL_REMINDER_CHECK_SECONDS', '60'))
+UPLOAD_SESSION_CLEANUP_INTERVAL = float(os.environ.get('UPLOAD_SESSION_CLEANUP_INTERVAL', '3600'))
+MAGIC_TOKEN_CLEANUP_CRON = os.environ.get('MAGIC_TOKEN_CLEANUP_CRON', '15 * * * *')
+# Saturday evening, for the week that started on Monday
+WEEKLY_RATINGS_CRON = os.environ.get('WEEKLY_RATINGS_CRON', '0 18 * * 6')
+PROJECT_STATS_RECONCILE_CRON = os.environ.get('PROJECT_STATS_RECONCILE_CRON', '40 2 * * *')
+
+
+async def send_due_approval_reminders():
+    from drawing_approval_reminders import check_and_send_reminders
+    return {"sent": await check_and_send_reminders()}
+
+
+async def purge_local_cache():
+    from cache_service import cache
+    return {"expired": await cache.cleanup_expired()}
+
+
+async def cleanup_magic_tokens():
+    from services.magic_link_service import cleanup_expired_tokens
+    return {"deleted": await cleanup_expired_tokens()}
+
+
+async def cleanup_uploads():
+    from services.upload_sessions import cleanup_expired_sessions
+    from services.blob_store import blob_store
+    return {
+        "expired_sessions": await cleanup_expired_sessions(),
+        "collected_blobs": await blob_store.collect_garbage(),
+    }
+
+
+async def rate_current_week():
+    from services.weekly_ratings import calculate_weekly_ratings, current_week_start
+    week_start = current_week_start()
+    ratings = await calculate_weekly_ratings(week_start)
+    return {"week_start": week_start, "rated": len(ratings)}
+
+
+async def reconcile_project_progress():
+    from services.project_stats import reconcile_project_stats
+    return await reconcile_project_stats()
+
+
+def register_default_jobs(runner: JobRunner):
+    runner.register(Job(
+        "approval_reminders", send_due_approval_reminders,
+        IntervalSchedule(APPROVAL_REMINDER_CHECK_SECONDS),
+        jitter_seconds=5, timeout_seconds=600,
+        description="Send due drawing approval reminders"
+    ))
+    runner.register(Job(
+        "upload_cleanup", cleanup_uploads,
+        IntervalSchedule(UPLOAD_SESSION_CLEANUP_INTERVAL),
+        jitter_seconds=300, timeout_seconds=1800, run_on_start=True,
+        description="Expire abandoned upload sessions and collect unreferenced blobs"
+    ))
+    runner.register(Job(
+        "magic_token_cleanup", cleanup_magic_tokens,
+        CronSchedule(MAGIC_TOKEN_CLEANUP_CRON),
+        jitter_seconds=120, timeout_seconds=300,
+        description="Delete expired magic link tokens"
+    ))
+    runner.register(Job(
+        "weekly_ratings", rate_current_week,
+        CronSchedule(WEEKLY_RATINGS_CRON),
+        jitter_seconds=300, timeout_seconds=1800,
+        description="Rate each team member's week from weekly target completion"
+    ))
+    runner.register(Job(
+        "project_stats_reconcile", reconcile_project_progress,
+        CronSchedule(PROJECT_STATS_RECONCILE_CRON),
+        jitter_seconds=600, timeout_seconds=3600, run_on_start=True,
+        description="Recount project progress counters and repair drift"
+    ))
+    # Per-process: every worker has its own in-memory cache
+    runner.register(Job(
+        "cache_cleanup", purge_local_cache,
+        IntervalSchedule(30),
+        timeout_seconds=30, leader_only=False,
+        description="Purge expired entries from this worker's in-memory cache"
+    ))
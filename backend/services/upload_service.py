@@ -0,0 +1,131 @@
+"""
+Streaming Upload Service
+Writes uploaded files to disk in fixed-size chunks without holding the
+whole file in memory or blocking the event loop.
+
+Each upload is streamed into a temporary file next to its destination,
+size-checked and hashed as bytes arrive, then atomically renamed into
+place, so readers never see a partially written file. With the blob
+store enabled (services.blob_store) the finished file is stored by
+content hash and the destination becomes a link to it, so identical
+uploads share one copy on disk.
+"""
+
+import os
+import uuid
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import Optional, Union
+
+from fastapi import HTTPException, UploadFile
+
+from services.blob_store import blob_store, BLOB_STORE_ENABLED
+
+logger = logging.getLogger(__name__)
+
+# Maximum upload size (500MB default, same setting the routes use)
+MAX_FILE_SIZE = int(os.environ.get('MAX_FILE_SIZE', 524288000))
+
+# Bytes read from the request and written to disk per step
+UPLOAD_CHUNK_SIZE = int(os.environ.get('UPLOAD_CHUNK_SIZE', 1024 * 1024))
+
+
+class UploadTooLarge(HTTPException):
+    """Upload exceeded its size limit (rejected while streaming)"""
+
+    def __init__(self, filename: Optional[str], max_size: int):
+        name = f"File {filename}: " if filename else ""
+        super().__init__(
+            status_code=413,
+            detail=f"{name}File size exceeds maximum allowed size ({max_size // (1024 * 1024)}MB)"
+        )
+
+
+class StoredUpload:
+    """Metadata for a file written by save_upload"""
+
+    def __init__(self, path: Path, size: int, sha256: str,
+                 original_filename: Optional[str], content_type: Optional[str]):
+        self.path = path
+        self.size = size
+        self.sha256 = sha256
+        self.original_filename = original_filename
+        self.content_type = content_type
+
+    @property
+    def filename(self) -> str:
+        return self.path.name
+
+    def to_dict(self) -> dict:
+        return {
+            "path": str(self.path),
+            "filename": self.filename,
+            "original_filename": self.original_filename,
+            "size": self.size,
+            "sha256": self.sha256,
+            "content_type": self.content_type,
+        }
+
+
+def _remove_quietly(path: Path):
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logger.warning(f"Could not remove partial upload {path}: {e}")
+
+
+async def save_upload(
+    upload: UploadFile,
+    destination: Union[str, Path],
+    max_size: int = MAX_FILE_SIZE,
+    chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> StoredUpload:
+    """
+    Stream an UploadFile to ``destination``.
+
+    Raises UploadTooLarge (HTTP 413) as soon as more than ``max_size``
+    bytes have been received; nothing is left on disk in that case.
+    """
+    destination = Path(destination)
+    loop = asyncio.get_event_loop()
+    await loop.run_in_executor(None, lambda: destination.parent.mkdir(parents=True, exist_ok=True))
+
+    temp_path = destination.parent / f".{destination.name}.{uuid.uuid4().hex}.part"
+    digest = hashlib.sha256()
+    size = 0
+
+    handle = await loop.run_in_executor(None, open, temp_path, "wb")
+    try:
+        try:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLarge(upload.filename, max_size)
+                digest.update(chunk)
+                await loop.run_in_executor(None, handle.write, chunk)
+            await loop.run_in_executor(None, handle.flush)
+        finally:
+            await loop.run_in_executor(None, handle.close)
+
+        if BLOB_STORE_ENABLED:
+            await blob_store.ingest(temp_path, destination, digest.hexdigest(), size, upload.content_type)
+        else:
+            await loop.run_in_executor(None, os.replace, temp_path, destination)
+    except BaseException:
+        await loop.run_in_executor(None, _remove_quietly, temp_path)
+        raise
+
+    return StoredUpload(
+        path=destination,
+        size=size,
+        sha256=digest.hexdigest(),
+        original_filename=upload.filename,
+        content_type=upload.content_type,
+    )
@@ -0,0 +1,367 @@
+"""
+Resumable Upload Sessions
+Chunked, resumable uploads for large drawing files (CAD/PDF sets).
+
+Protocol:
+    1. create_session()  - declare the file (name, size, optional sha256)
+    2. append_chunk()    - send byte ranges in order; each chunk may carry
+                           its own sha256 which is verified before it is
+                           accepted
+    3. get_session()     - ask for the current offset to resume after a
+                           dropped connection
+    4. finalize()        - verify the whole file and move it into the
+                           regular uploads layout
+
+Partial data lives in ``uploads/.sessions/<id>.part``; sessions that see
+no activity for UPLOAD_SESSION_TTL_HOURS are expired by
+cleanup_expired_sessions(), which also removes their partial files.
+"""
+
+import os
+import uuid
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from datetime import datetime, timezone, timedelta
+from typing import Any, AsyncIterator, Dict, Optional
+
+from fastapi import HTTPException
+
+from utils.database import get_database
+from services.upload_service import MAX_FILE_SIZE, UploadTooLarge
+from services.blob_store import blob_store, BLOB_STORE_ENABLED
+
+logger = logging.getLogger(__name__)
+
+db = get_database()
+
+SESSIONS_DIR = Path("uploads/.sessions")
+DRAWINGS_DIR = Path("uploads/drawings")
+REVISION_FILES_DIR = Path("uploads/revision_files")
+
+# Allowed extensions per upload target (same lists as the one-shot endpoints)
+DRAWING_EXTENSIONS = ['.pdf', '.dwg', '.dxf', '.dwf', '.dgn']
+REVISION_FILE_EXTENSIONS = ['.pdf', '.jpg', '.jpeg', '.png', '.dwg', '.dxf', '.webp']
+
+TARGET_DRAWING = "drawing"
+TARGET_REVISION_FILE = "revision_file"
+
+STATUS_ACTIVE = "active"
+STATUS_COMPLETE = "complete"
+
+# Suggested chunk size returned to clients (8MB)
+UPLOAD_SESSION_CHUNK_SIZE = int(os.environ.get('UPLOAD_SESSION_CHUNK_SIZE', 8 * 1024 * 1024))
+# Idle time after which an unfinished session is discarded
+UPLOAD_SESSION_TTL_HOURS = float(os.environ.get('UPLOAD_SESSION_TTL_HOURS', '24'))
+
+# How long a chunk write may hold the session before another request can take over
+CHUNK_LOCK_SECONDS = int(os.environ.get('UPLOAD_SESSION_CHUNK_LOCK_SECONDS', '600'))
+
+_HASH_READ_SIZE = 1024 * 1024
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _part_path(session_id: str) -> Path:
+    return SESSIONS_DIR / f"{session_id}.part"
+
+
+def _public(session: Dict[str, Any]) -> Dict[str, Any]:
+    """Client-facing view of a session"""
+    return {
+        "session_id": session["id"],
+        "target": session["target"],
+        "drawing_id": session["drawing_id"],
+        "filename": session["filename"],
+        "size": session["size"],
+        "offset": session["received"],
+        "chunk_size": UPLOAD_SESSION_CHUNK_SIZE,
+        "status": session["status"],
+        "expires_at": session["expires_at"].isoformat(),
+    }
+
+
+def _file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_READ_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _truncate(path: Path, size: int):
+    with open(path, "r+b") as f:
+        f.truncate(size)
+
+
+async def create_session(
+    target: str,
+    drawing_id: str,
+    filename: str,
+    size: int,
+    user_id: str,
+    upload_type: Optional[str] = None,
+    sha256: Optional[str] = None
+) -> Dict[str, Any]:
+    """Start a resumable upload for a drawing file or revision reference file"""
+    if target not in (TARGET_DRAWING, TARGET_REVISION_FILE):
+        raise HTTPException(status_code=400, detail=f"Unknown upload target: {target}")
+
+    extension = Path(filename).suffix.lower()
+    allowed = DRAWING_EXTENSIONS if target == TARGET_DRAWING else REVISION_FILE_EXTENSIONS
+    if extension not in allowed:
+        raise HTTPException(status_code=400, detail=f"File {filename}: file type {extension} not allowed")
+    if size <= 0:
+        raise HTTPException(status_code=400, detail="File size must be positive")
+    if size > MAX_FILE_SIZE:
+        raise UploadTooLarge(filename, MAX_FILE_SIZE)
+
+    drawing = await db.project_drawings.find_one({"id": drawing_id}, {"_id": 0, "id": 1})
+    if not drawing:
+        raise HTTPException(status_code=404, detail="Drawing not found")
+
+    session_id = str(uuid.uuid4())
+    now = _now()
+    session = {
+        "id": session_id,
+        "target": target,
+        "drawing_id": drawing_id,
+        "upload_type": upload_type,
+        "filename": filename,
+        "size": size,
+        "sha256": sha256.lower() if sha256 else None,
+        "received": 0,
+        "status": STATUS_ACTIVE,
+        "chunk_lock": None,
+        "chunk_lock_expires_at": None,
+        "user_id": user_id,
+        "created_at": now,
+        "updated_at": now,
+        "expires_at": now + timedelta(hours=UPLOAD_SESSION_TTL_HOURS),
+    }
+
+    loop = asyncio.get_event_loop()
+    part = _part_path(session_id)
+    await loop.run_in_executor(None, lambda: SESSIONS_DIR.mkdir(parents=True, exist_ok=True))
+    await loop.run_in_executor(None, part.touch)
+
+    await db.upload_sessions.insert_one(session)
+    return _public(session)
+
+
+async def _load(session_id: str, user_id: str) -> Dict[str, Any]:
+    session = await db.upload_sessions.find_one({"id": session_id}, {"_id": 0})
+    if not session or session["expires_at"].replace(tzinfo=timezone.utc) <= _now():
+        raise HTTPException(status_code=404, detail="Upload session not found or expired")
+    if session["user_id"] != user_id:
+        raise HTTPException(status_code=403, detail="Upload session belongs to another user")
+    session["expires_at"] = session["expires_at"].replace(tzinfo=timezone.utc)
+    return session
+
+
+async def get_session(session_id: str, user_id: str) -> Dict[str, Any]:
+    """Current state (and resume offset) of a session"""
+    return _public(await _load(session_id, user_id))
+
+
+async def append_chunk(
+    session_id: str,
+    user_id: str,
+    start: int,
+    chunk: AsyncIterator[bytes],
+    chunk_sha256: Optional[str] = None,
+    declared_length: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Append a byte range starting at ``start``, which must equal the
+    session's current offset. The body is streamed to the partial file;
+    if it is short, too long or fails its checksum the partial file is
+    rolled back to ``start`` and the chunk is rejected.
+    """
+    session = await _load(session_id, user_id)
+    if session["status"] != STATUS_ACTIVE:
+        raise HTTPException(status_code=409, detail="Upload session is already finalized")
+    if start != session["received"]:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Chunk does not start at the current offset", "offset": session["received"]}
+        )
+
+    # Take the session's write lock so two requests (possibly on different
+    # workers) can never write the same range at once
+    lock = uuid.uuid4().hex
+    now = _now()
+    claimed = await db.upload_sessions.find_one_and_update(
+        {
+            "id": session_id,
+            "status": STATUS_ACTIVE,
+            "received": start,
+            "$or": [{"chunk_lock": None}, {"chunk_lock_expires_at": {"$lte": now}}],
+        },
+        {"$set": {"chunk_lock": lock, "chunk_lock_expires_at": now + timedelta(seconds=CHUNK_LOCK_SECONDS)}},
+        projection={"_id": 0, "id": 1}
+    )
+    if not claimed:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Another chunk is being written to this session", "offset": session["received"]}
+        )
+
+    loop = asyncio.get_event_loop()
+    part = _part_path(session_id)
+    digest = hashlib.sha256()
+    written = 0
+    limit = session["size"] - start
+
+    handle = await loop.run_in_executor(None, open, part, "r+b")
+    try:
+        await loop.run_in_executor(None, handle.seek, start)
+        try:
+            async for data in chunk:
+                if not data:
+                    continue
+                written += len(data)
+                if written > limit:
+                    raise HTTPException(status_code=400, detail="Chunk extends past the declared file size")
+                digest.update(data)
+                await loop.run_in_executor(None, handle.write, data)
+
+            if declared_length is not None and written != declared_length:
+                raise HTTPException(status_code=400, detail="Chunk is shorter than its declared range")
+            if chunk_sha256 and digest.hexdigest() != chunk_sha256.lower():
+                raise HTTPException(status_code=400, detail="Chunk checksum mismatch")
+            await loop.run_in_executor(None, handle.flush)
+        finally:
+            await loop.run_in_executor(None, handle.close)
+    except BaseException:
+        # Drop whatever part of this chunk reached the disk
+        await loop.run_in_executor(None, _truncate, part, start)
+        await db.upload_sessions.update_one(
+            {"id": session_id, "chunk_lock": lock},
+            {"$set": {"chunk_lock": None, "chunk_lock_expires_at": None}}
+        )
+        raise
+
+    now = _now()
+    result = await db.upload_sessions.update_one(
+        {"id": session_id, "chunk_lock": lock},
+        {"$set": {
+            "received": start + written,
+            "updated_at": now,
+            "expires_at": now + timedelta(hours=UPLOAD_SESSION_TTL_HOURS),
+            "chunk_lock": None,
+            "chunk_lock_expires_at": None,
+        }}
+    )
+    if result.modified_count == 0:
+        # Our lock expired mid-write and another request took over
+        raise HTTPException(status_code=409, detail="Upload session changed while writing this chunk")
+
+    session.update(received=start + written, updated_at=now,
+                   expires_at=now + timedelta(hours=UPLOAD_SESSION_TTL_HOURS))
+    return _public(session)
+
+
+async def finalize(session_id: str, user_id: str) -> Dict[str, Any]:
+    """
+    Verify a fully received upload and move it into the uploads layout.
+    Returns the same file metadata the one-shot endpoints return.
+    """
+    session = await _load(session_id, user_id)
+    if session["received"] != session["size"]:
+        raise HTTPException(
+            status_code=409,
+            detail={"message": "Upload is incomplete", "offset": session["received"], "size": session["size"]}
+        )
+
+    claimed = await db.upload_sessions.update_one(
+        {"id": session_id, "status": STATUS_ACTIVE},
+        {"$set": {"status": STATUS_COMPLETE, "updated_at": _now()}}
+    )
+    if claimed.modified_count == 0:
+        raise HTTPException(status_code=409, detail="Upload session is already finalized")
+
+    loop = asyncio.get_event_loop()
+    part = _part_path(session_id)
+    try:
+        sha256 = await loop.run_in_executor(None, _file_sha256, part)
+        if session.get("sha256") and sha256 != session["sha256"]:
+            raise HTTPException(status_code=400, detail="File checksum mismatch")
+
+        extension = Path(session["filename"]).suffix
+        timestamp = _now().strftime('%Y%m%d_%H%M%S')
+        drawing_id = session["drawing_id"]
+
+        if session["target"] == TARGET_DRAWING:
+            unique_filename = f"{drawing_id}_{session.get('upload_type') or 'drawing'}_{timestamp}_0{extension}"
+            destination = DRAWINGS_DIR / unique_filename
+            file_info = {
+                "url": f"/uploads/drawings/{unique_filename}",
+                "filename": session["filename"],
+                "original_name": session["filename"],
+                "size": session["size"],
+                "sha256": sha256
+            }
+        else:
+            unique_filename = f"rev_{drawing_id}_{uuid.uuid4().hex[:8]}{extension.lower()}"
+            destination = REVISION_FILES_DIR / unique_filename
+            file_info = {
+                "filename": session["filename"],
+                "url": f"/api/revision-files/{unique_filename}",
+                "uploaded_at": _now().isoformat()
+            }
+
+        if BLOB_STORE_ENABLED:
+            await blob_store.ingest(part, destination, sha256, session["size"])
+        else:
+            await loop.run_in_executor(None, lambda: destination.parent.mkdir(parents=True, exist_ok=True))
+            await loop.run_in_executor(None, os.replace, part, destination)
+    except BaseException:
+        # Let the client retry finalize (or fix the data) on the same session
+        await db.upload_sessions.update_one(
+            {"id": session_id}, {"$set": {"status": STATUS_ACTIVE}}
+        )
+        raise
+
+    if session["target"] == TARGET_REVISION_FILE:
+        await db.project_drawings.update_one(
+            {"id": session["drawing_id"]},
+            {"$push": {"revision_reference_files": file_info}}
+        )
+
+    await db.upload_sessions.delete_one({"id": session_id})
+    logger.info(f"Resumable upload {session_id} finalized to {destination}")
+    return file_info
+
+
+async def abort_session(session_id: str, user_id: str):
+    """Discard a session and its partial data"""
+    await _load(session_id, user_id)
+    await db.upload_sessions.delete_one({"id": session_id, "status": STATUS_ACTIVE})
+    await asyncio.get_event_loop().run_in_executor(None, _remove_part, session_id)
+
+
+def _remove_part(session_id: str):
+    try:
+        _part_path(session_id).unlink()
+    except FileNotFoundError:
+        pass
+
+
+async def cleanup_expired_sessions() -> int:
+    """Delete expired sessions and their partial files. Returns the count removed."""
+    now = _now()
+    removed = 0
+    loop = asyncio.get_event_loop()
+    async for session in db.upload_sessions.find(
+        {"expires_at": {"$lte": now}}, {"_id": 0, "id": 1}
+    ):
+        await db.upload_sessions.delete_one({"id": session["id"], "expires_at": {"$lte": now}})
+        await loop.run_in_executor(None, _remove_part, session["id"])
+        removed += 1
+    if removed:
+        logger.info(f"Expired {removed} abandoned upload session(s)")
+    return removed
@@ -0,0 +1,110 @@
+"""
+Weekly Ratings
+Rates each team member's week from their weekly target completion.
+
+Used by POST /api/calculate-weekly-ratings and by the ``weekly_ratings``
+scheduled job (Saturdays, for the week that started on Monday). Ratings
+are upserted per team member and week, so re-running a week replaces its
+ratings instead of duplicating them.
+"""
+
+import logging
+from datetime import datetime, timezone, timedelta
+from typing import Dict, List
+
+from pymongo import ReturnDocument
+
+from utils.database import get_database
+from models_projects import WeeklyRating
+
+logger = logging.getLogger(__name__)
+
+db = get_database()
+
+
+def current_week_start(now: datetime = None) -> str:
+    """ISO date of this week's Monday (the week_start used for targets)"""
+    now = now or datetime.now(timezone.utc)
+    return (now - timedelta(days=now.weekday())).date().isoformat()
+
+
+def _rating_for(completion_percentage: float) -> float:
+    # Rating scale: 0-5
+    # 100%+ = 5, 90-99% = 4.5, 80-89% = 4, 70-79% = 3.5, 60-69% = 3, 50-59% = 2.5, <50% = 1-2
+    if completion_percentage >= 100:
+        return 5.0
+    elif completion_percentage >= 90:
+        return 4.5
+    elif completion_percentage >= 80:
+        return 4.0
+    elif completion_percentage >= 70:
+        return 3.5
+    elif completion_percentage >= 60:
+        return 3.0
+    elif completion_percentage >= 50:
+        return 2.5
+    return max(1.0, completion_percentage / 50 * 2)
+
+
+async def calculate_weekly_ratings(week_start: str) -> List[Dict]:
+    """Calculate and store ratings for every team member with targets in the given week"""
+    week_start_date = datetime.fromisoformat(week_start)
+    week_end_date = week_start_date + timedelta(days=6)
+    # Targets store week_start_date as datetime.isoformat() of the submitted date
+    stored_week_start = week_start_date.isoformat()
+
+    targets_by_member: Dict[str, List[Dict]] = {}
+    async for target in db.weekly_targets.find(
+        {"week_start_date": {"$in": list({week_start, stored_week_start})}},
+        {"_id": 0, "id": 1, "assigned_to_id": 1, "target_quantity": 1, "completed_quantity": 1}
+    ):
+        targets_by_member.setdefault(target.get('assigned_to_id'), []).append(target)
+
+    ratings_created = []
+    for member_id, targets in targets_by_member.items():
+        if not member_id:
+            continue
+
+        total_targets = sum(t.get('target_quantity', 0) for t in targets)
+        completed_targets = sum(t.get('completed_quantity', 0) for t in targets)
+
+        if total_targets == 0:
+            continue
+
+        completion_percentage = (completed_targets / total_targets) * 100
+        rating = _rating_for(completion_percentage)
+
+        weekly_rating = WeeklyRating(
+            team_member_id=member_id,
+            week_start_date=week_start_date,
+            week_end_date=week_end_date,
+            total_targets=total_targets,
+            completed_targets=completed_targets,
+            completion_percentage=completion_percentage,
+            rating=rating,
+            weekly_targets=[t['id'] for t in targets]
+        )
+
+        rating_dict = weekly_rating.model_dump()
+        for field in ['week_start_date', 'week_end_date', 'created_at']:
+            if rating_dict.get(field):
+                rating_dict[field] = rating_dict[field].isoformat() if isinstance(rating_dict[field], datetime) else rating_dict[field]
+
+        # Update weekly targets with ratings
+        await db.weekly_targets.update_many(
+            {"id": {"$in": [t['id'] for t in targets]}},
+            {"$set": {"rating": rating}}
+        )
+
+        insert_only = {"id": rating_dict.pop("id"), "created_at": rating_dict.pop("created_at")}
+        stored = await db.weekly_ratings.find_one_and_update(
+            {"team_member_id": member_id, "week_start_date": rating_dict["week_start_date"]},
+            {"$set": rating_dict, "$setOnInsert": insert_only},
+            projection={"_id": 0},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        ratings_created.append(stored)
+
+    logger.info(f"Calculated weekly ratings for {len(ratings_created)} team members (week of {week_start})")
+    return ratings_created
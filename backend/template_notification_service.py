@@ -41,6 +41,8 @@ from whatsapp_templates import (
     TemplateStatus,
     EVENT_TEMPLATE_MAP
 )
+from integrations.twilio_transport import twilio_transport
+from utils.fanout import fan_out, FanOutError
 
 logger = logging.getLogger(__name__)
 
@@ -50,6 +52,8 @@ TWILIO_AUTH_TOKEN = os.environ.get('TWILIO_AUTH_TOKEN')
 TWILIO_WHATSAPP_FROM = os.environ.get('TWILIO_WHATSAPP_NUMBER', 'whatsapp:+14155238886')
 TWILIO_SMS_FROM = os.environ.get('TWILIO_PHONE_NUMBER')
 APP_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://pmapp-stability.preview.emergentagent.com')
+# Recipients notified concurrently by notify_multiple_recipients
+FANOUT_CONCURRENCY = int(os.environ.get('NOTIFICATION_FANOUT_CONCURRENCY', '8'))
 
 
 class TemplateNotificationService:
@@ -65,15 +69,10 @@ class TemplateNotificationService:
     """
     
     def __init__(self):
-        self.twilio_client = None
+        self.twilio_transport = twilio_transport
         self.app_url = APP_URL
-        if TWILIO_ACCOUNT_SID and TWILIO_AUTH_TOKEN:
-            try:
-                from twilio.rest import Client
-                self.twilio_client = Client(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
-                logger.info("Twilio client initialized for template notifications")
-            except Exception as e:
-                logger.error(f"Failed to initialize Twilio client: {str(e)}")
+        if self.twilio_transport.is_configured:
+            logger.info("Twilio transport initialized for template notifications")
     
     async def send_notification(
         self,
@@ -122,7 +121,7 @@ class TemplateNotificationService:
             return result
         
         # Try WhatsApp template first (if approved and phone provided)
-        if recipient_phone and template.status == TemplateStatus.APPROVED and self.twilio_client:
+        if recipient_phone and template.status == TemplateStatus.APPROVED and self.twilio_transport.is_configured:
             whatsapp_result = await self._send_whatsapp_template(
                 template, 
                 recipient_phone, 
@@ -216,7 +215,7 @@ class TemplateNotificationService:
                 content_vars[str(i)] = str(value) if value else ""
             
             # Send via Twilio Content API
-            message = self.twilio_client.messages.create(
+            message = await self.twilio_transport.create_message(
                 from_=TWILIO_WHATSAPP_FROM,
                 to=formatted_phone,
                 content_sid=template.sid,
@@ -238,7 +237,7 @@ class TemplateNotificationService:
         variables: Dict[str, str]
     ) -> Dict[str, Any]:
         """Send SMS fallback message"""
-        if not TWILIO_SMS_FROM or not self.twilio_client:
+        if not TWILIO_SMS_FROM or not self.twilio_transport.is_configured:
             return {"success": False, "error": "SMS not configured"}
         
         try:
@@ -250,7 +249,7 @@ class TemplateNotificationService:
             # Format the SMS message
             sms_body = self._format_sms(template.fallback_sms, variables)
             
-            message = self.twilio_client.messages.create(
+            message = await self.twilio_transport.create_message(
                 from_=TWILIO_SMS_FROM,
                 to=clean_phone,
                 body=sms_body
@@ -921,21 +920,35 @@ class TemplateNotificationService:
             project_id: Associated project ID
             
         Returns:
-            List of results for each recipient
+            List of results for each recipient, in input order
         """
-        results = []
-        for recipient in recipients:
+        async def notify(recipient: Dict[str, Any]) -> Dict[str, Any]:
             variables = common_variables.copy()
             variables["recipient_name"] = recipient.get("name", "")
             
-            result = await self.send_notification(
+            return await self.send_notification(
                 template_key=template_key,
                 recipient_phone=recipient.get("phone", ""),
                 variables=variables,
                 recipient_id=recipient.get("id"),
                 project_id=project_id
             )
-            results.append(result)
+        
+        # Sends run concurrently; the Twilio rate limiter paces them
+        outcomes = await fan_out(recipients, notify, concurrency=FANOUT_CONCURRENCY)
+        
+        results = []
+        for recipient, outcome in zip(recipients, outcomes):
+            if isinstance(outcome, FanOutError):
+                logger.error(f"Notification to {recipient.get('name')} failed: {outcome.error}")
+                outcome = {
+                    "success": False,
+                    "template_key": template_key,
+                    "recipient": recipient.get("phone", ""),
+                    "error": str(outcome.error),
+                    "timestamp": datetime.now(timezone.utc).isoformat()
+                }
+            results.append(outcome)
         
         return results
 
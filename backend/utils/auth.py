@@ -13,6 +13,7 @@ import uuid
 from typing import Optional
 
 from utils.database import get_database
+from utils.principal_cache import principal_cache, session_deadline
 
 # Security
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -91,13 +92,25 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         if email is None:
             raise HTTPException(status_code=401, detail="Invalid authentication credentials")
         
+        cache_key = f"auth:jwt:{email}"
+        cached_user = principal_cache.get(cache_key)
+        if cached_user is not None:
+            return cached_user
+        
         user_doc = await db.users.find_one({"email": email}, {"_id": 0})
         if not user_doc:
             raise HTTPException(status_code=401, detail="User not found")
         
-        return User(**user_doc)
+        user = User(**user_doc)
+        principal_cache.set(cache_key, user, user_id=user.id, email=user.email)
+        return user
     
     except JWTError:
+        cache_key = f"auth:session:{token}"
+        cached_user = principal_cache.get(cache_key)
+        if cached_user is not None:
+            return cached_user
+        
         # Try Emergent session token
         session = await db.user_sessions.find_one({"session_token": token})
         if not session:
@@ -116,7 +129,12 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         if not user_doc:
             raise HTTPException(status_code=401, detail="User not found")
         
-        return User(**user_doc)
+        user = User(**user_doc)
+        principal_cache.set(
+            cache_key, user, user_id=user.id, email=user.email,
+            expires_at=session_deadline(expires_at)
+        )
+        return user
 
 
 async def require_owner(current_user: User = Depends(get_current_user)):
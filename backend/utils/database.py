@@ -1,21 +1,278 @@
 """
 Database connection utility
-Provides a singleton database connection
+Provides a single, lifecycle-managed MongoDB client registry shared by
+every module in the backend.
+
+Modules keep doing ``db = get_database()`` at import time; the returned
+handle is a lightweight proxy that resolves to the registry's client on
+first use, so no connection pool is opened until the app starts (or a
+script touches the database).
 """
 import os
+import logging
+import threading
+from typing import Dict, Optional
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
 from dotenv import load_dotenv
 from pathlib import Path
 
+logger = logging.getLogger(__name__)
+
 # Load environment variables
 ROOT_DIR = Path(__file__).parent.parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+DEFAULT_POOL = "primary"
+
+
+def _env_int(name: str, default: Optional[int]) -> Optional[int]:
+    value = os.environ.get(name)
+    if value in (None, ""):
+        return default
+    return int(value)
+
+
+class DatabaseSettings:
+    """Connection pool settings, loaded once from the environment"""
+
+    def __init__(self, prefix: str = "MONGO"):
+        self.url = os.environ['MONGO_URL']
+        self.db_name = os.environ['DB_NAME']
+        self.app_name = os.environ.get(f'{prefix}_APP_NAME', '4th-dimension-backend')
+
+        # Pool sizing
+        self.max_pool_size = _env_int(f'{prefix}_MAX_POOL_SIZE', 50)
+        self.min_pool_size = _env_int(f'{prefix}_MIN_POOL_SIZE', 0)
+        self.max_idle_time_ms = _env_int(f'{prefix}_MAX_IDLE_TIME_MS', 300000)
+        self.wait_queue_timeout_ms = _env_int(f'{prefix}_WAIT_QUEUE_TIMEOUT_MS', 10000)
+
+        # Timeouts
+        self.connect_timeout_ms = _env_int(f'{prefix}_CONNECT_TIMEOUT_MS', 10000)
+        self.server_selection_timeout_ms = _env_int(f'{prefix}_SERVER_SELECTION_TIMEOUT_MS', 10000)
+        self.socket_timeout_ms = _env_int(f'{prefix}_SOCKET_TIMEOUT_MS', None)
+
+        # Read preference / write concern
+        self.read_preference = os.environ.get(f'{prefix}_READ_PREFERENCE', 'primary')
+        self.write_concern_w = os.environ.get(f'{prefix}_WRITE_CONCERN_W', '1')
+        self.write_concern_journal = os.environ.get(f'{prefix}_WRITE_CONCERN_J', '').lower() == 'true'
+        self.write_concern_timeout_ms = _env_int(f'{prefix}_WRITE_CONCERN_TIMEOUT_MS', None)
+
+    def client_kwargs(self) -> dict:
+        """Keyword arguments for AsyncIOMotorClient"""
+        w = int(self.write_concern_w) if self.write_concern_w.isdigit() else self.write_concern_w
+        kwargs = {
+            "appname": self.app_name,
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": self.min_pool_size,
+            "maxIdleTimeMS": self.max_idle_time_ms,
+            "waitQueueTimeoutMS": self.wait_queue_timeout_ms,
+            "connectTimeoutMS": self.connect_timeout_ms,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+            "readPreference": self.read_preference,
+            "w": w,
+        }
+        if self.socket_timeout_ms is not None:
+            kwargs["socketTimeoutMS"] = self.socket_timeout_ms
+        if self.write_concern_journal:
+            kwargs["journal"] = True
+        if self.write_concern_timeout_ms is not None:
+            kwargs["wTimeoutMS"] = self.write_concern_timeout_ms
+        return kwargs
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Connection pool event counters for a single client"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self.connections_created = 0
+        self.connections_closed = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.checkout_failures = 0
+        self.pool_clears = 0
+
+    def _incr(self, attr: str):
+        with self._lock:
+            setattr(self, attr, getattr(self, attr) + 1)
+
+    # Pool-level events
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._incr("pool_clears")
+
+    def pool_closed(self, event):
+        pass
+
+    # Connection-level events
+    def connection_created(self, event):
+        self._incr("connections_created")
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._incr("connections_closed")
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._incr("checkout_failures")
+
+    def connection_checked_out(self, event):
+        self._incr("checkouts")
+
+    def connection_checked_in(self, event):
+        self._incr("checkins")
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "pool": self.name,
+                "open_connections": self.connections_created - self.connections_closed,
+                "in_use": self.checkouts - self.checkins,
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "pool_clears": self.pool_clears,
+            }
 
-def get_database():
+
+class MongoClientRegistry:
+    """
+    Process-wide registry of MongoDB clients.
+
+    One client (and therefore one connection pool) is created per named
+    pool. The default "primary" pool serves the whole app; additional
+    pools can be registered with their own settings, e.g. a reporting
+    pool reading from secondaries.
+    """
+
+    def __init__(self):
+        self._settings: Dict[str, DatabaseSettings] = {}
+        self._clients: Dict[str, AsyncIOMotorClient] = {}
+        self._metrics: Dict[str, PoolMetrics] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, name: str = DEFAULT_POOL, settings: Optional[DatabaseSettings] = None):
+        """Register settings for a pool (must happen before first use)"""
+        with self._lock:
+            if name in self._clients:
+                raise RuntimeError(f"MongoDB pool '{name}' is already connected")
+            self._settings[name] = settings or DatabaseSettings()
+
+    def get_client(self, name: str = DEFAULT_POOL) -> AsyncIOMotorClient:
+        """Get (creating on first use) the client for a pool"""
+        client = self._clients.get(name)
+        if client is not None:
+            return client
+        with self._lock:
+            if name not in self._clients:
+                settings = self._settings.get(name)
+                if settings is None:
+                    settings = self._settings[name] = DatabaseSettings()
+                metrics = PoolMetrics(name)
+                self._clients[name] = AsyncIOMotorClient(
+                    settings.url,
+                    event_listeners=[metrics],
+                    **settings.client_kwargs()
+                )
+                self._metrics[name] = metrics
+                logger.info(
+                    f"MongoDB pool '{name}' created "
+                    f"(maxPoolSize={settings.max_pool_size}, readPreference={settings.read_preference})"
+                )
+            return self._clients[name]
+
+    def get_database(self, name: str = DEFAULT_POOL):
+        """Get the configured database on a pool"""
+        client = self.get_client(name)
+        return client[self._settings[name].db_name]
+
+    async def connect(self):
+        """Create all configured pools and verify connectivity (startup hook)"""
+        names = list(self._settings) or [DEFAULT_POOL]
+        for name in names:
+            await self.get_client(name).admin.command("ping")
+            logger.info(f"MongoDB pool '{name}' connected")
+
+    def close(self):
+        """Close all pools (shutdown hook)"""
+        with self._lock:
+            for name, client in self._clients.items():
+                client.close()
+                logger.info(f"MongoDB pool '{name}' closed")
+            self._clients.clear()
+            self._metrics.clear()
+
+    def stats(self) -> list:
+        """Per-pool connection metrics"""
+        stats = []
+        for name, metrics in list(self._metrics.items()):
+            settings = self._settings[name]
+            stats.append({
+                **metrics.snapshot(),
+                "max_pool_size": settings.max_pool_size,
+                "min_pool_size": settings.min_pool_size,
+                "read_preference": settings.read_preference,
+                "write_concern": settings.write_concern_w,
+            })
+        return stats
+
+
+class DatabaseProxy:
+    """
+    Module-level database handle.
+
+    Resolves attribute/item access against the registry on every use so
+    modules can bind ``db`` at import time without opening a client.
+    """
+
+    def __init__(self, registry: MongoClientRegistry, pool: str = DEFAULT_POOL):
+        self._registry = registry
+        self._pool = pool
+
+    def __getattr__(self, name):
+        return getattr(self._registry.get_database(self._pool), name)
+
+    def __getitem__(self, name):
+        return self._registry.get_database(self._pool)[name]
+
+    def __repr__(self):
+        return f"DatabaseProxy(pool={self._pool!r})"
+
+
+# Singleton registry
+registry = MongoClientRegistry()
+db = DatabaseProxy(registry)
+
+
+def get_database(pool: str = DEFAULT_POOL):
     """Get database instance"""
-    return db
+    if pool == DEFAULT_POOL:
+        return db
+    return DatabaseProxy(registry, pool)
+
+
+def get_client(pool: str = DEFAULT_POOL) -> AsyncIOMotorClient:
+    """Get the shared MongoDB client"""
+    return registry.get_client(pool)
+
+
+async def connect_database():
+    """Open the shared MongoDB pools (FastAPI startup)"""
+    await registry.connect()
+
+
+def close_database():
+    """Close the shared MongoDB pools (FastAPI shutdown)"""
+    registry.close()
@@ -0,0 +1,44 @@
+"""
+Bounded-concurrency fan-out
+Runs one coroutine per item with at most ``concurrency`` in flight and
+returns the results in input order. A failure for one item is captured
+in its result instead of cancelling the others.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Iterable, List, TypeVar
+
+T = TypeVar("T")
+
+
+class FanOutError:
+    """Result placeholder for an item whose coroutine raised"""
+
+    __slots__ = ("item", "error")
+
+    def __init__(self, item: Any, error: BaseException):
+        self.item = item
+        self.error = error
+
+    def __repr__(self):
+        return f"FanOutError({self.error!r})"
+
+
+async def fan_out(
+    items: Iterable[T],
+    worker: Callable[[T], Awaitable[Any]],
+    concurrency: int = 8,
+) -> List[Any]:
+    """
+    Call ``worker(item)`` for every item, at most ``concurrency`` at a time.
+    Exceptions are returned as FanOutError entries.
+    """
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def run(item: T):
+        async with semaphore:
+            try:
+                return await worker(item)
+            except Exception as e:
+                return FanOutError(item, e)
+
+    return await asyncio.gather(*(run(item) for item in items))
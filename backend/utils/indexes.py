@@ -0,0 +1,293 @@
+"""
+MongoDB Index Manifest
+Declarative list of the indexes every hot collection needs, applied
+idempotently at startup or from the command line:
+
+    python -m utils.indexes            # apply the manifest
+    python -m utils.indexes --report   # explain() probe queries, flag COLLSCANs
+
+TTL indexes are declared on BSON date fields only. Collections that store
+their expiry as an ISO string also carry an ``expire_at`` datetime, written
+alongside it, which the TTL monitor uses to purge them.
+"""
+import os
+import asyncio
+import logging
+from typing import List, Optional, Dict, Any
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+from utils.database import get_database
+
+logger = logging.getLogger(__name__)
+
+# Field used for TTL purging on collections whose expiry is stored as a string
+TTL_FIELD = "expire_at"
+
+
+class IndexSpec:
+    """A single index declaration"""
+
+    def __init__(self, collection: str, keys: list, unique: bool = False,
+                 sparse: bool = False, ttl_seconds: Optional[int] = None,
+                 name: Optional[str] = None):
+        self.collection = collection
+        self.keys = keys
+        self.unique = unique
+        self.sparse = sparse
+        self.ttl_seconds = ttl_seconds
+        self.name = name or "_".join(
+            f"{field}_{'desc' if direction == DESCENDING else 'asc'}" for field, direction in keys
+        )
+
+    def to_model(self) -> IndexModel:
+        options = {"name": self.name}
+        if self.unique:
+            options["unique"] = True
+        if self.sparse:
+            options["sparse"] = True
+        if self.ttl_seconds is not None:
+            options["expireAfterSeconds"] = self.ttl_seconds
+        return IndexModel(self.keys, **options)
+
+    def to_dict(self) -> dict:
+        return {
+            "collection": self.collection,
+            "name": self.name,
+            "keys": [[field, direction] for field, direction in self.keys],
+            "unique": self.unique,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+def _log_retention_seconds() -> int:
+    return int(os.environ.get("LOG_RETENTION_DAYS", "30")) * 86400
+
+
+INDEX_MANIFEST: List[IndexSpec] = [
+    # Users & auth
+    IndexSpec("users", [("id", ASCENDING)]),
+    IndexSpec("users", [("email", ASCENDING)]),
+    IndexSpec("users", [("is_owner", ASCENDING)]),
+    IndexSpec("users", [("role", ASCENDING), ("approval_status", ASCENDING)]),
+    IndexSpec("user_sessions", [("session_token", ASCENDING)], unique=True),
+    IndexSpec("user_sessions", [("user_id", ASCENDING)]),
+    IndexSpec("user_sessions", [(TTL_FIELD, ASCENDING)], ttl_seconds=0),
+    IndexSpec("magic_tokens", [("token", ASCENDING)], unique=True),
+    IndexSpec("magic_tokens", [(TTL_FIELD, ASCENDING)], ttl_seconds=0),
+    IndexSpec("password_resets", [("token", ASCENDING)]),
+    IndexSpec("password_resets", [(TTL_FIELD, ASCENDING)], ttl_seconds=0),
+    IndexSpec("otps", [("user_id", ASCENDING), ("action", ASCENDING)]),
+    IndexSpec("otps", [(TTL_FIELD, ASCENDING)], ttl_seconds=0),
+    IndexSpec("otp_verifications", [("expires_at", ASCENDING)], ttl_seconds=0),
+    IndexSpec("pending_registrations", [("email", ASCENDING)]),
+    IndexSpec("pending_registrations", [("phone", ASCENDING)]),
+    IndexSpec("invitations", [("email", ASCENDING)]),
+    IndexSpec("invitations", [("phone", ASCENDING)]),
+
+    # Projects & people
+    IndexSpec("projects", [("id", ASCENDING)]),
+    IndexSpec("projects", [("team_leader_id", ASCENDING), ("deleted_at", ASCENDING)]),
+    IndexSpec("projects", [("client_id", ASCENDING), ("deleted_at", ASCENDING)]),
+    IndexSpec("projects", [("deleted_at", ASCENDING), ("created_at", DESCENDING)]),
+    # Contractor/consultant project lists (services/project_assignments)
+    IndexSpec("projects", [("assigned_party_ids", ASCENDING), ("deleted_at", ASCENDING)]),
+    IndexSpec("clients", [("id", ASCENDING)]),
+    IndexSpec("clients", [("email", ASCENDING)]),
+    IndexSpec("clients", [("user_id", ASCENDING)]),
+    IndexSpec("contractors", [("id", ASCENDING)]),
+    IndexSpec("contractors", [("email", ASCENDING)]),
+    IndexSpec("contractors", [("user_id", ASCENDING)]),
+    IndexSpec("consultants", [("id", ASCENDING)]),
+    IndexSpec("consultants", [("email", ASCENDING)]),
+    IndexSpec("consultants", [("user_id", ASCENDING)]),
+    IndexSpec("co_clients", [("project_id", ASCENDING)]),
+    IndexSpec("tasks", [("project_id", ASCENDING)]),
+    IndexSpec("project_income", [("project_id", ASCENDING)]),
+
+    # Drawings & comments
+    IndexSpec("project_drawings", [("id", ASCENDING)]),
+    IndexSpec("project_drawings", [
+        ("project_id", ASCENDING), ("deleted_at", ASCENDING), ("sequence_number", ASCENDING)
+    ]),
+    IndexSpec("project_drawings", [
+        ("under_review", ASCENDING), ("is_approved", ASCENDING), ("deleted_at", ASCENDING)
+    ]),
+    IndexSpec("project_drawings", [("status", ASCENDING), ("due_date", ASCENDING)]),
+    IndexSpec("project_drawings", [("preview_status", ASCENDING)], sparse=True),
+    IndexSpec("project_drawings", [("next_reminder_at", ASCENDING)], sparse=True),
+    # Lifecycle state (services/drawing_state): per-project and firm-wide due lists
+    IndexSpec("project_drawings", [("state", ASCENDING), ("project_id", ASCENDING)]),
+    IndexSpec("project_drawings", [("state", ASCENDING), ("due_date", ASCENDING)]),
+    IndexSpec("drawing_comments", [("drawing_id", ASCENDING), ("created_at", DESCENDING)]),
+    IndexSpec("drawing_comments", [("id", ASCENDING)]),
+    IndexSpec("project_comments", [("project_id", ASCENDING), ("created_at", DESCENDING)]),
+    IndexSpec("comments", [("project_id", ASCENDING), ("created_at", DESCENDING)]),
+
+    # Notifications
+    IndexSpec("notifications", [
+        ("user_id", ASCENDING), ("is_read", ASCENDING), ("created_at", DESCENDING)
+    ]),
+    IndexSpec("notifications", [("id", ASCENDING)]),
+    IndexSpec("whatsapp_notifications", [("user_id", ASCENDING), ("sent_at", DESCENDING)]),
+    IndexSpec("whatsapp_settings", [("user_id", ASCENDING)]),
+    IndexSpec("notification_logs", [("channel", ASCENDING), ("success", ASCENDING), ("timestamp", DESCENDING)]),
+    IndexSpec("notification_logs", [("id", ASCENDING)]),
+    IndexSpec("notification_logs", [("timestamp", ASCENDING)], ttl_seconds=_log_retention_seconds()),
+    IndexSpec("notification_outbox", [("id", ASCENDING)], unique=True),
+    IndexSpec("notification_outbox", [("idempotency_key", ASCENDING)], unique=True, sparse=True),
+    IndexSpec("notification_outbox", [("status", ASCENDING), ("next_attempt_at", ASCENDING)]),
+    IndexSpec("notification_outbox", [("status", ASCENDING), ("lease_expires_at", ASCENDING)]),
+    IndexSpec("notification_outbox", [("sent_at", ASCENDING)], ttl_seconds=_log_retention_seconds()),
+
+    # Uploads
+    IndexSpec("upload_sessions", [("id", ASCENDING)], unique=True),
+    IndexSpec("upload_sessions", [("expires_at", ASCENDING)]),
+    IndexSpec("blobs", [("sha256", ASCENDING)], unique=True),
+    IndexSpec("blobs", [("refcount", ASCENDING), ("updated_at", ASCENDING)]),
+    IndexSpec("blob_links", [("path", ASCENDING)], unique=True),
+    IndexSpec("blob_links", [("urls", ASCENDING)]),
+    IndexSpec("project_3d_images", [("id", ASCENDING)]),
+    IndexSpec("project_3d_images", [("derivatives_status", ASCENDING)], sparse=True),
+
+    # Resources
+    IndexSpec("resources", [("id", ASCENDING)]),
+
+    # Scheduled jobs
+    IndexSpec("job_runs", [("job", ASCENDING), ("started_at", DESCENDING)]),
+    IndexSpec("job_runs", [(TTL_FIELD, ASCENDING)], ttl_seconds=0),
+    IndexSpec("weekly_ratings", [("team_member_id", ASCENDING), ("week_start_date", ASCENDING)]),
+
+    # Materialized project progress counters (one document per project)
+    IndexSpec("project_stats", [("project_id", ASCENDING)], unique=True),
+]
+
+
+# Representative query shapes per router, used by the coverage report.
+# Each probe is (router, collection, filter, sort).
+QUERY_PROBES: List[tuple] = [
+    ("auth", "users", {"email": "probe@example.com"}, None),
+    ("auth", "users", {"id": "probe"}, None),
+    ("auth", "user_sessions", {"session_token": "probe"}, None),
+    ("magic_link", "magic_tokens", {"token": "probe"}, None),
+    ("projects", "projects", {"id": "probe"}, None),
+    ("projects", "projects", {"team_leader_id": "probe", "deleted_at": None}, None),
+    ("projects", "projects", {"client_id": "probe", "deleted_at": None}, None),
+    ("projects", "projects", {"assigned_party_ids": "probe", "deleted_at": None}, None),
+    ("drawings", "project_drawings", {"id": "probe"}, None),
+    ("drawings", "project_drawings", {"project_id": "probe", "deleted_at": None}, [("sequence_number", ASCENDING)]),
+    ("drawings", "project_drawings", {"under_review": True, "is_approved": {"$ne": True}, "deleted_at": None}, None),
+    ("reminders", "project_drawings", {"next_reminder_at": {"$lte": "probe"}, "under_review": {"$in": [True, 1, "true"]}}, [("next_reminder_at", ASCENDING)]),
+    ("drawings", "drawing_comments", {"drawing_id": "probe", "deleted_at": None}, [("created_at", DESCENDING)]),
+    ("comments", "project_comments", {"project_id": "probe"}, [("created_at", DESCENDING)]),
+    ("dashboard", "project_drawings", {"status": {"$in": ["planned", "in_progress"]}, "deleted_at": None}, None),
+    ("dashboard", "project_drawings", {"state": "uploaded_waiting_approval", "deleted_at": None}, [("due_date", ASCENDING)]),
+    ("dashboard", "project_drawings", {"state": {"$in": ["revision_required", "uploaded_waiting_approval"]}, "project_id": {"$in": ["probe"]}}, None),
+    ("notifications", "notifications", {"user_id": "probe"}, [("created_at", DESCENDING)]),
+    ("notifications", "notifications", {"user_id": "probe", "is_read": False}, None),
+    ("clients", "clients", {"id": "probe"}, None),
+    ("contractors", "contractors", {"id": "probe"}, None),
+    ("consultants", "consultants", {"id": "probe"}, None),
+    ("ops", "notification_logs", {"channel": "whatsapp", "success": False}, [("timestamp", DESCENDING)]),
+    ("outbox", "notification_outbox", {"status": "pending", "next_attempt_at": {"$lte": "probe"}}, [("next_attempt_at", ASCENDING)]),
+    ("outbox", "notification_outbox", {"status": "processing", "lease_expires_at": {"$lte": "probe"}}, None),
+    ("uploads", "blob_links", {"urls": "/api/uploads/probe"}, None),
+    ("uploads", "blob_links", {"path": "probe"}, None),
+    ("resources", "resources", {"id": "probe"}, None),
+    ("ops", "job_runs", {"job": "probe"}, [("started_at", DESCENDING)]),
+    ("projects", "project_stats", {"project_id": {"$in": ["probe"]}}, None),
+]
+
+
+async def ensure_indexes(db=None) -> Dict[str, Any]:
+    """
+    Apply the index manifest. Safe to run repeatedly: existing indexes
+    with identical definitions are left alone, and conflicting ones are
+    reported rather than dropped.
+    """
+    db = db if db is not None else get_database()
+    by_collection: Dict[str, List[IndexSpec]] = {}
+    for spec in INDEX_MANIFEST:
+        by_collection.setdefault(spec.collection, []).append(spec)
+
+    created, failed = [], []
+    for collection, specs in by_collection.items():
+        for spec in specs:
+            try:
+                await db[collection].create_indexes([spec.to_model()])
+                created.append(f"{collection}.{spec.name}")
+            except OperationFailure as e:
+                logger.warning(f"Index {collection}.{spec.name} not applied: {e}")
+                failed.append({"index": f"{collection}.{spec.name}", "error": str(e)})
+
+    logger.info(f"Index manifest applied: {len(created)} ok, {len(failed)} failed")
+    return {"applied": created, "failed": failed}
+
+
+def _plan_stages(plan: dict) -> List[str]:
+    """Flatten the stage names of an explain() plan tree"""
+    stages = [plan.get("stage")] if plan.get("stage") else []
+    if "inputStage" in plan:
+        stages.extend(_plan_stages(plan["inputStage"]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    if "queryPlan" in plan:
+        stages.extend(_plan_stages(plan["queryPlan"]))
+    return stages
+
+
+async def explain_coverage(db=None) -> Dict[str, Any]:
+    """
+    Run explain() on every probe query and flag collection scans.
+    """
+    db = db if db is not None else get_database()
+    results = []
+    for router, collection, query, sort in QUERY_PROBES:
+        find = {"find": collection, "filter": query}
+        if sort:
+            find["sort"] = dict(sort)
+        entry = {"router": router, "collection": collection, "filter": query, "sort": find.get("sort")}
+        try:
+            explained = await db.command({"explain": find, "verbosity": "queryPlanner"})
+            winning = explained.get("queryPlanner", {}).get("winningPlan", {})
+            stages = _plan_stages(winning)
+            entry["stages"] = stages
+            entry["collscan"] = "COLLSCAN" in stages
+            entry["in_memory_sort"] = "SORT" in stages
+        except OperationFailure as e:
+            entry["error"] = str(e)
+        results.append(entry)
+
+    collscans = [r for r in results if r.get("collscan")]
+    return {
+        "total_probes": len(results),
+        "collscan_count": len(collscans),
+        "ok": not collscans,
+        "probes": results,
+    }
+
+
+async def _main(report: bool):
+    from utils.database import close_database
+
+    try:
+        if report:
+            coverage = await explain_coverage()
+            for probe in coverage["probes"]:
+                flag = "COLLSCAN" if probe.get("collscan") else ("ERROR" if probe.get("error") else "ok")
+                print(f"[{flag:8}] {probe['router']:14} {probe['collection']}: {probe['filter']}")
+            print(f"{coverage['collscan_count']} of {coverage['total_probes']} probes use a collection scan")
+        else:
+            result = await ensure_indexes()
+            print(f"Applied {len(result['applied'])} indexes, {len(result['failed'])} failed")
+            for failure in result["failed"]:
+                print(f"  {failure['index']}: {failure['error']}")
+    finally:
+        close_database()
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main(report="--report" in sys.argv))
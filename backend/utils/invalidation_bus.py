@@ -0,0 +1,271 @@
+"""
+Cache Invalidation Bus
+Broadcasts cache invalidations to every app worker.
+
+Each worker keeps its own in-process caches (cache_service, the
+principal cache). Invalidations go through ``invalidation_bus.publish``,
+which applies them locally right away and appends them to the capped
+``cache_invalidations`` collection; every worker tails that collection
+with a tailable, awaiting cursor and applies messages from other
+workers through the handler registered for their kind.
+
+Messages are idempotent, so the subscriber re-reads a short window
+(INVALIDATION_REPLAY_SECONDS) whenever it reopens its cursor, which
+covers ObjectId clock skew between hosts; ids already applied are
+skipped. Whenever a worker may have missed messages (its cursor failed,
+or its outgoing queue overflowed) it runs the registered resync
+handlers, which drop local caches wholesale instead of risking stale
+reads.
+
+Publishing never waits on the database: messages are queued and written
+in batches by a background task. When the bus is not started (scripts,
+INVALIDATION_BUS_ENABLED=false) invalidations are local only.
+"""
+
+import os
+import socket
+import asyncio
+import logging
+from uuid import uuid4
+from collections import OrderedDict, deque
+from datetime import datetime, timezone, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+
+from utils.database import get_database
+
+logger = logging.getLogger(__name__)
+
+db = get_database()
+
+COLLECTION_NAME = "cache_invalidations"
+CAPPED_SIZE_BYTES = int(os.environ.get('INVALIDATION_BUS_SIZE_BYTES', 16 * 1024 * 1024))
+REPLAY_SECONDS = float(os.environ.get('INVALIDATION_REPLAY_SECONDS', '5'))
+# Queued messages beyond this collapse into a single resync broadcast
+MAX_PENDING = int(os.environ.get('INVALIDATION_BUS_MAX_PENDING', '5000'))
+PUBLISH_BATCH_SIZE = 500
+RETRY_SECONDS = 2
+
+KIND_RESYNC = "resync"
+KIND_HELLO = "hello"
+
+ORIGIN = f"{socket.gethostname()}:{os.getpid()}:{uuid4().hex[:6]}"
+
+
+class InvalidationBus:
+    """Publish/subscribe of cache invalidation messages over a capped collection"""
+
+    def __init__(self, collection_name: str = COLLECTION_NAME):
+        self.collection_name = collection_name
+        self._handlers: Dict[str, Callable[[dict], Any]] = {}
+        self._resync_handlers: List[Callable[[], Any]] = []
+        self._pending: deque = deque()
+        self._overflowed = False
+        self._seen: "OrderedDict[ObjectId, None]" = OrderedDict()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tasks: List[asyncio.Task] = []
+        self.connected = False
+        self.published = 0
+        self.received = 0
+        self.applied = 0
+        self.handler_errors = 0
+        self.resyncs = 0
+        self.last_received_at: Optional[datetime] = None
+
+    @property
+    def collection(self):
+        return db[self.collection_name]
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    # ----- registration -----
+
+    def register(self, kind: str, handler: Callable[[dict], Any]):
+        """Handle messages of ``kind`` (``handler(data)``, synchronous) on every worker"""
+        self._handlers[kind] = handler
+
+    def on_resync(self, handler: Callable[[], Any]):
+        """Run ``handler()`` when this worker may have missed invalidations"""
+        self._resync_handlers.append(handler)
+
+    # ----- publishing -----
+
+    def publish(self, kind: str, **data) -> Any:
+        """
+        Apply an invalidation locally and broadcast it to the other
+        workers; returns the local handler's result.
+        """
+        result = self._apply(kind, data)
+        if self.running:
+            if len(self._pending) >= MAX_PENDING:
+                # Can't keep up (database unreachable): tell everyone to drop their caches instead
+                self._pending.clear()
+                self._overflowed = True
+            else:
+                self._pending.append(self._message(kind, data))
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+        return result
+
+    def _message(self, kind: str, data: dict) -> dict:
+        return {"kind": kind, "origin": ORIGIN, "data": data, "at": datetime.now(timezone.utc)}
+
+    async def _publish_loop(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._pending or self._overflowed:
+                if self._overflowed:
+                    batch = [self._message(KIND_RESYNC, {})]
+                else:
+                    batch = [self._pending[i] for i in range(min(PUBLISH_BATCH_SIZE, len(self._pending)))]
+                try:
+                    await self.collection.insert_many(batch, ordered=True)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logger.warning(f"Invalidation bus publish failed ({len(batch)} messages): {e}")
+                    await asyncio.sleep(RETRY_SECONDS)
+                    continue
+                if self._overflowed:
+                    self._overflowed = False
+                else:
+                    for _ in batch:
+                        self._pending.popleft()
+                self.published += len(batch)
+
+    # ----- subscribing -----
+
+    def _apply(self, kind: str, data: dict) -> Any:
+        if kind == KIND_RESYNC:
+            self._resync()
+            return None
+        handler = self._handlers.get(kind)
+        if handler is None:
+            return None
+        try:
+            result = handler(data)
+            self.applied += 1
+            return result
+        except Exception as e:
+            self.handler_errors += 1
+            logger.error(f"Invalidation handler for '{kind}' failed: {e}")
+            return None
+
+    def _resync(self):
+        self.resyncs += 1
+        for handler in self._resync_handlers:
+            try:
+                handler()
+            except Exception as e:
+                logger.error(f"Invalidation resync handler failed: {e}")
+
+    def _mark_seen(self, message_id: ObjectId) -> bool:
+        """Record a message id; False if it was already applied"""
+        if message_id in self._seen:
+            return False
+        self._seen[message_id] = None
+        while len(self._seen) > 10000:
+            self._seen.popitem(last=False)
+        return True
+
+    async def _tail(self, since: datetime) -> datetime:
+        """Apply messages from ``since`` on until the cursor dies; returns the resume point"""
+        cursor = self.collection.find(
+            {"_id": {"$gte": ObjectId.from_datetime(since)}},
+            cursor_type=CursorType.TAILABLE_AWAIT
+        )
+        while cursor.alive:
+            async for message in cursor:
+                since = message["_id"].generation_time - timedelta(seconds=REPLAY_SECONDS)
+                if not self._mark_seen(message["_id"]) or message.get("origin") == ORIGIN:
+                    continue
+                self.received += 1
+                self.last_received_at = message.get("at")
+                self._apply(message.get("kind"), message.get("data") or {})
+            # No new messages within the await timeout; the cursor stays open
+            await asyncio.sleep(0.1)
+        return since
+
+    async def _subscribe_loop(self):
+        since = datetime.now(timezone.utc) - timedelta(seconds=REPLAY_SECONDS)
+        while True:
+            try:
+                self.connected = True
+                since = await self._tail(since)
+                # Dead cursor (e.g. no match yet when it was opened): reopen shortly
+                await asyncio.sleep(1)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Invalidation bus subscription lost: {e}")
+                if self.connected:
+                    self.connected = False
+                    # Messages may have been missed while disconnected
+                    self._resync()
+                await asyncio.sleep(RETRY_SECONDS)
+
+    # ----- lifecycle -----
+
+    async def _ensure_collection(self):
+        try:
+            await db.create_collection(self.collection_name, capped=True, size=CAPPED_SIZE_BYTES)
+            logger.info(f"Created capped collection {self.collection_name}")
+        except CollectionInvalid:
+            pass
+        options = await self.collection.options()
+        if not options.get("capped"):
+            raise RuntimeError(f"{self.collection_name} exists but is not a capped collection")
+        # Tailable cursors die immediately on an empty collection
+        await self.collection.insert_one(self._message(KIND_HELLO, {}))
+
+    async def start(self):
+        if self.running:
+            return
+        await self._ensure_collection()
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.create_task(self._publish_loop()),
+            asyncio.create_task(self._subscribe_loop()),
+        ]
+        logger.info(f"Invalidation bus started on {ORIGIN}")
+
+    async def stop(self):
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Flush what is still queued so other workers don't keep stale entries
+        if self._pending:
+            try:
+                await self.collection.insert_many(list(self._pending), ordered=True)
+                self.published += len(self._pending)
+            except Exception as e:
+                logger.warning(f"Could not flush {len(self._pending)} invalidations on shutdown: {e}")
+            self._pending.clear()
+        self.connected = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "origin": ORIGIN,
+            "running": self.running,
+            "connected": self.connected,
+            "pending": len(self._pending),
+            "published": self.published,
+            "received": self.received,
+            "applied": self.applied,
+            "handler_errors": self.handler_errors,
+            "resyncs": self.resyncs,
+            "last_received_at": self.last_received_at.isoformat() if self.last_received_at else None,
+            "kinds": sorted(self._handlers),
+        }
+
+
+# Singleton instance
+invalidation_bus = InvalidationBus()
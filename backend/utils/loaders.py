@@ -0,0 +1,182 @@
+"""
+Request-Scoped Batch Loaders
+DataLoader-style lookups of users, clients, contractors and consultants
+by id.
+
+``loader.load(id)`` does not query right away: ids requested during the
+same event-loop tick (typically the branches of an ``asyncio.gather``,
+including nested ones) are collected and resolved with a single ``{"id": {"$in": [...]}}`` find
+per collection. Results are memoized, so the same person asked for
+twice during a request is fetched once.
+
+Loaders live for one HTTP request: RequestLoaderMiddleware opens a fresh
+scope per request and ``get_loaders()`` returns it. Outside a request
+(jobs, scripts) ``get_loaders()`` returns a new, unshared set unless the
+caller opens its own ``loader_scope()``; nothing is memoized across
+requests, so there is no invalidation to worry about.
+
+Returned documents are copies, so callers may annotate them freely.
+"""
+
+import asyncio
+import logging
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, List, Optional
+
+from utils.database import get_database
+
+logger = logging.getLogger(__name__)
+
+db = get_database()
+
+MAX_BATCH_SIZE = 500
+
+# Fields never handed out by a loader
+LOADER_PROJECTIONS = {
+    "users": {"_id": 0, "password_hash": 0},
+}
+DEFAULT_PROJECTION = {"_id": 0}
+
+
+class BatchLoader:
+    """Batched, memoized lookups of one collection by a key field"""
+
+    def __init__(self, collection: str, key: str = "id", projection: Optional[dict] = None):
+        self.collection = collection
+        self.key = key
+        self.projection = projection or LOADER_PROJECTIONS.get(collection, DEFAULT_PROJECTION)
+        self._memo: Dict[Any, asyncio.Future] = {}
+        self._queue: List[Any] = []
+        self._scheduled = False
+        self._queued_at_check = 0
+
+    async def load(self, value: Any) -> Optional[dict]:
+        """The document whose key equals ``value``, or None"""
+        if value is None:
+            return None
+        future = self._memo.get(value)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._memo[value] = future
+            self._queue.append(value)
+            if not self._scheduled:
+                self._scheduled = True
+                self._queued_at_check = 0
+                loop.call_soon(self._dispatch)
+        doc = await asyncio.shield(future)
+        return dict(doc) if doc is not None else None
+
+    async def load_many(self, values: Iterable[Any]) -> Dict[Any, dict]:
+        """Documents for ``values`` keyed by value; missing ones are left out"""
+        values = list(dict.fromkeys(v for v in values if v is not None))
+        docs = await asyncio.gather(*(self.load(v) for v in values))
+        return {value: doc for value, doc in zip(values, docs) if doc is not None}
+
+    def _dispatch(self):
+        # Wait out ticks that still add ids (loads from nested gathers land a tick later)
+        if len(self._queue) != self._queued_at_check and len(self._queue) < MAX_BATCH_SIZE:
+            self._queued_at_check = len(self._queue)
+            asyncio.get_running_loop().call_soon(self._dispatch)
+            return
+        values, self._queue = self._queue, []
+        self._scheduled = False
+        for start in range(0, len(values), MAX_BATCH_SIZE):
+            asyncio.ensure_future(self._fetch(values[start:start + MAX_BATCH_SIZE]))
+
+    async def _fetch(self, values: List[Any]):
+        futures = {value: self._memo[value] for value in values}
+        try:
+            docs = await db[self.collection].find(
+                {self.key: {"$in": values}}, self.projection
+            ).to_list(None)
+        except Exception as e:
+            logger.warning(f"Batch load of {len(values)} {self.collection} failed: {e}")
+            for value, future in futures.items():
+                # Not memoized, so a later load retries
+                if self._memo.get(value) is future:
+                    del self._memo[value]
+                if not future.done():
+                    future.set_exception(e)
+                    # Waiters re-raise it; don't warn about an unretrieved exception
+                    future.exception()
+            return
+
+        found: Dict[Any, dict] = {}
+        for doc in docs:
+            found.setdefault(doc.get(self.key), doc)
+        for value, future in futures.items():
+            if not future.done():
+                future.set_result(found.get(value))
+
+
+class RequestLoaders:
+    """The batch loaders of one request, created on first use"""
+
+    def __init__(self):
+        self._loaders: Dict[tuple, BatchLoader] = {}
+
+    def loader(self, collection: str, key: str = "id") -> BatchLoader:
+        loader = self._loaders.get((collection, key))
+        if loader is None:
+            loader = self._loaders[(collection, key)] = BatchLoader(collection, key)
+        return loader
+
+    @property
+    def users(self) -> BatchLoader:
+        return self.loader("users")
+
+    @property
+    def clients(self) -> BatchLoader:
+        return self.loader("clients")
+
+    @property
+    def contractors(self) -> BatchLoader:
+        return self.loader("contractors")
+
+    @property
+    def consultants(self) -> BatchLoader:
+        return self.loader("consultants")
+
+    async def find_first(self, value: Any, *collections: str) -> Optional[dict]:
+        """
+        The document with id ``value`` from the first of ``collections``
+        that has one. All collections are asked in the same batch.
+        """
+        if value is None:
+            return None
+        docs = await asyncio.gather(*(self.loader(c).load(value) for c in collections))
+        return next((doc for doc in docs if doc is not None), None)
+
+
+_current: ContextVar[Optional[RequestLoaders]] = ContextVar("request_loaders", default=None)
+
+
+def get_loaders() -> RequestLoaders:
+    """The current request's loaders (a fresh, unshared set outside a scope)"""
+    return _current.get() or RequestLoaders()
+
+
+@contextmanager
+def loader_scope():
+    """Share one set of loaders for the duration of the block"""
+    token = _current.set(RequestLoaders())
+    try:
+        yield _current.get()
+    finally:
+        _current.reset(token)
+
+
+class RequestLoaderMiddleware:
+    """ASGI middleware giving every HTTP request its own loader scope"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        with loader_scope():
+            await self.app(scope, receive, send)
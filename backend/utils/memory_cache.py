@@ -0,0 +1,335 @@
+"""
+In-Process Memory Cache
+Sharded, bounded LRU cache engine behind cache_service (and the older
+cache module).
+
+Keys hash to one of N shards, each an OrderedDict in LRU order with its
+own entry and byte budget (the configured totals divided by N). Reads
+take no lock: a dict lookup, an expiry check and a move_to_end. Writes,
+evictions and invalidations take the shard's lock, a plain threading
+lock that is never held across an await, so the sync API is also safe
+from executor threads.
+
+Entries carry tags; ``invalidate_tag`` drops every entry with that tag
+through a per-shard tag index instead of scanning keys. ``get_or_load``
+coalesces concurrent misses for the same key onto one loader call, and
+a load that is invalidated while in flight is returned to its callers
+but not stored. The load runs in its own task, so a caller that is
+cancelled stops waiting without cancelling the load for the others.
+
+Sizes are estimates (sys.getsizeof over containers, sampled for large
+ones), good enough to keep a few large dashboard payloads from
+crowding out everything else.
+"""
+
+import sys
+import time
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+# Containers longer than this are sized from a sample of their items
+_SIZE_SAMPLE = 64
+_SIZE_MAX_DEPTH = 8
+
+
+def approx_size(value: Any, _depth: int = 0) -> int:
+    """Rough deep size of a JSON-like value in bytes"""
+    size = sys.getsizeof(value)
+    if _depth >= _SIZE_MAX_DEPTH:
+        return size
+    if isinstance(value, dict):
+        items = list(value.items())
+        if not items:
+            return size
+        sample = items[:_SIZE_SAMPLE]
+        sampled = sum(approx_size(k, _depth + 1) + approx_size(v, _depth + 1) for k, v in sample)
+        return size + sampled * len(items) // len(sample)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = value if isinstance(value, (list, tuple)) else list(value)
+        if not items:
+            return size
+        sample = items[:_SIZE_SAMPLE]
+        sampled = sum(approx_size(v, _depth + 1) for v in sample)
+        return size + sampled * len(items) // len(sample)
+    return size
+
+
+class _Entry:
+    __slots__ = ("value", "expires_at", "size", "tags")
+
+    def __init__(self, value: Any, expires_at: float, size: int, tags: frozenset):
+        self.value = value
+        self.expires_at = expires_at
+        self.size = size
+        self.tags = tags
+
+
+class _Shard:
+    __slots__ = ("entries", "tags", "bytes", "lock")
+
+    def __init__(self):
+        self.entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self.tags: Dict[str, Set[str]] = {}
+        self.bytes = 0
+        self.lock = threading.Lock()
+
+    def remove(self, key: str) -> Optional[_Entry]:
+        """Drop an entry and its tag index references (caller holds the lock)"""
+        entry = self.entries.pop(key, None)
+        if entry is None:
+            return None
+        self.bytes -= entry.size
+        for tag in entry.tags:
+            keys = self.tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.tags[tag]
+        return entry
+
+
+def _retrieve_exception(task: asyncio.Task):
+    # Every caller may have gone away; don't warn about an unretrieved exception
+    if not task.cancelled():
+        task.exception()
+
+
+class ShardedLRUCache:
+    """TTL cache with per-shard LRU eviction, tag invalidation and single-flight loads"""
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024, shards: int = 16):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._shards = [_Shard() for _ in range(max(1, shards))]
+        self._shard_entries = max(1, max_entries // len(self._shards))
+        self._shard_bytes = max(1, max_bytes // len(self._shards))
+        # key -> (load task, tags); only touched on the event loop thread
+        self._inflight: Dict[str, tuple] = {}
+        self._stale_loads: Set[str] = set()
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.coalesced = 0
+        self.load_errors = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.rejected = 0
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    # Reads
+
+    def _lookup(self, key: str) -> Any:
+        shard = self._shard(key)
+        entry = shard.entries.get(key)
+        if entry is None:
+            return _MISSING
+        if entry.expires_at <= time.monotonic():
+            with shard.lock:
+                if shard.entries.get(key) is entry:
+                    shard.remove(key)
+                    self.expirations += 1
+            return _MISSING
+        try:
+            shard.entries.move_to_end(key)
+        except KeyError:
+            # Evicted by another thread between the lookup and here
+            pass
+        return entry.value
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Cached value for ``key``, or ``default`` on a miss or expiry"""
+        value = self._lookup(key)
+        if value is _MISSING:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def __contains__(self, key: str) -> bool:
+        entry = self._shard(key).entries.get(key)
+        return entry is not None and entry.expires_at > time.monotonic()
+
+    # Writes
+
+    def set(self, key: str, value: Any, ttl_seconds: float, tags: Iterable[str] = ()):
+        """Cache ``value`` for ``ttl_seconds``, evicting least recently used entries over budget"""
+        if ttl_seconds <= 0:
+            self.delete(key)
+            return
+        size = approx_size(key) + approx_size(value)
+        if size > self._shard_bytes:
+            self.rejected += 1
+            self.delete(key)
+            logger.debug(f"Not caching {key}: ~{size} bytes exceeds the per-shard budget")
+            return
+
+        entry = _Entry(value, time.monotonic() + ttl_seconds, size, frozenset(tags))
+        shard = self._shard(key)
+        with shard.lock:
+            shard.remove(key)
+            shard.entries[key] = entry
+            shard.bytes += size
+            for tag in entry.tags:
+                shard.tags.setdefault(tag, set()).add(key)
+            while shard.entries and (
+                len(shard.entries) > self._shard_entries or shard.bytes > self._shard_bytes
+            ):
+                oldest = next(iter(shard.entries))
+                shard.remove(oldest)
+                self.evictions += 1
+
+    def delete(self, key: str) -> bool:
+        """Drop one key; a load in flight for it will not be stored"""
+        if key in self._inflight:
+            self._stale_loads.add(key)
+        shard = self._shard(key)
+        with shard.lock:
+            removed = shard.remove(key) is not None
+        if removed:
+            self.invalidations += 1
+        return removed
+
+    def invalidate_tag(self, *tags: str) -> int:
+        """Drop every entry carrying any of ``tags``; returns how many were removed"""
+        wanted = set(tags)
+        for key, (_, load_tags) in self._inflight.items():
+            if wanted & load_tags:
+                self._stale_loads.add(key)
+
+        removed = 0
+        for shard in self._shards:
+            if not any(tag in shard.tags for tag in wanted):
+                continue
+            with shard.lock:
+                for tag in wanted:
+                    for key in list(shard.tags.get(tag, ())):
+                        if shard.remove(key) is not None:
+                            removed += 1
+        self.invalidations += removed
+        return removed
+
+    def invalidate_prefix(self, prefix: str) -> int:
+        """Drop every key starting with ``prefix`` (a full scan; prefer tags)"""
+        for key in self._inflight:
+            if key.startswith(prefix):
+                self._stale_loads.add(key)
+
+        removed = 0
+        for shard in self._shards:
+            with shard.lock:
+                for key in [k for k in shard.entries if k.startswith(prefix)]:
+                    shard.remove(key)
+                    removed += 1
+        self.invalidations += removed
+        return removed
+
+    def clear(self):
+        """Drop every entry"""
+        self._stale_loads.update(self._inflight)
+        for shard in self._shards:
+            with shard.lock:
+                shard.entries.clear()
+                shard.tags.clear()
+                shard.bytes = 0
+
+    def purge_expired(self) -> int:
+        """Remove expired entries; returns how many were removed"""
+        now = time.monotonic()
+        removed = 0
+        for shard in self._shards:
+            with shard.lock:
+                for key in [k for k, e in shard.entries.items() if e.expires_at <= now]:
+                    shard.remove(key)
+                    removed += 1
+        self.expirations += removed
+        return removed
+
+    # Single-flight loading
+
+    async def get_or_load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl_seconds: float,
+        tags: Iterable[str] = (),
+        cache_none: bool = False
+    ) -> Any:
+        """
+        Cached value for ``key``, or the result of ``await loader()`` on a
+        miss. Concurrent misses for the same key share one loader call.
+        ``None`` results are not cached unless ``cache_none`` is set.
+        """
+        value = self._lookup(key)
+        if value is not _MISSING:
+            self.hits += 1
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight:
+            self.coalesced += 1
+            return await asyncio.shield(inflight[0])
+
+        self.misses += 1
+        self.loads += 1
+        # The load runs in its own task so that cancelling the caller that
+        # started it (a client disconnecting) doesn't cancel the waiters
+        task = asyncio.ensure_future(self._load(key, loader, ttl_seconds, tags, cache_none))
+        task.add_done_callback(_retrieve_exception)
+        self._inflight[key] = (task, frozenset(tags))
+        return await asyncio.shield(task)
+
+    async def _load(
+        self,
+        key: str,
+        loader: Callable[[], Awaitable[Any]],
+        ttl_seconds: float,
+        tags: Iterable[str],
+        cache_none: bool
+    ) -> Any:
+        try:
+            value = await loader()
+            if key not in self._stale_loads and (value is not None or cache_none):
+                self.set(key, value, ttl_seconds, tags)
+            return value
+        except asyncio.CancelledError:
+            raise
+        except BaseException:
+            self.load_errors += 1
+            raise
+        finally:
+            self._inflight.pop(key, None)
+            self._stale_loads.discard(key)
+
+    # Metrics
+
+    def stats(self) -> Dict[str, Any]:
+        entries = sum(len(s.entries) for s in self._shards)
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "bytes": sum(s.bytes for s in self._shards),
+            "max_bytes": self.max_bytes,
+            "shards": len(self._shards),
+            "tags": sum(len(s.tags) for s in self._shards),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+            "loads": self.loads,
+            "coalesced": self.coalesced,
+            "load_errors": self.load_errors,
+            "inflight": len(self._inflight),
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,176 @@
+"""
+Authenticated Principal Cache
+Bounded, short-TTL per-process cache of resolved users for the auth
+dependencies, so parallel dashboard calls don't each hit db.users.
+
+Entries are keyed by token subject (JWT email/id or session token) and
+indexed by user id and email so writes to a user record can drop every
+cached principal for that user. Those invalidations are broadcast to the
+other workers through utils.invalidation_bus.
+"""
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
+
+from utils.invalidation_bus import invalidation_bus
+
+logger = logging.getLogger(__name__)
+
+
+class _Entry:
+    __slots__ = ("value", "user_id", "email", "expires_at")
+
+    def __init__(self, value: Any, user_id: str, email: Optional[str], expires_at: float):
+        self.value = value
+        self.user_id = user_id
+        self.email = email
+        self.expires_at = expires_at
+
+
+class PrincipalCache:
+    """
+    LRU cache of resolved principals.
+
+    All operations are synchronous and run on the event loop thread, so no
+    locking is needed.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 30):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._by_user: Dict[str, Set[str]] = {}
+        self._by_email: Dict[str, Set[str]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Get a cached principal, or None on miss/expiry"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def set(self, key: str, value: Any, user_id: str, email: Optional[str] = None,
+            expires_at: Optional[float] = None):
+        """
+        Cache a principal. ``expires_at`` (monotonic seconds) caps the
+        entry lifetime below the TTL, e.g. for sessions about to expire.
+        """
+        if self.max_entries <= 0:
+            return
+        deadline = time.monotonic() + self.ttl_seconds
+        if expires_at is not None:
+            deadline = min(deadline, expires_at)
+
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = _Entry(value, user_id, email, deadline)
+        self._by_user.setdefault(user_id, set()).add(key)
+        if email:
+            self._by_email.setdefault(email.lower(), set()).add(key)
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._by_user.get(entry.user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[entry.user_id]
+        if entry.email:
+            keys = self._by_email.get(entry.email.lower())
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._by_email[entry.email.lower()]
+
+    def invalidate_key(self, key: str):
+        """Drop a single cached principal (e.g. on logout)"""
+        if key in self._entries:
+            self._remove(key)
+            self.invalidations += 1
+
+    def invalidate_user(self, user_id: Optional[str] = None, email: Optional[str] = None):
+        """Drop every cached principal for a user (by id and/or email)"""
+        keys: Set[str] = set()
+        if user_id:
+            keys |= self._by_user.get(user_id, set())
+        if email:
+            keys |= self._by_email.get(email.lower(), set())
+        for key in keys:
+            self._remove(key)
+        self.invalidations += len(keys)
+
+    def clear(self):
+        """Drop every cached principal"""
+        self._entries.clear()
+        self._by_user.clear()
+        self._by_email.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss counters"""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+# Singleton instance
+principal_cache = PrincipalCache(
+    max_entries=int(os.environ.get("PRINCIPAL_CACHE_MAX_ENTRIES", "1024")),
+    ttl_seconds=float(os.environ.get("PRINCIPAL_CACHE_TTL", "30")),
+)
+
+
+def session_deadline(expires_at) -> float:
+    """Convert an absolute session expiry datetime into a monotonic deadline"""
+    from datetime import datetime, timezone
+    remaining = (expires_at - datetime.now(timezone.utc)).total_seconds()
+    return time.monotonic() + max(remaining, 0)
+
+
+KIND_USER = "principal.user"
+KIND_KEYS = "principal.keys"
+
+invalidation_bus.register(
+    KIND_USER, lambda data: principal_cache.invalidate_user(user_id=data.get("user_id"), email=data.get("email"))
+)
+invalidation_bus.register(
+    KIND_KEYS, lambda data: [principal_cache.invalidate_key(key) for key in data["keys"]]
+)
+invalidation_bus.on_resync(principal_cache.clear)
+
+
+def invalidate_user(user_id: Optional[str] = None, email: Optional[str] = None):
+    """Invalidate cached principals after a write to the user record (on every worker)"""
+    invalidation_bus.publish(KIND_USER, user_id=user_id, email=email)
+
+
+def invalidate_session(token: str):
+    """Invalidate cached principals resolved from a session token (on every worker)"""
+    invalidation_bus.publish(KIND_KEYS, keys=[f"{namespace}:session:{token}" for namespace in ("server", "auth")])
@@ -6,12 +6,13 @@ import secrets
 import string
 from datetime import datetime, timezone, timedelta
 from typing import Optional, Tuple
-from sendgrid import SendGridAPIClient
 from sendgrid.helpers.mail import Mail, Email
 from twilio.rest import Client
+from integrations.twilio_transport import twilio_transport
+from integrations.sendgrid_transport import sendgrid_transport
 
 # Initialize clients
-sendgrid_client = SendGridAPIClient(os.getenv('SENDGRID_API_KEY'))
+# Sync client is only used for the Verify API; messages go through twilio_transport
 twilio_client = Client(os.getenv('TWILIO_ACCOUNT_SID'), os.getenv('TWILIO_AUTH_TOKEN'))
 
 # Email sender with display name
@@ -106,7 +107,7 @@ async def send_verification_email(
             html_content=html_content
         )
         
-        response = sendgrid_client.send(message)
+        response = await sendgrid_transport.send(message)
         
         if response.status_code in [200, 201, 202]:
             return True, None
@@ -138,7 +139,7 @@ This code will expire in 1 hour.
 
 If you didn't request this, please ignore this message."""
         
-        message = twilio_client.messages.create(
+        message = await twilio_transport.create_message(
             body=message_body,
             from_=from_number,
             to=phone_number
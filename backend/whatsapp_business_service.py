@@ -6,6 +6,8 @@ import os
 import httpx
 import logging
 
+from integrations.http_clients import request_with_retry
+
 logger = logging.getLogger(__name__)
 
 class WhatsAppBusinessService:
@@ -58,33 +60,32 @@ class WhatsAppBusinessService:
             
             logger.info(f"Sending WhatsApp message to {to[:8]}...")
             
-            async with httpx.AsyncClient() as client:
-                response = await client.post(
-                    self.base_url,
-                    headers=headers,
-                    json=payload,
-                    timeout=30.0
-                )
-                
-                response_data = response.json()
+            response = await request_with_retry(
+                "whatsapp_business", "POST", self.base_url,
+                headers=headers,
+                json=payload,
+                timeout=30.0
+            )
+            
+            response_data = response.json()
+            
+            if response.status_code == 200:
+                message_id = response_data.get('messages', [{}])[0].get('id', 'unknown')
+                logger.info(f"WhatsApp message sent successfully: {message_id}")
+                return {
+                    'success': True,
+                    'message_id': message_id,
+                    'status': 'sent'
+                }
+            else:
+                error_message = response_data.get('error', {}).get('message', 'Unknown error')
+                logger.error(f"WhatsApp API error: {error_message}")
+                return {
+                    'success': False,
+                    'error': error_message,
+                    'status_code': response.status_code
+                }
                 
-                if response.status_code == 200:
-                    message_id = response_data.get('messages', [{}])[0].get('id', 'unknown')
-                    logger.info(f"WhatsApp message sent successfully: {message_id}")
-                    return {
-                        'success': True,
-                        'message_id': message_id,
-                        'status': 'sent'
-                    }
-                else:
-                    error_message = response_data.get('error', {}).get('message', 'Unknown error')
-                    logger.error(f"WhatsApp API error: {error_message}")
-                    return {
-                        'success': False,
-                        'error': error_message,
-                        'status_code': response.status_code
-                    }
-                    
         except httpx.TimeoutException:
             logger.error(f"WhatsApp API timeout for {to}")
             return {
@@ -8,8 +8,6 @@ import re
 import logging
 from typing import Optional, Dict, List
 from datetime import datetime, timezone
-from twilio.rest import Client
-from twilio.base.exceptions import TwilioRestException
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -17,6 +15,8 @@ from dotenv import load_dotenv
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+from integrations.twilio_transport import twilio_transport, TwilioError
+
 logger = logging.getLogger(__name__)
 
 
@@ -34,13 +34,9 @@ class WhatsAppNotificationService:
             logger.warning("Twilio credentials not found - WhatsApp notifications will be disabled")
             self.client = None
         else:
-            try:
-                self.client = Client(self.account_sid, self.auth_token)
-                logger.info("✅ WhatsApp Notification Service initialized (Sandbox mode)")
-                logger.info(f"   Using WhatsApp number: {self.whatsapp_number}")
-            except Exception as e:
-                logger.error(f"Failed to initialize Twilio client: {str(e)}")
-                self.client = None
+            self.client = twilio_transport
+            logger.info("✅ WhatsApp Notification Service initialized (Sandbox mode)")
+            logger.info(f"   Using WhatsApp number: {self.whatsapp_number}")
     
     def validate_indian_phone(self, phone_number: str) -> bool:
         """
@@ -99,7 +95,7 @@ class WhatsAppNotificationService:
         logger.error(f"Invalid phone number format: {phone_number}")
         return None
     
-    def send_message(
+    async def send_message(
         self,
         to_number: str,
         message_body: str,
@@ -141,10 +137,10 @@ class WhatsAppNotificationService:
             
             # Add media if provided
             if media_url:
-                message_params["media_url"] = [media_url]
+                message_params["media_url"] = media_url
             
             # Send message
-            message = self.client.messages.create(**message_params)
+            message = await self.client.create_message(**message_params)
             
             logger.info(f"WhatsApp message sent successfully. SID: {message.sid}, To: {normalized_number}")
             
@@ -157,7 +153,7 @@ class WhatsAppNotificationService:
                 "sent_at": datetime.now(timezone.utc).isoformat()
             }
         
-        except TwilioRestException as e:
+        except TwilioError as e:
             logger.error(f"Twilio error sending WhatsApp message: {e.msg} (Code: {e.code})")
             return {
                 "success": False,
@@ -172,7 +168,7 @@ class WhatsAppNotificationService:
                 "error": str(e)
             }
     
-    def send_bulk_messages(
+    async def send_bulk_messages(
         self,
         recipients: List[str],
         message_body: str,
@@ -197,7 +193,7 @@ class WhatsAppNotificationService:
         }
         
         for phone_number in recipients:
-            result = self.send_message(phone_number, message_body, media_url)
+            result = await self.send_message(phone_number, message_body, media_url)
             
             if result["success"]:
                 results["success"] += 1
@@ -12,20 +12,19 @@ Flow:
 """
 
 import os
+import asyncio
 import logging
 from typing import List, Optional, Dict
 from datetime import datetime, timezone, timedelta
-from motor.motor_asyncio import AsyncIOMotorClient
 from notification_service import notification_service
-import httpx
+from integrations.http_clients import request_with_retry
+from utils.database import get_database
+from utils.loaders import get_loaders
 
 logger = logging.getLogger(__name__)
 
 # Database connection
-mongo_url = os.environ.get('MONGO_URL')
-db_name = os.environ.get('DB_NAME', 'architecture_firm')
-client = AsyncIOMotorClient(mongo_url)
-db = client[db_name]
+db = get_database()
 
 # App URL
 APP_URL = os.environ.get('REACT_APP_BACKEND_URL', 'https://pmapp-stability.preview.emergentagent.com')
@@ -160,8 +159,24 @@ async def get_project_participants(project: Dict) -> List[Dict]:
     """Get all participants of a project"""
     participants = []
     
+    assigned_contractors = project.get('assigned_contractors', {})
+    if not isinstance(assigned_contractors, dict):
+        assigned_contractors = {}
+    assigned_consultants = project.get('assigned_consultants', {})
+    if not isinstance(assigned_consultants, dict):
+        assigned_consultants = {}
+    
+    # Resolve everyone at once: one batched query per collection, falling back to users
+    loaders = get_loaders()
+    owner, team_leader, client, contractors, consultants = await asyncio.gather(
+        db.users.find_one({"is_owner": True}, {"_id": 0}),
+        loaders.users.load(project.get('team_leader_id')),
+        loaders.find_first(project.get('client_id'), "clients", "users"),
+        asyncio.gather(*(loaders.find_first(cid, "contractors", "users") for cid in assigned_contractors.values())),
+        asyncio.gather(*(loaders.find_first(cid, "consultants", "users") for cid in assigned_consultants.values()))
+    )
+    
     # Get owner
-    owner = await db.users.find_one({"is_owner": True}, {"_id": 0})
     if owner:
         participants.append({
             "id": owner['id'],
@@ -172,62 +187,46 @@ async def get_project_participants(project: Dict) -> List[Dict]:
         })
     
     # Get team leader
-    if project.get('team_leader_id'):
-        team_leader = await db.users.find_one({"id": project['team_leader_id']}, {"_id": 0})
-        if team_leader:
-            participants.append({
-                "id": team_leader['id'],
-                "name": team_leader['name'],
-                "role": "Team Leader",
-                "phone": team_leader.get('mobile'),
-                "type": "team_leader"
-            })
+    if team_leader:
+        participants.append({
+            "id": team_leader['id'],
+            "name": team_leader['name'],
+            "role": "Team Leader",
+            "phone": team_leader.get('mobile'),
+            "type": "team_leader"
+        })
     
     # Get client
-    if project.get('client_id'):
-        client = await db.clients.find_one({"id": project['client_id']}, {"_id": 0})
-        if not client:
-            client = await db.users.find_one({"id": project['client_id']}, {"_id": 0})
-        if client:
-            participants.append({
-                "id": client['id'],
-                "name": client.get('name', client.get('contact_person', 'Client')),
-                "role": "Client",
-                "phone": client.get('phone', client.get('mobile')),
-                "type": "client"
-            })
+    if client:
+        participants.append({
+            "id": client['id'],
+            "name": client.get('name', client.get('contact_person', 'Client')),
+            "role": "Client",
+            "phone": client.get('phone', client.get('mobile')),
+            "type": "client"
+        })
     
     # Get assigned contractors
-    assigned_contractors = project.get('assigned_contractors', {})
-    if isinstance(assigned_contractors, dict):
-        for contractor_type, contractor_id in assigned_contractors.items():
-            contractor = await db.contractors.find_one({"id": contractor_id}, {"_id": 0})
-            if not contractor:
-                contractor = await db.users.find_one({"id": contractor_id}, {"_id": 0})
-            if contractor:
-                participants.append({
-                    "id": contractor['id'],
-                    "name": contractor.get('name', 'Contractor'),
-                    "role": f"{contractor_type} Contractor",
-                    "phone": contractor.get('phone', contractor.get('mobile')),
-                    "type": "contractor"
-                })
+    for contractor_type, contractor in zip(assigned_contractors, contractors):
+        if contractor:
+            participants.append({
+                "id": contractor['id'],
+                "name": contractor.get('name', 'Contractor'),
+                "role": f"{contractor_type} Contractor",
+                "phone": contractor.get('phone', contractor.get('mobile')),
+                "type": "contractor"
+            })
     
     # Get assigned consultants
-    assigned_consultants = project.get('assigned_consultants', {})
-    if isinstance(assigned_consultants, dict):
-        for consultant_type, consultant_id in assigned_consultants.items():
-            consultant = await db.consultants.find_one({"id": consultant_id}, {"_id": 0})
-            if not consultant:
-                consultant = await db.users.find_one({"id": consultant_id}, {"_id": 0})
-            if consultant:
-                participants.append({
-                    "id": consultant['id'],
-                    "name": consultant.get('name', 'Consultant'),
-                    "role": f"{consultant_type} Consultant",
-                    "phone": consultant.get('phone', consultant.get('mobile')),
-                    "type": "consultant"
-                })
+    for consultant_type, consultant in zip(assigned_consultants, consultants):
+        if consultant:
+            participants.append({
+                "id": consultant['id'],
+                "name": consultant.get('name', 'Consultant'),
+                "role": f"{consultant_type} Consultant",
+                "phone": consultant.get('phone', consultant.get('mobile')),
+                "type": "consultant"
+            })
     
     # Remove duplicates based on id
     seen_ids = set()
@@ -333,24 +332,23 @@ async def send_whatsapp_with_media(phone_number: str, message: str, media_url: s
             "MediaUrl": media_url
         }
         
-        async with httpx.AsyncClient() as http_client:
-            response = await http_client.post(
-                url,
-                data=data,
-                auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN),
-                timeout=30.0
-            )
+        response = await request_with_retry(
+            "twilio", "POST", url,
+            data=data,
+            auth=(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN),
+            timeout=30.0
+        )
+        
+        if response.status_code == 201:
+            result = response.json()
+            return {
+                "success": True,
+                "message_sid": result.get('sid'),
+                "status": result.get('status')
+            }
+        else:
+            return {"success": False, "error": response.text}
             
-            if response.status_code == 201:
-                result = response.json()
-                return {
-                    "success": True,
-                    "message_sid": result.get('sid'),
-                    "status": result.get('status')
-                }
-            else:
-                return {"success": False, "error": response.text}
-                
     except Exception as e:
         logger.error(f"WhatsApp with media error: {str(e)}")
         return {"success": False, "error": str(e)}
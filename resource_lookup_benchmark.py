@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Resource File Lookup Benchmark
+Compares the old per-request directory scan used to find a resource's file
+(os.listdir + prefix match) with the stored file_path lookup, in a
+resources directory holding 100k files.
+
+Usage:
+    python resource_lookup_benchmark.py [--files 100000] [--lookups 200]
+"""
+
+import os
+import sys
+import time
+import uuid
+import random
+import shutil
+import argparse
+import tempfile
+import statistics
+
+
+def populate(directory, count):
+    """Create ``count`` resource files named like uploads: <id>_<hex>.<ext>"""
+    paths = {}
+    for _ in range(count):
+        resource_id = str(uuid.uuid4())
+        path = os.path.join(directory, f"{resource_id}_{uuid.uuid4().hex[:8]}.pdf")
+        with open(path, "wb") as f:
+            f.write(b"%PDF-1.4\n")
+        paths[resource_id] = path
+    return paths
+
+
+def scan_lookup(directory, resource_id):
+    """Previous behaviour: list the directory and prefix-match every name"""
+    file_pattern = f"{resource_id}_"
+    for filename in os.listdir(directory):
+        if filename.startswith(file_pattern):
+            return os.path.join(directory, filename)
+    return None
+
+
+def stored_path_lookup(paths, resource_id):
+    """Current behaviour: file_path comes from the resource document"""
+    path = paths[resource_id]
+    os.stat(path)
+    return path
+
+
+def measure(label, fn, keys):
+    timings = []
+    for key in keys:
+        started = time.perf_counter()
+        path = fn(key)
+        with open(path, "rb") as f:
+            f.read(16)
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<22} median {statistics.median(timings):9.3f} ms   p95 {p95:9.3f} ms")
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=100000)
+    parser.add_argument("--lookups", type=int, default=200)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="resources_bench_")
+    try:
+        print(f"Creating {args.files} files in {directory} ...")
+        paths = populate(directory, args.files)
+        keys = random.sample(list(paths), min(args.lookups, len(paths)))
+
+        scan = measure("os.listdir scan", lambda key: scan_lookup(directory, key), keys)
+        stored = measure("stored file_path", lambda key: stored_path_lookup(paths, key), keys)
+        print(f"Speed-up: {scan / stored:.0f}x")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+"""
+Tests for cron parsing and next-run computation (backend/services/job_runner.py)
+"""
+
+import os
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("motor")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test")
+
+from services.job_runner import CronSchedule, _parse_cron_field  # noqa: E402
+
+
+def at(year, month, day, hour=0, minute=0):
+    return datetime(year, month, day, hour, minute, tzinfo=timezone.utc)
+
+
+# _parse_cron_field
+
+def test_parse_lists_ranges_and_steps():
+    assert _parse_cron_field("*", 0, 5) == {0, 1, 2, 3, 4, 5}
+    assert _parse_cron_field("1,3,5", 0, 59) == {1, 3, 5}
+    assert _parse_cron_field("10-12", 0, 59) == {10, 11, 12}
+    assert _parse_cron_field("*/15", 0, 59) == {0, 15, 30, 45}
+    assert _parse_cron_field("1-10/3", 0, 59) == {1, 4, 7, 10}
+    # a/b runs from a to the top of the range
+    assert _parse_cron_field("5/20", 0, 59) == {5, 25, 45}
+
+
+@pytest.mark.parametrize("field, low, high", [
+    ("60", 0, 59),
+    ("24", 0, 23),
+    ("0", 1, 31),
+    ("13", 1, 12),
+    ("8", 0, 7),
+    ("5-70", 0, 59),
+    ("10-5", 0, 59),
+    ("*/0", 0, 59),
+])
+def test_out_of_range_fields_are_rejected(field, low, high):
+    with pytest.raises(ValueError):
+        _parse_cron_field(field, low, high)
+
+
+def test_malformed_expressions_are_rejected():
+    with pytest.raises(ValueError):
+        CronSchedule("0 0 * *")
+    with pytest.raises(ValueError):
+        CronSchedule("0 0 * * mon")
+    with pytest.raises(ValueError):
+        CronSchedule("61 0 * * *")
+
+
+# CronSchedule
+
+def test_weekday_zero_and_seven_are_sunday():
+    sunday = 6  # datetime.weekday()
+    assert CronSchedule("0 9 * * 0").weekdays == {sunday}
+    assert CronSchedule("0 9 * * 7").weekdays == {sunday}
+    # 2026-10-16 is a Friday; the next Sunday is the 18th
+    assert CronSchedule("0 9 * * 0").next_after(at(2026, 10, 16)) == at(2026, 10, 18, 9)
+    assert CronSchedule("0 9 * * 7").next_after(at(2026, 10, 16)) == at(2026, 10, 18, 9)
+
+
+def test_both_day_fields_restricted_match_either():
+    # The 13th, or any Friday
+    schedule = CronSchedule("0 0 13 * 5")
+    # Friday the 16th -> Friday the 23rd (not Nov 13)
+    assert schedule.next_after(at(2026, 10, 16)) == at(2026, 10, 23)
+    # Tuesday the 13th counts although it isn't a Friday
+    assert schedule.next_after(at(2026, 10, 12, 12)) == at(2026, 10, 13)
+
+
+def test_one_day_field_restricted_must_match():
+    # Only the weekday is restricted: day-of-month "*" doesn't widen it
+    assert CronSchedule("0 0 * * 5").next_after(at(2026, 10, 17)) == at(2026, 10, 23)
+    # Only the day-of-month is restricted
+    assert CronSchedule("0 0 13 * *").next_after(at(2026, 10, 14)) == at(2026, 11, 13)
+
+
+def test_minute_steps():
+    schedule = CronSchedule("*/15 * * * *")
+    assert schedule.next_after(at(2026, 10, 16, 10, 7)) == at(2026, 10, 16, 10, 15)
+    assert schedule.next_after(at(2026, 10, 16, 10, 45)) == at(2026, 10, 16, 11, 0)
+
+
+def test_next_after_is_strictly_later():
+    schedule = CronSchedule("30 2 * * *")
+    assert schedule.next_after(at(2026, 10, 16, 2, 30)) == at(2026, 10, 17, 2, 30)
+    # Seconds are dropped before stepping forward
+    moment = datetime(2026, 10, 16, 2, 29, 59, tzinfo=timezone.utc)
+    assert schedule.next_after(moment) == at(2026, 10, 16, 2, 30)
+
+
+def test_month_rollover():
+    # The 31st skips months without one
+    assert CronSchedule("0 0 31 * *").next_after(at(2026, 1, 31)) == at(2026, 3, 31)
+    # December rolls into the next year
+    assert CronSchedule("0 0 1 * *").next_after(at(2026, 12, 15)) == at(2027, 1, 1)
+    # A restricted month waits for the next year's occurrence
+    assert CronSchedule("0 6 1 3 *").next_after(at(2026, 3, 1, 7)) == at(2027, 3, 1, 6)
+
+
+def test_never_matching_expression_raises():
+    with pytest.raises(ValueError):
+        CronSchedule("0 0 30 2 *").next_after(at(2026, 1, 1))
@@ -0,0 +1,73 @@
+"""
+Tests for bounded-concurrency fan-out (backend/utils/fanout.py)
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from utils.fanout import FanOutError, fan_out  # noqa: E402
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_fan_out_keeps_input_order():
+    async def scenario():
+        async def worker(i):
+            await asyncio.sleep(0.001 * (5 - i))
+            return i * 10
+
+        assert await fan_out(range(5), worker, concurrency=5) == [0, 10, 20, 30, 40]
+
+    run(scenario())
+
+
+def test_fan_out_isolates_failures():
+    async def scenario():
+        done = []
+
+        async def worker(i):
+            await asyncio.sleep(0.001)
+            if i == 2:
+                raise ValueError("boom")
+            done.append(i)
+            return i
+
+        results = await fan_out(range(5), worker, concurrency=2)
+        assert [r for r in results if not isinstance(r, FanOutError)] == [0, 1, 3, 4]
+        failed = results[2]
+        assert isinstance(failed, FanOutError)
+        assert failed.item == 2
+        assert isinstance(failed.error, ValueError)
+        # The failure cancelled nothing
+        assert sorted(done) == [0, 1, 3, 4]
+
+    run(scenario())
+
+
+def test_fan_out_bounds_concurrency():
+    async def scenario():
+        in_flight = 0
+        peak = 0
+
+        async def worker(i):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.001)
+            in_flight -= 1
+            return i
+
+        results = await fan_out(range(20), worker, concurrency=3)
+        assert results == list(range(20))
+        assert peak == 3
+
+        peak = 0
+        await fan_out(range(5), worker, concurrency=0)
+        assert peak == 1
+
+    run(scenario())
@@ -0,0 +1,162 @@
+"""
+Tests for range and revalidation handling (backend/services/file_serving.py)
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("motor")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test")
+
+from starlette.requests import Request  # noqa: E402
+
+from services import file_serving  # noqa: E402
+from services.file_serving import parse_range, serve_file  # noqa: E402
+
+CONTENT = b"0123456789abcdefghij"
+SHA = "c0ffee"
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def make_request(headers=None, method="GET"):
+    return Request({
+        "type": "http",
+        "method": method,
+        "path": "/file",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()],
+    })
+
+
+async def body_of(response):
+    if hasattr(response, "body_iterator"):
+        return b"".join([chunk async for chunk in response.body_iterator])
+    return response.body
+
+
+@pytest.fixture
+def stored_file(tmp_path, monkeypatch):
+    path = tmp_path / "drawing.pdf"
+    path.write_bytes(CONTENT)
+
+    async def locate(p):
+        return Path(p) if Path(p).is_file() else None
+
+    async def content_hash(p, resolved=None):
+        return SHA
+
+    monkeypatch.setattr(file_serving.blob_store, "locate", locate)
+    monkeypatch.setattr(file_serving.blob_store, "content_hash", content_hash)
+    return path
+
+
+# parse_range
+
+def test_parse_range_explicit_and_open_ended():
+    assert parse_range("bytes=0-3", 20) == (0, 3)
+    assert parse_range("bytes=5-", 20) == (5, 19)
+    # An end past the file is clamped
+    assert parse_range("bytes=10-100", 20) == (10, 19)
+
+
+def test_parse_range_suffix():
+    assert parse_range("bytes=-4", 20) == (16, 19)
+    # A suffix longer than the file is the whole file
+    assert parse_range("bytes=-50", 20) == (0, 19)
+
+
+def test_parse_range_ignores_multi_range_and_malformed_headers():
+    assert parse_range("bytes=0-1,4-5", 20) is None
+    assert parse_range("items=0-3", 20) is None
+    assert parse_range("bytes=abc", 20) is None
+    assert parse_range("bytes=-", 20) is None
+    assert parse_range("bytes=5-2", 20) is None
+
+
+def test_parse_range_unsatisfiable():
+    with pytest.raises(ValueError):
+        parse_range("bytes=20-", 20)
+    with pytest.raises(ValueError):
+        parse_range("bytes=-0", 20)
+    with pytest.raises(ValueError):
+        parse_range("bytes=-5", 0)
+
+
+# serve_file
+
+def test_range_request_returns_partial_content(stored_file):
+    response = run(serve_file(make_request({"Range": "bytes=2-5"}), stored_file))
+    assert response.status_code == 206
+    assert response.headers["content-range"] == f"bytes 2-5/{len(CONTENT)}"
+    assert response.headers["content-length"] == "4"
+    assert run(body_of(response)) == CONTENT[2:6]
+
+
+def test_suffix_and_open_ended_ranges(stored_file):
+    suffix = run(serve_file(make_request({"Range": "bytes=-3"}), stored_file))
+    assert suffix.status_code == 206
+    assert run(body_of(suffix)) == CONTENT[-3:]
+
+    open_ended = run(serve_file(make_request({"Range": "bytes=15-"}), stored_file))
+    assert open_ended.status_code == 206
+    assert open_ended.headers["content-range"] == f"bytes 15-19/{len(CONTENT)}"
+    assert run(body_of(open_ended)) == CONTENT[15:]
+
+
+def test_multi_range_falls_back_to_full_response(stored_file):
+    response = run(serve_file(make_request({"Range": "bytes=0-1,4-5"}), stored_file))
+    assert response.status_code == 200
+    assert "content-range" not in response.headers
+
+
+def test_unsatisfiable_range_returns_416(stored_file):
+    response = run(serve_file(make_request({"Range": "bytes=100-"}), stored_file))
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+
+def test_if_none_match_returns_304(stored_file):
+    response = run(serve_file(make_request({"If-None-Match": f'"{SHA}"'}), stored_file))
+    assert response.status_code == 304
+    assert response.headers["etag"] == f'"{SHA}"'
+
+    # Weak comparison, lists and "*" match too
+    for header in (f'W/"{SHA}"', f'"other", "{SHA}"', "*"):
+        assert run(serve_file(make_request({"If-None-Match": header}), stored_file)).status_code == 304
+
+
+def test_stale_if_none_match_returns_200(stored_file):
+    response = run(serve_file(make_request({"If-None-Match": '"stale"'}), stored_file))
+    assert response.status_code == 200
+
+
+def test_if_range_matching_etag_honours_range(stored_file):
+    headers = {"Range": "bytes=0-3", "If-Range": f'"{SHA}"'}
+    response = run(serve_file(make_request(headers), stored_file))
+    assert response.status_code == 206
+    assert run(body_of(response)) == CONTENT[:4]
+
+
+def test_if_range_stale_etag_falls_back_to_200(stored_file):
+    headers = {"Range": "bytes=0-3", "If-Range": '"stale"'}
+    response = run(serve_file(make_request(headers), stored_file))
+    assert response.status_code == 200
+    assert "content-range" not in response.headers
+
+
+def test_missing_file_is_404(tmp_path, stored_file):
+    from fastapi import HTTPException
+
+    with pytest.raises(HTTPException) as exc:
+        run(serve_file(make_request(), tmp_path / "missing.pdf"))
+    assert exc.value.status_code == 404
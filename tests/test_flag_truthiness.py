@@ -0,0 +1,67 @@
+"""
+Parity of the drawing flag truthiness rule between Python (flag_set) and
+Mongo (flag_expression / flag_filter), backend/services/project_stats.py
+"""
+
+import os
+import sys
+from numbers import Number
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("motor")
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test")
+
+from services.project_stats import flag_expression, flag_filter, flag_set  # noqa: E402
+
+MISSING = object()
+
+SET_VALUES = [True, 1, 1.0, "true"]
+UNSET_VALUES = [False, None, 0, 0.0, "", "false", "True", "1", MISSING]
+
+
+def bson_equal(a, b) -> bool:
+    """Equality as MongoDB compares BSON values: booleans never equal numbers"""
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is bool and type(b) is bool and a == b
+    if isinstance(a, Number) and isinstance(b, Number):
+        return a == b
+    return type(a) is type(b) and a == b
+
+
+def mongo_expression(expression: dict, doc: dict) -> bool:
+    """Evaluate an aggregation {"$in": ["$field", [...]]} against doc"""
+    field_ref, candidates = expression["$in"]
+    value = doc.get(field_ref[1:], MISSING)
+    if value is MISSING:
+        return False
+    return any(bson_equal(value, candidate) for candidate in candidates)
+
+
+def mongo_filter(query: dict, doc: dict) -> bool:
+    """Evaluate a find filter {field: {"$in" | "$nin": [...]}} against doc"""
+    (field, condition), = query.items()
+    (operator, candidates), = condition.items()
+    value = doc.get(field, MISSING)
+    # A missing field matches null for query operators
+    value = None if value is MISSING else value
+    found = any(bson_equal(value, candidate) for candidate in candidates)
+    return found if operator == "$in" else not found
+
+
+def doc_with(value) -> dict:
+    return {} if value is MISSING else {"under_review": value}
+
+
+@pytest.mark.parametrize("value", SET_VALUES + UNSET_VALUES, ids=repr)
+def test_python_and_mongo_agree(value):
+    doc = doc_with(value)
+    expected = value in SET_VALUES
+    assert flag_set(doc, "under_review") is expected
+    assert mongo_expression(flag_expression("under_review"), doc) is expected
+    assert mongo_filter(flag_filter("under_review"), doc) is expected
+    assert mongo_filter(flag_filter("under_review", False), doc) is not expected
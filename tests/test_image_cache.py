@@ -0,0 +1,86 @@
+"""
+Tests for the on-disk image cache (backend/services/image_cache.py)
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from services.image_cache import DiskLRUCache  # noqa: E402
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_misses_share_one_render(tmp_path):
+    async def scenario():
+        cache = DiskLRUCache(tmp_path, 1024 * 1024)
+        calls = 0
+
+        async def render(temp_path):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            temp_path.write_bytes(b"variant")
+
+        paths = await asyncio.gather(*(cache.get_or_create("k", render) for _ in range(10)))
+        assert calls == 1
+        assert len(set(paths)) == 1
+        assert paths[0].read_bytes() == b"variant"
+        assert cache.stats()["coalesced"] == 9
+
+    run(scenario())
+
+
+def test_cancelled_leader_does_not_cancel_waiters(tmp_path):
+    async def scenario():
+        cache = DiskLRUCache(tmp_path, 1024 * 1024)
+        release = asyncio.Event()
+
+        async def render(temp_path):
+            await release.wait()
+            temp_path.write_bytes(b"variant")
+
+        leader = asyncio.ensure_future(cache.get_or_create("k", render))
+        while not cache.stats()["inflight"]:
+            await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(cache.get_or_create("k", render))
+        await asyncio.sleep(0.01)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        path = await waiter
+        assert path.read_bytes() == b"variant"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        assert cache.stats()["inflight"] == 0
+        assert cache.stats()["entries"] == 1
+
+    run(scenario())
+
+
+def test_failed_render_reaches_waiters_and_leaves_no_temp_file(tmp_path):
+    async def scenario():
+        cache = DiskLRUCache(tmp_path, 1024 * 1024)
+
+        async def render(temp_path):
+            temp_path.write_bytes(b"partial")
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            *(cache.get_or_create("k", render) for _ in range(3)),
+            return_exceptions=True
+        )
+        assert all(isinstance(r, ValueError) for r in results)
+        assert cache.stats()["errors"] == 1
+        assert not any(p.name.endswith(".tmp") for p in tmp_path.rglob("*"))
+
+    run(scenario())
@@ -0,0 +1,152 @@
+"""
+Tests for the in-process cache engine (backend/utils/memory_cache.py)
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from utils.memory_cache import ShardedLRUCache  # noqa: E402
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_concurrent_misses_share_one_load():
+    async def scenario():
+        cache = ShardedLRUCache()
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "value"
+
+        results = await asyncio.gather(*(cache.get_or_load("k", loader, 60) for _ in range(20)))
+        assert results == ["value"] * 20
+        assert calls == 1
+        assert cache.get("k") == "value"
+
+    run(scenario())
+
+
+def test_cancelled_leader_does_not_cancel_waiters():
+    async def scenario():
+        cache = ShardedLRUCache()
+        release = asyncio.Event()
+
+        async def loader():
+            await release.wait()
+            return "value"
+
+        leader = asyncio.ensure_future(cache.get_or_load("k", loader, 60))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(cache.get_or_load("k", loader, 60))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await waiter == "value"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        # The load finished and was stored despite the cancelled leader
+        assert cache.get("k") == "value"
+        assert cache.stats()["inflight"] == 0
+
+    run(scenario())
+
+
+def test_cancelled_waiter_does_not_cancel_load():
+    async def scenario():
+        cache = ShardedLRUCache()
+        release = asyncio.Event()
+
+        async def loader():
+            await release.wait()
+            return "value"
+
+        leader = asyncio.ensure_future(cache.get_or_load("k", loader, 60))
+        await asyncio.sleep(0)
+        waiter = asyncio.ensure_future(cache.get_or_load("k", loader, 60))
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await leader == "value"
+        assert waiter.cancelled()
+
+    run(scenario())
+
+
+def test_loader_exception_reaches_every_caller_and_is_not_cached():
+    async def scenario():
+        cache = ShardedLRUCache()
+        calls = 0
+
+        async def failing():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            raise ValueError("boom")
+
+        results = await asyncio.gather(
+            *(cache.get_or_load("k", failing, 60) for _ in range(3)),
+            return_exceptions=True
+        )
+        assert calls == 1
+        assert all(isinstance(r, ValueError) for r in results)
+        assert "k" not in cache
+        assert cache.stats()["load_errors"] == 1
+
+        async def working():
+            return "value"
+
+        # The next miss loads again
+        assert await cache.get_or_load("k", working, 60) == "value"
+
+    run(scenario())
+
+
+def test_load_invalidated_in_flight_is_returned_but_not_stored():
+    async def scenario():
+        cache = ShardedLRUCache()
+        release = asyncio.Event()
+
+        async def loader():
+            await release.wait()
+            return "stale"
+
+        pending = asyncio.ensure_future(cache.get_or_load("k", loader, 60, tags=["t"]))
+        await asyncio.sleep(0)
+        cache.invalidate_tag("t")
+        release.set()
+
+        assert await pending == "stale"
+        assert "k" not in cache
+
+    run(scenario())
+
+
+def test_entry_and_byte_budgets_evict_least_recently_used():
+    cache = ShardedLRUCache(max_entries=4, max_bytes=1024 * 1024, shards=1)
+    for i in range(4):
+        cache.set(f"k{i}", i, 60)
+    cache.get("k0")
+    cache.set("k4", 4, 60)
+    assert "k0" in cache
+    assert "k1" not in cache
+
+    small = ShardedLRUCache(max_entries=100, max_bytes=2000, shards=1)
+    small.set("big", "x" * 5000, 60)
+    assert "big" not in small
+    assert small.stats()["rejected"] == 1
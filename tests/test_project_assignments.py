@@ -0,0 +1,41 @@
+"""
+Tests for assignment id extraction (backend/services/project_assignments.py)
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from services.project_assignments import (  # noqa: E402
+    assigned_party_ids, assignment_update, touches_assignments, ASSIGNED_PARTY_IDS_EXPRESSION
+)
+
+
+def test_ids_come_from_both_maps_deduplicated():
+    project = {
+        "assigned_contractors": {"Civil": "c1", "Electrical": "c2", "Tiles": "c1"},
+        "assigned_consultants": {"Structural": "s1", "MEP": "c2"},
+    }
+    assert assigned_party_ids(project) == ["c1", "c2", "s1"]
+
+
+def test_missing_legacy_and_empty_values_are_ignored():
+    assert assigned_party_ids({}) == []
+    assert assigned_party_ids({"assigned_contractors": None, "assigned_consultants": ["c1"]}) == []
+    assert assigned_party_ids({"assigned_contractors": {"Civil": "", "Tiles": None, "Paint": "c3"}}) == ["c3"]
+
+
+def test_assignment_update_sets_fields_literally_then_recomputes():
+    pipeline = assignment_update({"assigned_contractors": {"Civil": "c1"}, "notes": "$100 advance"})
+    assert pipeline[0] == {"$set": {
+        "assigned_contractors": {"$literal": {"Civil": "c1"}},
+        "notes": {"$literal": "$100 advance"},
+    }}
+    assert pipeline[1] == {"$set": {"assigned_party_ids": ASSIGNED_PARTY_IDS_EXPRESSION}}
+
+
+def test_touches_assignments():
+    assert touches_assignments({"assigned_contractors": {}})
+    assert touches_assignments({"assigned_consultants": {"MEP": "c1"}})
+    assert not touches_assignments({"title": "New name"})
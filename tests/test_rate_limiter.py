@@ -0,0 +1,125 @@
+"""
+Tests for the provider token-bucket limiter (backend/integrations/rate_limiter.py)
+"""
+
+import asyncio
+import os
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+# Importing the integrations package loads the provider clients
+for module in ("dotenv", "httpx", "motor", "sendgrid"):
+    pytest.importorskip(module)
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test")
+
+from integrations import rate_limiter  # noqa: E402
+from integrations.rate_limiter import AsyncRateLimiter  # noqa: E402
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class FakeClock:
+    """
+    Monotonic clock that only moves when the limiter sleeps (or a test
+    advances it). Tests use rates whose intervals are exact in binary so
+    the token arithmetic has no rounding residue.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+        self._real_sleep = asyncio.sleep
+
+    def monotonic(self):
+        return self.now
+
+    async def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+        await self._real_sleep(0)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # Only the limiter sees the fake clock; the event loop keeps the real one
+    fake = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", SimpleNamespace(monotonic=fake.monotonic))
+    monkeypatch.setattr(rate_limiter, "asyncio", SimpleNamespace(Lock=asyncio.Lock, sleep=fake.sleep))
+    return fake
+
+
+def test_burst_is_available_immediately(clock):
+    async def scenario():
+        limiter = AsyncRateLimiter(rate=4, burst=3)
+        for _ in range(3):
+            await limiter.acquire()
+        assert clock.sleeps == []
+        assert limiter.waits == 0
+
+        await limiter.acquire()
+        assert clock.sleeps == [0.25]
+        assert limiter.waits == 1
+
+    run(scenario())
+
+
+def test_tokens_refill_at_rate_up_to_burst(clock):
+    async def scenario():
+        limiter = AsyncRateLimiter(rate=4, burst=3)
+        for _ in range(3):
+            await limiter.acquire()
+
+        # 0.5s buys two sends
+        clock.now += 0.5
+        await limiter.acquire()
+        await limiter.acquire()
+        assert clock.sleeps == []
+        await limiter.acquire()
+        assert len(clock.sleeps) == 1
+
+        # A long idle period saves up no more than the burst
+        clock.now += 60
+        for _ in range(3):
+            await limiter.acquire()
+        assert len(clock.sleeps) == 1
+        await limiter.acquire()
+        assert len(clock.sleeps) == 2
+
+    run(scenario())
+
+
+def test_concurrent_acquirers_are_spaced_at_the_rate(clock):
+    async def scenario():
+        limiter = AsyncRateLimiter(rate=4, burst=1)
+        granted = []
+
+        async def send(i):
+            await limiter.acquire()
+            granted.append(clock.now)
+
+        start = clock.now
+        await asyncio.gather(*(send(i) for i in range(10)))
+        assert len(granted) == 10
+        gaps = [b - a for a, b in zip(granted, granted[1:])]
+        assert gaps == [0.25] * 9
+        assert granted[-1] - start == 2.25
+
+    run(scenario())
+
+
+def test_zero_rate_is_unlimited(clock):
+    async def scenario():
+        limiter = AsyncRateLimiter(rate=0, burst=1)
+        for _ in range(100):
+            await limiter.acquire()
+        assert clock.sleeps == []
+
+    run(scenario())